@@ -3,27 +3,47 @@ Test Scenario & Coverage Generator - Web Application
 A web interface for generating structured test scenarios from code changes.
 """
 
-from flask import Flask, render_template, request, jsonify, Response, send_file
+from flask import Flask, g, render_template, request, jsonify, Response
 from flask_cors import CORS
+import gzip
+import hashlib
 import io
 import json
 import os
+import re
 from dotenv import load_dotenv
 import traceback
+from dataclasses import asdict
 from datetime import datetime
 
 import boto3
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
 
 from src.git_analyzer import GitHubPRAnalyzer
+from src.bulk_analyzer import BulkAnalyzer, BulkCheckpoint
+from src.github_client import GitHubRateLimitError
 from src.code_analyzer import CodeAnalyzer
 from src.test_generator import TestScenarioGenerator
-from src.excel_processor import ExcelProcessor, ExcelParseError
+from src.excel_processor import (
+    ExcelProcessor, ExcelParseError, TestSuiteTable, suite_format, DECISION_OUTPUT_SPEC, PLAN_OUTPUT_SPEC,
+)
 from src.excel_mapper import ExcelMapper
-from src.jira_client import ZephyrScaleClient
+from src.exporters import TestCaseExporter, EXPORT_FORMATS
+from src.jira_client import ZephyrScaleClient, ZephyrError, ZephyrTestCase
+from src.zephyr_mirror import ZephyrMirror
+from src.zephyr_cycles import CyclePusher
 from src.decision_rules import apply_decision
+from src.coverage_index import (
+    CoverageFormatError, CoverageIndex, impact_mappings, mark_impacted, merge_coverage, parse_coverage,
+)
+from src.run_planner import load_duration_history, plan_suite_run
+from src.incremental import affected_cases, changed_files, file_fingerprints, merge_cases
+from src.upload_store import UploadStore, UploadNotFoundError
+from src.result_store import ResultNotFoundError, ResultStore
+from src.webhooks import ANALYSE_ACTIONS, PRPrecomputer, pull_request_target, verify_signature
+from src.health_monitor import DISABLED, UP, HealthMonitor, default_probes
+from src.tracing import KIND_SERVER, Tracer, end_span, server_timing, start_span
+from src.progress import JOB_ID_RE, ProgressChannel, activate, current as current_progress, deactivate, stage
+from src.jobs import JobRunner
 
 # Load environment variables
 import pathlib
@@ -46,11 +66,94 @@ _bedrock_client = boto3.client(
     aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
 )
 
+# Uploaded workbooks, parsed rows and mapping results, shared across workers
+_upload_store = UploadStore.from_env()
+# Analysis results, addressable by result ID (GET /api/results/<id>)
+_result_store = ResultStore.from_env()
+_coverage_index = CoverageIndex.from_env()
+
+# Jira / GitHub / Bedrock probed in the background once the first request
+# is served (start_health_probes); health endpoints and fail-fast checks
+# read the cached results
+_health = HealthMonitor.from_env(default_probes(_bedrock_client))
+
+# Request tracing: spans go to TRACE_EXPORTER (file / OTLP); each response's
+# Server-Timing header summarises its stages
+Tracer.from_env().install()
+
+# Static files, long-lived progress streams and load balancer health checks
+UNTRACED_ENDPOINTS = {'static', 'progress_events', 'health'}
+
+# Stage progress of long-running requests, streamed by GET /api/progress/<id>
+_progress = ProgressChannel.from_env()
+# Pushes, bulk analyses and crawls that outlast a request run as background
+# jobs; GET /api/jobs/<id> reports their state and result
+_jobs = JobRunner.from_env(_progress)
+
+# Endpoints that report stage progress → their pipeline (src/progress.py)
+PROGRESS_PIPELINES = {
+    'analyze_pr': 'analyze-pr',
+    'analyze_diff': 'analyze-diff',
+    'map_excel': 'map-excel',
+    'download_mapped_excel': 'download-mapped-excel',
+}
+
+
+def _unavailable(*dependencies):
+    """503 response when a dependency is known to be down, else None."""
+    down = [name for name in dependencies if _health.is_down(name)]
+    if not down:
+        return None
+    return jsonify({
+        'success': False,
+        'error': f"{', '.join(d.capitalize() for d in down)} is currently unavailable. Please try again later.",
+        'unavailable': down,
+    }), 503
+
+
+@app.before_request
+def start_health_probes():
+    # Here rather than at import, so importing the app (tests, tools) makes no network calls
+    _health.start()
+
+
+@app.before_request
+def start_trace():
+    if request.endpoint in UNTRACED_ENDPOINTS:
+        return
+    route = request.url_rule.rule if request.url_rule else request.path
+    g.trace = start_span(
+        f'{request.method} {route}', KIND_SERVER,
+        traceparent=request.headers.get('traceparent'),
+        **{'http.method': request.method, 'http.route': route},
+    )
+
+
+@app.after_request
+def finish_trace(response):
+    trace = g.pop('trace', None)
+    if trace is None:
+        return response
+    root, token = trace
+    root.set(**{'http.status_code': response.status_code})
+    if response.status_code >= 500:
+        root.error = f'HTTP {response.status_code}'
+    end_span(root, token)
+    response.headers['Server-Timing'] = server_timing(root)
+    return response
+
+
+@app.teardown_request
+def abort_trace(exc=None):
+    trace = g.pop('trace', None)    # still open: the request raised
+    if trace is not None:
+        end_span(*trace, error=exc)
+
 
 @app.before_request
 def require_basic_auth():
-    if request.path == '/health':
-        return None
+    if request.path in ('/health', '/webhooks/github'):
+        return None  # the webhook authenticates by signature
 
     app_username = os.getenv('APP_USERNAME', '')
     app_password = os.getenv('APP_PASSWORD', '')
@@ -67,6 +170,27 @@ def require_basic_auth():
         )
 
 
+@app.before_request
+def start_progress():
+    pipeline = PROGRESS_PIPELINES.get(request.endpoint)
+    if pipeline:
+        g.progress_token = activate(_progress.reporter(pipeline, request.headers.get('X-Progress-Id')))
+
+
+@app.after_request
+def finish_progress(response):
+    if 'progress_token' in g:
+        current_progress().finish(ok=response.status_code < 400)
+    return response
+
+
+@app.teardown_request
+def reset_progress(exc=None):
+    token = g.pop('progress_token', None)
+    if token is not None:
+        deactivate(token)
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -81,8 +205,15 @@ def analyze_pr():
     """
     Analyse a GitHub pull request and generate structured test cases.
 
-    JSON payload: { "pr_url": "...", "generate_code": false }
+    JSON payload: { "pr_url": "...", "generate_code": false, "full": false }
+
+    After new commits, only files whose changes differ from the PR's last
+    analysis are regenerated (``"full": true`` regenerates everything);
+    ``data.delta`` lists the case ids added, changed and retired.
     """
+    unavailable = _unavailable('github', 'bedrock')
+    if unavailable:
+        return unavailable
     try:
         data = request.get_json()
         if not data or 'pr_url' not in data:
@@ -90,6 +221,7 @@ def analyze_pr():
 
         pr_url = data['pr_url'].strip()
         generate_code = data.get('generate_code', False)
+        full = data.get('full', False)
 
         if 'github.com' not in pr_url:
             return jsonify({'success': False, 'error': 'Invalid GitHub PR URL. Must contain github.com'}), 400
@@ -105,11 +237,24 @@ def analyze_pr():
         except ValueError:
             return jsonify({'success': False, 'error': 'Invalid PR number'}), 400
 
-        # Step 1: Fetch from GitHub
+        # Step 1: Fetch PR info (cache-revalidated). A webhook or an earlier
+        # request may already have analysed this head SHA; then serve that.
+        # Otherwise fetch the diff; huge PRs fall back to the paged files API,
+        # which is consumed lazily by the parser — so parsing happens here,
+        # where GitHub errors are handled.
         gh_analyzer = GitHubPRAnalyzer(os.getenv('GITHUB_TOKEN'))
+        code_analyzer = CodeAnalyzer()
+        pr_key = f'{owner}/{repo}#{pr_number}'
         try:
-            diff_text = gh_analyzer.get_pr_diff(owner, repo, pr_number)
-            pr_info = gh_analyzer.get_pr_info(owner, repo, pr_number)
+            with stage('github_fetch'):
+                pr_info = gh_analyzer.get_pr_info(owner, repo, pr_number)
+                stored = None if full else _result_store.get_pr_analysis(pr_key, pr_info.get('head_sha'))
+                if stored is None:
+                    diff_lines, pr_info = gh_analyzer.get_pr_changes(owner, repo, pr_number, info=pr_info)
+                    # Paged diffs are fetched as the parser consumes them
+                    parsed_diff = code_analyzer.parse_diff_lines(diff_lines)
+        except GitHubRateLimitError as e:
+            return jsonify({'success': False, 'error': f'{e}. Please retry later.'}), 429
         except Exception as e:
             error_msg = str(e)
             if '401' in error_msg:
@@ -118,43 +263,115 @@ def analyze_pr():
                 return jsonify({'success': False, 'error': 'PR not found. Check the URL and repository access'}), 404
             return jsonify({'success': False, 'error': f'GitHub API error: {error_msg}'}), 500
 
-        # Step 2: Analyse code changes (local)
-        code_analyzer = CodeAnalyzer()
-        parsed_diff = code_analyzer.parse_diff(diff_text)
-        change_types = code_analyzer.identify_change_types(parsed_diff)
-        diff_summary = code_analyzer.generate_summary(parsed_diff)
-
-        # Step 3: Single Bedrock call → structured test cases
         test_generator = TestScenarioGenerator()
-        try:
-            structured_test_cases = test_generator.generate_structured_test_cases(
-                diff_summary=diff_summary,
-                parsed_diff=parsed_diff,
-                change_types=change_types,
-                pr_context=pr_info,
-            )
-        except Exception as e:
-            error_msg = str(e)
-            if 'throttlingexception' in error_msg.lower() or 'toomanyrequests' in error_msg.lower():
-                return jsonify({'success': False, 'error': 'AWS Bedrock throttled. Please retry in a moment.'}), 429
-            elif 'accessdeniedexception' in error_msg.lower() or 'is not authorized' in error_msg.lower():
-                return jsonify({'success': False, 'error': 'AWS credentials invalid or lack Bedrock access.'}), 401
-            return jsonify({'success': False, 'error': f'AI generation error: {error_msg}'}), 500
+        if stored is not None:
+            analysis = stored
+        else:
+            # Step 2: Analyse code changes (local)
+            with stage('diff_parse'):
+                change_types = code_analyzer.identify_change_types(parsed_diff)
+                diff_summary = code_analyzer.generate_summary(parsed_diff)
+
+            # Step 3: Single Bedrock call → structured test cases (for the
+            # changed files only when the PR was analysed before)
+            try:
+                structured_test_cases, delta = _generate_pr_cases(
+                    test_generator, pr_key, pr_info, parsed_diff, change_types, diff_summary, full=full,
+                )
+            except Exception as e:
+                error_msg = str(e)
+                if 'throttlingexception' in error_msg.lower() or 'toomanyrequests' in error_msg.lower():
+                    return jsonify({'success': False, 'error': 'AWS Bedrock throttled. Please retry in a moment.'}), 429
+                elif 'accessdeniedexception' in error_msg.lower() or 'is not authorized' in error_msg.lower():
+                    return jsonify({'success': False, 'error': 'AWS credentials invalid or lack Bedrock access.'}), 401
+                return jsonify({'success': False, 'error': f'AI generation error: {error_msg}'}), 500
+
+            analysis = _pr_analysis(pr_key, pr_info, parsed_diff, change_types, structured_test_cases, delta)
 
         # Step 4: Optionally generate test code
+        structured_test_cases = analysis['structured_test_cases']
         test_code = None
         if generate_code:
             try:
-                test_code = test_generator.generate_automated_test_code(
-                    structured_test_cases=structured_test_cases,
-                    language="python",
-                    framework="pytest",
-                )
+                with stage('code_generation'):
+                    test_code = test_generator.generate_automated_test_code(
+                        structured_test_cases=structured_test_cases,
+                        language="python",
+                        framework="pytest",
+                    )
             except Exception as e:
                 test_code = f"Error generating test code: {str(e)}"
 
-        # Step 5: Build file analyses
-        file_analyses = [
+        result = dict(analysis, test_code=test_code, precomputed=stored is not None)
+        result['result_id'] = _result_store.put(result, kind='pr')
+        return jsonify({'success': True, 'data': result})
+
+    except Exception as e:
+        app.logger.error("analyze_pr error: %s", traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Unexpected error: {str(e)}'}), 500
+
+
+def _generate_pr_cases(test_generator, pr_key, pr_info, parsed_diff, change_types, diff_summary, full=False):
+    """
+    Generate the PR's test cases, incrementally when it was analysed before.
+
+    Returns:
+        (test cases, delta) — delta is None for a full generation, else
+        {"base_head_sha", "regenerated_files", "failed_files", "added",
+        "changed", "retired"}; failed_files kept their previous cases
+        because the model output for them was unparseable
+    """
+    latest = None if full else _result_store.get_latest_pr_analysis(pr_key)
+    if latest is None or 'file_fingerprints' not in latest[1]:
+        return test_generator.generate_structured_test_cases(
+            diff_summary=diff_summary,
+            parsed_diff=parsed_diff,
+            change_types=change_types,
+            pr_context=pr_info,
+        ), None
+
+    base_sha, previous = latest
+    previous_cases = previous['structured_test_cases']
+    changed, removed = changed_files(previous['file_fingerprints'], file_fingerprints(parsed_diff))
+    regenerated, failed = [], set()
+    if changed:
+        code_analyzer = CodeAnalyzer()
+        changed_diff = [f for f in parsed_diff if f['file_path'] in changed]
+        regenerated = test_generator.generate_structured_test_cases(
+            diff_summary=code_analyzer.generate_summary(changed_diff),
+            parsed_diff=changed_diff,
+            change_types=code_analyzer.identify_change_types(changed_diff),
+            pr_context=pr_info,
+            existing_cases=affected_cases(previous_cases, changed),
+        )
+        if not regenerated:
+            # Unparseable model output: keep the previous cases rather than retire them
+            failed, changed = changed, set()
+    cases, delta = merge_cases(previous_cases, regenerated, changed, removed)
+    return cases, dict(delta, base_head_sha=base_sha, regenerated_files=sorted(changed),
+                       failed_files=sorted(failed))
+
+
+def _pr_analysis(pr_key, pr_info, parsed_diff, change_types, structured_test_cases, delta=None) -> dict:
+    """
+    Build the analyze-pr response data (without test code) and store it
+    under the PR's head SHA, so the same commit is never analysed twice.
+    """
+    analysis = {
+        'pr_info': {
+            'title': pr_info['title'],
+            'author': pr_info['author'],
+            'base_branch': pr_info['base_branch'],
+            'head_branch': pr_info['head_branch'],
+            'head_sha': pr_info.get('head_sha'),
+            'state': pr_info['state'],
+        },
+        'summary': {
+            'total_files': len(parsed_diff),
+            'total_additions': sum(len(f['additions']) for f in parsed_diff),
+            'total_deletions': sum(len(f['deletions']) for f in parsed_diff),
+        },
+        'file_analyses': [
             {
                 'file_path': f['file_path'],
                 'additions': len(f['additions']),
@@ -163,34 +380,87 @@ def analyze_pr():
                 'has_deletions': len(f['deletions']) > 0,
             }
             for f in parsed_diff[:10]
-        ]
+        ],
+        'change_types': change_types,
+        'structured_test_cases': structured_test_cases,
+        'delta': delta,
+        'file_fingerprints': file_fingerprints(parsed_diff),
+        'generated_at': datetime.now().isoformat(),
+    }
+    # An empty or partly failed generation (unparseable model output) is worth
+    # retrying, not caching: stored fingerprints would mark the failed files
+    # as up to date, so they would never be regenerated
+    failed = delta is not None and delta.get('failed_files')
+    if pr_info.get('head_sha') and structured_test_cases and not failed:
+        _result_store.put_pr_analysis(pr_key, pr_info['head_sha'], analysis)
+    return analysis
 
-        return jsonify({
-            'success': True,
-            'data': {
-                'pr_info': {
-                    'title': pr_info['title'],
-                    'author': pr_info['author'],
-                    'base_branch': pr_info['base_branch'],
-                    'head_branch': pr_info['head_branch'],
-                    'state': pr_info['state'],
-                },
-                'summary': {
-                    'total_files': len(parsed_diff),
-                    'total_additions': sum(len(f['additions']) for f in parsed_diff),
-                    'total_deletions': sum(len(f['deletions']) for f in parsed_diff),
-                },
-                'file_analyses': file_analyses,
-                'change_types': change_types,
-                'structured_test_cases': structured_test_cases,
-                'test_code': test_code,
-                'generated_at': datetime.now().isoformat(),
-            }
-        })
 
-    except Exception as e:
-        app.logger.error("analyze_pr error: %s", traceback.format_exc())
-        return jsonify({'success': False, 'error': f'Unexpected error: {str(e)}'}), 500
+# ─────────────────────────────────────────────
+# GitHub webhook: precompute analyses on push
+# ─────────────────────────────────────────────
+
+def _precompute_pr(owner: str, repo: str, pr_number: int, head_sha: str) -> None:
+    """Background analysis of one PR head SHA (runs on the PRPrecomputer pool)."""
+    pr_key = f'{owner}/{repo}#{pr_number}'
+    if _result_store.get_pr_analysis(pr_key, head_sha) is not None:
+        return
+
+    gh_analyzer = GitHubPRAnalyzer(os.getenv('GITHUB_TOKEN'))
+    pr_info = gh_analyzer.get_pr_info(owner, repo, pr_number)
+    if pr_info.get('head_sha') and pr_info['head_sha'] != head_sha:
+        return  # superseded; the newer push has its own delivery
+
+    code_analyzer = CodeAnalyzer()
+    diff_lines, pr_info = gh_analyzer.get_pr_changes(owner, repo, pr_number, info=pr_info)
+    parsed_diff = code_analyzer.parse_diff_lines(diff_lines)
+    change_types = code_analyzer.identify_change_types(parsed_diff)
+    structured_test_cases, delta = _generate_pr_cases(
+        TestScenarioGenerator(), pr_key, pr_info, parsed_diff, change_types,
+        code_analyzer.generate_summary(parsed_diff),
+    )
+    _pr_analysis(pr_key, pr_info, parsed_diff, change_types, structured_test_cases, delta)
+    app.logger.info("Precomputed %s at %s (%d test cases)", pr_key, head_sha[:12], len(structured_test_cases))
+
+
+_precomputer = PRPrecomputer.from_env(_precompute_pr)
+
+
+@app.route('/webhooks/github', methods=['POST'])
+def github_webhook():
+    """
+    Receive GitHub pull_request events and precompute their analyses.
+
+    Configure the repository webhook with content type application/json
+    and the secret in GITHUB_WEBHOOK_SECRET; deliveries without a valid
+    X-Hub-Signature-256 are rejected.
+    """
+    secret = os.getenv('GITHUB_WEBHOOK_SECRET', '')
+    if not secret:
+        return jsonify({'success': False, 'error': 'Webhook receiver is not configured'}), 503
+    if not verify_signature(secret, request.get_data(), request.headers.get('X-Hub-Signature-256')):
+        return jsonify({'success': False, 'error': 'Invalid signature'}), 401
+
+    event = request.headers.get('X-GitHub-Event', '')
+    if event == 'ping':
+        return jsonify({'success': True, 'message': 'pong'})
+    if event != 'pull_request':
+        return jsonify({'success': True, 'message': f'Ignored {event or "unknown"} event'}), 202
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        owner, repo, pr_number, head_sha = pull_request_target(payload)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Malformed pull_request payload'}), 400
+
+    action = payload.get('action')
+    if action == 'closed':
+        _precomputer.cancel(owner, repo, pr_number)
+    elif action in ANALYSE_ACTIONS:
+        _precomputer.schedule(owner, repo, pr_number, head_sha)
+    else:
+        return jsonify({'success': True, 'message': f'Ignored {action} action'}), 202
+    return jsonify({'success': True, 'message': f'{action}: {owner}/{repo}#{pr_number}'}), 202
 
 
 @app.route('/api/analyze-diff', methods=['POST'])
@@ -200,6 +470,9 @@ def analyze_diff():
 
     JSON payload: { "diff_text": "...", "generate_code": false }
     """
+    unavailable = _unavailable('bedrock')
+    if unavailable:
+        return unavailable
     try:
         data = request.get_json()
         if not data or 'diff_text' not in data:
@@ -213,9 +486,10 @@ def analyze_diff():
 
         # Analyse code changes (local)
         code_analyzer = CodeAnalyzer()
-        parsed_diff = code_analyzer.parse_diff(diff_text)
-        change_types = code_analyzer.identify_change_types(parsed_diff)
-        diff_summary = code_analyzer.generate_summary(parsed_diff)
+        with stage('diff_parse'):
+            parsed_diff = code_analyzer.parse_diff(diff_text)
+            change_types = code_analyzer.identify_change_types(parsed_diff)
+            diff_summary = code_analyzer.generate_summary(parsed_diff)
 
         # Single Bedrock call → structured test cases
         test_generator = TestScenarioGenerator()
@@ -238,11 +512,12 @@ def analyze_diff():
         test_code = None
         if generate_code:
             try:
-                test_code = test_generator.generate_automated_test_code(
-                    structured_test_cases=structured_test_cases,
-                    language="python",
-                    framework="pytest",
-                )
+                with stage('code_generation'):
+                    test_code = test_generator.generate_automated_test_code(
+                        structured_test_cases=structured_test_cases,
+                        language="python",
+                        framework="pytest",
+                    )
             except Exception as e:
                 test_code = f"Error generating test code: {str(e)}"
 
@@ -255,99 +530,244 @@ def analyze_diff():
             for f in parsed_diff[:10]
         ]
 
-        return jsonify({
-            'success': True,
-            'data': {
-                'summary': {
-                    'total_files': len(parsed_diff),
-                    'total_additions': sum(len(f['additions']) for f in parsed_diff),
-                    'total_deletions': sum(len(f['deletions']) for f in parsed_diff),
-                },
-                'file_analyses': file_analyses,
-                'change_types': change_types,
-                'structured_test_cases': structured_test_cases,
-                'test_code': test_code,
-                'generated_at': datetime.now().isoformat(),
-            }
-        })
+        result = {
+            'summary': {
+                'total_files': len(parsed_diff),
+                'total_additions': sum(len(f['additions']) for f in parsed_diff),
+                'total_deletions': sum(len(f['deletions']) for f in parsed_diff),
+            },
+            'file_analyses': file_analyses,
+            'change_types': change_types,
+            'structured_test_cases': structured_test_cases,
+            'test_code': test_code,
+            'generated_at': datetime.now().isoformat(),
+        }
+        result['result_id'] = _result_store.put(result, kind='diff')
+        return jsonify({'success': True, 'data': result})
 
     except Exception as e:
         app.logger.error("analyze_diff error: %s", traceback.format_exc())
         return jsonify({'success': False, 'error': f'Error: {str(e)}'}), 500
 
 
+# At most this many PRs per bulk analysis request
+BULK_MAX_TARGETS = int(os.getenv('BULK_MAX_TARGETS', 200))
+
+
+@app.route('/api/analyze-bulk', methods=['POST'])
+def analyze_bulk():
+    """
+    Generate one consolidated, de-duplicated set of test cases for many PRs.
+
+    JSON payload: { "pr_urls": [...] } or { "query": "repo:o/r milestone:v2.3" }
+                  plus optional "resume": false
+
+    The analysis runs as a background job: the 202 response carries
+    ``job_id`` (see /api/jobs/<id> and /api/progress/<id>). Re-posting the
+    same targets while the job runs joins it; afterwards it resumes the
+    job, and PRs finished before are not analysed again unless they got
+    new commits since ("resume": false analyses every PR afresh). The
+    job's result has ``summary``, ``targets`` and the ``result_id`` of
+    the full report; export it with /api/export-test-cases.
+    """
+    unavailable = _unavailable('github', 'bedrock')
+    if unavailable:
+        return unavailable
+    try:
+        data = request.get_json(silent=True) or {}
+        analyzer = BulkAnalyzer(os.getenv('GITHUB_TOKEN'))
+        try:
+            if data.get('pr_urls'):
+                targets = BulkAnalyzer.targets_from_urls(data['pr_urls'])
+            elif data.get('query', '').strip():
+                with stage('github_fetch'):
+                    targets = analyzer.targets_from_search(data['query'].strip())
+            else:
+                return jsonify({'success': False, 'error': 'Provide pr_urls or query'}), 400
+        except GitHubRateLimitError as e:
+            return jsonify({'success': False, 'error': f'{e}. Please retry later.'}), 429
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        if not targets:
+            return jsonify({'success': False, 'error': 'No pull requests matched'}), 400
+        if len(targets) > BULK_MAX_TARGETS:
+            return jsonify({
+                'success': False,
+                'error': f'{len(targets)} pull requests requested; the limit is {BULK_MAX_TARGETS}',
+            }), 400
+
+        resume = bool(data.get('resume', True))
+
+        def analyse():
+            progress = current_progress()
+            report = analyzer.run(
+                targets,
+                resume=resume,
+                on_progress=lambda record, done, total: progress.items(done, total, record['key']),
+            ).to_dict()
+            result_id = _result_store.put(report, kind='bulk') if report['test_cases'] else None
+            return {k: v for k, v in report.items() if k != 'test_cases'} | {'result_id': result_id}
+
+        job_id = 'bulk-' + BulkCheckpoint.job_id_for(targets)
+        return _job_accepted(*_jobs.submit('analyze-bulk', analyse, job_id=job_id))
+
+    except Exception as e:
+        app.logger.error("analyze_bulk error: %s", traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Unexpected error: {str(e)}'}), 500
+
+
+# ─────────────────────────────────────────────
+# Progress events (Server-Sent Events)
+# ─────────────────────────────────────────────
+
+@app.route('/api/progress/<job_id>', methods=['GET'])
+def progress_events(job_id):
+    """
+    Stream the stage progress of the request sent with ``X-Progress-Id:
+    <job_id>`` as Server-Sent Events; open it before starting the request.
+
+    Events: ``stage`` (stage, label, status running/done/failed, step of
+    steps, elapsed, expected, total_elapsed, eta_seconds), ``items``
+    (done of total, for bulk analyses) and a final ``done`` (status ok or
+    error). A reconnecting EventSource resumes after its Last-Event-ID.
+    """
+    if not JOB_ID_RE.match(job_id):
+        return jsonify({'success': False, 'error': 'Invalid progress id'}), 400
+    try:
+        after = int(request.headers.get('Last-Event-ID') or 0)
+    except ValueError:
+        after = 0
+
+    def generate():
+        yield 'retry: 2000\n\n'
+        for item in _progress.events(job_id, after=after):
+            if item is None:
+                yield ': keep-alive\n\n'
+                continue
+            seq, event = item
+            yield f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',     # nginx: pass events through unbuffered
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    State of a background job (test cycle push, ...), for clients that
+    poll rather than stream /api/progress/<job_id>.
+
+    ``data.status`` is queued, running, ok, error or lost (its worker
+    stopped; submit it again). Once ok, ``data.result`` holds what the
+    endpoint would have returned; ``data.items`` counts progress so far.
+    """
+    state = _jobs.status(job_id)
+    if state is None:
+        return jsonify({'success': False, 'error': 'Job not found or expired.'}), 404
+    return jsonify({'success': True, 'data': state})
+
+
+def _job_accepted(job_id, started):
+    """202 response for a submitted background job."""
+    return jsonify({
+        'success': True,
+        'data': {
+            'job_id': job_id,
+            'started': started,
+            'status_url': f'/api/jobs/{job_id}',
+            'progress_url': f'/api/progress/{job_id}',
+        },
+    }), 202
+
+
+# ─────────────────────────────────────────────
+# Stored analysis results
+# ─────────────────────────────────────────────
+
+# Result bodies at least this large are gzip-compressed when accepted
+RESULT_GZIP_MIN_BYTES = 1024
+
+
+@app.route('/api/results/<result_id>', methods=['GET'])
+def get_result(result_id):
+    """
+    Serve a stored analysis result, to reload it or open a shared link.
+
+    Query: ?fields=summary,structured_test_cases – top-level keys to return
+           (result_id and kind are always included)
+
+    Results never change, so responses carry an ETag and a matching
+    If-None-Match is answered 304 without reading the store. The ETag is
+    weak: the gzip and identity bodies differ byte for byte but hold the
+    same result.
+    """
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or None
+    etag = result_id
+    if fields is not None:
+        etag += '-' + hashlib.sha256(','.join(sorted(set(fields))).encode()).hexdigest()[:8]
+    cache_headers = {'ETag': f'W/"{etag}"', 'Cache-Control': 'private, max-age=86400', 'Vary': 'Accept-Encoding'}
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=cache_headers)
+
+    try:
+        data = _result_store.get(result_id, fields)
+    except ResultNotFoundError:
+        return jsonify({'success': False, 'error': 'Result not found or expired. Please re-run the analysis.'}), 404
+
+    response = jsonify({'success': True, 'data': data})
+    response.headers.update(cache_headers)
+    body = response.get_data()
+    if request.accept_encodings['gzip'] and len(body) >= RESULT_GZIP_MIN_BYTES:
+        response.set_data(gzip.compress(body, 6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
 # ─────────────────────────────────────────────
 # Excel download endpoints
 # ─────────────────────────────────────────────
 
+@app.route('/api/export-test-cases', methods=['POST'])
 @app.route('/api/download-test-cases-excel', methods=['POST'])
 def download_test_cases_excel():
     """
-    Convert structured test cases JSON to a formatted Excel workbook.
+    Stream structured test cases as xlsx, CSV, JSON Lines or Markdown.
 
-    JSON payload: { "test_cases": [...] }
-    Returns: .xlsx file download
+    JSON payload: { "test_cases": [...] } or { "result_id": "..." }
+                  plus optional "format": xlsx (default) | csv | jsonl | md
+                  (also accepted as a ?format= query parameter)
+
+    ``result_id`` is the ID returned by the analysis endpoints; it returns
+    404 once pruned, and the client should then post test_cases.
     """
     try:
-        data = request.get_json()
-        test_cases = data.get('test_cases', []) if data else []
+        data = request.get_json(silent=True) or {}
+        fmt = (request.args.get('format') or data.get('format') or 'xlsx').lower()
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"Unsupported format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}",
+            }), 400
+
+        if data.get('result_id'):
+            try:
+                test_cases = _result_store.get_test_cases(data['result_id'])
+            except ResultNotFoundError:
+                return jsonify({'success': False, 'error': 'Test case result has expired. Please re-run the analysis.'}), 404
+        else:
+            test_cases = data.get('test_cases', [])
 
         if not test_cases:
             return jsonify({'success': False, 'error': 'No test cases provided'}), 400
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Test Cases'
-
-        header_fill = PatternFill(start_color='2C3E50', end_color='2C3E50', fill_type='solid')
-        header_font = Font(color='FFFFFF', bold=True, size=11)
-        alt_fill = PatternFill(start_color='F8FAFC', end_color='F8FAFC', fill_type='solid')
-
-        headers = ['ID', 'Title', 'Type', 'Priority', 'Category', 'Test Steps', 'Expected Result']
-        ws.append(headers)
-        for col_idx in range(1, len(headers) + 1):
-            cell = ws.cell(row=1, column=col_idx)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        ws.row_dimensions[1].height = 28
-
-        for i, tc in enumerate(test_cases, start=2):
-            steps_text = '\n'.join(tc.get('steps', [])) if isinstance(tc.get('steps'), list) else str(tc.get('steps', ''))
-            row_data = [
-                tc.get('id', ''),
-                tc.get('title', ''),
-                tc.get('type', ''),
-                tc.get('priority', ''),
-                tc.get('category', ''),
-                steps_text,
-                tc.get('expected_result', ''),
-            ]
-            ws.append(row_data)
-            fill = alt_fill if i % 2 == 0 else PatternFill(fill_type=None)
-            for col_idx in range(1, len(headers) + 1):
-                cell = ws.cell(row=i, column=col_idx)
-                if i % 2 == 0:
-                    cell.fill = alt_fill
-                cell.alignment = Alignment(vertical='top', wrap_text=True)
-            ws.row_dimensions[i].height = 60
-
-        col_widths = [10, 35, 14, 12, 20, 60, 45]
-        for col_idx, width in enumerate(col_widths, start=1):
-            ws.column_dimensions[get_column_letter(col_idx)].width = width
-
-        ws.freeze_panes = 'A2'
-
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-
-        filename = f"test_cases_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename,
+        filename = f"test_cases_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{TestCaseExporter.extension(fmt)}"
+        return Response(
+            TestCaseExporter.stream(test_cases, fmt, columns=TestCaseExporter.columns_for(test_cases)),
+            mimetype=TestCaseExporter.mimetype(fmt),
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'},
         )
 
     except Exception as exc:
@@ -361,28 +781,68 @@ def map_excel():
     Map generated test cases against an uploaded Excel test case file.
 
     multipart/form-data:
-        excel_file            – .xlsx / .xls upload
-        structured_test_cases – JSON string (array)
+        excel_file            – .xlsx / .xls upload, or a .csv / .tsv / .jsonl
+                                suite export; repeat the field to upload
+                                several files (or upload_id – handle from
+                                a previous upload, or story_id – a Jira
+                                story whose Zephyr Scale test cases are read
+                                from the local mirror)
+        all_sheets            – "true" to ingest every worksheet, not just the
+                                active one (optional)
+        structured_test_cases – JSON string (array), or result_id – ID of a
+                                stored analysis result
+
+    The response includes ``upload_id`` and ``mapping_id`` so the download
+    endpoint can reference the stored workbook and mapping result.
     """
+    unavailable = _unavailable('bedrock')
+    if unavailable:
+        return unavailable
     try:
-        if 'excel_file' not in request.files:
+        if request.form.get('result_id'):
+            try:
+                generated_cases = _result_store.get_test_cases(request.form['result_id'])
+            except ResultNotFoundError:
+                return jsonify({'success': False, 'error': 'Test case result has expired. Please re-run the analysis.'}), 404
+        else:
+            raw_cases = request.form.get('structured_test_cases', '[]')
+            try:
+                generated_cases = json.loads(raw_cases)
+                if not isinstance(generated_cases, list):
+                    raise ValueError("structured_test_cases must be a JSON array")
+            except (json.JSONDecodeError, ValueError) as exc:
+                return jsonify({'success': False, 'error': f'Invalid structured_test_cases: {exc}'}), 400
+
+        files = request.files.getlist('excel_file')
+        if files:
+            for file in files:
+                if not suite_format(file.filename):
+                    return jsonify({
+                        'success': False,
+                        'error': 'File must be an Excel file (.xlsx or .xls) or a CSV, TSV or JSON Lines export.',
+                    }), 400
+            upload_id = _store_uploads(files, request.form.get('all_sheets', '').lower() == 'true')
+        elif request.form.get('upload_id'):
+            upload_id = request.form['upload_id']
+        elif request.form.get('story_id'):
+            mirror = _get_zephyr_mirror()
+            if mirror is None:
+                return jsonify({'success': False, 'error': 'Jira integration is not configured.'}), 503
+            story_id = request.form['story_id'].strip()
+            # Maps against the last synced copy if the sync fails
+            _refresh_zephyr_mirror(mirror)
+            suite = mirror.suite_jsonl(story_id)
+            if not suite:
+                return jsonify({'success': False, 'error': f'No Zephyr Scale test cases are linked to {story_id}.'}), 404
+            upload_id = _upload_store.put(io.BytesIO(suite), f'{story_id}.jsonl')
+        else:
             return jsonify({'success': False, 'error': 'No Excel file uploaded.'}), 400
 
-        file = request.files['excel_file']
-        if not file.filename or not file.filename.lower().endswith(('.xlsx', '.xls')):
-            return jsonify({'success': False, 'error': 'File must be an Excel file (.xlsx or .xls).'}), 400
-
-        raw_cases = request.form.get('structured_test_cases', '[]')
         try:
-            generated_cases = json.loads(raw_cases)
-            if not isinstance(generated_cases, list):
-                raise ValueError("structured_test_cases must be a JSON array")
-        except (json.JSONDecodeError, ValueError) as exc:
-            return jsonify({'success': False, 'error': f'Invalid structured_test_cases: {exc}'}), 400
-
-        try:
-            file_bytes = file.read()
-            excel_rows = ExcelProcessor.parse(file_bytes)
+            with stage('excel_parse'):
+                excel_rows = _load_upload_rows(upload_id)
+        except UploadNotFoundError:
+            return jsonify({'success': False, 'error': 'Uploaded file has expired. Please upload it again.'}), 404
         except ExcelParseError as exc:
             return jsonify({'success': False, 'error': str(exc)}), 422
 
@@ -392,12 +852,20 @@ def map_excel():
         generated_by_id = {tc.get('id', ''): tc for tc in generated_cases}
         new_generated = [generated_by_id[tc_id] for tc_id in result.new_generated_ids if tc_id in generated_by_id]
 
+        mapping_data = {
+            'mappings': result.mappings,
+            'new_generated': new_generated,
+            'stats': result.stats,
+        }
+        mapping_id = UploadStore.mapping_id_for(upload_id, generated_cases)
+        _upload_store.put_mapping(upload_id, mapping_id, mapping_data)
+
         return jsonify({
             'success': True,
             'data': {
-                'mappings': result.mappings,
-                'new_generated': new_generated,
-                'stats': result.stats,
+                **mapping_data,
+                'upload_id': upload_id,
+                'mapping_id': mapping_id,
             }
         })
 
@@ -411,44 +879,124 @@ def download_mapped_excel():
     """
     Produce a colour-coded Excel workbook with mapping results.
 
-    multipart/form-data:
+    multipart/form-data (or JSON):
+        upload_id      – handle returned by /api/map-excel
+        mapping_id     – stored mapping result returned by /api/map-excel
+    or, without a stored upload:
         excel_file     – original upload
         mapping_result – JSON string: { mappings, new_generated, stats }
+        impacted_tests – JSON array of coverage-impacted test names (from
+                         /api/coverage/impact); matching rows become RUN
+    optional run plan (adds Plan Status / Runner / Run Order / Est. Duration):
+        time_budget_minutes – window each runner has
+        runners             – parallel runners (default 1)
+        duration_history    – CSV/JSON file of test id → seconds; otherwise
+                              the suite's Duration column (minutes) is used
+
+    Returns 404 when a referenced upload or mapping has been evicted; the
+    client should then fall back to posting the file and mapping again.
     """
     try:
-        if 'excel_file' not in request.files:
+        params = request.form if request.form else (request.get_json(silent=True) or {})
+
+        files = request.files.getlist('excel_file')
+        if files:
+            upload_id = _store_uploads(files, str(params.get('all_sheets', '')).lower() == 'true')
+        elif params.get('upload_id'):
+            upload_id = params['upload_id']
+        else:
             return jsonify({'success': False, 'error': 'No Excel file provided.'}), 400
 
-        file = request.files['excel_file']
-        file_bytes = file.read()
-
-        try:
-            mapping_data = json.loads(request.form.get('mapping_result', '{}'))
-        except json.JSONDecodeError as exc:
-            return jsonify({'success': False, 'error': f'Invalid mapping_result JSON: {exc}'}), 400
+        mapping_data = None
+        if params.get('mapping_id'):
+            try:
+                mapping_data = _upload_store.get_mapping(upload_id, params['mapping_id'])
+            except UploadNotFoundError:
+                mapping_data = None
+        if mapping_data is None:
+            raw_mapping = params.get('mapping_result')
+            if raw_mapping is None:
+                return jsonify({'success': False, 'error': 'Mapping result has expired. Please re-run the mapping.'}), 404
+            try:
+                mapping_data = json.loads(raw_mapping) if isinstance(raw_mapping, str) else raw_mapping
+            except json.JSONDecodeError as exc:
+                return jsonify({'success': False, 'error': f'Invalid mapping_result JSON: {exc}'}), 400
 
         try:
-            excel_rows = ExcelProcessor.parse(file_bytes)
+            with stage('excel_parse'):
+                excel_rows = _load_upload_rows(upload_id)
+                bundle = _upload_store.get_bundle(upload_id)
+                if bundle:
+                    workbooks = _bundle_workbooks(bundle[0])
+                else:
+                    file_bytes = _upload_store.get_bytes(upload_id)
+                    file_format = _upload_format(upload_id)
+        except UploadNotFoundError:
+            return jsonify({'success': False, 'error': 'Uploaded file has expired. Please upload it again.'}), 404
         except ExcelParseError as exc:
             return jsonify({'success': False, 'error': str(exc)}), 422
 
-        # Apply deterministic execution decisions to every mapping entry.
-        # apply_decision() is a pure function — no I/O, no AI calls.
-        mappings = [apply_decision(m) for m in mapping_data.get('mappings', [])]
-
-        output_bytes = ExcelProcessor.build_decision_output(
-            file_bytes,
-            excel_rows,
-            mappings,
-            mapping_data.get('new_generated', []),
-        )
+        with stage('mapping'):
+            # Tests that execute changed lines (from /api/coverage/impact) are
+            # promoted to MAPPED/100 so the decision below makes them RUN
+            mappings = mapping_data.get('mappings', [])
+            if params.get('impacted_tests'):
+                try:
+                    impacted = params['impacted_tests']
+                    mark_impacted(mappings, json.loads(impacted) if isinstance(impacted, str) else impacted)
+                except json.JSONDecodeError as exc:
+                    return jsonify({'success': False, 'error': f'Invalid impacted_tests JSON: {exc}'}), 400
+
+            # Apply deterministic execution decisions to every mapping entry.
+            # apply_decision() is a pure function — no I/O, no AI calls.
+            mappings = [apply_decision(m) for m in mappings]
+
+            # Optional time-budgeted run plan over the RUN/REVIEW decisions
+            spec, plan = DECISION_OUTPUT_SPEC, None
+            if params.get('time_budget_minutes'):
+                try:
+                    budget_minutes = float(params['time_budget_minutes'])
+                    runners = int(params.get('runners') or 1)
+                    history_file = request.files.get('duration_history')
+                    history = (
+                        load_duration_history(history_file.read(), history_file.filename or '')
+                        if history_file else None
+                    )
+                except ValueError as exc:
+                    return jsonify({'success': False, 'error': f'Invalid run plan input: {exc}'}), 400
+                plan = plan_suite_run(mappings, excel_rows, budget_minutes * 60, runners, history)
+                spec = PLAN_OUTPUT_SPEC
+
+        # Rendered here into a spooled write-only workbook, then streamed back
+        # in chunks; multi-sheet uploads are written back one output sheet per
+        # source sheet
+        with stage('render'):
+            if bundle:
+                chunks = ExcelProcessor.stream_workbooks_decision_output(
+                    workbooks,
+                    excel_rows,
+                    mappings,
+                    mapping_data.get('new_generated', []),
+                    spec=spec,
+                )
+            else:
+                chunks = ExcelProcessor.stream_decision_output(
+                    file_bytes,
+                    excel_rows,
+                    mappings,
+                    mapping_data.get('new_generated', []),
+                    fmt=file_format,
+                    spec=spec,
+                )
 
         filename = f"mapped_test_cases_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        return send_file(
-            io.BytesIO(output_bytes),
+        headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+        if plan:
+            headers['X-Run-Plan'] = json.dumps(plan)   # summary: planned, over_budget, runners, coverage
+        return Response(
+            chunks,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename,
+            headers=headers,
         )
 
     except Exception as exc:
@@ -456,21 +1004,377 @@ def download_mapped_excel():
         return jsonify({'success': False, 'error': f'Download error: {str(exc)}'}), 500
 
 
+def _store_uploads(files, all_sheets: bool) -> str:
+    """
+    Spool uploaded workbook(s) into the upload store and return one handle.
+
+    A single workbook in active-sheet mode is stored as a plain upload;
+    several workbooks or all-sheets mode are grouped into a bundle.
+    """
+    handles = [_upload_store.put(f.stream, f.filename or 'upload.xlsx') for f in files]
+    handles = list(dict.fromkeys(handles))  # identical files are ingested once
+    if len(handles) == 1 and not all_sheets:
+        return handles[0]
+    return _upload_store.put_bundle(handles, {'all_sheets': all_sheets})
+
+
+def _bundle_workbooks(handles):
+    """(file name, bytes) per bundle member, as expected by parse_workbooks()."""
+    return [
+        (_upload_store.get_meta(h).get('filename', h), _upload_store.get_bytes(h))
+        for h in handles
+    ]
+
+
+def _upload_format(upload_id: str) -> str:
+    """Parser format (see SUITE_FORMATS) of a stored plain upload, from its file name."""
+    return suite_format(_upload_store.get_meta(upload_id).get('filename', '')) or 'xlsx'
+
+
+def _load_upload_rows(upload_id: str) -> TestSuiteTable:
+    """Return parsed rows for a stored upload, parsing and caching them on first use."""
+    stored = _upload_store.get_rows(upload_id)
+    if stored is not None:
+        return TestSuiteTable.from_json(stored)
+
+    bundle = _upload_store.get_bundle(upload_id)
+    if bundle:
+        handles, options = bundle
+        excel_rows = TestSuiteTable.from_rows(ExcelProcessor.parse_workbooks(
+            _bundle_workbooks(handles),
+            all_sheets=options.get('all_sheets', True),
+        ))
+    else:
+        excel_rows = ExcelProcessor.parse_table(_upload_store.get_bytes(upload_id), fmt=_upload_format(upload_id))
+    _upload_store.put_rows(upload_id, excel_rows.to_json())
+    return excel_rows
+
+
+# ─────────────────────────────────────────────
+# Coverage-based test impact
+# ─────────────────────────────────────────────
+
+@app.route('/api/coverage/ingest', methods=['POST'])
+def coverage_ingest():
+    """
+    Add per-test line coverage to the impact index.
+
+    multipart/form-data:
+        coverage_file – .coverage (coverage.py, per-test contexts), .info/.lcov
+                        (LCOV, one TN: per test) or .xml (JaCoCo); repeatable
+        test_name     – test the report belongs to, for reports without
+                        per-test data (optional; default: the file name)
+        source_root   – prefix stripped from absolute source paths (optional)
+
+    Reports of the same test across several files are merged; re-ingesting
+    a test replaces its earlier coverage.
+    """
+    try:
+        files = request.files.getlist('coverage_file')
+        if not files:
+            return jsonify({'success': False, 'error': 'No coverage file uploaded.'}), 400
+
+        coverage = {}
+        for file in files:
+            try:
+                merge_coverage(coverage, parse_coverage(
+                    file.read(),
+                    file.filename or '',
+                    test_name=request.form.get('test_name') or None,
+                    source_root=request.form.get('source_root') or None,
+                ))
+            except CoverageFormatError as exc:
+                return jsonify({'success': False, 'error': str(exc)}), 422
+
+        ingested = _coverage_index.ingest(coverage)
+        return jsonify({'success': True, 'data': {**ingested, 'index': _coverage_index.stats()}})
+
+    except Exception as exc:
+        app.logger.error("coverage_ingest error: %s", traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Coverage ingest error: {str(exc)}'}), 500
+
+
+@app.route('/api/coverage/impact', methods=['POST'])
+def coverage_impact():
+    """
+    List the indexed tests that execute a changed line.
+
+    JSON payload: { "pr_url": "..." } or { "diff_text": "..." }
+
+    ``data.mappings`` are decided RUN entries; pass ``data.impacted_tests``
+    to /api/download-mapped-excel to mark the matching suite rows RUN.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        code_analyzer = CodeAnalyzer()
+        if data.get('diff_text', '').strip():
+            parsed_diff = code_analyzer.parse_diff(data['diff_text'].strip())
+        elif data.get('pr_url', '').strip():
+            parts = data['pr_url'].strip().split('/')
+            try:
+                owner, repo, pr_number = parts[-4], parts[-3], int(parts[-1])
+            except (IndexError, ValueError):
+                return jsonify({'success': False, 'error': 'Invalid GitHub PR URL format'}), 400
+            try:
+                diff_lines, _ = GitHubPRAnalyzer(os.getenv('GITHUB_TOKEN')).get_pr_changes(owner, repo, pr_number)
+                parsed_diff = code_analyzer.parse_diff_lines(diff_lines)
+            except GitHubRateLimitError as e:
+                return jsonify({'success': False, 'error': f'{e}. Please retry later.'}), 429
+        else:
+            return jsonify({'success': False, 'error': 'Provide pr_url or diff_text'}), 400
+
+        impacted = _coverage_index.impacted_tests(parsed_diff)
+        mappings = [apply_decision(m) for m in impact_mappings(impacted)]
+        return jsonify({
+            'success': True,
+            'data': {
+                'impacted_tests': list(impacted),
+                'hits': impacted,
+                'mappings': mappings,
+                'changed_files': len(parsed_diff),
+            }
+        })
+
+    except Exception as exc:
+        app.logger.error("coverage_impact error: %s", traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Coverage impact error: {str(exc)}'}), 500
+
+
 # ─────────────────────────────────────────────
 # Health / Jira
 # ─────────────────────────────────────────────
 
 @app.route('/health')
 def health():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    # Served from the background probes' cache — no outbound calls
+    dependencies = {name: state['status'] for name, state in _health.snapshot().items()}
+    degraded = any(status not in (UP, DISABLED) for status in dependencies.values())
+    return jsonify({
+        'status': 'degraded' if degraded else 'healthy',
+        'dependencies': dependencies,
+        'timestamp': datetime.now().isoformat(),
+    })
+
+
+@app.route('/api/health', methods=['GET'])
+def dependency_health():
+    """Last probe result per dependency: status, latency_ms, checked_at, error."""
+    return jsonify({'success': True, 'data': _health.snapshot()})
 
 
 @app.route('/api/jira/health', methods=['GET'])
 def jira_health():
+    state = _health.snapshot()['jira']
+    if state['status'] == DISABLED or not os.getenv('JIRA_BASE_URL', '').strip():
+        return jsonify({'enabled': False, 'connected': False})
+    return jsonify({
+        'enabled': True,
+        'connected': state['status'] == UP,
+        'latency_ms': state['latency_ms'],
+        'checked_at': state['checked_at'],
+    })
+
+
+# Mirror syncs older than this are refreshed before a story is mapped
+ZEPHYR_MIRROR_MAX_AGE = int(os.getenv('ZEPHYR_MIRROR_MAX_AGE_SECONDS', 300))
+
+_zephyr_mirror = None
+
+
+def _get_zephyr_mirror():
+    """The process's ZephyrMirror, or None when Jira is not configured."""
+    global _zephyr_mirror
+    if _zephyr_mirror is None:
+        client = ZephyrScaleClient.from_env()
+        if client is not None:
+            _zephyr_mirror = ZephyrMirror.from_env(client)
+    return _zephyr_mirror
+
+
+def _submit_zephyr_sync(mirror, full=None):
+    """
+    Sync the mirror as a background job; returns (job id, started). One
+    sync job per project: submitting while one runs joins it.
+    """
+    def sync():
+        with stage('zephyr_sync'):
+            return mirror.sync(full=full)
+
+    project = re.sub(r'[^A-Za-z0-9_-]', '', mirror.client.project_key or '') or 'default'
+    return _jobs.submit('zephyr-sync', sync, job_id=f'zephyr-sync-{project}'[:64])
+
+
+def _refresh_zephyr_mirror(mirror):
+    """
+    Bring the mirror up to date before a read: a quick incremental sync
+    in the request, and a due full crawl in the background.
+    """
+    try:
+        mirror.ensure_fresh(ZEPHYR_MIRROR_MAX_AGE)
+    except ZephyrError as exc:
+        app.logger.warning("Zephyr mirror sync failed: %s", exc)
+    if mirror.full_sync_due():
+        _submit_zephyr_sync(mirror, full=True)
+
+
+@app.route('/api/jira/sync', methods=['POST'])
+def jira_sync():
+    """
+    Sync the local Zephyr Scale mirror, as a background job.
+
+    JSON payload (optional): { "full": true } to crawl the whole project;
+    otherwise only cases updated since the last sync are fetched (or the
+    project is crawled when a full crawl is due). Answers 202 with the
+    ``job_id``; the job's result holds the sync stats.
+    """
+    mirror = _get_zephyr_mirror()
+    if mirror is None:
+        return jsonify({'success': False, 'error': 'Jira integration is not configured.'}), 503
+    try:
+        data = request.get_json(silent=True) or {}
+        return _job_accepted(*_submit_zephyr_sync(mirror, full=True if data.get('full') else None))
+    except Exception as exc:
+        app.logger.error("jira_sync error: %s", traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Zephyr sync error: {str(exc)}'}), 500
+
+
+@app.route('/api/jira/stories/<story_id>/test-cases', methods=['GET'])
+def jira_story_test_cases(story_id):
+    """Zephyr Scale test cases linked to a story, from the local mirror."""
+    mirror = _get_zephyr_mirror()
+    if mirror is None:
+        return jsonify({'success': False, 'error': 'Jira integration is not configured.'}), 503
+    try:
+        _refresh_zephyr_mirror(mirror)
+        cases = mirror.test_cases_for_story(story_id)
+        return jsonify({
+            'success': True,
+            'data': {'test_cases': [asdict(tc) for tc in cases], 'mirror': mirror.status()},
+        })
+    except Exception as exc:
+        app.logger.error("jira_story_test_cases error: %s", traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Zephyr read error: {str(exc)}'}), 500
+
+
+@app.route('/api/jira/test-cycles', methods=['POST'])
+def jira_push_test_cycle():
+    """
+    Create a Zephyr Scale test cycle from decided mappings.
+
+    JSON payload:
+        upload_id, mapping_id – stored mapping from /api/map-excel
+        (or mapping_result    – { mappings, new_generated })
+        cycle_name            – name of the new cycle
+        story_id              – story to link the cycle and new cases to (optional)
+        folder                – cycle folder (optional)
+
+    RUN rows whose test id is a Zephyr key become executions; MUST_ADD_AND_RUN
+    cases are created first. The push runs as a background job: the 202
+    response carries ``job_id`` (see /api/jobs/<id> and /api/progress/<id>).
+    Re-posting the same payload while it runs joins that job; afterwards it
+    resumes the push and retries only what failed. The job's result has
+    ``summary`` (counts, items per second), ``failed`` and ``skipped``.
+    """
     client = ZephyrScaleClient.from_env()
     if client is None:
-        return jsonify({'enabled': False, 'connected': False})
-    return jsonify({'enabled': True, 'connected': client.health_check()})
+        return jsonify({'success': False, 'error': 'Jira integration is not configured.'}), 503
+    try:
+        data = request.get_json(silent=True) or {}
+        cycle_name = str(data.get('cycle_name', '')).strip()
+        if not cycle_name:
+            return jsonify({'success': False, 'error': 'Missing cycle_name'}), 400
+
+        mapping_data = None
+        if data.get('upload_id') and data.get('mapping_id'):
+            try:
+                mapping_data = _upload_store.get_mapping(data['upload_id'], data['mapping_id'])
+            except UploadNotFoundError:
+                mapping_data = None
+        if mapping_data is None:
+            mapping_data = data.get('mapping_result')
+            if not isinstance(mapping_data, dict):
+                return jsonify({'success': False, 'error': 'Mapping result has expired. Please re-run the mapping.'}), 404
+
+        mappings = [apply_decision(m) for m in mapping_data.get('mappings', [])]
+        new_generated = mapping_data.get('new_generated', [])
+        pusher = CyclePusher(client)
+
+        def push():
+            return pusher.push(
+                mappings,
+                new_generated,
+                cycle_name,
+                story_id=str(data.get('story_id') or '').strip() or None,
+                folder=data.get('folder') or None,
+            ).to_dict()
+
+        job_id = 'cycle-' + pusher.job_id(mappings, new_generated, cycle_name)
+        return _job_accepted(*_jobs.submit('zephyr-cycle', push, job_id=job_id))
+
+    except Exception as exc:
+        app.logger.error("jira_push_test_cycle error: %s", traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Zephyr cycle error: {str(exc)}'}), 500
+
+
+# At most this many test cases per Zephyr push
+ZEPHYR_MAX_PUSH = int(os.getenv('ZEPHYR_MAX_PUSH', 1000))
+
+
+@app.route('/api/jira/test-cases', methods=['POST'])
+def jira_push_test_cases():
+    """
+    Create or update generated test cases in Zephyr Scale under a User Story.
+
+    JSON payload: { "story_id": "PROJ-123", "result_id": "..." }
+              or  { "story_id": "PROJ-123", "test_cases": [...] }
+
+    Idempotent: cases pushed before are updated or left unchanged, so a
+    partial failure is retried by posting the same payload again.
+    ``data.results`` has one entry per case (action created / updated /
+    unchanged / duplicate / failed, Zephyr key, error).
+    """
+    client = ZephyrScaleClient.from_env()
+    if client is None:
+        return jsonify({'success': False, 'error': 'Jira integration is not configured.'}), 503
+    try:
+        data = request.get_json(silent=True) or {}
+        story_id = str(data.get('story_id', '')).strip()
+        if not story_id:
+            return jsonify({'success': False, 'error': 'Missing story_id'}), 400
+
+        if data.get('result_id'):
+            try:
+                test_cases = _result_store.get_test_cases(data['result_id'])
+            except ResultNotFoundError:
+                return jsonify({'success': False, 'error': 'Result has expired. Please regenerate.'}), 404
+        else:
+            test_cases = data.get('test_cases')
+        if not isinstance(test_cases, list) or not test_cases:
+            return jsonify({'success': False, 'error': 'Provide result_id or a non-empty test_cases array'}), 400
+        if len(test_cases) > ZEPHYR_MAX_PUSH:
+            return jsonify({
+                'success': False,
+                'error': f'{len(test_cases)} test cases sent; the limit is {ZEPHYR_MAX_PUSH}',
+            }), 400
+
+        try:
+            results = client.bulk_create_test_cases(
+                [ZephyrTestCase.from_generated(tc) for tc in test_cases], story_id
+            )
+        except ZephyrError as exc:
+            return jsonify({'success': False, 'error': str(exc)}), 502
+
+        counts = {}
+        for result in results:
+            counts[result.action] = counts.get(result.action, 0) + 1
+        return jsonify({
+            'success': not counts.get('failed'),
+            'data': {'counts': counts, 'results': [r.to_dict() for r in results]},
+        })
+
+    except Exception as exc:
+        app.logger.error("jira_push_test_cases error: %s", traceback.format_exc())
+        return jsonify({'success': False, 'error': f'Zephyr push error: {str(exc)}'}), 500
 
 
 if __name__ == '__main__':
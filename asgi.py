@@ -0,0 +1,178 @@
+"""
+ASGI entry point — async serving mode.
+
+Serves the Flask app from app.py, with the same endpoints and UI, under an
+ASGI server:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+
+The WSGI translation is a2wsgi's: views run on its bounded thread pool
+(ASGI_MAX_THREADS) and response chunks are sent as the app produces them,
+so a request waiting on Bedrock or GitHub ties up one thread instead of a
+whole worker process. Bedrock calls stay capped by BEDROCK_MAX_CONCURRENCY.
+
+Around it, this module manages the connection:
+
+- The request body is read on the event loop before a view runs. An
+  oversized body gets a 413. A client that disconnects mid-upload never
+  reaches a view.
+- Once the body is in, the connection is watched for a disconnect. A
+  streamed response (SSE progress, workbook downloads) then stops at its
+  next chunk and is closed, which frees its pool thread. Without this it
+  would run to the end for nobody. Progress streams send a keep-alive at
+  least every 15 seconds, so that is the most a stream's thread outlives
+  its client.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Optional
+
+from a2wsgi import WSGIMiddleware
+
+from app import app
+
+DEFAULT_MAX_THREADS = 64
+
+# Scope key (seen by the view thread as environ["asgi.scope"]) of the
+# request's disconnect flag
+_DISCONNECTED = "tsg.disconnected"
+
+
+class _ClientDisconnected(Exception):
+    """The client went away before its request body was complete."""
+
+
+class WSGIBridge:
+    """a2wsgi's WSGI → ASGI adapter, plus body limits and disconnect handling."""
+
+    def __init__(self, wsgi_app, max_threads: int = DEFAULT_MAX_THREADS, max_body: Optional[int] = None):
+        self.wsgi_app = wsgi_app
+        self.max_body = max_body
+        self._wsgi = WSGIMiddleware(self._until_disconnect, workers=max(int(max_threads), 1))
+
+    @property
+    def executor(self):
+        return self._wsgi.executor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return      # no websockets
+
+        try:
+            body = await self._read_body(receive)
+        except _ClientDisconnected:
+            return      # nobody to answer; never run the view on a partial body
+        if body is None:
+            await self._send_simple(send, 413, b"Request body too large.")
+            return
+
+        disconnected = threading.Event()
+        replayed = False
+
+        async def replay():
+            # a2wsgi reads the body once; it is handed over in one message
+            nonlocal replayed
+            if replayed:
+                await asyncio.Future()      # never: the watcher owns receive() now
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def watch():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        async def send_while_connected(message):
+            if disconnected.is_set():
+                return      # dropped; the view thread stops at its next chunk
+            try:
+                await send(message)
+            except OSError:
+                disconnected.set()
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await self._wsgi(dict(scope, **{_DISCONNECTED: disconnected}), replay, send_while_connected)
+        finally:
+            watcher.cancel()
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _until_disconnect(self, environ, start_response):
+        """The WSGI app, its response cut short once the client is gone (runs on the pool)."""
+        iterable = self.wsgi_app(environ, start_response)
+        disconnected = environ.get("asgi.scope", {}).get(_DISCONNECTED)
+        return iterable if disconnected is None else _UntilDisconnect(iterable, disconnected)
+
+    async def _read_body(self, receive) -> Optional[bytes]:
+        """
+        The whole request body, or None when it exceeds max_body.
+
+        Raises:
+            _ClientDisconnected: the client disconnected mid-body.
+        """
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise _ClientDisconnected()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if self.max_body is not None and size > self.max_body:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        return b"".join(chunks)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _send_simple(send, status: int, body: bytes) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+class _UntilDisconnect:
+    """A WSGI response iterable that ends early once the client has disconnected."""
+
+    def __init__(self, iterable, disconnected: threading.Event):
+        self._iterable = iterable
+        self._disconnected = disconnected
+
+    def __iter__(self):
+        for chunk in self._iterable:
+            if self._disconnected.is_set():
+                return
+            yield chunk
+
+    def close(self) -> None:
+        close = getattr(self._iterable, "close", None)
+        if close is not None:
+            close()
+
+
+application = WSGIBridge(
+    app,
+    max_threads=int(os.getenv("ASGI_MAX_THREADS", DEFAULT_MAX_THREADS)),
+    max_body=app.config.get("MAX_CONTENT_LENGTH"),
+)
@@ -10,6 +10,9 @@ from src.git_analyzer import GitAnalyzer, GitHubPRAnalyzer
 from src.code_analyzer import CodeAnalyzer
 from src.test_generator import TestScenarioGenerator
 
+# Changed-line count above which local diffs are streamed without context lines
+LARGE_DIFF_LINES = 20000
+
 
 def main():
     """Main function to run the PR test scenario generator."""
@@ -33,7 +36,9 @@ def main():
     print()
 
     diff_text = None
+    parsed_diff = None
     pr_context = None
+    code_analyzer = CodeAnalyzer()
 
     try:
         if choice == "1":
@@ -42,14 +47,23 @@ def main():
             base_branch = input("Enter base branch (e.g., 'main'): ").strip()
             compare_branch = input("Enter compare branch (e.g., 'feature/new-feature'): ").strip()
 
-            print(f"\nAnalyzing changes between {base_branch} and {compare_branch}...")
+            print(f"\nAnalyzing changes on {compare_branch} since it branched from {base_branch}...")
             git_analyzer = GitAnalyzer(repo_path)
-            diff_text = git_analyzer.get_diff_between_branches(base_branch, compare_branch)
+            stats = git_analyzer.get_numstat(base_branch, compare_branch)
 
-            if not diff_text:
+            if not stats:
                 print("No changes found between the branches.")
                 return
 
+            changed_lines = sum((s["additions"] or 0) + (s["deletions"] or 0) for s in stats)
+            print(f"{len(stats)} files changed, {changed_lines} lines")
+
+            # Huge diffs: skip unchanged context lines to keep parsing lean
+            context_lines = 0 if changed_lines > LARGE_DIFF_LINES else 3
+            parsed_diff = code_analyzer.parse_diff_lines(
+                git_analyzer.iter_diff_lines(base_branch, compare_branch, context_lines=context_lines)
+            )
+
         elif choice == "2":
             # GitHub PR
             pr_url = input("Enter GitHub PR URL (e.g., https://github.com/owner/repo/pull/123): ").strip()
@@ -68,8 +82,7 @@ def main():
             gh_analyzer = GitHubPRAnalyzer(github_token)
 
             print(f"\nFetching PR #{pr_number} from {owner}/{repo}...")
-            diff_text = gh_analyzer.get_pr_diff(owner, repo, pr_number)
-            pr_context = gh_analyzer.get_pr_info(owner, repo, pr_number)
+            diff_text, pr_context = gh_analyzer.get_pr(owner, repo, pr_number)
 
             print(f"PR Title: {pr_context['title']}")
             print(f"Author: {pr_context['author']}")
@@ -91,14 +104,14 @@ def main():
             print("Invalid choice.")
             return
 
-        if not diff_text or not diff_text.strip():
-            print("No diff content provided.")
-            return
+        if parsed_diff is None:
+            if not diff_text or not diff_text.strip():
+                print("No diff content provided.")
+                return
+            parsed_diff = code_analyzer.parse_diff(diff_text)
 
         # Analyze the code changes
         print("\nAnalyzing code changes...")
-        code_analyzer = CodeAnalyzer()
-        parsed_diff = code_analyzer.parse_diff(diff_text)
         change_types = code_analyzer.identify_change_types(parsed_diff)
         diff_summary = code_analyzer.generate_summary(parsed_diff)
 
@@ -173,4 +186,9 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "bulk":
+        # Non-interactive: many PRs / a commit range → one consolidated report
+        from src.bulk_analyzer import main as bulk_main
+        bulk_main(sys.argv[2:])
+    else:
+        main()
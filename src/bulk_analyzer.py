@@ -0,0 +1,541 @@
+"""
+Bulk Analyzer Module
+Generates test cases for many pull requests (or local commits) at once and
+consolidates them into one de-duplicated report and workbook, e.g. for a
+release sign-off.
+
+Targets come from a list of PR URLs, a GitHub search (milestone, label,
+...) or a commit range of a local repository. PR metadata is fetched in
+batched GraphQL calls, targets are analysed concurrently — Bedrock calls
+stay under the process-wide limit in test_generator — and every finished
+target is checkpointed to disk, so an interrupted run resumes where it
+stopped instead of starting over. A checkpointed PR is reused only while
+its head commit is unchanged; checkpoints are removed once a job finishes
+without failures, and abandoned ones after BULK_CHECKPOINT_TTL_DAYS.
+
+Usage:
+    python -m src.bulk_analyzer --pr https://github.com/o/r/pull/1 --pr ...
+    python -m src.bulk_analyzer --query "repo:o/r milestone:v2.3"
+    python -m src.bulk_analyzer --range v2.2..v2.3 --repo-path .
+
+    analyzer = BulkAnalyzer(token)
+    report = analyzer.run(BulkAnalyzer.targets_from_urls(urls))
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.code_analyzer import CodeAnalyzer
+from src.exporters import TestCaseExporter
+from src.git_analyzer import GitAnalyzer, GitHubPRAnalyzer
+from src.test_generator import TestScenarioGenerator
+from src.tracing import submit_in_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8          # targets analysed at once (Bedrock has its own cap)
+GRAPHQL_BATCH_SIZE = 50          # pull requests per metadata query
+SEARCH_PER_PAGE = 100
+MAX_SEARCH_RESULTS = 1000        # GitHub search returns at most 1000 results
+DEFAULT_CHECKPOINT_TTL_DAYS = 7  # abandoned (never completed) jobs are removed after this
+
+_PR_URL_RE = re.compile(r"github\.com/([^/\s]+)/([^/\s]+)/pull/(\d+)")
+_EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+_PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+_PR_FIELDS = "title body baseRefName baseRefOid headRefName headRefOid state changedFiles author { login }"
+
+
+@dataclass(frozen=True)
+class BulkTarget:
+    """One unit of a bulk analysis: a GitHub pull request or a local commit."""
+    owner: str = ""
+    repo: str = ""
+    pr_number: int = 0
+    commit: str = ""
+
+    @property
+    def key(self) -> str:
+        if self.commit:
+            return f"commit:{self.commit}"
+        return f"{self.owner}/{self.repo}#{self.pr_number}"
+
+
+@dataclass
+class BulkReport:
+    """Outcome of a bulk run: one record per target plus the consolidated test cases."""
+    job_id: str
+    targets: List[Dict]
+    test_cases: List[Dict]
+    generated_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def failed(self) -> List[Dict]:
+        return [t for t in self.targets if t["status"] != "done"]
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "summary": {
+                "targets": len(self.targets),
+                "analysed": len(self.targets) - len(self.failed),
+                "failed": len(self.failed),
+                "test_cases": len(self.test_cases),
+            },
+            "targets": self.targets,
+            "test_cases": self.test_cases,
+            "generated_at": self.generated_at,
+        }
+
+
+class BulkCheckpoint:
+    """
+    On-disk record of finished targets for one bulk job, so a rerun of the
+    same job skips them. One JSON file per target, written atomically.
+    """
+
+    def __init__(self, root: str, job_id: str):
+        self.dir = os.path.join(root, job_id)
+        os.makedirs(self.dir, exist_ok=True)
+
+    @staticmethod
+    def default_root() -> str:
+        return os.getenv("BULK_CHECKPOINT_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "tsg_bulk")
+
+    @staticmethod
+    def prune(root: str, max_age_seconds: float) -> int:
+        """Remove job checkpoints not written to for max_age_seconds; returns how many."""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        try:
+            names = os.listdir(root)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                if os.path.isdir(path) and os.stat(path).st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    @staticmethod
+    def job_id_for(targets: Iterable[BulkTarget]) -> str:
+        """Deterministic job id: the same set of targets resumes the same job."""
+        keys = sorted({t.key for t in targets})
+        return hashlib.sha256("\n".join(keys).encode()).hexdigest()[:16]
+
+    def load(self) -> Dict[str, Dict]:
+        """Return target key → record for every target checkpointed so far."""
+        records = {}
+        for name in os.listdir(self.dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.dir, name), "r", encoding="utf-8") as fh:
+                    record = json.load(fh)
+            except (OSError, ValueError):
+                continue  # partially written by an interrupted run
+            records[record["key"]] = record
+        return records
+
+    def save(self, record: Dict) -> None:
+        name = hashlib.sha256(record["key"].encode()).hexdigest()[:16] + ".json"
+        fd, tmp_path = tempfile.mkstemp(dir=self.dir, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(record, fh, separators=(",", ":"))
+        os.replace(tmp_path, os.path.join(self.dir, name))
+
+    def clear(self) -> None:
+        for name in os.listdir(self.dir):
+            os.remove(os.path.join(self.dir, name))
+
+    def remove(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class BulkAnalyzer:
+    """Runs the single-PR pipeline over many targets and consolidates the results."""
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        repo_path: str = ".",
+        max_workers: Optional[int] = None,
+        checkpoint_root: Optional[str] = None,
+        gh_analyzer: Optional[GitHubPRAnalyzer] = None,
+        generator: Optional[TestScenarioGenerator] = None,
+    ):
+        """
+        Args:
+            token:           GitHub token (GraphQL metadata batching needs one;
+                             without it PR info is fetched one REST call per PR)
+            repo_path:       Local repository for commit targets
+            max_workers:     Targets analysed concurrently
+                             (default: BULK_MAX_WORKERS or 8)
+            checkpoint_root: Where finished targets are recorded
+                             (default: BULK_CHECKPOINT_DIR or the temp dir)
+            gh_analyzer:     GitHubPRAnalyzer to fetch PRs with
+            generator:       TestScenarioGenerator shared by all targets
+
+        Checkpoints of jobs not resumed for BULK_CHECKPOINT_TTL_DAYS
+        (default 7) are removed.
+        """
+        self.token = token
+        self.repo_path = repo_path
+        self.max_workers = max_workers or int(os.getenv("BULK_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+        self.checkpoint_root = checkpoint_root or BulkCheckpoint.default_root()
+        self.checkpoint_ttl_seconds = float(
+            os.getenv("BULK_CHECKPOINT_TTL_DAYS", DEFAULT_CHECKPOINT_TTL_DAYS)
+        ) * 86400
+        self.gh_analyzer = gh_analyzer or GitHubPRAnalyzer(token)
+        self._generator = generator
+        self._git_analyzer: Optional[GitAnalyzer] = None
+
+    # ------------------------------------------------------------------
+    # Target selection
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def targets_from_urls(urls: Iterable[str]) -> List[BulkTarget]:
+        """
+        Parse PR URLs (duplicates dropped, order kept).
+
+        Raises:
+            ValueError: For a URL that is not a GitHub pull request URL.
+        """
+        targets = []
+        for url in urls:
+            url = url.strip()
+            if not url:
+                continue
+            match = _PR_URL_RE.search(url)
+            if not match:
+                raise ValueError(f"Invalid GitHub PR URL: {url}")
+            targets.append(BulkTarget(match.group(1), match.group(2), int(match.group(3))))
+        return list(dict.fromkeys(targets))
+
+    def targets_from_search(self, query: str) -> List[BulkTarget]:
+        """
+        Pull requests matching a GitHub search query, e.g.
+        "repo:octo/app milestone:v2.3" or "org:octo label:release-2.3".
+        """
+        targets = []
+        for page in range(1, MAX_SEARCH_RESULTS // SEARCH_PER_PAGE + 1):
+            response = self.gh_analyzer.client.get(
+                "/search/issues",
+                params={"q": f"is:pr {query}", "per_page": SEARCH_PER_PAGE, "page": page},
+            )
+            if not response.ok:
+                raise ValueError(f"Error searching pull requests: {response.status_code} - {response.text}")
+            items = response.json().get("items", [])
+            for item in items:
+                owner, repo = item["repository_url"].rstrip("/").split("/")[-2:]
+                targets.append(BulkTarget(owner, repo, int(item["number"])))
+            if len(items) < SEARCH_PER_PAGE:
+                break
+        return list(dict.fromkeys(targets))
+
+    def targets_from_range(self, base: str, head: str) -> List[BulkTarget]:
+        """One target per mainline commit in base..head of the local repository."""
+        return [BulkTarget(commit=c["sha"]) for c in self._git().get_commits(base, head)]
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def run(
+        self,
+        targets: List[BulkTarget],
+        resume: bool = True,
+        on_progress: Optional[Callable[[Dict, int, int], None]] = None,
+    ) -> BulkReport:
+        """
+        Analyse every target and return the consolidated report.
+
+        Targets already finished by an earlier run of the same job are
+        taken from the checkpoint (pass ``resume=False`` to start over)
+        unless the PR got new commits since; failed ones are retried.
+        ``on_progress(record, done, total)`` is called as each target
+        finishes. A job that finishes without failures drops its
+        checkpoint.
+        """
+        BulkCheckpoint.prune(self.checkpoint_root, self.checkpoint_ttl_seconds)
+        job_id = BulkCheckpoint.job_id_for(targets)
+        checkpoint = BulkCheckpoint(self.checkpoint_root, job_id)
+        if not resume:
+            checkpoint.clear()
+
+        checkpointed = {key: r for key, r in checkpoint.load().items() if r["status"] == "done"}
+        infos = self.fetch_pr_infos([t for t in targets if not t.commit])
+        records = {
+            t.key: checkpointed[t.key]
+            for t in targets
+            if t.key in checkpointed and self._is_current(t, checkpointed[t.key], infos)
+        }
+        pending = [t for t in targets if t.key not in records]
+        if records:
+            logger.info("Bulk job %s: resuming, %d of %d targets already done", job_id, len(records), len(targets))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bulk") as pool:
+            futures = [submit_in_context(pool, self._analyze_target, t, infos.get(t.key)) for t in pending]
+            try:
+                for future in as_completed(futures):
+                    record = future.result()
+                    checkpoint.save(record)
+                    records[record["key"]] = record
+                    if on_progress:
+                        on_progress(record, len(records), len(targets))
+            except BaseException:
+                # Interrupted: drop what has not started; finished targets are checkpointed
+                for f in futures:
+                    f.cancel()
+                raise
+
+        ordered = [records[t.key] for t in targets if t.key in records]
+        if all(r["status"] == "done" for r in ordered):
+            checkpoint.remove()
+        return BulkReport(
+            job_id=job_id,
+            targets=[{k: v for k, v in r.items() if k != "test_cases"} for r in ordered],
+            test_cases=self.consolidate(ordered),
+        )
+
+    def fetch_pr_infos(self, targets: List[BulkTarget]) -> Dict[str, Dict]:
+        """
+        PR information (as GitHubPRAnalyzer.get_pr_info()) for many PRs,
+        GRAPHQL_BATCH_SIZE per GraphQL query. PRs the batch could not
+        resolve are left out; their targets fetch info themselves.
+        """
+        if not self.token or not targets:
+            return {}
+        infos = {}
+        for start in range(0, len(targets), GRAPHQL_BATCH_SIZE):
+            batch = targets[start:start + GRAPHQL_BATCH_SIZE]
+            try:
+                infos.update(self._fetch_info_batch(batch))
+            except ValueError as e:
+                logger.warning("Batched PR metadata fetch failed (%s); fetching per PR", e)
+        return infos
+
+    @staticmethod
+    def consolidate(records: Iterable[Dict]) -> List[Dict]:
+        """
+        Merge the test cases of finished targets, dropping duplicates.
+
+        Cases with the same type and (normalised) title are one case: it
+        keeps the highest priority seen and lists every source target.
+        Ids are renumbered TC-001, TC-002, ... in target order.
+        """
+        merged: Dict[tuple, Dict] = {}
+        for record in records:
+            for tc in record.get("test_cases") or []:
+                key = (
+                    str(tc.get("type", "")).lower(),
+                    re.sub(r"[^a-z0-9]+", " ", str(tc.get("title", "")).lower()).strip(),
+                )
+                existing = merged.get(key)
+                if existing is None:
+                    merged[key] = dict(tc, sources=[record["key"]])
+                    continue
+                if record["key"] not in existing["sources"]:
+                    existing["sources"].append(record["key"])
+                rank = _PRIORITY_RANK.get(str(tc.get("priority", "")).lower(), 3)
+                if rank < _PRIORITY_RANK.get(str(existing.get("priority", "")).lower(), 3):
+                    existing["priority"] = tc["priority"]
+
+        cases = list(merged.values())
+        for i, tc in enumerate(cases, start=1):
+            tc["id"] = f"TC-{i:03d}"
+        return cases
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _git(self) -> GitAnalyzer:
+        if self._git_analyzer is None:
+            self._git_analyzer = GitAnalyzer(self.repo_path)
+        return self._git_analyzer
+
+    def _generator_instance(self) -> TestScenarioGenerator:
+        if self._generator is None:
+            self._generator = TestScenarioGenerator()
+        return self._generator
+
+    def _is_current(self, target: BulkTarget, record: Dict, infos: Dict[str, Dict]) -> bool:
+        """
+        True when a checkpointed record still matches the target's head
+        commit. PR info fetched here is added to ``infos`` for reuse.
+        """
+        if target.commit:
+            return True     # a commit never changes
+        info = infos.get(target.key)
+        if info is None:
+            try:
+                info = infos[target.key] = self.gh_analyzer.get_pr_info(target.owner, target.repo, target.pr_number)
+            except ValueError:
+                return False
+        return bool(info.get("head_sha")) and record.get("head_sha") == info["head_sha"]
+
+    def _fetch_info_batch(self, batch: List[BulkTarget]) -> Dict[str, Dict]:
+        repos = list(dict.fromkeys((t.owner, t.repo) for t in batch))
+        variables, params, fields = {}, [], []
+        for i, (owner, repo) in enumerate(repos):
+            variables[f"o{i}"], variables[f"n{i}"] = owner, repo
+            params.append(f"$o{i}: String!, $n{i}: String!")
+            pulls = " ".join(
+                f"p{t.pr_number}: pullRequest(number: {t.pr_number}) {{ {_PR_FIELDS} }}"
+                for t in batch if (t.owner, t.repo) == (owner, repo)
+            )
+            fields.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ {pulls} }}")
+        data = self.gh_analyzer.client.graphql(f"query({', '.join(params)}) {{ {' '.join(fields)} }}", variables)
+
+        infos = {}
+        for t in batch:
+            pr = (data.get(f"r{repos.index((t.owner, t.repo))}") or {}).get(f"p{t.pr_number}")
+            if not pr:
+                continue
+            infos[t.key] = {
+                "title": pr["title"],
+                "description": pr["body"],
+                "base_branch": pr["baseRefName"],
+                "head_branch": pr["headRefName"],
+                "head_sha": pr["headRefOid"],
+                "base_sha": pr.get("baseRefOid"),
+                "author": (pr.get("author") or {}).get("login", "ghost"),
+                "state": "open" if pr["state"] == "OPEN" else "closed",   # REST has no "merged" state
+                "changed_files": pr.get("changedFiles"),
+            }
+        return infos
+
+    def _analyze_target(self, target: BulkTarget, info: Optional[Dict]) -> Dict:
+        """Run the pipeline for one target; failures are recorded, not raised."""
+        record = {"key": target.key, "status": "failed", "title": "", "author": "", "error": None}
+        started = time.monotonic()
+        try:
+            code_analyzer = CodeAnalyzer()
+            if target.commit:
+                commit = self._git().repo.commit(target.commit)
+                info = {
+                    "title": commit.summary,
+                    "description": commit.message,
+                    "base_branch": commit.parents[0].hexsha[:12] if commit.parents else "",
+                    "head_branch": commit.hexsha[:12],
+                    "author": commit.author.name,
+                    "state": "committed",
+                    "head_sha": commit.hexsha,
+                }
+                parent = commit.parents[0].hexsha if commit.parents else _EMPTY_TREE
+                parsed_diff = code_analyzer.parse_diff_lines(
+                    self._git().iter_diff_lines(parent, commit.hexsha, three_dot=False)
+                )
+            else:
+                diff_lines, info = self.gh_analyzer.get_pr_changes(
+                    target.owner, target.repo, target.pr_number, info=info,
+                )
+                parsed_diff = code_analyzer.parse_diff_lines(diff_lines)
+            record.update(title=info["title"], author=info["author"], head_sha=info.get("head_sha"))
+
+            test_cases = self._generator_instance().generate_structured_test_cases(
+                diff_summary=code_analyzer.generate_summary(parsed_diff),
+                parsed_diff=parsed_diff,
+                change_types=code_analyzer.identify_change_types(parsed_diff),
+                pr_context=info,
+            )
+            record.update(
+                status="done",
+                files=len(parsed_diff),
+                additions=sum(len(f["additions"]) for f in parsed_diff),
+                deletions=sum(len(f["deletions"]) for f in parsed_diff),
+                test_cases=test_cases,
+            )
+        except Exception as e:
+            logger.warning("Bulk analysis of %s failed: %s", target.key, e)
+            record["error"] = str(e)
+        record["seconds"] = round(time.monotonic() - started, 1)
+        return record
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate one consolidated test case report for many PRs.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--pr", action="append", metavar="URL", help="PR URL (repeatable)")
+    source.add_argument("--pr-file", help="File with one PR URL per line")
+    source.add_argument("--query", help='GitHub search, e.g. "repo:octo/app milestone:v2.3"')
+    source.add_argument("--range", metavar="BASE..HEAD", help="Commit range of a local repository")
+    parser.add_argument("--repo-path", default=".", help="Local repository for --range (default: .)")
+    parser.add_argument("--workers", type=int, help=f"Targets analysed at once (default: {DEFAULT_MAX_WORKERS})")
+    parser.add_argument("--output", default="bulk_test_cases", help="Output path prefix (.json and .xlsx)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore results checkpointed by an earlier run")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    analyzer = BulkAnalyzer(os.getenv("GITHUB_TOKEN"), repo_path=args.repo_path, max_workers=args.workers)
+    try:
+        if args.pr or args.pr_file:
+            urls = args.pr
+            if args.pr_file:
+                with open(args.pr_file, "r", encoding="utf-8") as fh:
+                    urls = fh.read().split()
+            targets = BulkAnalyzer.targets_from_urls(urls)
+        elif args.query:
+            targets = analyzer.targets_from_search(args.query)
+        else:
+            base, sep, head = args.range.partition("..")
+            if not sep or not base or not head.lstrip("."):
+                parser.error("--range must look like BASE..HEAD")
+            targets = analyzer.targets_from_range(base, head.lstrip("."))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not targets:
+        print("No pull requests or commits to analyse.")
+        return
+    print(f"Analysing {len(targets)} targets...")
+
+    def progress(record, done, total):
+        status = "ok" if record["status"] == "done" else f"FAILED ({record['error']})"
+        print(f"[{done}/{total}] {record['key']} {record['title']} — {status}")
+
+    try:
+        report = analyzer.run(targets, resume=not args.fresh, on_progress=progress)
+    except KeyboardInterrupt:
+        print("\nInterrupted. Run the same command again to resume.", file=sys.stderr)
+        sys.exit(130)
+
+    with open(f"{args.output}.json", "w", encoding="utf-8") as fh:
+        json.dump(report.to_dict(), fh, indent=2)
+    with open(f"{args.output}.xlsx", "wb") as fh:
+        columns = TestCaseExporter.columns_for(report.test_cases)
+        for chunk in TestCaseExporter.stream(report.test_cases, "xlsx", columns=columns):
+            fh.write(chunk)
+
+    summary = report.to_dict()["summary"]
+    print(f"\n{summary['analysed']}/{summary['targets']} targets analysed, "
+          f"{summary['test_cases']} unique test cases → {args.output}.json, {args.output}.xlsx")
+    if report.failed:
+        print(f"{summary['failed']} failed; run the same command again to retry them.")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,19 @@ Code Analyzer Module
 Analyzes code changes from git diffs to understand what was modified.
 """
 
-from typing import Dict, List
+from typing import Dict, Iterable, List
 import re
 
+from src.tracing import traced
+
+
+def _diff_size(parsed_diff: List[Dict]) -> Dict[str, int]:
+    return {
+        'files': len(parsed_diff),
+        'additions': sum(len(f['additions']) for f in parsed_diff),
+        'deletions': sum(len(f['deletions']) for f in parsed_diff),
+    }
+
 
 class CodeAnalyzer:
     """Analyzes code diffs to extract meaningful change information."""
@@ -24,10 +34,29 @@ class CodeAnalyzer:
         Returns:
             List of dictionaries containing file changes
         """
+        return self.parse_diff_lines(diff_text.split('\n'))
+
+    @traced('code_analyzer.parse_diff', _diff_size)
+    def parse_diff_lines(self, lines: Iterable[str]) -> List[Dict]:
+        """
+        Parse a git diff supplied line by line (e.g. streamed from the GitHub
+        files API or a git subprocess) without holding the whole diff text.
+
+        Args:
+            lines: Diff lines, without trailing newlines
+
+        Returns:
+            List of dictionaries containing file changes (as parse_diff()).
+            Each also has ``old_path`` and ``changed_ranges``: [start, end]
+            line ranges in the *old* file that were modified or deleted, or
+            next to which lines were inserted (used for coverage lookups).
+        """
         files_changed = []
         current_file = None
+        old_line = 0
+        replacing = False   # inside a "-" block: "+" lines replace it rather than insert
 
-        for line in diff_text.split('\n'):
+        for line in lines:
             # New file marker
             if line.startswith('diff --git'):
                 if current_file:
@@ -38,24 +67,39 @@ class CodeAnalyzer:
                 if match:
                     current_file = {
                         'file_path': match.group(2),
+                        'old_path': match.group(1),
                         'additions': [],
                         'deletions': [],
-                        'context': []
+                        'context': [],
+                        'changed_ranges': [],
                     }
 
-            # Track additions
+            # Hunk header: "@@ -old_start[,count] +new_start[,count] @@"
+            elif line.startswith('@@'):
+                match = re.match(r'@@ -(\d+)', line)
+                old_line = int(match.group(1)) if match else 0
+                replacing = False
+
+            # Track additions (inserted between old_line - 1 and old_line)
             elif line.startswith('+') and not line.startswith('+++'):
                 if current_file:
                     current_file['additions'].append(line[1:])
+                    if not replacing:
+                        self._add_range(current_file['changed_ranges'], max(old_line - 1, 1), max(old_line, 1))
 
             # Track deletions
             elif line.startswith('-') and not line.startswith('---'):
                 if current_file:
                     current_file['deletions'].append(line[1:])
+                    self._add_range(current_file['changed_ranges'], old_line, old_line)
+                old_line += 1
+                replacing = True
 
             # Track context
             elif current_file and line.startswith(' '):
                 current_file['context'].append(line[1:])
+                old_line += 1
+                replacing = False
 
         # Add the last file
         if current_file:
@@ -63,6 +107,15 @@ class CodeAnalyzer:
 
         return files_changed
 
+    @staticmethod
+    def _add_range(ranges: List[List[int]], start: int, end: int) -> None:
+        """Append [start, end], merging it into the last range when they touch."""
+        if ranges and start <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+
+    @traced('code_analyzer.identify_change_types', lambda types: {'changes': sum(map(len, types.values()))})
     def identify_change_types(self, parsed_diff: List[Dict]) -> Dict[str, List[str]]:
         """
         Identify types of changes made in the diff.
@@ -145,6 +198,7 @@ class CodeAnalyzer:
         db_patterns = ['migration', 'schema', 'model', 'entity', 'repository']
         return any(pattern in file_path.lower() for pattern in db_patterns)
 
+    @traced('code_analyzer.generate_summary', lambda summary: {'summary_chars': len(summary)})
     def generate_summary(self, parsed_diff: List[Dict]) -> str:
         """
         Generate a human-readable summary of changes.
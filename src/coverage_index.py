@@ -0,0 +1,472 @@
+"""
+Coverage Index Module
+Deterministic test impact analysis from recorded per-test line coverage.
+
+Coverage reports — coverage.py data files (``.coverage`` SQLite, with
+per-test contexts from ``pytest --cov-context=test``), LCOV tracefiles
+(one ``TN:`` block per test) and JaCoCo XML (one report per test or
+suite) — are ingested into an on-disk index: for every source file, the
+line intervals each test executed. Ingesting a test again replaces only
+that test's intervals, and only the files it touched are rewritten, so
+the index is updated incrementally as CI publishes new reports.
+
+At query time each file's intervals are loaded into an interval tree and
+intersected with the changed line ranges of a parsed diff (see
+CodeAnalyzer.parse_diff_lines(), ``changed_ranges``), giving the exact
+set of tests that executed a changed line. No AI calls are involved.
+
+Usage:
+    index = CoverageIndex.from_env()
+    index.ingest(parse_coverage(report_bytes, "coverage.info"))
+    impacted = index.impacted_tests(parsed_diff)
+    mappings = [apply_decision(m) for m in impact_mappings(impacted)]
+
+    # or promote matching suite rows of an Excel mapping
+    mark_impacted(mapping_data["mappings"], impacted)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:     # Windows: the index lock only serialises threads of one process
+    fcntl = None
+
+# coverage data: test name → source path → executed line numbers
+CoverageData = Dict[str, Dict[str, Set[int]]]
+
+# Report file extension → parser format
+COVERAGE_FORMATS: Dict[str, str] = {
+    ".coverage": "coveragepy",
+    ".sqlite": "coveragepy",
+    ".db": "coveragepy",
+    ".info": "lcov",
+    ".lcov": "lcov",
+    ".xml": "jacoco",
+}
+
+_MANIFEST_FILE = "manifest.json"
+_FILES_DIR = "files"
+_CONTEXT_SUFFIX_RE = re.compile(r"\|(run|setup|teardown)$")
+
+_thread_lock = threading.Lock()
+
+
+class CoverageFormatError(ValueError):
+    """Raised when a coverage report cannot be read."""
+
+
+def coverage_format(filename: str) -> Optional[str]:
+    """Parser format for a report file name (see COVERAGE_FORMATS), or None."""
+    name = os.path.basename(filename or "").lower()
+    if name.startswith(".coverage"):
+        return "coveragepy"     # .coverage, .coverage.<host>.<pid> parallel files
+    return COVERAGE_FORMATS.get(os.path.splitext(name)[1])
+
+
+def parse_coverage(data: bytes, filename: str, test_name: Optional[str] = None,
+                   source_root: Optional[str] = None) -> CoverageData:
+    """
+    Read a coverage report into {test: {path: lines}}.
+
+    Args:
+        data:        Raw report bytes.
+        filename:    Report file name; picks the format.
+        test_name:   Test the whole report belongs to, for reports without
+                     per-test data (default: the file name).
+        source_root: Prefix stripped from absolute source paths, so they
+                     match repository-relative diff paths.
+
+    Raises:
+        CoverageFormatError: for an unknown or unreadable report.
+    """
+    fmt = coverage_format(filename)
+    default_test = test_name or os.path.basename(filename)
+    try:
+        if fmt == "coveragepy":
+            coverage = _parse_coveragepy(data, default_test)
+        elif fmt == "lcov":
+            coverage = _parse_lcov(data.decode("utf-8", errors="replace"), default_test)
+        elif fmt == "jacoco":
+            coverage = _parse_jacoco(data, default_test)
+        else:
+            raise CoverageFormatError(f"Unsupported coverage report {filename!r}: use .coverage, .info/.lcov or .xml")
+    except (sqlite3.Error, ET.ParseError, ValueError) as exc:
+        if isinstance(exc, CoverageFormatError):
+            raise
+        raise CoverageFormatError(f"Could not read coverage report {filename!r}: {exc}")
+
+    if source_root:
+        root = source_root.rstrip("/\\") + "/"
+        coverage = {
+            test: {(p[len(root):] if p.startswith(root) else p): lines for p, lines in paths.items()}
+            for test, paths in coverage.items()
+        }
+    return coverage
+
+
+def merge_coverage(into: CoverageData, coverage: CoverageData) -> CoverageData:
+    """
+    Add coverage to ``into`` (in place) and return it. A test seen in both
+    keeps the union of its paths and lines, e.g. one test's reports from
+    several modules.
+    """
+    for test, paths in coverage.items():
+        merged = into.setdefault(test, {})
+        for path, lines in paths.items():
+            merged.setdefault(path, set()).update(lines)
+    return into
+
+
+def lines_to_intervals(lines: Iterable[int]) -> List[Tuple[int, int]]:
+    """Collapse line numbers into sorted, inclusive (start, end) runs."""
+    intervals: List[List[int]] = []
+    for line in sorted(set(lines)):
+        if intervals and line == intervals[-1][1] + 1:
+            intervals[-1][1] = line
+        else:
+            intervals.append([line, line])
+    return [(start, end) for start, end in intervals]
+
+
+class IntervalTree:
+    """
+    Static, augmented interval tree over (start, end, test) triples.
+
+    Intervals are sorted by start and stored as an implicit balanced
+    binary tree over that array; each node also keeps the largest end in
+    its subtree, so overlap queries skip whole subtrees that end too soon
+    and run in O(log n + k).
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int, str]]):
+        items = sorted(intervals)
+        self._starts = [i[0] for i in items]
+        self._ends = [i[1] for i in items]
+        self._tests = [i[2] for i in items]
+        self._max_end = list(self._ends)
+        self._build(0, len(items) - 1)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlapping(self, start: int, end: int) -> Set[str]:
+        """Tests with an interval intersecting [start, end]."""
+        found: Set[str] = set()
+        stack = [(0, len(self._starts) - 1)]
+        while stack:
+            lo, hi = stack.pop()
+            if lo > hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] < start:
+                continue        # nothing in this subtree reaches the query
+            stack.append((lo, mid - 1))
+            if self._starts[mid] <= end:
+                if self._ends[mid] >= start:
+                    found.add(self._tests[mid])
+                stack.append((mid + 1, hi))
+        return found
+
+    def _build(self, lo: int, hi: int) -> int:
+        if lo > hi:
+            return -1
+        mid = (lo + hi) // 2
+        self._max_end[mid] = max(self._ends[mid], self._build(lo, mid - 1), self._build(mid + 1, hi))
+        return self._max_end[mid]
+
+
+class CoverageIndex:
+    """
+    Persistent per-file index of the lines each test executed.
+
+    One JSON file per source file holds its (start, end, test) intervals; a
+    manifest lists the files each test covers. Writers take an exclusive
+    lock, so workers can share one index directory.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(os.path.join(root, _FILES_DIR), exist_ok=True)
+        self._trees: Dict[str, Tuple[float, IntervalTree]] = {}    # path → (mtime, tree)
+
+    @classmethod
+    def from_env(cls) -> "CoverageIndex":
+        """Create an index in COVERAGE_INDEX_DIR (default: the system temp dir)."""
+        root = os.getenv("COVERAGE_INDEX_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "tsg_coverage")
+        return cls(root)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def ingest(self, coverage: CoverageData) -> Dict:
+        """
+        Add or replace the coverage of the given tests.
+
+        Returns:
+            {"tests": tests ingested, "files": source files rewritten}
+        """
+        with self._locked():
+            manifest = self._read_manifest()
+            touched: Dict[str, Dict[str, List]] = {}    # path → {test: intervals}
+
+            for test, paths in coverage.items():
+                for path in manifest["tests"].get(test, []):
+                    touched.setdefault(path, {})[test] = []
+                for path, lines in paths.items():
+                    if lines:
+                        touched.setdefault(path, {})[test] = lines_to_intervals(lines)
+                manifest["tests"][test] = sorted(p for p, lines in paths.items() if lines)
+
+            for path, by_test in touched.items():
+                intervals = [i for i in self._read_file(path) if i[2] not in by_test]
+                for test, runs in by_test.items():
+                    intervals.extend((start, end, test) for start, end in runs)
+                self._write_file(path, intervals)
+                if intervals:
+                    manifest["files"][path] = self._file_key(path)
+                else:
+                    manifest["files"].pop(path, None)
+
+            self._write_json(os.path.join(self.root, _MANIFEST_FILE), manifest)
+        return {"tests": len(coverage), "files": len(touched)}
+
+    def remove_tests(self, tests: Iterable[str]) -> None:
+        """Drop tests from the index (e.g. deleted from the suite)."""
+        self.ingest({test: {} for test in tests})
+
+    def stats(self) -> Dict:
+        manifest = self._read_manifest()
+        return {"tests": len(manifest["tests"]), "files": len(manifest["files"])}
+
+    def impacted_tests(self, parsed_diff: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Tests that executed a changed line of the diff.
+
+        Returns:
+            test → [{"file_path", "start", "end"}] changed ranges it covers,
+            sorted by test name
+        """
+        indexed = list(self._read_manifest()["files"])
+        impacted: Dict[str, List[Dict]] = {}
+        for file_change in parsed_diff:
+            ranges = file_change.get("changed_ranges") or []
+            old_path = file_change.get("old_path") or file_change["file_path"]
+            if not ranges:
+                continue
+            for path in self._matching_paths(old_path, indexed):
+                tree = self._tree(path)
+                for start, end in ranges:
+                    for test in tree.overlapping(start, end):
+                        impacted.setdefault(test, []).append(
+                            {"file_path": file_change["file_path"], "start": start, "end": end}
+                        )
+        return dict(sorted(impacted.items()))
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _matching_paths(diff_path: str, indexed: List[str]) -> List[str]:
+        """Indexed paths equal to diff_path or ending in "/" + diff_path (absolute report paths)."""
+        suffix = "/" + diff_path.lstrip("/")
+        return [p for p in indexed if p == diff_path or p.replace("\\", "/").endswith(suffix)]
+
+    def _tree(self, path: str) -> IntervalTree:
+        file_path = self._file_path(path)
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            return IntervalTree([])
+        cached = self._trees.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        tree = IntervalTree(self._read_file(path))
+        self._trees[path] = (mtime, tree)
+        return tree
+
+    @staticmethod
+    def _file_key(path: str) -> str:
+        return hashlib.sha256(path.encode()).hexdigest()[:24]
+
+    def _file_path(self, path: str) -> str:
+        return os.path.join(self.root, _FILES_DIR, self._file_key(path) + ".json")
+
+    def _read_file(self, path: str) -> List[Tuple[int, int, str]]:
+        try:
+            with open(self._file_path(path), "r", encoding="utf-8") as fh:
+                return [tuple(i) for i in json.load(fh)["intervals"]]
+        except FileNotFoundError:
+            return []
+
+    def _write_file(self, path: str, intervals: List[Tuple[int, int, str]]) -> None:
+        if not intervals:
+            try:
+                os.remove(self._file_path(path))
+            except FileNotFoundError:
+                pass
+            return
+        self._write_json(self._file_path(path), {"path": path, "intervals": sorted(intervals)})
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(os.path.join(self.root, _MANIFEST_FILE), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"files": {}, "tests": {}}
+
+    def _write_json(self, path: str, data) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _locked(self):
+        with _thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, ".lock"), "a") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def impact_mappings(impacted: Dict[str, List[Dict]]) -> List[Dict]:
+    """
+    Mapping dicts (ExcelMapper shape) for coverage-impacted tests, as
+    MAPPED at 100% confidence — apply_decision() turns them into RUN.
+    """
+    mappings = []
+    for test, hits in impacted.items():
+        where = ", ".join(sorted({f"{h['file_path']}:{h['start']}-{h['end']}" for h in hits}))
+        mappings.append({
+            "excel_row_index": None,
+            "raw_id": test,
+            "generated_tc_id": None,
+            "generated_title": "",
+            "status": "MAPPED",
+            "confidence": 100,
+            "notes": f"Coverage: executes changed lines {where}",
+            "source": "coverage",
+        })
+    return mappings
+
+
+def mark_impacted(mappings: List[Dict], impacted: Iterable[str]) -> int:
+    """
+    Promote suite mappings whose test id is coverage-impacted to MAPPED at
+    100% confidence, before apply_decision(). A test id matches a coverage
+    test name exactly or as its last "::" / "." component (pytest node ids,
+    JUnit class.method names). Returns the number of mappings promoted.
+    """
+    names: Set[str] = set()
+    for test in impacted:
+        names.add(test)
+        names.add(re.split(r"::|\.", test)[-1])
+    promoted = 0
+    for mapping in mappings:
+        raw_id = str(mapping.get("raw_id") or "").strip()
+        if raw_id and raw_id in names:
+            mapping["status"] = "MAPPED"
+            mapping["confidence"] = 100
+            mapping["notes"] = "Coverage: executes changed lines" + (
+                f"; {mapping['notes']}" if mapping.get("notes") else ""
+            )
+            promoted += 1
+    return promoted
+
+
+# ---------------------------------------------------------------------------
+# Report parsers
+# ---------------------------------------------------------------------------
+
+def _parse_coveragepy(data: bytes, default_test: str) -> CoverageData:
+    """coverage.py SQLite data file; line_bits (or arc) rows per measurement context."""
+    fd, tmp_path = tempfile.mkstemp(suffix=".coverage")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        conn = sqlite3.connect(f"file:{tmp_path}?mode=ro", uri=True)
+        try:
+            files = dict(conn.execute("SELECT id, path FROM file"))
+            contexts = dict(conn.execute("SELECT id, context FROM context"))
+            coverage: CoverageData = {}
+
+            def add(context_id, file_id, lines):
+                test = _CONTEXT_SUFFIX_RE.sub("", contexts.get(context_id) or "") or default_test
+                coverage.setdefault(test, {}).setdefault(files[file_id], set()).update(lines)
+
+            for file_id, context_id, numbits in conn.execute("SELECT file_id, context_id, numbits FROM line_bits"):
+                add(context_id, file_id, _numbits_to_lines(numbits))
+            # Branch-coverage data files record arcs instead of lines
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+            if "arc" in tables:
+                for file_id, context_id, from_no, to_no in conn.execute(
+                    "SELECT file_id, context_id, fromno, tono FROM arc"
+                ):
+                    add(context_id, file_id, [n for n in (from_no, to_no) if n > 0])
+        finally:
+            conn.close()
+    finally:
+        os.remove(tmp_path)
+    return coverage
+
+
+def _numbits_to_lines(numbits: bytes) -> List[int]:
+    """Decode coverage.py's numbits blob: bit n set ⇔ line n executed."""
+    return [
+        byte_i * 8 + bit_i
+        for byte_i, byte in enumerate(numbits)
+        if byte
+        for bit_i in range(8)
+        if byte & (1 << bit_i)
+    ]
+
+
+def _parse_lcov(text: str, default_test: str) -> CoverageData:
+    """LCOV tracefile: TN: test name, SF: source file, DA:<line>,<hits>."""
+    coverage: CoverageData = {}
+    test, lines = default_test, None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if line.startswith("TN:"):
+            test = line[3:].strip() or default_test
+        elif line.startswith("SF:"):
+            lines = coverage.setdefault(test, {}).setdefault(line[3:].strip(), set())
+        elif line.startswith("DA:") and lines is not None:
+            fields = line[3:].split(",")
+            if len(fields) >= 2 and fields[1].strip().lstrip("-").isdigit() and int(fields[1]) > 0:
+                lines.add(int(fields[0]))
+        elif line == "end_of_record":
+            lines = None
+    return coverage
+
+
+def _parse_jacoco(data: bytes, default_test: str) -> CoverageData:
+    """JaCoCo XML report: <package name><sourcefile name><line nr ci>; one test per report."""
+    root = ET.fromstring(data)
+    test = default_test
+    paths: Dict[str, Set[int]] = {}
+    for package in root.iter("package"):
+        prefix = package.get("name", "")
+        for sourcefile in package.iter("sourcefile"):
+            path = f"{prefix}/{sourcefile.get('name')}" if prefix else sourcefile.get("name")
+            covered = {int(line.get("nr")) for line in sourcefile.iter("line") if int(line.get("ci", 0)) > 0}
+            if covered:
+                paths[path] = covered
+    return {test: paths}
@@ -9,6 +9,11 @@ import logging
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 
+from src.excel_processor import SuiteRows, row_key
+from src.progress import stage
+from src.test_generator import bedrock_slots
+from src.tracing import KIND_CLIENT, set_attributes, span
+
 logger = logging.getLogger(__name__)
 
 # Confidence thresholds
@@ -26,7 +31,10 @@ class MappingResult:
     One entry per Excel row:
     {
         excel_row_index: int,        # worksheet row number
+        sheet: str,                  # only for multi-sheet ingestion (parse_workbooks)
+        workbook: str,               # only when several workbooks were uploaded
         raw_id: str,                 # display identifier from Excel (TC ID or row num)
+        test_id: str,                # the TC ID alone, without raw_id's "<sheet> / " prefix
         generated_tc_id: str|None,   # best matching generated TC id, or None
         generated_title: str|None,   # title of that TC for display
         status: str,                 # MAPPED | POSSIBLE MATCH | NOT IMPACTED
@@ -72,12 +80,13 @@ class ExcelMapper:
     # Public API
     # ------------------------------------------------------------------
 
-    def map(self, excel_rows: List[Dict], generated_cases: List[Dict]) -> MappingResult:
+    def map(self, excel_rows: SuiteRows, generated_cases: List[Dict]) -> MappingResult:
         """
         Map generated test cases to existing Excel rows.
 
         Args:
-            excel_rows: Parsed rows from ExcelProcessor.parse().
+            excel_rows: Parsed rows from ExcelProcessor.parse() / parse_table()
+                        (a list of row dicts or a TestSuiteTable).
             generated_cases: Structured test cases from TestScenarioGenerator.generate_structured_test_cases().
 
         Returns:
@@ -86,27 +95,35 @@ class ExcelMapper:
         if not excel_rows or not generated_cases:
             return self._empty_result(excel_rows, generated_cases)
 
-        prompt = self._build_mapping_prompt(excel_rows, generated_cases)
-        raw_response = self._invoke(prompt)
-        ai_output = self._parse_ai_response(raw_response)
+        with stage("prompt_build"):
+            prompt = self._build_mapping_prompt(excel_rows, generated_cases)
+            set_attributes(rows=len(excel_rows), test_cases=len(generated_cases), prompt_chars=len(prompt))
+        with stage("model_call"):
+            raw_response = self._invoke(prompt)
+        with stage("response_parse"):
+            ai_output = self._parse_ai_response(raw_response)
+            set_attributes(mappings=len(ai_output.get("mappings") or []))
 
-        return self._build_result(ai_output, excel_rows, generated_cases)
+        with stage("mapping"):
+            return self._build_result(ai_output, excel_rows, generated_cases)
 
     # ------------------------------------------------------------------
     # Private: prompt construction
     # ------------------------------------------------------------------
 
-    def _build_mapping_prompt(self, excel_rows: List[Dict], generated_cases: List[Dict]) -> str:
-        # Compact serialisation of Excel rows (only meaningful fields)
-        existing_list = []
-        for row in excel_rows:
-            existing_list.append({
-                "row_index": row["row_index"],
+    def _build_mapping_prompt(self, excel_rows: SuiteRows, generated_cases: List[Dict]) -> str:
+        # Compact serialisation of Excel rows (only meaningful fields),
+        # written row by row rather than via an intermediate list of dicts
+        existing_json = self._json_array(
+            {
+                "row_index": row_key(row),
                 "raw_id": row.get("_raw_id", str(row["row_index"])),
                 "scenario": row.get("test_scenario") or row.get("description") or row.get("test_case") or "",
                 "steps": row.get("test_steps", ""),
                 "expected": row.get("expected_result", ""),
-            })
+            }
+            for row in excel_rows
+        )
 
         # Compact serialisation of generated cases
         generated_list = []
@@ -140,7 +157,7 @@ Rules:
 - 0–19:   No meaningful relationship
 
 ## Existing test cases (from Excel)
-{json.dumps(existing_list, indent=2)}
+{existing_json}
 
 ## Generated test cases (from PR analysis)
 {json.dumps(generated_list, indent=2)}
@@ -150,7 +167,7 @@ Return ONLY valid JSON — no markdown fences, no explanation. Schema:
 {{
   "mappings": [
     {{
-      "excel_row_index": <int>,
+      "excel_row_index": <row_index of the existing test case, exactly as given>,
       "generated_tc_id": "<string or null>",
       "confidence": <0-100>,
       "notes": "<one sentence explanation>"
@@ -164,21 +181,38 @@ Return ONLY valid JSON — no markdown fences, no explanation. Schema:
 """
         return prompt
 
+    @staticmethod
+    def _json_array(items) -> str:
+        """Same text as json.dumps(list(items), indent=2), without building the list."""
+        parts = [json.dumps(item, indent=2).replace("\n", "\n  ") for item in items]
+        if not parts:
+            return "[]"
+        return "[\n  " + ",\n  ".join(parts) + "\n]"
+
     # ------------------------------------------------------------------
     # Private: Bedrock invocation
     # ------------------------------------------------------------------
 
     def _invoke(self, prompt: str) -> str:
-        response = self._client.invoke_model(
-            modelId=self.MODEL_ID,
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": self.MAX_TOKENS,
-                "temperature": self.TEMPERATURE,
-                "messages": [{"role": "user", "content": prompt}],
-            }),
-        )
-        return json.loads(response["body"].read())["content"][0]["text"].strip()
+        """One Bedrock call, under the process-wide concurrency cap (test_generator.bedrock_slots)."""
+        with bedrock_slots, span("bedrock.invoke_model", KIND_CLIENT, model=self.MODEL_ID) as traced:
+            response = self._client.invoke_model(
+                modelId=self.MODEL_ID,
+                body=json.dumps({
+                    "anthropic_version": "bedrock-2023-05-31",
+                    "max_tokens": self.MAX_TOKENS,
+                    "temperature": self.TEMPERATURE,
+                    "messages": [{"role": "user", "content": prompt}],
+                }),
+            )
+            payload = json.loads(response["body"].read())
+            usage = payload.get("usage") or {}
+            traced.set(
+                input_tokens=usage.get("input_tokens"),
+                output_tokens=usage.get("output_tokens"),
+                stop_reason=payload.get("stop_reason"),
+            )
+        return payload["content"][0]["text"].strip()
 
     # ------------------------------------------------------------------
     # Private: response parsing
@@ -206,22 +240,23 @@ Return ONLY valid JSON — no markdown fences, no explanation. Schema:
     def _build_result(
         self,
         ai_output: Dict,
-        excel_rows: List[Dict],
+        excel_rows: SuiteRows,
         generated_cases: List[Dict],
     ) -> MappingResult:
         """Combine AI output with confidence thresholds to produce MappingResult."""
 
         generated_by_id: Dict[str, Dict] = {tc["id"]: tc for tc in generated_cases if tc.get("id")}
 
-        # Index AI mappings by excel_row_index for O(1) lookup
-        ai_by_row: Dict[int, Dict] = {}
+        # Index AI mappings by row key for O(1) lookup (str: the model may
+        # echo integer row numbers back as strings or vice versa)
+        ai_by_row: Dict[str, Dict] = {}
         for m in ai_output.get("mappings", []):
-            ai_by_row[m["excel_row_index"]] = m
+            ai_by_row[str(m.get("excel_row_index"))] = m
 
         mappings: List[Dict] = []
         for row in excel_rows:
             row_idx = row["row_index"]
-            ai_m = ai_by_row.get(row_idx, {})
+            ai_m = ai_by_row.get(str(row_key(row)), {})
             confidence = ai_m.get("confidence", 0) or 0
             tc_id = ai_m.get("generated_tc_id")
 
@@ -235,7 +270,7 @@ Return ONLY valid JSON — no markdown fences, no explanation. Schema:
                 tc_id = None  # don't show a TC id for unconfident matches
 
             tc = generated_by_id.get(tc_id or "") if tc_id else None
-            mappings.append({
+            mappings.append(self._with_origin(row, {
                 "excel_row_index": row_idx,
                 "raw_id": row.get("_raw_id", str(row_idx)),
                 "generated_tc_id": tc_id,
@@ -243,7 +278,7 @@ Return ONLY valid JSON — no markdown fences, no explanation. Schema:
                 "status": status,
                 "confidence": confidence if tc_id else 0,
                 "notes": ai_m.get("notes", ""),
-            })
+            }))
 
         # Determine NEW generated test cases
         matched_tc_ids = {m["generated_tc_id"] for m in mappings if m["generated_tc_id"]}
@@ -272,9 +307,19 @@ Return ONLY valid JSON — no markdown fences, no explanation. Schema:
             stats=stats,
         )
 
-    def _empty_result(self, excel_rows: List[Dict], generated_cases: List[Dict]) -> MappingResult:
+    @staticmethod
+    def _with_origin(row, mapping: Dict) -> Dict:
+        """Carry the test id and the sheet/workbook origin of multi-sheet rows onto their mapping."""
+        mapping["test_id"] = row.get("_test_id") or ""
+        if row.get("_sheet"):
+            mapping["sheet"] = row["_sheet"]
+        if row.get("_workbook"):
+            mapping["workbook"] = row["_workbook"]
+        return mapping
+
+    def _empty_result(self, excel_rows: SuiteRows, generated_cases: List[Dict]) -> MappingResult:
         mappings = [
-            {
+            self._with_origin(row, {
                 "excel_row_index": row["row_index"],
                 "raw_id": row.get("_raw_id", str(row["row_index"])),
                 "generated_tc_id": None,
@@ -282,7 +327,7 @@ Return ONLY valid JSON — no markdown fences, no explanation. Schema:
                 "status": "NOT IMPACTED",
                 "confidence": 0,
                 "notes": "No generated test cases to map against.",
-            }
+            })
             for row in excel_rows
         ]
         return MappingResult(
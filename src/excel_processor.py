@@ -1,17 +1,34 @@
 """
 Excel Processor Module
-Handles reading existing test case Excel files and producing color-coded mapped output workbooks.
+Handles reading existing test case files (Excel, or CSV/TSV/JSON Lines exports)
+and producing color-coded mapped output workbooks.
 """
 
+import csv
 import difflib
 import io
+import json
+import os
+import shutil
+from array import array
+from collections.abc import Mapping
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
 
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
+from openpyxl.styles.cell_style import StyleArray
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.writer.excel import ExcelWriter
+
+from src.tracing import set_attributes, traced
 
 
 # ---------------------------------------------------------------------------
@@ -26,6 +43,11 @@ COLUMN_ALIASES: Dict[str, List[str]] = {
     "precondition": ["precondition", "preconditions", "pre-condition", "pre condition", "prerequisites"],
     "test_steps": ["test steps", "steps", "step", "procedure", "test procedure", "test step"],
     "expected_result": ["expected result", "expected", "expected outcome", "result", "expected results"],
+    # Optional run-planning inputs (see run_planner); bare duration numbers are minutes
+    "priority": ["priority", "test priority", "prio"],
+    "risk": ["risk", "risk level", "business risk"],
+    "duration": ["duration", "duration (min)", "estimated duration", "est. duration", "execution time",
+                 "estimated time", "run time", "runtime", "time (min)"],
 }
 
 # openpyxl fill colours for each mapping status
@@ -36,24 +58,49 @@ STATUS_FILLS = {
     "NEW":            PatternFill(start_color="D6EAF8", end_color="D6EAF8", fill_type="solid"),  # soft blue
 }
 
+# Accepted test suite file extensions → parser format. Text formats are read
+# with the stdlib csv/json modules instead of openpyxl.
+SUITE_FORMATS: Dict[str, str] = {
+    ".xlsx": "xlsx",
+    ".xlsm": "xlsx",
+    ".xls": "xlsx",
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".tab": "tsv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+# Consecutive empty rows after which parsing stops. Off by default: a gap
+# that long inside the data would silently drop every row after it
+DEFAULT_MAX_EMPTY_ROWS: Optional[int] = None
+
+# Empty rows past the last data row after which output rendering stops
+# (trailing formatting rows are never written)
+OUTPUT_TRAILING_EMPTY_ROWS = 50
+
 HEADER_FILL = PatternFill(start_color="2C3E50", end_color="2C3E50", fill_type="solid")
 HEADER_FONT = Font(color="FFFFFF", bold=True)
 NEW_SECTION_FILL = PatternFill(start_color="D6EAF8", end_color="D6EAF8", fill_type="solid")
+SEPARATOR_FILL = PatternFill(start_color="2980B9", end_color="2980B9", fill_type="solid")
 
-MAPPING_COLUMNS = [
-    "Mapping Status",
-    "Generated TC ID",
-    "Generated Title",
-    "Match Confidence (%)",
-    "QA Notes",
-]
+# Output sheet title for decision workbooks rendered from CSV/TSV/JSON Lines
+TEXT_SHEET_TITLE = "Test Cases"
 
-# Three decision columns appended after the 5 mapping columns
-DECISION_COLUMNS = [
-    "Execution Decision",
-    "Execution Reason",
-    "Suggested Action",
-]
+NEW_SECTION_TITLE = "NEW — Generated scenarios not in existing test suite"
+NEW_SECTION_HEADERS = ["TC ID", "Title", "Type", "Priority", "Category", "Steps", "Expected Result"]
+NEW_DECISION_REASON = (
+    "No existing test covers this generated scenario. A new test case must be added before release."
+)
+
+# Streaming download: chunk size, and the size at which a rendered workbook
+# spills from memory to a temp file
+STREAM_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Fixed timestamp for rendered workbooks (document properties and zip
+# entries), so identical input renders to byte-identical output
+RENDER_TIMESTAMP = datetime(2000, 1, 1)
 
 # Cell-level fill colours for the Execution Decision column only.
 # Row background colours (STATUS_FILLS) are unchanged.
@@ -73,6 +120,241 @@ class ExcelParseError(ValueError):
     """Raised when the uploaded Excel file cannot be parsed meaningfully."""
 
 
+# ---------------------------------------------------------------------------
+# Row identity across sheets/workbooks
+# ---------------------------------------------------------------------------
+
+def origin_key(row_index: int, sheet: Optional[str] = None, workbook: Optional[str] = None) -> Union[int, str]:
+    """
+    Identity of an Excel row across sheets and workbooks.
+
+    Plain single-sheet rows keep their integer row number; rows from
+    multi-sheet ingestion get "Sheet!12" or "suite.xlsx/Sheet!12".
+    """
+    if not sheet:
+        return row_index
+    prefix = f"{workbook}/{sheet}" if workbook else sheet
+    return f"{prefix}!{row_index}"
+
+
+def row_key(row: Dict) -> Union[int, str]:
+    """origin_key() for a parsed row dict."""
+    return origin_key(row["row_index"], row.get("_sheet"), row.get("_workbook"))
+
+
+def mapping_key(mapping: Dict) -> Union[int, str]:
+    """origin_key() for a mapping dict (see ExcelMapper)."""
+    return origin_key(mapping["excel_row_index"], mapping.get("sheet"), mapping.get("workbook"))
+
+
+def suite_format(filename: str) -> Optional[str]:
+    """Return the SUITE_FORMATS parser format for a file name, or None if unsupported."""
+    return SUITE_FORMATS.get(os.path.splitext(filename or "")[1].lower())
+
+
+# ---------------------------------------------------------------------------
+# Columnar row store
+# ---------------------------------------------------------------------------
+
+# Row keys present only on rows from multi-sheet/multi-workbook ingestion
+_ORIGIN_KEYS = ("_sheet", "_workbook")
+
+
+class TestSuiteTable:
+    """
+    Compact columnar store of parsed test suite rows.
+
+    Every text value is interned once in a per-table string pool and each
+    column is an ``array('i')`` of pool ids; row numbers live in their own
+    ``array('i')``. Iterating or indexing yields SuiteRow views that read
+    through to the columns and behave like the row dicts parse() returns
+    (``row["test_steps"]``, ``row.get("_sheet")``), so the mapper, the
+    output renderer and similarity scoring can take a table wherever they
+    take a list of row dicts.
+
+    Usage:
+        table = ExcelProcessor.parse_table(file_bytes)
+        for row in table:
+            row["row_index"], row["test_scenario"]
+        steps = list(table.column("test_steps"))
+    """
+
+    FIELDS: Tuple[str, ...] = tuple(COLUMN_ALIASES) + ("_raw_id", "_test_id") + _ORIGIN_KEYS
+
+    def __init__(self):
+        self.row_index = array("i")
+        self.columns: Dict[str, array] = {name: array("i") for name in self.FIELDS}
+        self._strings: List[str] = [""]
+        self._ids: Dict[str, int] = {"": 0}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> "TestSuiteTable":
+        """Build a table from row dicts (e.g. ExcelProcessor.iter_rows())."""
+        table = cls()
+        for row in rows:
+            table.append(row)
+        return table
+
+    @classmethod
+    def from_json(cls, data: Union[Dict, List[Dict]]) -> "TestSuiteTable":
+        """Rebuild a table from to_json() output (or a plain list of row dicts)."""
+        if isinstance(data, list):
+            return cls.from_rows(data)
+        table = cls()
+        table._strings = list(data["strings"])
+        table._ids = {value: idx for idx, value in enumerate(table._strings)}
+        table.row_index = array("i", data["row_index"])
+        for name in cls.FIELDS:
+            column = data["columns"].get(name)
+            table.columns[name] = array("i", column) if column is not None else array("i", [0] * len(table.row_index))
+        return table
+
+    def to_json(self) -> Dict:
+        """JSON-serialisable columnar form (see from_json())."""
+        return {
+            "strings": self._strings,
+            "row_index": self.row_index.tolist(),
+            "columns": {name: column.tolist() for name, column in self.columns.items()},
+        }
+
+    def append(self, row: Dict) -> None:
+        self.row_index.append(row["row_index"])
+        for name, column in self.columns.items():
+            column.append(self._intern(row.get(name) or ""))
+
+    def value(self, pos: int, name: str) -> str:
+        """Text of field ``name`` in row ``pos`` ("" when empty)."""
+        return self._strings[self.columns[name][pos]]
+
+    def column(self, name: str) -> Iterator[str]:
+        """Iterate one field's text down the table without building row views."""
+        strings = self._strings
+        return (strings[idx] for idx in self.columns[name])
+
+    def __len__(self) -> int:
+        return len(self.row_index)
+
+    def __iter__(self) -> Iterator["SuiteRow"]:
+        return (SuiteRow(self, pos) for pos in range(len(self.row_index)))
+
+    def __getitem__(self, pos: int) -> "SuiteRow":
+        if pos < 0:
+            pos += len(self.row_index)
+        if not 0 <= pos < len(self.row_index):
+            raise IndexError("TestSuiteTable index out of range")
+        return SuiteRow(self, pos)
+
+    def _intern(self, value: str) -> int:
+        idx = self._ids.get(value)
+        if idx is None:
+            idx = self._ids[value] = len(self._strings)
+            self._strings.append(value)
+        return idx
+
+
+class SuiteRow(Mapping):
+    """
+    Read-only, dict-like view of one TestSuiteTable row.
+
+    Has the same keys as a parse() row dict: ``row_index``, the
+    COLUMN_ALIASES fields, ``_raw_id`` and ``_test_id``, plus
+    ``_sheet``/``_workbook`` when the row came from multi-sheet ingestion.
+    """
+
+    __slots__ = ("_table", "_pos")
+
+    def __init__(self, table: TestSuiteTable, pos: int):
+        self._table = table
+        self._pos = pos
+
+    def __getitem__(self, key: str):
+        table = self._table
+        if key == "row_index":
+            return table.row_index[self._pos]
+        column = table.columns.get(key)
+        if column is None:
+            raise KeyError(key)
+        value = table._strings[column[self._pos]]
+        if not value and key in _ORIGIN_KEYS:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self) -> Iterator[str]:
+        yield "row_index"
+        table = self._table
+        for name in table.FIELDS:
+            if name not in _ORIGIN_KEYS or table.columns[name][self._pos]:
+                yield name
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"SuiteRow({dict(self)!r})"
+
+
+# Parsed rows as accepted by the mapper and the output renderer
+SuiteRows = Union[List[Dict], TestSuiteTable]
+
+
+# ---------------------------------------------------------------------------
+# Output column specs
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class OutputColumn:
+    """
+    One column appended to the right of the source data in an output workbook.
+
+    Attributes:
+        header:    Column header text.
+        value:     Mapping dict → cell value on existing test case rows.
+        new_value: Cell value on NEW-section rows; None leaves the column
+                   out of the NEW section.
+        decision:  Colour the cell by DECISION_FILLS instead of the row status.
+    """
+    header: str
+    value: Callable[[Dict], object]
+    new_value: Optional[str] = None
+    decision: bool = False
+
+
+# Columns appended by build_output()
+MAPPING_OUTPUT_SPEC: Tuple[OutputColumn, ...] = (
+    OutputColumn("Mapping Status", lambda m: m.get("status", "NOT IMPACTED")),
+    OutputColumn("Generated TC ID", lambda m: m.get("generated_tc_id") or ""),
+    OutputColumn("Generated Title", lambda m: m.get("generated_title") or ""),
+    OutputColumn("Match Confidence (%)", lambda m: m.get("confidence") or ""),
+    OutputColumn("QA Notes", lambda m: m.get("notes") or ""),
+)
+
+# Columns appended by build_decision_output(): mapping + decision columns
+DECISION_OUTPUT_SPEC: Tuple[OutputColumn, ...] = MAPPING_OUTPUT_SPEC + (
+    OutputColumn("Execution Decision", lambda m: m.get("execution_decision", ""),
+                 new_value="MUST_ADD_AND_RUN", decision=True),
+    OutputColumn("Execution Reason", lambda m: m.get("execution_reason", ""), new_value=NEW_DECISION_REASON),
+    OutputColumn("Suggested Action", lambda m: m.get("suggested_action", ""), new_value="Add New Test"),
+)
+
+# Columns appended when a run plan was computed (run_planner.plan_run())
+PLAN_OUTPUT_SPEC: Tuple[OutputColumn, ...] = DECISION_OUTPUT_SPEC + (
+    OutputColumn("Plan Status", lambda m: m.get("plan_status", "")),
+    OutputColumn("Runner", lambda m: m.get("plan_runner", "")),
+    OutputColumn("Run Order", lambda m: m.get("plan_order", "")),
+    OutputColumn("Est. Duration (min)", lambda m: m.get("plan_duration_min", "")),
+)
+
+MAPPING_COLUMNS = [col.header for col in MAPPING_OUTPUT_SPEC]
+# Three decision columns appended after the 5 mapping columns
+DECISION_COLUMNS = [col.header for col in DECISION_OUTPUT_SPEC[len(MAPPING_OUTPUT_SPEC):]]
+
+
 # ---------------------------------------------------------------------------
 # Main class
 # ---------------------------------------------------------------------------
@@ -85,98 +367,188 @@ class ExcelProcessor:
     # ------------------------------------------------------------------
 
     @staticmethod
-    def parse(file_bytes: bytes) -> List[Dict]:
+    @traced("excel.parse", lambda rows: {"rows": len(rows)})
+    def parse(
+        file_bytes: bytes,
+        max_empty_rows: Optional[int] = DEFAULT_MAX_EMPTY_ROWS,
+        fmt: str = "xlsx",
+    ) -> List[Dict]:
         """
-        Parse an Excel workbook and return a list of test case row dicts.
+        Parse a test suite file (Excel workbook by default, or CSV/TSV/JSON
+        Lines — see SUITE_FORMATS) and return a list of test case row dicts.
 
         Each dict has keys matching COLUMN_ALIASES canonical names plus
-        ``row_index`` (1-based worksheet row number) and ``_raw_id``
-        (value from the first detected identifier column, for display).
+        ``row_index`` (1-based worksheet row number), ``_raw_id`` (value
+        from the first detected identifier column, for display; prefixed
+        with its sheet by parse_workbooks()) and ``_test_id`` (that value
+        alone, "" without an identifier).
+
+        Thin wrapper around iter_rows() for callers that need the full list.
 
         Raises:
             ExcelParseError: if no recognisable test case columns are found.
         """
-        wb = load_workbook(filename=io.BytesIO(file_bytes), read_only=True, data_only=True)
-        ws = wb.active
+        result = list(ExcelProcessor.iter_rows(file_bytes, max_empty_rows=max_empty_rows, fmt=fmt))
+        if not result:
+            raise ExcelParseError("The uploaded file has a header row but no data rows.")
+        return result
 
-        rows = list(ws.iter_rows(values_only=True))
-        if not rows:
-            raise ExcelParseError("The uploaded Excel file appears to be empty.")
+    @staticmethod
+    @traced("excel.parse", lambda table: {"rows": len(table)})
+    def parse_table(
+        file_bytes: bytes,
+        max_empty_rows: Optional[int] = DEFAULT_MAX_EMPTY_ROWS,
+        fmt: str = "xlsx",
+    ) -> TestSuiteTable:
+        """
+        Like parse(), but collect the rows into a compact TestSuiteTable
+        instead of a list of dicts (only one row dict exists at a time).
 
-        # Locate header row: first row containing at least one non-empty cell
-        header_row_idx = None
-        for i, row in enumerate(rows):
-            if any(cell is not None and str(cell).strip() for cell in row):
-                header_row_idx = i
-                break
+        Raises:
+            ExcelParseError: as parse().
+        """
+        table = TestSuiteTable.from_rows(
+            ExcelProcessor.iter_rows(file_bytes, max_empty_rows=max_empty_rows, fmt=fmt)
+        )
+        if not len(table):
+            raise ExcelParseError("The uploaded file has a header row but no data rows.")
+        return table
 
-        if header_row_idx is None:
-            raise ExcelParseError("Could not find a header row in the Excel file.")
+    @staticmethod
+    def iter_rows(
+        file_bytes: bytes,
+        max_empty_rows: Optional[int] = DEFAULT_MAX_EMPTY_ROWS,
+        fmt: str = "xlsx",
+    ) -> Iterator[Dict]:
+        """
+        Lazily yield test case row dicts from a test suite file.
 
-        headers = [str(cell).strip().lower() if cell is not None else "" for cell in rows[header_row_idx]]
+        The header row is located first and resolved to a column map; data
+        rows are then streamed from the read-only worksheet, reading only up
+        to the last mapped column so wide sheets with many irrelevant columns
+        stay cheap. CSV/TSV/JSON Lines suites are streamed through the stdlib
+        readers with the same header resolution, so a text export never goes
+        through openpyxl at all.
 
-        # Map each column index → canonical field name
-        col_map: Dict[int, str] = {}
-        for col_idx, header in enumerate(headers):
-            if not header:
-                continue
-            canonical = ExcelProcessor._match_column(header)
-            if canonical and col_idx not in col_map.values():
-                col_map[col_idx] = canonical
+        Args:
+            file_bytes:     Raw bytes of the uploaded file.
+            max_empty_rows: Stop after this many consecutive empty rows, for
+                            sheets known to carry many trailing formatting
+                            rows. None (the default) reads to the sheet's
+                            last row; empty rows are skipped either way.
+            fmt:            "xlsx", "csv", "tsv" or "jsonl" (see suite_format()).
 
-        if not col_map:
-            raise ExcelParseError(
-                "No recognisable test case columns found. "
-                "Expected headers like: Test Case, Description, Test Scenario, "
-                "Precondition, Test Steps, Expected Result."
-            )
+        Yields:
+            Row dicts in the same shape as parse().
 
-        # Parse data rows
-        result = []
-        for row_offset, row in enumerate(rows[header_row_idx + 1:], start=1):
-            # Skip entirely empty rows
-            if all(cell is None or str(cell).strip() == "" for cell in row):
-                continue
+        Raises:
+            ExcelParseError: if the sheet is empty or has no recognisable columns.
+        """
+        if fmt != "xlsx":
+            records = ExcelProcessor._iter_text_records(file_bytes, fmt)
+            yield from ExcelProcessor._iter_record_rows(records, max_empty_rows)
+            return
 
-            entry: Dict = {"row_index": header_row_idx + 1 + row_offset}
-            for col_idx, canonical in col_map.items():
-                raw = row[col_idx] if col_idx < len(row) else None
-                entry[canonical] = str(raw).strip() if raw is not None else ""
+        wb = load_workbook(filename=io.BytesIO(file_bytes), read_only=True, data_only=True)
+        try:
+            yield from ExcelProcessor._iter_sheet_rows(wb.active, max_empty_rows)
+        finally:
+            wb.close()
 
-            # Provide defaults for any missing canonical fields
-            for canon in COLUMN_ALIASES:
-                entry.setdefault(canon, "")
+    @staticmethod
+    def sheet_names(file_bytes: bytes) -> List[str]:
+        """Return the worksheet names of a workbook without loading any cells."""
+        wb = load_workbook(filename=io.BytesIO(file_bytes), read_only=True)
+        try:
+            return list(wb.sheetnames)
+        finally:
+            wb.close()
 
-            # Convenience display ID: prefer test_case field, else row number
-            entry["_raw_id"] = entry.get("test_case") or f"Row {entry['row_index']}"
-            result.append(entry)
+    @staticmethod
+    @traced("excel.parse_workbooks", lambda rows: {"rows": len(rows)})
+    def parse_workbooks(
+        workbooks: List[Tuple[str, bytes]],
+        all_sheets: bool = True,
+        max_workers: Optional[int] = None,
+        max_empty_rows: Optional[int] = DEFAULT_MAX_EMPTY_ROWS,
+    ) -> List[Dict]:
+        """
+        Parse several worksheets and/or workbooks into one list of row dicts.
 
-        if not result:
-            raise ExcelParseError("The Excel file has a header row but no data rows.")
+        Every worksheet (or only the active one when ``all_sheets`` is False)
+        of every workbook is parsed with its own header detection. Sheets are
+        parsed concurrently in a process pool because openpyxl parsing is
+        CPU-bound. Sheets without recognisable test case columns (cover
+        pages, summaries) are skipped.
 
-        return result
+        CSV/TSV/JSON Lines members (by file extension) count as one sheet
+        named after the file.
+
+        Each row dict is tagged with ``_sheet`` (worksheet title) and, when
+        more than one workbook is given, ``_workbook`` (file name); use
+        row_key() to identify rows across sheets.
+
+        Args:
+            workbooks:      (file name, raw bytes) per uploaded workbook.
+            all_sheets:     Parse every worksheet rather than the active one.
+            max_workers:    Process pool size (default: CPU count). 1 parses inline.
+            max_empty_rows: See iter_rows().
+
+        Raises:
+            ExcelParseError: if no worksheet yields any test case rows.
+        """
+        names = ExcelProcessor._unique_names([name for name, _ in workbooks])
+        tag_workbook = len(workbooks) > 1
+
+        tasks = []
+        for name, (_, file_bytes) in zip(names, workbooks):
+            fmt = suite_format(name) or "xlsx"
+            sheets = ExcelProcessor.sheet_names(file_bytes) if all_sheets and fmt == "xlsx" else [None]
+            for sheet in sheets:
+                tasks.append((file_bytes, fmt, name, sheet, tag_workbook, max_empty_rows))
+
+        workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+        set_attributes(workbooks=len(workbooks), sheets=len(tasks), workers=workers)
+        if workers <= 1:
+            results = [_parse_sheet_task(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_parse_sheet_task, tasks))
+
+        rows: List[Dict] = []
+        skipped: List[str] = []
+        for sheet_rows, error in results:
+            rows.extend(sheet_rows)
+            if error:
+                skipped.append(error)
+
+        if not rows:
+            raise ExcelParseError(
+                "No worksheet contained recognisable test case rows. " + " ".join(skipped)
+            )
+        return rows
 
     # ------------------------------------------------------------------
-    # Public API: build_output
+    # Public API: build_output / build_decision_output
     # ------------------------------------------------------------------
 
     @staticmethod
     def build_output(
         original_bytes: bytes,
-        excel_rows: List[Dict],
+        excel_rows: SuiteRows,
         mappings: List[Dict],
         new_generated: List[Dict],
     ) -> bytes:
         """
         Produce a colour-coded Excel workbook.
 
-        Appends mapping columns to the right of the original data, colours
-        each row by status, and adds a "NEW" section below for generated
-        test cases that had no match in the original file.
+        Appends mapping columns (MAPPING_OUTPUT_SPEC) to the right of the
+        original data, colours each row by status, and adds a "NEW" section
+        below for generated test cases that had no match in the original file.
 
         Args:
             original_bytes: Raw bytes of the uploaded workbook.
-            excel_rows: Parsed rows from ExcelProcessor.parse().
+            excel_rows: Parsed rows from ExcelProcessor.parse() or parse_table().
             mappings: List of mapping dicts from MappingResult.mappings.
                       Each item: {excel_row_index, generated_tc_id, status, confidence, notes}
                       generated_tc_id / notes may be None.
@@ -185,109 +557,24 @@ class ExcelProcessor:
         Returns:
             bytes of the resulting .xlsx workbook.
         """
-        wb = load_workbook(filename=io.BytesIO(original_bytes))
-        ws = wb.active
-
-        # Find the last used column in the header row
-        header_row_num = ExcelProcessor._detect_header_row_num(ws)
-        last_col = ws.max_column or 1
-
-        # Write mapping column headers
-        mapping_col_start = last_col + 1
-        for offset, col_name in enumerate(MAPPING_COLUMNS):
-            cell = ws.cell(row=header_row_num, column=mapping_col_start + offset, value=col_name)
-            cell.fill = HEADER_FILL
-            cell.font = HEADER_FONT
-            cell.alignment = Alignment(horizontal="center")
-
-        # Build index: excel row_index → mapping entry
-        mapping_by_row: Dict[int, Dict] = {m["excel_row_index"]: m for m in mappings}
-
-        # Apply mapping data to each data row
-        for excel_row in excel_rows:
-            row_index = excel_row["row_index"]
-            mapping = mapping_by_row.get(row_index, {})
-            status = mapping.get("status", "NOT IMPACTED")
-            fill = STATUS_FILLS.get(status, STATUS_FILLS["NOT IMPACTED"])
-
-            # Colour entire row
-            for col in range(1, ws.max_column + 1):
-                ws.cell(row=row_index, column=col).fill = fill
-
-            # Write mapping columns
-            ws.cell(row=row_index, column=mapping_col_start).value = status
-            ws.cell(row=row_index, column=mapping_col_start + 1).value = mapping.get("generated_tc_id") or ""
-            ws.cell(row=row_index, column=mapping_col_start + 2).value = mapping.get("generated_title") or ""
-            ws.cell(row=row_index, column=mapping_col_start + 3).value = mapping.get("confidence") or ""
-            ws.cell(row=row_index, column=mapping_col_start + 4).value = mapping.get("notes") or ""
-
-        # Append NEW generated scenarios section
-        if new_generated:
-            next_row = ws.max_row + 2  # blank row gap
-
-            # Section header
-            separator_cell = ws.cell(row=next_row, column=1, value="NEW — Generated scenarios not in existing test suite")
-            separator_cell.fill = PatternFill(start_color="2980B9", end_color="2980B9", fill_type="solid")
-            separator_cell.font = Font(color="FFFFFF", bold=True)
-            ws.merge_cells(start_row=next_row, start_column=1, end_row=next_row, end_column=max(last_col + len(MAPPING_COLUMNS), 6))
-            next_row += 1
-
-            # NEW rows header
-            new_headers = ["TC ID", "Title", "Type", "Priority", "Category", "Steps", "Expected Result"]
-            for col_offset, hdr in enumerate(new_headers, start=1):
-                cell = ws.cell(row=next_row, column=col_offset, value=hdr)
-                cell.fill = HEADER_FILL
-                cell.font = HEADER_FONT
-            next_row += 1
-
-            for tc in new_generated:
-                steps_text = " | ".join(tc.get("steps", [])) if isinstance(tc.get("steps"), list) else str(tc.get("steps", ""))
-                row_fill = STATUS_FILLS["NEW"]
-                values = [
-                    tc.get("id", ""),
-                    tc.get("title", ""),
-                    tc.get("type", ""),
-                    tc.get("priority", ""),
-                    tc.get("category", ""),
-                    steps_text,
-                    tc.get("expected_result", ""),
-                ]
-                for col_offset, val in enumerate(values, start=1):
-                    cell = ws.cell(row=next_row, column=col_offset, value=val)
-                    cell.fill = row_fill
-                    cell.alignment = Alignment(wrap_text=True)
-                next_row += 1
-
-        # Auto-size columns (approximate)
-        for col in ws.columns:
-            max_len = 0
-            col_letter = get_column_letter(col[0].column)
-            for cell in col:
-                try:
-                    if cell.value:
-                        max_len = max(max_len, min(len(str(cell.value)), 60))
-                except Exception:
-                    pass
-            ws.column_dimensions[col_letter].width = max(12, max_len + 2)
-
         output = io.BytesIO()
-        wb.save(output)
+        ExcelProcessor.write_output(
+            original_bytes, excel_rows, mappings, new_generated, output, spec=MAPPING_OUTPUT_SPEC
+        )
         return output.getvalue()
 
-    # ------------------------------------------------------------------
-    # Public API: build_decision_output
-    # ------------------------------------------------------------------
-
     @staticmethod
     def build_decision_output(
         original_bytes: bytes,
-        excel_rows: List[Dict],
+        excel_rows: SuiteRows,
         mappings: List[Dict],
         new_generated: List[Dict],
+        spec: Tuple[OutputColumn, ...] = DECISION_OUTPUT_SPEC,
     ) -> bytes:
         """
         Produce a colour-coded Excel workbook with 8 appended columns:
-        the existing 5 mapping columns plus 3 decision columns.
+        the existing 5 mapping columns plus 3 decision columns
+        (DECISION_OUTPUT_SPEC).
 
         The 3 decision columns (Execution Decision, Execution Reason,
         Suggested Action) must already be present on each mapping dict —
@@ -301,97 +588,407 @@ class ExcelProcessor:
         NEW section rows (unmatched generated TCs) always get
         MUST_ADD_AND_RUN because they have no existing test coverage.
 
+        Pass ``spec=PLAN_OUTPUT_SPEC`` to also append the run plan columns
+        after run_planner.plan_run() has annotated the mappings.
+
         Args:
             original_bytes: Raw bytes of the uploaded workbook.
-            excel_rows:     Parsed rows from ExcelProcessor.parse().
+            excel_rows:     Parsed rows from ExcelProcessor.parse() or parse_table().
             mappings:       Enriched mapping dicts (status + decision fields).
             new_generated:  Generated TC dicts that are NEW (no Excel match).
+            spec:           Appended columns (default: mapping + decision columns).
 
         Returns:
             bytes of the resulting .xlsx workbook.
         """
-        wb = load_workbook(filename=io.BytesIO(original_bytes))
-        ws = wb.active
+        output = io.BytesIO()
+        ExcelProcessor.write_output(original_bytes, excel_rows, mappings, new_generated, output, spec=spec)
+        return output.getvalue()
+
+    @staticmethod
+    def stream_decision_output(
+        original_bytes: bytes,
+        excel_rows: SuiteRows,
+        mappings: List[Dict],
+        new_generated: List[Dict],
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        fmt: str = "xlsx",
+        spec: Tuple[OutputColumn, ...] = DECISION_OUTPUT_SPEC,
+    ) -> Iterator[bytes]:
+        """
+        Render the decision workbook and return an iterator of xlsx chunks.
+
+        Rendering happens eagerly (so errors surface before a response is
+        started) into a spooled temp file; the returned iterator then reads
+        it back in ``chunk_size`` pieces and removes the file when exhausted
+        or closed. Suitable as the body of a chunked HTTP response.
+        """
+        return ExcelProcessor._spool(
+            lambda fileobj: ExcelProcessor.write_output(
+                original_bytes, excel_rows, mappings, new_generated, fileobj, spec=spec, fmt=fmt
+            ),
+            chunk_size,
+        )
+
+    @staticmethod
+    @traced("excel.render")
+    def write_output(
+        original_bytes: bytes,
+        excel_rows: SuiteRows,
+        mappings: List[Dict],
+        new_generated: List[Dict],
+        fileobj: BinaryIO,
+        spec: Tuple[OutputColumn, ...] = DECISION_OUTPUT_SPEC,
+        fmt: str = "xlsx",
+    ) -> None:
+        """
+        Stream an output workbook with the ``spec`` columns appended into fileobj.
+
+        The uploaded sheet is read in read-only mode and its values are
+        copied row by row into a write-only workbook, with the spec columns
+        appended as each row streams past. Source cell formatting is not
+        carried over; the header row gets the standard header style instead.
+        CSV/TSV/JSON Lines sources (``fmt``) are rendered the same way into
+        an xlsx sheet. Identical input gives byte-identical output.
+        """
+        set_attributes(rows=len(excel_rows), mappings=len(mappings), new_generated=len(new_generated))
+        out_wb = Workbook(write_only=True)
+        styles = ExcelProcessor._StyleTable(out_wb)
+        if fmt != "xlsx":
+            ExcelProcessor._write_sheet(
+                out_wb, styles, TEXT_SHEET_TITLE,
+                ExcelProcessor._OutputRows.for_text(original_bytes, fmt, excel_rows, mappings, new_generated, spec),
+            )
+            ExcelProcessor._save(out_wb, fileobj)
+            return
+
+        src_wb = load_workbook(filename=io.BytesIO(original_bytes), read_only=True)
+        try:
+            src_ws = src_wb.active
+            ExcelProcessor._write_sheet(
+                out_wb, styles, src_ws.title,
+                ExcelProcessor._OutputRows.for_sheet(src_ws, excel_rows, mappings, new_generated, spec),
+            )
+            ExcelProcessor._save(out_wb, fileobj)
+        finally:
+            src_wb.close()
 
-        header_row_num = ExcelProcessor._detect_header_row_num(ws)
-        last_col = ws.max_column or 1
+    @staticmethod
+    def stream_workbooks_decision_output(
+        workbooks: List[Tuple[str, bytes]],
+        excel_rows: SuiteRows,
+        mappings: List[Dict],
+        new_generated: List[Dict],
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        spec: Tuple[OutputColumn, ...] = DECISION_OUTPUT_SPEC,
+    ) -> Iterator[bytes]:
+        """Chunked decision workbook for parse_workbooks() rows (see write_workbooks_output())."""
+        return ExcelProcessor._spool(
+            lambda fileobj: ExcelProcessor.write_workbooks_output(
+                workbooks, excel_rows, mappings, new_generated, fileobj, spec=spec
+            ),
+            chunk_size,
+        )
 
-        # Write all 8 appended column headers (5 mapping + 3 decision)
-        all_appended = MAPPING_COLUMNS + DECISION_COLUMNS
-        mapping_col_start = last_col + 1
-        for offset, col_name in enumerate(all_appended):
-            cell = ws.cell(row=header_row_num, column=mapping_col_start + offset, value=col_name)
-            cell.fill = HEADER_FILL
-            cell.font = HEADER_FONT
-            cell.alignment = Alignment(horizontal="center")
+    @staticmethod
+    @traced("excel.render")
+    def write_workbooks_output(
+        workbooks: List[Tuple[str, bytes]],
+        excel_rows: SuiteRows,
+        mappings: List[Dict],
+        new_generated: List[Dict],
+        fileobj: BinaryIO,
+        spec: Tuple[OutputColumn, ...] = DECISION_OUTPUT_SPEC,
+    ) -> None:
+        """
+        Output workbook for rows from parse_workbooks(), written back per sheet.
+
+        Each source worksheet that contributed rows gets its own output sheet
+        with the ``spec`` columns appended (titled "<file> - <sheet>" when
+        several workbooks were uploaded). NEW generated scenarios go on a
+        separate "NEW Scenarios" sheet since they belong to no source sheet.
 
-        # Build lookup: excel row_index → enriched mapping dict
-        mapping_by_row: Dict[int, Dict] = {m["excel_row_index"]: m for m in mappings}
+        Args:
+            workbooks:     The same (file name, bytes) list given to parse_workbooks().
+            excel_rows:    Tagged rows from parse_workbooks().
+            mappings:      Enriched mapping dicts carrying ``sheet``/``workbook``.
+            new_generated: Generated TC dicts that are NEW (no Excel match).
+            spec:          Appended columns (default: mapping + decision columns).
+        """
+        set_attributes(rows=len(excel_rows), mappings=len(mappings), new_generated=len(new_generated))
+        rows_by_sheet: Dict[Tuple, List[Dict]] = {}
+        for row in excel_rows:
+            rows_by_sheet.setdefault((row.get("_workbook"), row.get("_sheet")), []).append(row)
+        mappings_by_sheet: Dict[Tuple, List[Dict]] = {}
+        for mapping in mappings:
+            mappings_by_sheet.setdefault((mapping.get("workbook"), mapping.get("sheet")), []).append(mapping)
+
+        names = ExcelProcessor._unique_names([name for name, _ in workbooks])
+        tag_workbook = len(workbooks) > 1
+        out_wb = Workbook(write_only=True)
+        styles = ExcelProcessor._StyleTable(out_wb)
+        used_titles: set = set()
+
+        for name, (_, file_bytes) in zip(names, workbooks):
+            workbook_tag = name if tag_workbook else None
+            fmt = suite_format(name) or "xlsx"
+            if fmt != "xlsx":
+                # Text suites are a single "sheet" named after the file
+                key = (workbook_tag, os.path.splitext(name)[0])
+                if key in rows_by_sheet:
+                    ExcelProcessor._write_sheet(
+                        out_wb, styles, ExcelProcessor._sheet_title(key[1], used_titles),
+                        ExcelProcessor._OutputRows.for_text(
+                            file_bytes, fmt, rows_by_sheet[key], mappings_by_sheet.get(key, []), [], spec
+                        ),
+                    )
+                continue
+
+            src_wb = load_workbook(filename=io.BytesIO(file_bytes), read_only=True)
+            try:
+                for src_ws in src_wb.worksheets:
+                    key = (workbook_tag, src_ws.title)
+                    if key not in rows_by_sheet:
+                        continue
+                    title = f"{os.path.splitext(name)[0]} - {src_ws.title}" if tag_workbook else src_ws.title
+                    ExcelProcessor._write_sheet(
+                        out_wb, styles, ExcelProcessor._sheet_title(title, used_titles),
+                        ExcelProcessor._OutputRows.for_sheet(
+                            src_ws, rows_by_sheet[key], mappings_by_sheet.get(key, []), [], spec
+                        ),
+                    )
+            finally:
+                src_wb.close()
+
+        if new_generated or not out_wb.worksheets:
+            ExcelProcessor._write_sheet(
+                out_wb, styles, ExcelProcessor._sheet_title("NEW Scenarios", used_titles),
+                ExcelProcessor._OutputRows(None, 0, [], [], new_generated, spec),
+            )
+        ExcelProcessor._save(out_wb, fileobj)
+
+    # ------------------------------------------------------------------
+    # Renderer
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _write_sheet(out_wb, styles: "ExcelProcessor._StyleTable", title: str,
+                     rows: "ExcelProcessor._OutputRows") -> None:
+        """
+        Append one output sheet to a write-only workbook.
+
+        Write-only sheets must declare column widths before the first row,
+        so widths are accumulated in a measuring pass over the same row
+        stream rather than by walking a fully loaded sheet afterwards.
+        """
+        widths: Dict[int, int] = {}
+        for row in rows:
+            for col_idx, (value, _) in enumerate(row, start=1):
+                # Capped at 60 chars to avoid absurdly wide columns
+                length = min(len(str(value)), 60) if value else 0
+                widths[col_idx] = max(widths.get(col_idx, 0), length)
+
+        ws = out_wb.create_sheet(title=title)
+        for col_idx, max_len in widths.items():
+            ws.column_dimensions[get_column_letter(col_idx)].width = max(12, max_len + 2)
+
+        for row_num, row in enumerate(rows, start=1):
+            ws.append([styles.cell(ws, value, key) for value, key in row])
+            if row and row[0][1] == "separator":
+                ws.merged_cells.add(CellRange(
+                    min_row=row_num, min_col=1,
+                    max_row=row_num, max_col=max(rows.last_col + len(rows.spec), 6),
+                ))
+
+    @staticmethod
+    def _save(out_wb, fileobj: BinaryIO) -> None:
+        """
+        Save a rendered workbook with fixed document and archive timestamps,
+        so identical input always gives byte-identical output.
+        """
+        out_wb.properties.created = RENDER_TIMESTAMP
+        out_wb.properties.modified = RENDER_TIMESTAMP
+        archive = _FixedTimeZipFile(fileobj, "w", ZIP_DEFLATED, allowZip64=True)
+        ExcelWriter(out_wb, archive).save()
+
+    class _StyleTable:
+        """
+        Style key → cell style, interned once per output workbook.
 
-        for excel_row in excel_rows:
-            row_index = excel_row["row_index"]
-            mapping = mapping_by_row.get(row_index, {})
+        Every look used by the renderer is registered as a NamedStyle when
+        the workbook is created, so fonts/fills/alignments are deduplicated
+        up front and each styled cell only copies a small StyleArray instead
+        of having Font/Fill/Alignment objects assigned (and hashed) per cell.
+        """
+
+        def __init__(self, wb):
+            self._styles: Dict[str, StyleArray] = {}
+            self._add(wb, "header", "Output Header",
+                      fill=HEADER_FILL, font=HEADER_FONT, alignment=Alignment(horizontal="center"))
+            self._add(wb, "separator", "Output Section", fill=SEPARATOR_FILL, font=HEADER_FONT)
+            self._add(wb, "new", "Output NEW Row", fill=STATUS_FILLS["NEW"], alignment=Alignment(wrap_text=True))
+            for status, fill in STATUS_FILLS.items():
+                self._add(wb, f"status:{status}", f"Status {status}", fill=fill)
+            for decision, fill in DECISION_FILLS.items():
+                self._add(wb, f"decision:{decision}", f"Decision {decision}", fill=fill)
+
+        def _add(self, wb, key: str, name: str, **attrs) -> None:
+            style = NamedStyle(name=name, **attrs)
+            wb.add_named_style(style)
+            self._styles[key] = style.as_tuple()
+
+        def cell(self, ws, value, key: Optional[str]):
+            """Return a plain value, or a WriteOnlyCell carrying the interned style for key."""
+            if key is None:
+                return value
+            cell = WriteOnlyCell(ws, value=value)
+            style = self._styles[key]
+            if cell.has_style:
+                # Keep the number format openpyxl picked for date/time values
+                style = copy(style)
+                style.numFmtId = cell._style.numFmtId
+            cell._style = style
+            return cell
+
+    class _OutputRows:
+        """
+        Re-iterable stream of output rows for a mapping output sheet.
+
+        Each row is a list of (value, style_key) pairs; style keys are
+        resolved by _StyleTable. Iterating re-reads the read-only source
+        sheet, so the row data is never held in memory.
+        """
+
+        def __init__(
+            self,
+            records: Optional[Callable[[], Iterable[tuple]]],
+            last_col: int,
+            excel_rows: SuiteRows,
+            mappings: List[Dict],
+            new_generated: List[Dict],
+            spec: Tuple[OutputColumn, ...],
+        ):
+            """
+            Args:
+                records:  Returns a fresh iterator of source value tuples
+                          (row 1 first), or None for a NEW-only sheet.
+                last_col: Number of source columns; appended columns start after it.
+                spec:     Columns appended to the right of the source data.
+            """
+            self.records = records
+            self.new_generated = new_generated
+            self.spec = spec
+            self.last_col = last_col
+            self.mapping_col_start = self.last_col + 1
+
+            # Build lookup: excel row_index → mapping dict
+            self.mapping_by_row: Dict[int, Dict] = {m["excel_row_index"]: m for m in mappings}
+            if isinstance(excel_rows, TestSuiteTable):
+                self.data_rows = set(excel_rows.row_index)
+            else:
+                self.data_rows = {r["row_index"] for r in excel_rows}
+            self.last_data_row = max(self.data_rows, default=0)
+
+        @classmethod
+        def for_sheet(cls, src_ws, excel_rows: SuiteRows, mappings: List[Dict], new_generated: List[Dict],
+                      spec: Tuple[OutputColumn, ...]):
+            """Rows for a read-only worksheet source."""
+            if src_ws.max_column is None:
+                src_ws.calculate_dimension(force=True)
+            last_col = src_ws.max_column or 1
+            return cls(
+                lambda: src_ws.iter_rows(min_row=1, max_col=last_col, values_only=True),
+                last_col, excel_rows, mappings, new_generated, spec,
+            )
+
+        @classmethod
+        def for_text(cls, file_bytes: bytes, fmt: str, excel_rows: SuiteRows, mappings: List[Dict],
+                     new_generated: List[Dict], spec: Tuple[OutputColumn, ...]):
+            """Rows for a CSV/TSV/JSON Lines source (see _iter_text_records())."""
+            def records():
+                return ExcelProcessor._iter_text_records(file_bytes, fmt)
+            last_col = max((len(record) for record in records()), default=1)
+            return cls(records, last_col, excel_rows, mappings, new_generated, spec)
+
+        def __iter__(self) -> Iterator[List[Tuple]]:
+            header_row_num = None
+            pending_empty = 0
+            source = () if self.records is None else self.records()
+
+            for row_num, values in enumerate(source, start=1):
+                if all(v is None or str(v).strip() == "" for v in values):
+                    # Hold back empty rows so trailing formatting rows are never written
+                    pending_empty += 1
+                    if pending_empty >= OUTPUT_TRAILING_EMPTY_ROWS and row_num > self.last_data_row:
+                        break
+                    continue
+                for _ in range(pending_empty):
+                    yield []
+                pending_empty = 0
+
+                if header_row_num is None:
+                    header_row_num = row_num
+                    yield [(v, "header") for v in values] + [(col.header, "header") for col in self.spec]
+                elif row_num in self.data_rows:
+                    yield self._data_row(row_num, values)
+                else:
+                    yield [(v, None) for v in values]
+
+            # Append NEW generated scenarios section after a blank row gap
+            if self.new_generated:
+                if self.records is not None:
+                    yield []
+                yield from self._new_section()
+
+        def _data_row(self, row_index: int, values: tuple) -> List[Tuple]:
+            mapping = self.mapping_by_row.get(row_index, {})
             status = mapping.get("status", "NOT IMPACTED")
-            fill = STATUS_FILLS.get(status, STATUS_FILLS["NOT IMPACTED"])
-
-            # Colour the entire row with the existing status colour
-            for col in range(1, ws.max_column + 1):
-                ws.cell(row=row_index, column=col).fill = fill
-
-            # Write the 5 existing mapping columns
-            ws.cell(row=row_index, column=mapping_col_start).value     = status
-            ws.cell(row=row_index, column=mapping_col_start + 1).value = mapping.get("generated_tc_id") or ""
-            ws.cell(row=row_index, column=mapping_col_start + 2).value = mapping.get("generated_title") or ""
-            ws.cell(row=row_index, column=mapping_col_start + 3).value = mapping.get("confidence") or ""
-            ws.cell(row=row_index, column=mapping_col_start + 4).value = mapping.get("notes") or ""
-
-            # Write the 3 decision columns
-            decision = mapping.get("execution_decision", "")
-            reason   = mapping.get("execution_reason", "")
-            action   = mapping.get("suggested_action", "")
-
-            decision_cell = ws.cell(row=row_index, column=mapping_col_start + 5, value=decision)
-            ws.cell(row=row_index, column=mapping_col_start + 6, value=reason)
-            ws.cell(row=row_index, column=mapping_col_start + 7, value=action)
-
-            # Colour the Execution Decision cell independently (overrides row fill for that cell)
-            if decision in DECISION_FILLS:
-                decision_cell.fill = DECISION_FILLS[decision]
-
-        # Append NEW generated scenarios section
-        if new_generated:
-            next_row = ws.max_row + 2  # blank row gap
-
-            # Section header spanning all columns
-            separator_cell = ws.cell(row=next_row, column=1, value="NEW — Generated scenarios not in existing test suite")
-            separator_cell.fill = PatternFill(start_color="2980B9", end_color="2980B9", fill_type="solid")
-            separator_cell.font = Font(color="FFFFFF", bold=True)
-            ws.merge_cells(
-                start_row=next_row, start_column=1,
-                end_row=next_row, end_column=max(last_col + len(all_appended), 6),
+            row_style = f"status:{status}" if status in STATUS_FILLS else "status:NOT IMPACTED"
+
+            # Colour the entire row with the status colour; decision cells
+            # get their own colour on top
+            row = [(v, row_style) for v in values]
+            for col in self.spec:
+                value = col.value(mapping)
+                style = f"decision:{value}" if col.decision and value in DECISION_FILLS else row_style
+                row.append((value, style))
+            return row
+
+        def _new_section(self) -> Iterator[List[Tuple]]:
+            # Spec columns with a NEW-row value line up with the main section,
+            # shifted right if they would overlap the TC columns
+            new_cols = [(idx, col) for idx, col in enumerate(self.spec) if col.new_value is not None]
+            shift = 0
+            if new_cols:
+                shift = max(0, len(NEW_SECTION_HEADERS) + 1 - (self.mapping_col_start + new_cols[0][0]))
+
+            def place(leading: List[Tuple], cells: List[Tuple]) -> List[Tuple]:
+                row = list(leading)
+                for (idx, _), cell in zip(new_cols, cells):
+                    row += [(None, None)] * (self.mapping_col_start + idx + shift - 1 - len(row))
+                    row.append(cell)
+                return row
+
+            # Section header spanning all columns (merged by the writer)
+            yield [(NEW_SECTION_TITLE, "separator")]
+
+            yield place(
+                [(hdr, "header") for hdr in NEW_SECTION_HEADERS],
+                [(col.header, "header") for _, col in new_cols],
             )
-            next_row += 1
-
-            # NEW rows column headers — include the 3 decision columns so they align
-            new_headers = ["TC ID", "Title", "Type", "Priority", "Category", "Steps", "Expected Result"]
-            for col_offset, hdr in enumerate(new_headers, start=1):
-                cell = ws.cell(row=next_row, column=col_offset, value=hdr)
-                cell.fill = HEADER_FILL
-                cell.font = HEADER_FONT
-            # Write decision column headers at the same positions used in the main section
-            for offset, hdr in enumerate(DECISION_COLUMNS):
-                cell = ws.cell(row=next_row, column=mapping_col_start + 5 + offset, value=hdr)
-                cell.fill = HEADER_FILL
-                cell.font = HEADER_FONT
-            next_row += 1
-
-            for tc in new_generated:
+
+            # Every NEW TC has no existing coverage (e.g. always MUST_ADD_AND_RUN)
+            new_cells = [
+                (col.new_value, f"decision:{col.new_value}" if col.decision and col.new_value in DECISION_FILLS
+                 else "status:NEW")
+                for _, col in new_cols
+            ]
+            for tc in self.new_generated:
                 steps_text = (
                     " | ".join(tc.get("steps", []))
                     if isinstance(tc.get("steps"), list)
                     else str(tc.get("steps", ""))
                 )
-                row_fill = STATUS_FILLS["NEW"]
                 values = [
                     tc.get("id", ""),
                     tc.get("title", ""),
@@ -401,51 +998,200 @@ class ExcelProcessor:
                     steps_text,
                     tc.get("expected_result", ""),
                 ]
-                for col_offset, val in enumerate(values, start=1):
-                    cell = ws.cell(row=next_row, column=col_offset, value=val)
-                    cell.fill = row_fill
-                    cell.alignment = Alignment(wrap_text=True)
-
-                # Every NEW TC has no existing coverage — always MUST_ADD_AND_RUN
-                decision_cell = ws.cell(
-                    row=next_row,
-                    column=mapping_col_start + 5,
-                    value="MUST_ADD_AND_RUN",
-                )
-                decision_cell.fill = DECISION_FILLS["MUST_ADD_AND_RUN"]
-                ws.cell(
-                    row=next_row,
-                    column=mapping_col_start + 6,
-                    value="No existing test covers this generated scenario. A new test case must be added before release.",
-                ).fill = row_fill
-                ws.cell(
-                    row=next_row,
-                    column=mapping_col_start + 7,
-                    value="Add New Test",
-                ).fill = row_fill
-
-                next_row += 1
-
-        # Auto-size columns (capped at 60 chars to avoid absurdly wide columns)
-        for col in ws.columns:
-            max_len = 0
-            col_letter = get_column_letter(col[0].column)
-            for cell in col:
-                try:
-                    if cell.value:
-                        max_len = max(max_len, min(len(str(cell.value)), 60))
-                except Exception:
-                    pass
-            ws.column_dimensions[col_letter].width = max(12, max_len + 2)
-
-        output = io.BytesIO()
-        wb.save(output)
-        return output.getvalue()
+                yield place([(v, "new") for v in values], new_cells)
 
     # ------------------------------------------------------------------
     # Private helpers
     # ------------------------------------------------------------------
 
+    @staticmethod
+    def _spool(write: Callable[[BinaryIO], None], chunk_size: int) -> Iterator[bytes]:
+        """
+        Run a writer into a spooled temp file eagerly (so errors surface
+        before a response is started) and return a chunk iterator over it.
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            write(spool)
+            spool.seek(0)
+        except Exception:
+            spool.close()
+            raise
+        return ExcelProcessor._iter_chunks(spool, chunk_size)
+
+    @staticmethod
+    def _unique_names(names: List[str]) -> List[str]:
+        """De-duplicate workbook file names ("suite.xlsx", "suite (2).xlsx")."""
+        seen: Dict[str, int] = {}
+        unique = []
+        for name in names:
+            count = seen.get(name, 0) + 1
+            seen[name] = count
+            if count == 1:
+                unique.append(name)
+            else:
+                stem, ext = os.path.splitext(name)
+                unique.append(f"{stem} ({count}){ext}")
+        return unique
+
+    @staticmethod
+    def _sheet_title(title: str, used: set) -> str:
+        """Return a valid (≤31 chars, no []:*?/\\) worksheet title not in used."""
+        base = "".join("_" if c in "[]:*?/\\" else c for c in title)[:31] or "Sheet"
+        candidate, n = base, 1
+        while candidate.lower() in used:
+            n += 1
+            suffix = f" ({n})"
+            candidate = base[:31 - len(suffix)] + suffix
+        used.add(candidate.lower())
+        return candidate
+
+    @staticmethod
+    def _iter_chunks(fileobj: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+        """Yield fileobj in chunk_size pieces, closing it afterwards."""
+        try:
+            while True:
+                chunk = fileobj.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            fileobj.close()
+
+    @staticmethod
+    def _iter_sheet_rows(ws, max_empty_rows: Optional[int]) -> Iterator[Dict]:
+        """Stream row dicts from one read-only worksheet (see iter_rows())."""
+        header_row_num, header = ExcelProcessor._find_header(
+            ws.iter_rows(min_row=1, values_only=True), max_empty_rows
+        )
+        col_map = ExcelProcessor._resolve_columns(header)
+
+        # Column projection: never materialise cells right of the last mapped column
+        records = ws.iter_rows(min_row=header_row_num + 1, max_col=max(col_map) + 1, values_only=True)
+        yield from ExcelProcessor._rows_from_records(records, header_row_num + 1, col_map, max_empty_rows)
+
+    @staticmethod
+    def _iter_record_rows(records: Iterator[tuple], max_empty_rows: Optional[int]) -> Iterator[Dict]:
+        """Stream row dicts from an iterator of value tuples whose first non-empty one is the header."""
+        header_row_num, header = ExcelProcessor._find_header(records, max_empty_rows)
+        col_map = ExcelProcessor._resolve_columns(header)
+        # The header search consumed records up to and including the header
+        yield from ExcelProcessor._rows_from_records(records, header_row_num + 1, col_map, max_empty_rows)
+
+    @staticmethod
+    def _rows_from_records(
+        records: Iterator[tuple],
+        first_row: int,
+        col_map: Dict[int, str],
+        max_empty_rows: Optional[int],
+    ) -> Iterator[Dict]:
+        """Build row dicts from data records, stopping at a long run of empty ones."""
+        empty_run = 0
+        for row_index, row in enumerate(records, start=first_row):
+            # Skip entirely empty rows; a long run of them marks the end of the data
+            if all(cell is None or str(cell).strip() == "" for cell in row):
+                empty_run += 1
+                if max_empty_rows is not None and empty_run >= max_empty_rows:
+                    break
+                continue
+            empty_run = 0
+            yield ExcelProcessor._build_row(row_index, row, col_map)
+
+    @staticmethod
+    def _find_header(records: Iterator[tuple], max_empty_rows: Optional[int]) -> Tuple[int, List[str]]:
+        """
+        Return (1-based row number, lowercase header strings) for the first
+        non-empty record.
+        """
+        seen_any = False
+        for row_num, row in enumerate(records, start=1):
+            seen_any = True
+            if any(cell is not None and str(cell).strip() for cell in row):
+                return row_num, [str(cell).strip().lower() if cell is not None else "" for cell in row]
+            if max_empty_rows is not None and row_num >= max_empty_rows:
+                break
+
+        if not seen_any:
+            raise ExcelParseError("The uploaded file appears to be empty.")
+        raise ExcelParseError("Could not find a header row in the uploaded file.")
+
+    @staticmethod
+    def _iter_text_records(file_bytes: bytes, fmt: str) -> Iterator[tuple]:
+        """
+        Stream value tuples from a CSV/TSV/JSON Lines suite.
+
+        For JSON Lines the keys of the first object form a virtual header
+        record (row 1); each object then yields its values in that order.
+        List values (e.g. step arrays) are joined with newlines.
+        """
+        text = io.TextIOWrapper(io.BytesIO(file_bytes), encoding="utf-8-sig", errors="replace", newline="")
+        if fmt in ("csv", "tsv"):
+            for record in csv.reader(text, delimiter="\t" if fmt == "tsv" else ","):
+                yield tuple(record)
+            return
+        if fmt != "jsonl":
+            raise ExcelParseError(f"Unsupported test suite format: {fmt}")
+
+        keys: Optional[List[str]] = None
+        for line_num, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError as exc:
+                raise ExcelParseError(f"Invalid JSON on line {line_num}: {exc}") from exc
+            if not isinstance(obj, dict):
+                raise ExcelParseError(f"Line {line_num} is not a JSON object.")
+            if keys is None:
+                keys = list(obj)
+                yield tuple(keys)
+            yield tuple(
+                "\n".join(str(v) for v in obj.get(k)) if isinstance(obj.get(k), list) else obj.get(k)
+                for k in keys
+            )
+
+    @staticmethod
+    def _resolve_columns(headers: List[str]) -> Dict[int, str]:
+        """
+        Map each column index → canonical field name.
+
+        Raises:
+            ExcelParseError: if no header matches a COLUMN_ALIASES entry.
+        """
+        col_map: Dict[int, str] = {}
+        for col_idx, header in enumerate(headers):
+            if not header:
+                continue
+            canonical = ExcelProcessor._match_column(header)
+            if canonical and col_idx not in col_map.values():
+                col_map[col_idx] = canonical
+
+        if not col_map:
+            raise ExcelParseError(
+                "No recognisable test case columns found. "
+                "Expected headers like: Test Case, Description, Test Scenario, "
+                "Precondition, Test Steps, Expected Result."
+            )
+        return col_map
+
+    @staticmethod
+    def _build_row(row_index: int, row: tuple, col_map: Dict[int, str]) -> Dict:
+        """Build one canonical row dict from a tuple of cell values."""
+        entry: Dict = {"row_index": row_index}
+        for col_idx, canonical in col_map.items():
+            raw = row[col_idx] if col_idx < len(row) else None
+            entry[canonical] = str(raw).strip() if raw is not None else ""
+
+        # Provide defaults for any missing canonical fields
+        for canon in COLUMN_ALIASES:
+            entry.setdefault(canon, "")
+
+        # Convenience display ID: prefer test_case field, else row number.
+        # _test_id keeps the bare test id once _raw_id gets a sheet prefix.
+        entry["_raw_id"] = entry.get("test_case") or f"Row {entry['row_index']}"
+        entry["_test_id"] = entry.get("test_case") or ""
+        return entry
+
     @staticmethod
     def _match_column(header: str) -> Optional[str]:
         """
@@ -467,10 +1213,79 @@ class ExcelProcessor:
                     return canonical
         return None
 
-    @staticmethod
-    def _detect_header_row_num(ws) -> int:
-        """Return the 1-based row number of the first non-empty row (the header)."""
-        for row in ws.iter_rows():
-            if any(cell.value for cell in row):
-                return row[0].row
-        return 1
+
+# ---------------------------------------------------------------------------
+# Deterministic xlsx archive
+# ---------------------------------------------------------------------------
+
+class _FixedTimeZipFile(ZipFile):
+    """
+    ZipFile that stamps every entry with RENDER_TIMESTAMP instead of the
+    current time (openpyxl writes parts via writestr() and write-only
+    sheets via write() from a temp file).
+    """
+
+    _DATE_TIME = RENDER_TIMESTAMP.timetuple()[:6]
+
+    def _fixed_info(self, arcname: str) -> ZipInfo:
+        zinfo = ZipInfo(arcname, date_time=self._DATE_TIME)
+        zinfo.compress_type = self.compression
+        zinfo.external_attr = 0o600 << 16
+        return zinfo
+
+    def writestr(self, zinfo_or_arcname, data, *args, **kwargs):
+        if not isinstance(zinfo_or_arcname, ZipInfo):
+            zinfo_or_arcname = self._fixed_info(zinfo_or_arcname)
+        super().writestr(zinfo_or_arcname, data, *args, **kwargs)
+
+    def write(self, filename, arcname=None, *args, **kwargs):
+        zinfo = self._fixed_info(arcname or os.path.basename(filename))
+        zinfo.file_size = os.path.getsize(filename)
+        with open(filename, "rb") as src, self.open(zinfo, "w") as dest:
+            shutil.copyfileobj(src, dest, STREAM_CHUNK_SIZE)
+
+
+# ---------------------------------------------------------------------------
+# Process pool worker (module level so it can be pickled)
+# ---------------------------------------------------------------------------
+
+def _parse_sheet_task(task: Tuple) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Parse one worksheet for ExcelProcessor.parse_workbooks().
+
+    Returns (tagged rows, None) or ([], reason) when the sheet has no
+    recognisable test case rows.
+    """
+    file_bytes, fmt, name, sheet, tag_workbook, max_empty_rows = task
+    workbook = name if tag_workbook else None
+
+    wb = None
+    try:
+        if fmt == "xlsx":
+            wb = load_workbook(filename=io.BytesIO(file_bytes), read_only=True, data_only=True)
+            ws = wb[sheet] if sheet else wb.active
+            title = ws.title
+            rows_iter = ExcelProcessor._iter_sheet_rows(ws, max_empty_rows)
+        else:
+            title = os.path.splitext(name)[0]
+            rows_iter = ExcelProcessor._iter_record_rows(
+                ExcelProcessor._iter_text_records(file_bytes, fmt), max_empty_rows
+            )
+
+        where = f"{workbook}/{title}" if workbook else title
+        try:
+            rows = list(rows_iter)
+        except ExcelParseError as exc:
+            return [], f"Skipped '{where}': {exc}"
+        if not rows:
+            return [], f"Skipped '{where}': no data rows."
+
+        for row in rows:
+            row["_sheet"] = title
+            if workbook:
+                row["_workbook"] = workbook
+            row["_raw_id"] = f"{where} / {row['_raw_id']}"
+        return rows, None
+    finally:
+        if wb is not None:
+            wb.close()
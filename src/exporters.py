@@ -0,0 +1,328 @@
+"""
+Exporters Module
+Streams generated structured test cases as xlsx, CSV, JSON Lines or Markdown.
+
+Every format is produced by a generator that yields bytes as rows are
+rendered, so a download starts immediately and memory stays constant
+regardless of how many test cases are exported.
+"""
+
+import csv
+import io
+import json
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+from src.excel_processor import STREAM_CHUNK_SIZE
+
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Export format → (mimetype, file extension)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "xlsx":  ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "csv":   ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "md":    ("text/markdown; charset=utf-8", "md"),
+}
+
+XLSX_SHEET_TITLE = "Test Cases"
+XLSX_HEADER_HEIGHT = 28
+XLSX_ROW_HEIGHT = 60
+
+HEADER_FILL = PatternFill(start_color="2C3E50", end_color="2C3E50", fill_type="solid")
+HEADER_FONT = Font(color="FFFFFF", bold=True, size=11)
+ALT_ROW_FILL = PatternFill(start_color="F8FAFC", end_color="F8FAFC", fill_type="solid")
+
+
+def _steps_text(tc: Dict, separator: str = "\n") -> str:
+    steps = tc.get("steps", [])
+    return separator.join(str(s) for s in steps) if isinstance(steps, list) else str(steps or "")
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    """One column of a tabular export (xlsx, CSV, Markdown)."""
+    header: str
+    width: int                      # xlsx column width
+    value: Callable[[Dict], object]
+
+
+EXPORT_COLUMNS: Tuple[ExportColumn, ...] = (
+    ExportColumn("ID", 10, lambda tc: tc.get("id", "")),
+    ExportColumn("Title", 35, lambda tc: tc.get("title", "")),
+    ExportColumn("Type", 14, lambda tc: tc.get("type", "")),
+    ExportColumn("Priority", 12, lambda tc: tc.get("priority", "")),
+    ExportColumn("Category", 20, lambda tc: tc.get("category", "")),
+    ExportColumn("Test Steps", 60, _steps_text),
+    ExportColumn("Expected Result", 45, lambda tc: tc.get("expected_result", "")),
+)
+
+# Consolidated (bulk) exports also say which PRs/commits each case came from
+SOURCE_COLUMN = ExportColumn("Sources", 28, lambda tc: ", ".join(tc.get("sources", [])))
+
+
+# ---------------------------------------------------------------------------
+# Main class
+# ---------------------------------------------------------------------------
+
+class TestCaseExporter:
+    """
+    Stream generated test cases in one of EXPORT_FORMATS.
+
+    Usage:
+        chunks = TestCaseExporter.stream(test_cases, "csv")
+        return Response(chunks, mimetype=TestCaseExporter.mimetype("csv"))
+    """
+
+    @staticmethod
+    def stream(
+        test_cases: Iterable[Dict],
+        fmt: str = "xlsx",
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        columns: Tuple[ExportColumn, ...] = EXPORT_COLUMNS,
+    ) -> Iterator[bytes]:
+        """
+        Return a generator of export bytes for test_cases.
+
+        Output is batched into chunks of roughly ``chunk_size`` bytes.
+        ``columns`` sets the tabular formats' columns (JSON Lines always
+        carries the full objects).
+
+        Raises:
+            ValueError: If fmt is not one of EXPORT_FORMATS (raised before
+                        any output is produced).
+        """
+        writers = {
+            "xlsx": TestCaseExporter._iter_xlsx,
+            "csv": TestCaseExporter._iter_csv,
+            "jsonl": TestCaseExporter._iter_jsonl,
+            "md": TestCaseExporter._iter_markdown,
+        }
+        if fmt not in writers:
+            raise ValueError(f"Unsupported export format {fmt!r}. Use one of: {', '.join(EXPORT_FORMATS)}")
+        return TestCaseExporter._batched(writers[fmt](test_cases, columns), chunk_size)
+
+    @staticmethod
+    def mimetype(fmt: str) -> str:
+        return EXPORT_FORMATS[fmt][0]
+
+    @staticmethod
+    def extension(fmt: str) -> str:
+        return EXPORT_FORMATS[fmt][1]
+
+    @staticmethod
+    def columns_for(test_cases: List[Dict]) -> Tuple[ExportColumn, ...]:
+        """EXPORT_COLUMNS, plus SOURCE_COLUMN for consolidated (bulk) results."""
+        if any(tc.get("sources") for tc in test_cases):
+            return EXPORT_COLUMNS + (SOURCE_COLUMN,)
+        return EXPORT_COLUMNS
+
+    # ------------------------------------------------------------------
+    # Format writers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _iter_csv(test_cases: Iterable[Dict], columns: Tuple[ExportColumn, ...]) -> Iterator[bytes]:
+        # UTF-8 BOM so Excel detects the encoding when opening the file
+        yield "\ufeff".encode("utf-8")
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow([col.header for col in columns])
+        for tc in test_cases:
+            writer.writerow([col.value(tc) for col in columns])
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+        yield buf.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _iter_jsonl(test_cases: Iterable[Dict], columns: Tuple[ExportColumn, ...]) -> Iterator[bytes]:
+        # Full test case objects, one per line
+        for tc in test_cases:
+            yield (json.dumps(tc, ensure_ascii=False) + "\n").encode("utf-8")
+
+    @staticmethod
+    def _iter_markdown(test_cases: Iterable[Dict], columns: Tuple[ExportColumn, ...]) -> Iterator[bytes]:
+        def cell(value) -> str:
+            text = str(value if value is not None else "")
+            return text.replace("\\", "\\\\").replace("|", "\\|").replace("\r\n", "\n").replace("\n", "<br>")
+
+        yield ("| " + " | ".join(col.header for col in columns) + " |\n").encode("utf-8")
+        yield ("|" + "|".join("---" for _ in columns) + "|\n").encode("utf-8")
+        for tc in test_cases:
+            yield ("| " + " | ".join(cell(col.value(tc)) for col in columns) + " |\n").encode("utf-8")
+
+    @staticmethod
+    def _iter_xlsx(test_cases: Iterable[Dict], columns: Tuple[ExportColumn, ...]) -> Iterator[bytes]:
+        """
+        Stream an xlsx package without buffering the worksheet.
+
+        Every part except the worksheet body comes from a template built
+        once per process by openpyxl (styles, header row, widths, frozen
+        pane). Data rows are written as inline-string XML straight into the
+        deflated zip entry, referencing the template's precomputed style
+        ids, and the zip (written with data descriptors, so no seeking)
+        is drained to the caller as it grows.
+        """
+        template = _xlsx_template(columns)
+        sink = _ChunkSink()
+        with ZipFile(sink, "w", ZIP_DEFLATED, allowZip64=True) as archive:
+            for name, data in template.parts:
+                if name != template.sheet_part:
+                    archive.writestr(ZipInfo(name, date_time=template.date_time), data, ZIP_DEFLATED)
+                    continue
+
+                info = ZipInfo(name, date_time=template.date_time)
+                info.compress_type = ZIP_DEFLATED
+                with archive.open(info, "w", force_zip64=True) as sheet:
+                    sheet.write(template.sheet_head)
+                    for row_num, tc in enumerate(test_cases, start=2):
+                        style = template.even_style if row_num % 2 == 0 else template.odd_style
+                        sheet.write(_xlsx_row(row_num, [col.value(tc) for col in columns], style))
+                        yield sink.drain()
+                    sheet.write(template.sheet_tail)
+            yield sink.drain()
+        yield sink.drain()
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _batched(parts: Iterator[bytes], chunk_size: int) -> Iterator[bytes]:
+        """Coalesce small writer outputs into chunks of about chunk_size bytes."""
+        buf = bytearray()
+        for part in parts:
+            buf += part
+            if len(buf) >= chunk_size:
+                yield bytes(buf)
+                buf.clear()
+        if buf:
+            yield bytes(buf)
+
+
+# ---------------------------------------------------------------------------
+# xlsx streaming internals
+# ---------------------------------------------------------------------------
+
+class _ChunkSink:
+    """Write-only, non-seekable file object collecting zip output between drains."""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def write(self, data) -> int:
+        self._buf += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+@dataclass(frozen=True)
+class _XlsxTemplate:
+    parts: List[Tuple[str, bytes]]      # (zip entry name, bytes) in package order
+    sheet_part: str
+    sheet_head: bytes                   # worksheet XML up to the end of the header row
+    sheet_tail: bytes                   # "</sheetData>" and everything after it
+    even_style: int                     # cellXfs index for even (shaded) data rows
+    odd_style: int
+    date_time: Tuple[int, ...]
+
+
+@lru_cache(maxsize=4)
+def _xlsx_template(columns: Tuple[ExportColumn, ...]) -> _XlsxTemplate:
+    """Build the styled, header-only workbook that streamed exports are cut from."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = XLSX_SHEET_TITLE
+
+    ws.append([col.header for col in columns])
+    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    for cell in ws[1]:
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cell.alignment = header_alignment
+    ws.row_dimensions[1].height = XLSX_HEADER_HEIGHT
+    for col_idx, col in enumerate(columns, start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = col.width
+    ws.freeze_panes = "A2"
+
+    # Register the two data row styles, then drop the sample cells; the
+    # style ids stay in the workbook's stylesheet
+    row_alignment = Alignment(vertical="top", wrap_text=True)
+    even, odd = ws.cell(row=2, column=1), ws.cell(row=3, column=1)
+    even.fill = ALT_ROW_FILL
+    even.alignment = row_alignment
+    odd.alignment = row_alignment
+    even_style, odd_style = even.style_id, odd.style_id
+    ws.delete_rows(2, 2)
+
+    output = io.BytesIO()
+    wb.save(output)
+
+    parts: List[Tuple[str, bytes]] = []
+    with ZipFile(output) as archive:
+        date_time = archive.infolist()[0].date_time
+        for info in archive.infolist():
+            parts.append((info.filename, archive.read(info)))
+
+    sheet_part = "xl/worksheets/sheet1.xml"
+    sheet_xml = dict(parts)[sheet_part]
+    # The dimension element is an optional hint; drop it rather than leave it stale
+    sheet_xml = re.sub(rb"<dimension [^>]*/>", b"", sheet_xml)
+    head, tail = sheet_xml.split(b"</sheetData>", 1)
+    return _XlsxTemplate(
+        parts=parts,
+        sheet_part=sheet_part,
+        sheet_head=head,
+        sheet_tail=b"</sheetData>" + tail,
+        even_style=even_style,
+        odd_style=odd_style,
+        date_time=date_time,
+    )
+
+
+def _xlsx_row(row_num: int, values: List, style: int) -> bytes:
+    """
+    Worksheet XML for one data row (strings written inline, not shared).
+    NaN and infinities have no numeric cell form; they are written as text.
+    """
+    cells = []
+    for col_idx, value in enumerate(values, start=1):
+        ref = f"{get_column_letter(col_idx)}{row_num}"
+        if _is_number(value):
+            cells.append(f'<c r="{ref}" s="{style}"><v>{value}</v></c>')
+        else:
+            text = ILLEGAL_CHARACTERS_RE.sub("", str(value if value is not None else ""))
+            cells.append(
+                f'<c r="{ref}" s="{style}" t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+            )
+    return (
+        f'<row r="{row_num}" ht="{XLSX_ROW_HEIGHT}" customHeight="1">' + "".join(cells) + "</row>"
+    ).encode("utf-8")
+
+
+def _is_number(value) -> bool:
+    """True for values written as numeric cells: finite ints and floats (not bools)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    return isinstance(value, int) or math.isfinite(value)
@@ -3,10 +3,37 @@ Git Analyzer Module
 Handles git operations and extracts diff information from pull requests.
 """
 
-import git
-from typing import Dict, List
-import requests
+import base64
+import difflib
+import itertools
+import logging
+import math
 import os
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import git
+
+from src.github_client import GitHubClient, GitHubResponse, DIFF_ACCEPT
+from src.repo_mirror import MirrorError, RepoMirrorCache
+from src.tracing import submit_in_context
+
+logger = logging.getLogger(__name__)
+
+# Shared by all analyzers for concurrent GitHub fetches (I/O bound)
+_FETCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="github-fetch")
+
+# Files API paging (GitHub returns at most 3000 files per pull request)
+FILES_PER_PAGE = 100
+MAX_FILE_PAGES = 30
+
+# Files listed without an inline patch: fetch their blob, or list them with no lines
+PATCHLESS_POLICIES = ("blob", "skip")
+MAX_BLOB_BYTES = 1024 * 1024
 
 
 class GitAnalyzer:
@@ -75,24 +102,246 @@ class GitAnalyzer:
         except git.GitCommandError as e:
             raise ValueError(f"Error getting changed files: {str(e)}")
 
+    def get_commits(self, base: str, head: str, first_parent: bool = True) -> List[Dict]:
+        """
+        List the commits reachable from head but not from base, oldest first.
+
+        With ``first_parent`` (the default) only the mainline is followed, so
+        a merged pull request appears as its merge commit, whose diff against
+        its first parent is the whole PR.
+
+        Returns:
+            List of {"sha", "parent", "subject", "message", "author"};
+            "parent" is None for a root commit
+        """
+        try:
+            commits = list(self.repo.iter_commits(f"{base}..{head}", first_parent=first_parent))
+        except git.GitCommandError as e:
+            raise ValueError(f"Error listing commits: {str(e)}")
+        return [
+            {
+                "sha": c.hexsha,
+                "parent": c.parents[0].hexsha if c.parents else None,
+                "subject": c.summary,
+                "message": c.message,
+                "author": c.author.name,
+            }
+            for c in reversed(commits)
+        ]
+
+    def get_numstat(
+        self,
+        base: str,
+        compare: str,
+        paths: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        three_dot: bool = True,
+        renames: bool = True,
+    ) -> List[Dict]:
+        """
+        Cheap per-file line counts (``git diff --numstat``), to size a diff
+        before streaming it with iter_diff_lines() using the same arguments.
+
+        Returns:
+            List of {"file_path", "old_path", "additions", "deletions", "binary"};
+            binary files have None counts
+        """
+        output = subprocess.run(
+            self._diff_command(base, compare, paths, exclude, three_dot, renames, ["--numstat", "-z"]),
+            capture_output=True, check=False,
+        )
+        if output.returncode != 0:
+            raise ValueError(f"Error getting diff stats: {output.stderr.decode(errors='replace').strip()}")
+
+        stats = []
+        fields = iter(output.stdout.decode("utf-8", errors="replace").split("\0"))
+        for entry in fields:
+            if not entry:
+                continue
+            added, deleted, path = entry.split("\t", 2)
+            old_path = path
+            if not path:
+                # Renames/copies with -z: "added\tdeleted\t\0old\0new\0"
+                old_path, path = next(fields), next(fields)
+            binary = added == "-"
+            stats.append({
+                "file_path": path,
+                "old_path": old_path,
+                "additions": None if binary else int(added),
+                "deletions": None if binary else int(deleted),
+                "binary": binary,
+            })
+        return stats
+
+    def iter_diff_lines(
+        self,
+        base: str,
+        compare: str,
+        paths: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        three_dot: bool = True,
+        renames: bool = True,
+        context_lines: int = 3,
+    ) -> Iterator[str]:
+        """
+        Stream a unified diff from a ``git diff`` subprocess, line by line,
+        for CodeAnalyzer.parse_diff_lines() — the diff is never held whole.
+
+        Args:
+            base: Base branch/commit
+            compare: Branch/commit to compare
+            paths: Pathspecs to include (default: everything)
+            exclude: Pathspecs to leave out (e.g. ["*.lock", "vendor/"])
+            three_dot: Diff from the merge-base of base and compare, as a pull
+                       request does, so changes made on base since the branch
+                       point are not included (default: True)
+            renames: Detect renames (-M) instead of reporting delete + add
+            context_lines: Unchanged lines around each hunk (0 for a lean diff)
+
+        Raises:
+            ValueError: If git fails (e.g. an unknown branch)
+        """
+        command = self._diff_command(
+            base, compare, paths, exclude, three_dot, renames, ["--no-color", f"--unified={int(context_lines)}"],
+        )
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+            try:
+                for raw in proc.stdout:
+                    yield raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            finally:
+                proc.stdout.close()
+                if proc.poll() is None:
+                    proc.kill()
+                returncode = proc.wait()
+            if returncode != 0:
+                stderr.seek(0)
+                raise ValueError(f"Error getting diff: {stderr.read().decode(errors='replace').strip()}")
+
+    def _diff_command(
+        self,
+        base: str,
+        compare: str,
+        paths: Optional[List[str]],
+        exclude: Optional[List[str]],
+        three_dot: bool,
+        renames: bool,
+        options: List[str],
+    ) -> List[str]:
+        revisions = f"{base}...{compare}" if three_dot else f"{base}..{compare}"
+        pathspecs = list(paths or []) + [f":(exclude){pattern}" for pattern in exclude or []]
+        return [
+            "git", f"--git-dir={self.repo.git_dir}", "-c", "core.quotePath=false",
+            "diff", "--no-ext-diff", "-M" if renames else "--no-renames", *options,
+            revisions, "--", *pathspecs,
+        ]
+
 
 class GitHubPRAnalyzer:
     """Analyzes GitHub pull requests using the GitHub API."""
 
-    def __init__(self, token: str = None):
+    def __init__(self, token: str = None, base_url: str = None, patchless_policy: str = None,
+                 mirrors: Optional[RepoMirrorCache] = None):
         """
         Initialize GitHub PR Analyzer.
 
+        Requests go through a pooled, cache-aware GitHubClient, so repeat
+        fetches of an unchanged PR are answered by 304 Not Modified.
+
         Args:
             token: GitHub personal access token (optional, but recommended for private repos)
+            base_url: API root (default: GITHUB_API_URL or https://api.github.com)
+            patchless_policy: What to do with files the files API returns without
+                              an inline patch (too large or binary) — "blob" to
+                              fetch the file content, "skip" to list the file
+                              without lines (default: GITHUB_PATCHLESS_POLICY or "blob")
+            mirrors: Local bare-mirror cache to compute diffs with git instead of
+                     the diff API (default: RepoMirrorCache.from_env(), which is
+                     None unless PR_DIFF_SOURCE=mirror)
         """
         self.token = token
-        self.base_url = "https://api.github.com"
-        self.headers = {
-            "Accept": "application/vnd.github.v3+json"
-        }
-        if token:
-            self.headers["Authorization"] = f"token {token}"
+        self.mirrors = mirrors if mirrors is not None else RepoMirrorCache.from_env(token)
+        self.client = GitHubClient(token, base_url=base_url)
+        self.base_url = self.client.base_url
+        self.patchless_policy = (
+            patchless_policy or os.getenv("GITHUB_PATCHLESS_POLICY", "").strip() or "blob"
+        ).lower()
+        if self.patchless_policy not in PATCHLESS_POLICIES:
+            raise ValueError(f"patchless_policy must be one of {PATCHLESS_POLICIES}")
+
+    def get_pr(self, owner: str, repo: str, pr_number: int) -> Tuple[str, Dict]:
+        """
+        Fetch the diff and the PR information concurrently.
+
+        Returns:
+            (diff text, PR information dict) — see get_pr_changes() / get_pr_info()
+        """
+        diff_lines, info = self.get_pr_changes(owner, repo, pr_number)
+        return "\n".join(diff_lines), info
+
+    def get_pr_changes(
+        self,
+        owner: str,
+        repo: str,
+        pr_number: int,
+        info: Optional[Dict] = None,
+    ) -> Tuple[Iterable[str], Dict]:
+        """
+        Fetch the PR diff as lines plus the PR information, concurrently.
+
+        With a mirror cache configured the diff is computed locally instead
+        (``git diff base...head`` after an incremental fetch), falling back
+        to the API if the mirror fails.
+
+        When GitHub refuses the diff media type (406/422 "too large", 5xx)
+        or returns fewer files than the PR has, the lines come instead from
+        iter_pr_file_diff_lines(), which pages through the files API — the
+        returned iterator then fetches lazily, so feed it straight into
+        CodeAnalyzer.parse_diff_lines().
+
+        Args:
+            info: PR information already fetched (e.g. in a batch); skips
+                  the get_pr_info() call
+
+        Returns:
+            (iterable of diff lines, PR information dict)
+        """
+        if self.mirrors is not None:
+            info = info or self.get_pr_info(owner, repo, pr_number)
+            try:
+                base_ref, head_ref = self.mirrors.fetch_pr(owner, repo, pr_number, info["base_branch"])
+                return self._mirror_diff_lines(owner, repo, base_ref, head_ref), info
+            except MirrorError as e:
+                logger.warning("Mirror diff for %s/%s#%s failed (%s); using the GitHub API", owner, repo, pr_number, e)
+
+        diff_future = submit_in_context(_FETCH_POOL, self._fetch_diff, owner, repo, pr_number)
+        info_future = None
+        if info is None:
+            info_future = submit_in_context(_FETCH_POOL, self.get_pr_info, owner, repo, pr_number)
+        response = diff_future.result()
+        if info_future is not None:
+            info = info_future.result()
+
+        if response.ok:
+            file_count = sum(1 for line in response.text.split("\n") if line.startswith("diff --git"))
+            if not info.get("changed_files") or file_count >= info["changed_files"]:
+                return response.text.split("\n"), info
+            logger.warning(
+                "Diff for %s/%s#%s lists %d of %d files; falling back to the files API",
+                owner, repo, pr_number, file_count, info["changed_files"],
+            )
+        elif response.status_code in (406, 422) or response.status_code >= 500:
+            logger.warning(
+                "Diff for %s/%s#%s unavailable (%s); falling back to the files API",
+                owner, repo, pr_number, response.status_code,
+            )
+        else:
+            raise ValueError(f"Error fetching PR: {response.status_code} - {response.text}")
+
+        lines = self.iter_pr_file_diff_lines(
+            owner, repo, pr_number, info.get("changed_files"), base_sha=info.get("base_sha"),
+        )
+        return lines, info
 
     def get_pr_diff(self, owner: str, repo: str, pr_number: int) -> str:
         """
@@ -106,13 +355,9 @@ class GitHubPRAnalyzer:
         Returns:
             String containing the PR diff
         """
-        url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}"
-        headers = self.headers.copy()
-        headers["Accept"] = "application/vnd.github.v3.diff"
+        response = self._fetch_diff(owner, repo, pr_number)
 
-        response = requests.get(url, headers=headers)
-
-        if response.status_code == 200:
+        if response.ok:
             return response.text
         else:
             raise ValueError(f"Error fetching PR: {response.status_code} - {response.text}")
@@ -129,18 +374,171 @@ class GitHubPRAnalyzer:
         Returns:
             Dictionary containing PR information
         """
-        url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}"
-        response = requests.get(url, headers=self.headers)
+        response = self.client.get(f"/repos/{owner}/{repo}/pulls/{pr_number}")
 
-        if response.status_code == 200:
+        if response.ok:
             data = response.json()
             return {
                 "title": data["title"],
                 "description": data["body"],
                 "base_branch": data["base"]["ref"],
                 "head_branch": data["head"]["ref"],
+                "head_sha": data["head"].get("sha"),
+                "base_sha": data["base"].get("sha"),
                 "author": data["user"]["login"],
-                "state": data["state"]
+                "state": data["state"],
+                "changed_files": data.get("changed_files"),
             }
         else:
             raise ValueError(f"Error fetching PR info: {response.status_code}")
+
+    def iter_pr_file_diff_lines(
+        self,
+        owner: str,
+        repo: str,
+        pr_number: int,
+        changed_files: Optional[int] = None,
+        base_sha: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Yield a unified diff for a PR assembled from the paginated files API.
+
+        Pages are fetched concurrently (all at once when ``changed_files`` is
+        known, otherwise after page 1 reveals the last page) and yielded in
+        order. Each file gets a synthetic "diff --git" header followed by
+        its patch. Files without a patch follow ``patchless_policy``; blob
+        fetches for a page also run concurrently. With "blob", an added file
+        is listed as all additions and a modified one is diffed against its
+        version at ``base_sha`` (the PR's base commit); without a base
+        version to diff against it is marked too large, with no lines.
+
+        Note: GitHub lists at most 3000 files per pull request.
+        """
+        path = f"/repos/{owner}/{repo}/pulls/{pr_number}/files"
+        futures = []
+        try:
+            if changed_files:
+                last_page = min(math.ceil(changed_files / FILES_PER_PAGE), MAX_FILE_PAGES)
+                futures = [
+                    submit_in_context(_FETCH_POOL, self._get_files_page, path, page)
+                    for page in range(1, last_page + 1)
+                ]
+            else:
+                first_files, last_page = self._get_files_page(path, 1)
+                futures = [
+                    submit_in_context(_FETCH_POOL, self._get_files_page, path, page)
+                    for page in range(2, last_page + 1)
+                ]
+                yield from self._files_diff_lines(owner, repo, first_files, base_sha)
+
+            for future in futures:
+                files, _ = future.result()
+                yield from self._files_diff_lines(owner, repo, files, base_sha)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _mirror_diff_lines(self, owner: str, repo: str, base_ref: str, head_ref: str) -> Iterator[str]:
+        """
+        Diff lines from the mirror, with git diff already started: a mirror
+        that cannot be read or diffed raises MirrorError here rather than
+        when the caller iterates, so get_pr_changes() can still fall back
+        to the API.
+        """
+        lines = self._stream_mirror_diff(owner, repo, base_ref, head_ref)
+        try:
+            first = next(lines)
+        except StopIteration:
+            return iter(())
+        except MirrorError:
+            raise
+        except ValueError as e:
+            raise MirrorError(str(e)) from e
+        return itertools.chain([first], lines)
+
+    def _stream_mirror_diff(self, owner: str, repo: str, base_ref: str, head_ref: str) -> Iterator[str]:
+        with self.mirrors.reading(owner, repo) as path:
+            yield from GitAnalyzer(path).iter_diff_lines(base_ref, head_ref)
+
+    def _fetch_diff(self, owner: str, repo: str, pr_number: int) -> GitHubResponse:
+        return self.client.get(f"/repos/{owner}/{repo}/pulls/{pr_number}", accept=DIFF_ACCEPT)
+
+    def _get_files_page(self, path: str, page: int) -> Tuple[List[Dict], int]:
+        """Return (files on page, last page number) for the PR files API."""
+        response = self.client.get(path, params={"per_page": FILES_PER_PAGE, "page": page})
+        if not response.ok:
+            raise ValueError(f"Error fetching PR files: {response.status_code} - {response.text}")
+        match = re.search(r'[?&]page=(\d+)[^>]*>;\s*rel="last"', response.headers.get("Link", ""))
+        last_page = int(match.group(1)) if match else page
+        return response.json(), min(last_page, MAX_FILE_PAGES)
+
+    def _files_diff_lines(self, owner: str, repo: str, files: List[Dict],
+                          base_sha: Optional[str] = None) -> Iterator[str]:
+        """Diff lines for one page of files-API entries."""
+        blobs, bases = {}, {}
+        if self.patchless_policy == "blob":
+            for f in files:
+                if "patch" in f or not f.get("sha") or f.get("status") == "removed":
+                    continue
+                blobs[f["sha"]] = submit_in_context(_FETCH_POOL, self._get_blob_text, owner, repo, f["sha"])
+                if f.get("status") != "added" and base_sha:
+                    old_path = f.get("previous_filename") or f["filename"]
+                    bases[f["sha"]] = submit_in_context(
+                        _FETCH_POOL, self._get_file_text, owner, repo, old_path, base_sha,
+                    )
+
+        for f in files:
+            new_path = f["filename"]
+            old_path = f.get("previous_filename") or new_path
+            yield f"diff --git a/{old_path} b/{new_path}"
+            yield "--- /dev/null" if f.get("status") == "added" else f"--- a/{old_path}"
+            yield "+++ /dev/null" if f.get("status") == "removed" else f"+++ b/{new_path}"
+
+            if "patch" in f:
+                yield from f["patch"].split("\n")
+            elif f.get("sha") in blobs:
+                text = blobs[f["sha"]].result()
+                if text is None:
+                    yield "Binary files differ"
+                elif f.get("status") == "added":
+                    content = text.split("\n")
+                    yield f"@@ -0,0 +1,{len(content)} @@"
+                    for line in content:
+                        yield f"+{line}"
+                else:
+                    base_text = bases[f["sha"]].result() if f["sha"] in bases else None
+                    if base_text is None:
+                        yield "Diff too large to show"
+                        continue
+                    hunks = difflib.unified_diff(base_text.split("\n"), text.split("\n"), lineterm="")
+                    yield from itertools.islice(hunks, 2, None)     # past difflib's ---/+++ headers
+
+    def _get_blob_text(self, owner: str, repo: str, sha: str) -> Optional[str]:
+        """Return a blob's text, or None when it is binary or over MAX_BLOB_BYTES."""
+        response = self.client.get(f"/repos/{owner}/{repo}/git/blobs/{sha}")
+        if not response.ok:
+            logger.warning("Could not fetch blob %s: %s", sha, response.status_code)
+            return None
+        return self._decode_text(response.json())
+
+    def _get_file_text(self, owner: str, repo: str, path: str, ref: str) -> Optional[str]:
+        """Return a file's text at ref (contents API), or None as for _get_blob_text()."""
+        response = self.client.get(f"/repos/{owner}/{repo}/contents/{quote(path)}", params={"ref": ref})
+        if not response.ok:
+            logger.warning("Could not fetch %s at %s: %s", path, ref[:12], response.status_code)
+            return None
+        return self._decode_text(response.json())
+
+    @staticmethod
+    def _decode_text(data: Dict) -> Optional[str]:
+        if data.get("size", 0) > MAX_BLOB_BYTES or data.get("encoding") == "none":
+            return None
+        content = base64.b64decode(data.get("content", "")) if data.get("encoding") == "base64" else \
+            data.get("content", "").encode()
+        if b"\0" in content:
+            return None
+        return content.decode("utf-8", errors="replace")
@@ -0,0 +1,400 @@
+"""
+GitHub Client Module
+Pooled, cache-aware access to the GitHub REST API.
+
+One keep-alive session per process is shared by every client, every
+request has explicit connect/read timeouts, and successful responses are
+kept in an on-disk ETag/Last-Modified cache shared across worker
+processes. Repeat fetches send conditional requests; a ``304 Not
+Modified`` answer is served from the cache and does not count against
+the rate limit. ``X-RateLimit-*`` headers are tracked per token, and
+secondary rate limits (403/429 with Retry-After) are retried with
+backoff.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.tracing import KIND_CLIENT, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.github.com"
+JSON_ACCEPT = "application/vnd.github.v3+json"
+DIFF_ACCEPT = "application/vnd.github.v3.diff"
+
+CONNECT_TIMEOUT = 5          # seconds
+READ_TIMEOUT = 30            # seconds; large diffs can be slow to generate
+POOL_SIZE = 16               # keep-alive connections per host
+MAX_RETRIES = 3              # for secondary limits, 5xx and connection errors
+MAX_WAIT_SECONDS = 60        # longest we sleep for a limit reset / Retry-After
+
+DEFAULT_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60    # unused entries dropped after a week
+_CACHE_PRUNE_INTERVAL = 10 * 60
+
+
+class GitHubRateLimitError(ValueError):
+    """Raised when the GitHub rate limit is exhausted for longer than MAX_WAIT_SECONDS."""
+
+
+@dataclass
+class GitHubResponse:
+    """Body and metadata of a GitHub API response (possibly served from the cache)."""
+    status_code: int
+    text: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    from_cache: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+    def json(self):
+        return json.loads(self.text)
+
+
+# ---------------------------------------------------------------------------
+# Shared state (per process)
+# ---------------------------------------------------------------------------
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+# (token digest, resource) → last seen {"limit", "remaining", "reset", "resource"}.
+# Resources ("core", "search", "graphql") have separate budgets.
+_rate_limits: Dict[Tuple[str, str], Dict] = {}
+
+
+def _shared_session() -> requests.Session:
+    """Process-wide keep-alive session with a sized connection pool."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _int_or_none(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait for a Retry-After header (delay-seconds or HTTP-date), or None if unparseable."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Conditional request cache
+# ---------------------------------------------------------------------------
+
+class ResponseCache:
+    """
+    On-disk cache of GitHub responses keyed by URL, Accept header and token.
+
+    Only responses carrying an ETag or Last-Modified are stored, since
+    they can be revalidated with a conditional request. Entries are plain
+    JSON files, so every worker process pointing at the same directory
+    shares them.
+    """
+
+    def __init__(self, root: str, ttl_seconds: int = DEFAULT_CACHE_TTL_SECONDS):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self._last_prune = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Create a cache from GITHUB_CACHE_DIR and GITHUB_CACHE_TTL_SECONDS (both optional)."""
+        root = os.getenv("GITHUB_CACHE_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "tsg_github_cache")
+        ttl = int(os.getenv("GITHUB_CACHE_TTL_SECONDS", DEFAULT_CACHE_TTL_SECONDS))
+        return cls(root=root, ttl_seconds=ttl)
+
+    @staticmethod
+    def key(url: str, accept: str, token: Optional[str]) -> str:
+        # The token is part of the key: private repositories must not leak
+        # between users of a shared cache
+        return hashlib.sha256(f"{url}\n{accept}\n{token or ''}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = os.path.join(self.root, f"{key}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: Dict) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(entry, fh, separators=(",", ":"))
+            os.replace(tmp_path, os.path.join(self.root, f"{key}.json"))
+        except OSError as exc:
+            logger.warning("Could not write GitHub cache entry: %s", exc)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune()
+
+    def _prune(self) -> None:
+        """Drop entries not used within the TTL (at most every _CACHE_PRUNE_INTERVAL)."""
+        now = time.time()
+        if now - self._last_prune < _CACHE_PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl_seconds:
+                    os.remove(path)
+            except OSError:
+                continue  # removed concurrently by another worker
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class GitHubClient:
+    """
+    Minimal GitHub REST client used by GitHubPRAnalyzer.
+
+    Usage:
+        client = GitHubClient(token)
+        resp = client.get("/repos/octo/app/pulls/7", accept=DIFF_ACCEPT)
+        if resp.ok:
+            diff_text = resp.text
+    """
+
+    _default_cache: Optional[ResponseCache] = None
+
+    def __init__(self, token: Optional[str] = None, base_url: Optional[str] = None,
+                 cache: Optional[ResponseCache] = None):
+        """
+        Args:
+            token:    GitHub personal access token (optional).
+            base_url: API root; defaults to GITHUB_API_URL or api.github.com
+                      (set it for GitHub Enterprise).
+            cache:    Conditional request cache; defaults to a process-wide
+                      ResponseCache.from_env().
+        """
+        self.token = token
+        self.base_url = (base_url or os.getenv("GITHUB_API_URL", "").strip() or DEFAULT_BASE_URL).rstrip("/")
+        self.headers = {"Accept": JSON_ACCEPT}
+        if token:
+            self.headers["Authorization"] = f"token {token}"
+        if cache is None:
+            if GitHubClient._default_cache is None:
+                GitHubClient._default_cache = ResponseCache.from_env()
+            cache = GitHubClient._default_cache
+        self.cache = cache
+        self._token_key = hashlib.sha256((token or "").encode()).hexdigest()[:16]
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, path: str, accept: str = JSON_ACCEPT, params: Optional[Dict] = None) -> GitHubResponse:
+        """
+        GET an API path (e.g. "/repos/o/r/pulls/1"), revalidating any cached copy.
+
+        Non-200 responses are returned as-is for the caller to report.
+
+        Raises:
+            GitHubRateLimitError: If the rate limit stays exhausted for longer
+                                  than MAX_WAIT_SECONDS.
+            requests.RequestException: If the request still fails after
+                                       MAX_RETRIES retries.
+        """
+        url = f"{self.base_url}{path}"
+        prepared_url = requests.Request("GET", url, params=params).prepare().url
+        cache_key = ResponseCache.key(prepared_url, accept, self.token)
+        cached = self.cache.get(cache_key) if self.cache else None
+
+        headers = dict(self.headers, Accept=accept)
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        resp = self._send(url, headers, params)
+
+        if resp.status_code == 304 and cached:
+            self.cache.put(cache_key, cached)   # refresh its age
+            return GitHubResponse(200, cached["text"], cached.get("headers", {}), from_cache=True)
+
+        result = GitHubResponse(resp.status_code, resp.text, dict(resp.headers))
+        if resp.status_code == 200 and self.cache and (resp.headers.get("ETag") or resp.headers.get("Last-Modified")):
+            self.cache.put(cache_key, {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "headers": {k: v for k, v in resp.headers.items() if k.lower() in ("content-type", "link")},
+                "text": resp.text,
+            })
+        return result
+
+    def graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict:
+        """
+        Run a GraphQL query (requires a token) and return its "data".
+
+        Used to batch many lookups into one request, e.g. metadata for a
+        list of pull requests via aliased fields.
+
+        Raises:
+            ValueError: On an HTTP error or when GitHub reports query errors.
+            GitHubRateLimitError: As for get().
+        """
+        headers = dict(self.headers, Accept="application/json")
+        resp = self._send(
+            self._graphql_url(), headers, None, method="POST",
+            json_body={"query": query, "variables": variables or {}}, resource="graphql",
+        )
+        if resp.status_code != 200:
+            raise ValueError(f"GitHub GraphQL error: {resp.status_code} - {resp.text}")
+        payload = resp.json()
+        if payload.get("errors") and not payload.get("data"):
+            raise ValueError(f"GitHub GraphQL error: {payload['errors'][0].get('message')}")
+        return payload.get("data") or {}
+
+    @property
+    def rate_limit(self) -> Optional[Dict]:
+        """Last seen REST rate limit state for this token: {limit, remaining, reset, resource}."""
+        return _rate_limits.get((self._token_key, "core"))
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _graphql_url(self) -> str:
+        # GitHub Enterprise serves REST at /api/v3 and GraphQL at /api/graphql
+        if self.base_url.endswith("/api/v3"):
+            return self.base_url[:-len("/v3")] + "/graphql"
+        return f"{self.base_url}/graphql"
+
+    def _send(self, url: str, headers: Dict, params: Optional[Dict], method: str = "GET",
+              json_body: Optional[Dict] = None, resource: Optional[str] = None) -> requests.Response:
+        session = _shared_session()
+        resource = resource or ("search" if "/search/" in url else "core")
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        with span("github.request", KIND_CLIENT, **{"http.method": method, "url.path": path}) as traced:
+            for attempt in range(MAX_RETRIES + 1):
+                traced.set(attempts=attempt + 1)
+                self._wait_for_reset(resource)
+                try:
+                    resp = session.request(
+                        method, url, headers=headers, params=params, json=json_body,
+                        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                    )
+                except (requests.ConnectionError, requests.Timeout) as exc:
+                    if attempt == MAX_RETRIES:
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning("GitHub request failed (%s); retrying in %.1fs", exc, delay)
+                    time.sleep(delay)
+                    continue
+
+                self._record_rate_limit(resp)
+                traced.set(**{
+                    "http.status_code": resp.status_code,
+                    "rate_limit.remaining": _int_or_none(resp.headers.get("X-RateLimit-Remaining")),
+                })
+                delay = self._retry_delay(resp, attempt)
+                if delay is None:
+                    return resp
+                logger.warning("GitHub returned %s for %s; retrying in %.1fs", resp.status_code, url, delay)
+                time.sleep(delay)
+            return resp
+
+    def _retry_delay(self, resp: requests.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying resp, or None when it should be returned as-is."""
+        status = resp.status_code
+        if status not in (403, 429) and status < 500:
+            return None
+
+        if status in (403, 429):
+            retry_after = resp.headers.get("Retry-After")
+            if resp.headers.get("X-RateLimit-Remaining") == "0" and not retry_after:
+                # Primary limit exhausted
+                delay = int(resp.headers.get("X-RateLimit-Reset", 0)) - time.time() + 1
+            elif retry_after or status == 429 or "secondary rate limit" in resp.text.lower():
+                delay = _retry_after_seconds(retry_after)
+                if delay is None:
+                    delay = self._backoff(attempt)
+            else:
+                return None  # plain permission error
+            if delay > MAX_WAIT_SECONDS:
+                raise GitHubRateLimitError(
+                    f"GitHub rate limit exceeded ({status}); retry in {int(delay)}s"
+                )
+        else:
+            delay = self._backoff(attempt)  # transient 5xx
+
+        return None if attempt == MAX_RETRIES else max(delay, 0)
+
+    def _wait_for_reset(self, resource: str) -> None:
+        """Sleep until the reset time when the last response said the limit is exhausted."""
+        state = _rate_limits.get((self._token_key, resource))
+        if not state or state["remaining"] > 0:
+            return
+        delay = state["reset"] - time.time() + 1
+        if delay <= 0:
+            return
+        if delay > MAX_WAIT_SECONDS:
+            raise GitHubRateLimitError(f"GitHub rate limit exhausted; resets in {int(delay)}s")
+        logger.warning("GitHub rate limit exhausted; waiting %.0fs for reset", delay)
+        time.sleep(delay)
+
+    def _record_rate_limit(self, resp: requests.Response) -> None:
+        remaining = resp.headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        try:
+            resource = resp.headers.get("X-RateLimit-Resource", "core")
+            _rate_limits[(self._token_key, resource)] = {
+                "limit": int(resp.headers.get("X-RateLimit-Limit", 0)),
+                "remaining": int(remaining),
+                "reset": int(resp.headers.get("X-RateLimit-Reset", 0)),
+                "resource": resource,
+            }
+        except ValueError:
+            return
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Exponential backoff with jitter: ~1s, 2s, 4s ..."""
+        return (2 ** attempt) * (0.5 + random.random())
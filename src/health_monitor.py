@@ -0,0 +1,257 @@
+"""
+Health Monitor Module
+Background health probes for the services the app depends on (Jira,
+GitHub, Bedrock), served from a cache.
+
+One worker process at a time — whichever holds the probe lock — runs every
+probe each HEALTH_PROBE_INTERVAL_SECONDS and writes the results (status,
+latency, last error) to a small JSON file. Every worker reads that file,
+re-reading only when its mtime changes, so health endpoints answer without
+touching the network. When the probing worker exits its lock is released
+and another worker's thread takes over on its next tick.
+
+A dependency counts as down only after HEALTH_FAILURE_THRESHOLD failed
+probes in a row, so one slow answer does not disable features.
+
+Nothing is probed until start() is called — the app calls it when it
+serves its first request, not at import. HEALTH_PROBES_ENABLED=false
+turns probing off (every dependency then stays "unknown", never down).
+
+Usage:
+    monitor = HealthMonitor.from_env(default_probes(bedrock_client)).start()
+    monitor.snapshot()          # {"jira": {"status": "up", "latency_ms": 84.2, ...}, ...}
+    monitor.is_down("bedrock")  # fail fast instead of waiting out a timeout
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Optional
+
+import requests
+
+try:
+    import fcntl
+except ImportError:     # Windows: every process probes for itself
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 60
+DEFAULT_FAILURE_THRESHOLD = 2
+PROBE_TIMEOUT = 5           # seconds per probe
+
+UP, DOWN, DISABLED, UNKNOWN = "up", "down", "disabled", "unknown"
+
+# A probe returns normally when the service is reachable, raises when it is
+# not, and returns DISABLED when the integration is not configured.
+Probe = Callable[[], Optional[str]]
+
+
+class HealthMonitor:
+    """Scheduled dependency probes with results shared through a file."""
+
+    def __init__(self, probes: Dict[str, Probe], state_path: str,
+                 interval_seconds: float = DEFAULT_INTERVAL_SECONDS,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 enabled: bool = True):
+        self.probes = probes
+        self.state_path = state_path
+        self.interval = max(float(interval_seconds), 1.0)
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.enabled = enabled
+        self._cache: Dict[str, Dict] = {}
+        self._cache_mtime: Optional[float] = None
+        self._cache_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._lock_fh = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool = ThreadPoolExecutor(max_workers=max(len(probes), 1), thread_name_prefix="health-probe")
+
+    @classmethod
+    def from_env(cls, probes: Dict[str, Probe]) -> "HealthMonitor":
+        state_path = os.getenv("HEALTH_STATE_PATH", "").strip() or os.path.join(
+            tempfile.gettempdir(), "tsg_health.json"
+        )
+        return cls(
+            probes,
+            state_path,
+            interval_seconds=float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", DEFAULT_INTERVAL_SECONDS)),
+            failure_threshold=int(os.getenv("HEALTH_FAILURE_THRESHOLD", DEFAULT_FAILURE_THRESHOLD)),
+            enabled=os.getenv("HEALTH_PROBES_ENABLED", "true").strip().lower() not in ("false", "0", "no"),
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self) -> "HealthMonitor":
+        """Start the background probe thread (idempotent; a no-op when disabled)."""
+        if self._thread is not None or not self.enabled:
+            return self
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Last probe result per dependency, from the shared state file:
+        {name: {"status", "latency_ms", "checked_at", "error", "failures"}}.
+        Dependencies not probed yet are "unknown".
+        """
+        try:
+            mtime = os.stat(self.state_path).st_mtime
+        except OSError:
+            mtime = None
+        with self._cache_lock:
+            if mtime is not None and mtime != self._cache_mtime:
+                try:
+                    with open(self.state_path, "r", encoding="utf-8") as fh:
+                        self._cache = json.load(fh)
+                    self._cache_mtime = mtime
+                except (OSError, ValueError):
+                    pass    # mid-replace; keep the previous copy
+            cache = self._cache
+        return {
+            name: cache.get(name) or {"status": UNKNOWN, "latency_ms": None, "checked_at": None,
+                                            "error": None, "failures": 0}
+            for name in self.probes
+        }
+
+    def is_down(self, name: str) -> bool:
+        """True when the dependency failed failure_threshold probes in a row."""
+        return self.snapshot().get(name, {}).get("status") == DOWN
+
+    def probe_all(self) -> Dict[str, Dict]:
+        """Run every probe now (concurrently), store and return the results."""
+        previous = self.snapshot()
+        futures = {name: self._pool.submit(self._timed, probe) for name, probe in self.probes.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                outcome, latency_ms, error = future.result(timeout=PROBE_TIMEOUT + 1)
+            except FutureTimeout:
+                outcome, latency_ms, error = DOWN, None, f"No answer within {PROBE_TIMEOUT}s"
+            failures = previous[name].get("failures", 0) + 1 if outcome == DOWN else 0
+            if outcome == DOWN and failures < self.failure_threshold and previous[name]["status"] in (UP, UNKNOWN):
+                status = previous[name]["status"]   # not (yet) confirmed down
+            else:
+                status = outcome
+            results[name] = {
+                "status": status,
+                "latency_ms": latency_ms,
+                "checked_at": time.time(),
+                "error": error,
+                "failures": failures,
+            }
+        self._write(results)
+        return results
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._is_prober():
+                try:
+                    self.probe_all()
+                except Exception:
+                    logger.exception("Health probe round failed")
+            self._stop.wait(self.interval)
+
+    def _is_prober(self) -> bool:
+        """Take (or keep) the cross-process probe lock without blocking."""
+        if fcntl is None:
+            return True
+        if self._lock_fh is not None:
+            return True
+        fh = open(self.state_path + ".lock", "a")
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        self._lock_fh = fh      # held until the process exits
+        return True
+
+    @staticmethod
+    def _timed(probe: Probe):
+        started = time.perf_counter()
+        try:
+            outcome = probe()
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            return (DISABLED, None, None) if outcome == DISABLED else (UP, latency_ms, None)
+        except Exception as exc:
+            return DOWN, round((time.perf_counter() - started) * 1000, 1), str(exc)[:300]
+
+    def _write(self, results: Dict[str, Dict]) -> None:
+        directory = os.path.dirname(self.state_path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-health-")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(results, fh)
+        os.replace(tmp_path, self.state_path)
+
+
+# ---------------------------------------------------------------------------
+# Probes
+# ---------------------------------------------------------------------------
+
+def default_probes(bedrock_client=None) -> Dict[str, Probe]:
+    """Jira (credentials), GitHub (API reachable, token valid) and Bedrock."""
+    return {
+        "jira": _probe_jira,
+        "github": _probe_github,
+        "bedrock": lambda: _probe_bedrock(bedrock_client),
+    }
+
+
+def _probe_jira() -> Optional[str]:
+    from src.jira_client import ZephyrScaleClient
+
+    client = ZephyrScaleClient.from_env()
+    if client is None:
+        return DISABLED
+    if not client.health_check():
+        raise RuntimeError("Jira rejected the credentials or is unreachable")
+    return None
+
+
+def _probe_github() -> Optional[str]:
+    from src.github_client import GitHubClient
+
+    # /rate_limit does not count against the rate limit
+    client = GitHubClient(os.getenv("GITHUB_TOKEN"))
+    resp = requests.get(f"{client.base_url}/rate_limit", headers=client.headers, timeout=PROBE_TIMEOUT)
+    if resp.status_code != 200:
+        raise RuntimeError(f"GitHub returned {resp.status_code}")
+    return None
+
+
+def _probe_bedrock(bedrock_client) -> Optional[str]:
+    import boto3
+    from botocore.config import Config
+
+    # Control-plane call with the runtime client's credentials and region:
+    # proves the endpoint is reachable and the credentials are accepted.
+    region = bedrock_client.meta.region_name if bedrock_client is not None else os.getenv("AWS_REGION", "us-east-1")
+    client = boto3.client(
+        "bedrock",
+        region_name=region,
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
+        config=Config(connect_timeout=PROBE_TIMEOUT, read_timeout=PROBE_TIMEOUT, retries={"max_attempts": 1}),
+    )
+    client.list_foundation_models(byProvider="anthropic")
+    return None
@@ -0,0 +1,99 @@
+"""
+Incremental Analysis Module
+Re-analyses a pull request after new commits by regenerating test cases
+only for the files whose changes differ from the last analysis.
+
+No AI calls, no I/O. The last analysis keeps a fingerprint of each file's
+changed lines; comparing those with the new diff gives the interdiff at
+file level. Fingerprints ignore line numbers and context, so a rebase that
+only moves hunks around changes nothing. Test cases carry the "files" they
+exercise (see TestScenarioGenerator), which decides which ones are
+regenerated, kept or retired.
+"""
+
+import hashlib
+import re
+from typing import Dict, List, Set, Tuple
+
+# Fields compared to tell an updated case from an unchanged one
+_CASE_FIELDS = ("title", "type", "priority", "category", "steps", "expected_result", "files")
+
+
+def file_fingerprints(parsed_diff: List[Dict]) -> Dict[str, str]:
+    """file path → digest of its added and deleted lines (from CodeAnalyzer.parse_diff_lines())."""
+    fingerprints = {}
+    for f in parsed_diff:
+        digest = hashlib.sha256()
+        for prefix, lines in (("+", f["additions"]), ("-", f["deletions"])):
+            for line in lines:
+                digest.update(f"{prefix}{line}\n".encode("utf-8", errors="replace"))
+        fingerprints[f["file_path"]] = digest.hexdigest()[:16]
+    return fingerprints
+
+
+def changed_files(previous: Dict[str, str], current: Dict[str, str]) -> Tuple[Set[str], Set[str]]:
+    """(files added or modified since the last analysis, files no longer in the PR)."""
+    changed = {path for path, digest in current.items() if previous.get(path) != digest}
+    removed = set(previous) - set(current)
+    return changed, removed
+
+
+def affected_cases(cases: List[Dict], changed: Set[str]) -> List[Dict]:
+    """Previous cases exercising any changed file — the ones to regenerate."""
+    return [tc for tc in cases if set(tc.get("files") or []) & changed]
+
+
+def merge_cases(
+    previous: List[Dict],
+    regenerated: List[Dict],
+    changed: Set[str],
+    removed: Set[str],
+) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """
+    Combine the previous cases with those regenerated for the changed files.
+
+    Cases not touching a changed file are kept as they were. A regenerated
+    case carrying the id of an affected case replaces it (same id); other
+    regenerated cases are new and get the next free ids. Affected cases the
+    model did not return are retired, as are cases whose files have all
+    left the PR. Cases without "files" (older analyses) are always kept.
+
+    Returns:
+        (merged cases in previous order, new ones last,
+         {"added": [ids], "changed": [ids], "retired": [ids]})
+    """
+    affected_ids = {tc.get("id") for tc in affected_cases(previous, changed)}
+    next_number = max((_id_number(tc.get("id")) for tc in previous), default=0) + 1
+
+    updates: Dict[str, Dict] = {}
+    added: List[Dict] = []
+    for tc in regenerated:
+        if tc.get("id") in affected_ids and tc["id"] not in updates:
+            updates[tc["id"]] = tc
+        else:
+            added.append(dict(tc, id=f"TC-{next_number:03d}"))
+            next_number += 1
+
+    merged: List[Dict] = []
+    delta = {"added": [tc["id"] for tc in added], "changed": [], "retired": []}
+    for tc in previous:
+        case_id = tc.get("id")
+        files = set(tc.get("files") or [])
+        if case_id in affected_ids:
+            if case_id not in updates:
+                delta["retired"].append(case_id)
+                continue
+            update = updates[case_id]
+            if any(update.get(k) != tc.get(k) for k in _CASE_FIELDS):
+                delta["changed"].append(case_id)
+            merged.append(update)
+        elif files and files <= removed:
+            delta["retired"].append(case_id)
+        else:
+            merged.append(tc)
+    return merged + added, delta
+
+
+def _id_number(case_id) -> int:
+    match = re.search(r"(\d+)$", str(case_id or ""))
+    return int(match.group(1)) if match else 0
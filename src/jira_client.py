@@ -1,22 +1,72 @@
 """
-Jira + Zephyr Scale Client — Phase 2 Scaffold
+Jira + Zephyr Scale Client
 Authentication: Jira API Token (Bearer).
 Hierarchy: Test cases live under a User Story (issue link).
 
 Activate by setting JIRA_BASE_URL, JIRA_API_TOKEN, and JIRA_PROJECT_KEY in .env.
-All write/fetch methods raise NotImplementedError until Phase 2 is implemented.
-Only health_check() is live so the UI can show connection status.
+Writes go through the Zephyr Scale REST API (``/rest/atm/1.0``): test cases
+are created and updated concurrently by a bounded worker pool sharing one
+keep-alive session, paced by a client-side rate limiter that also backs
+off for a 429's Retry-After. Upserts are idempotent: every test case
+written carries a label derived from its story and summary (which case it
+is) and one derived from its content (which revision), so re-pushing the
+same cases updates or skips them instead of creating duplicates. A create
+whose answer is lost (read timeout, dropped connection) is not blindly
+re-sent: the case is looked up by its identity label first.
+Reads page through TQL searches; src/zephyr_mirror.py keeps a local copy.
+
+Usage:
+    client = ZephyrScaleClient.from_env()
+    results = client.bulk_create_test_cases(cases, story_id="PROJ-123")
+    failed = [r for r in results if r.action == "failed"]
+
+For offline development see tests/fake_zephyr.py.
 """
 
+import hashlib
+import json
 import logging
 import os
-from dataclasses import dataclass, field
-from typing import List, Optional
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
 logger = logging.getLogger(__name__)
 
+ZEPHYR_API_PATH = "/rest/atm/1.0"
+REQUEST_TIMEOUT = (5, 30)           # connect, read seconds
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_RATE_PER_SECOND = 10.0      # client-side request pacing
+MAX_RETRIES = 4                     # for 429, 5xx and connection errors
+MAX_WAIT_SECONDS = 60               # longest Retry-After we honour before failing the item
+SEARCH_PAGE_SIZE = 100
+
+# Labels written on every generated test case (see _upsert_labels)
+GENERATED_LABEL = "tsg-generated"
+_KEY_LABEL_PREFIX = "tsg-key-"
+_REV_LABEL_PREFIX = "tsg-rev-"
+
+_PRIORITY_NAMES = {"critical": "High", "high": "High", "medium": "Normal", "low": "Low"}
+
+
+class ZephyrError(Exception):
+    """Raised when a Zephyr Scale request fails for good."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class ZephyrOutcomeUnknown(ZephyrError):
+    """Raised when a non-idempotent write got no answer: it may or may not have been applied."""
+
 
 # ---------------------------------------------------------------------------
 # Shared schema — aligns with Zephyr Scale test case fields
@@ -44,6 +94,89 @@ class ZephyrTestCase:
     status: Optional[str] = None
     labels: List[str] = field(default_factory=list)
     story_id: Optional[str] = None   # Linked Jira User Story key (e.g. "PROJ-123")
+    priority: Optional[str] = None   # Zephyr Scale priority name (High / Normal / Low)
+
+    @classmethod
+    def from_generated(cls, tc: Dict) -> "ZephyrTestCase":
+        """Build from a generated test case dict (TestScenarioGenerator schema)."""
+        return cls(
+            id=tc.get("id", ""),
+            summary=tc.get("title", ""),
+            description=tc.get("category", ""),
+            precondition=tc.get("precondition", "") or tc.get("preconditions", ""),
+            test_steps=list(tc.get("steps") or []),
+            expected_result=tc.get("expected_result", ""),
+            labels=[t for t in (tc.get("type"), tc.get("category")) if t],
+            priority=_PRIORITY_NAMES.get(str(tc.get("priority", "")).lower()),
+        )
+
+    @classmethod
+    def from_zephyr(cls, item: Dict) -> "ZephyrTestCase":
+        """Build from a Zephyr Scale test case JSON object."""
+        steps = ((item.get("testScript") or {}).get("steps")) or []
+        expected = next((s.get("expectedResult") for s in reversed(steps) if s.get("expectedResult")), "")
+        links = item.get("issueLinks") or []
+        return cls(
+            id=item.get("key", ""),
+            summary=item.get("name", ""),
+            description=item.get("objective") or "",
+            precondition=item.get("precondition") or "",
+            test_steps=[s.get("description", "") for s in steps if s.get("description")],
+            expected_result=expected or "",
+            status=item.get("status"),
+            labels=list(item.get("labels") or []),
+            story_id=links[0] if links else None,
+            priority=item.get("priority"),
+        )
+
+
+@dataclass
+class ZephyrWriteResult:
+    """Outcome of writing one test case in a bulk request."""
+    index: int                  # position in the input list
+    summary: str
+    action: str                 # created | updated | unchanged | duplicate | failed
+    key: Optional[str] = None   # Zephyr Scale test case key, e.g. "PROJ-T12"
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all worker threads of a client. pause() stops
+    every caller until a server-imposed Retry-After has passed.
+    """
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = max(rate_per_second, 0.001)
+        self.capacity = float(burst or max(int(rate_per_second), 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold all callers for ``seconds`` (e.g. a 429 Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
 
 
 # ---------------------------------------------------------------------------
@@ -60,16 +193,25 @@ class ZephyrScaleClient:
             # connection is valid
     """
 
-    def __init__(self, base_url: str, api_token: str, project_key: str):
+    def __init__(self, base_url: str, api_token: str, project_key: str,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 rate_per_second: float = DEFAULT_RATE_PER_SECOND):
         """
         Args:
-            base_url:     Jira base URL, e.g. "https://your-org.atlassian.net"
-            api_token:    Jira API token (from id.atlassian.com/manage-profile/security/api-tokens)
-            project_key:  Jira project key, e.g. "PROJ"
+            base_url:        Jira base URL, e.g. "https://your-org.atlassian.net"
+            api_token:       Jira API token (from id.atlassian.com/manage-profile/security/api-tokens)
+            project_key:     Jira project key, e.g. "PROJ"
+            max_workers:     Concurrent write requests in bulk operations.
+            rate_per_second: Client-side request rate limit.
         """
         self.base_url = base_url.rstrip("/")
         self.project_key = project_key
+        self.max_workers = max(int(max_workers), 1)
+        self._limiter = RateLimiter(rate_per_second)
         self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_workers + 2)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
         self._session.headers.update({
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json",
@@ -96,7 +238,13 @@ class ZephyrScaleClient:
             logger.warning("JIRA_BASE_URL is set but JIRA_API_TOKEN is missing.")
             return None
 
-        return cls(base_url=base_url, api_token=api_token, project_key=project_key)
+        return cls(
+            base_url=base_url,
+            api_token=api_token,
+            project_key=project_key,
+            max_workers=int(os.getenv("ZEPHYR_MAX_WORKERS", DEFAULT_MAX_WORKERS)),
+            rate_per_second=float(os.getenv("ZEPHYR_RATE_LIMIT", DEFAULT_RATE_PER_SECOND)),
+        )
 
     # ------------------------------------------------------------------
     # Health check (LIVE — used by /api/jira/health)
@@ -120,38 +268,54 @@ class ZephyrScaleClient:
             return False
 
     # ------------------------------------------------------------------
-    # Phase 2 stubs — fetch
+    # Fetch
     # ------------------------------------------------------------------
 
     def get_test_cases_for_story(self, story_id: str) -> List[ZephyrTestCase]:
         """
         Fetch all Zephyr Scale test cases linked to a Jira User Story.
 
+        Reads from the server; src.zephyr_mirror serves the same from a
+        local copy without paging the project.
+
         Args:
             story_id: Jira issue key, e.g. "PROJ-123"
 
         Returns:
             List of ZephyrTestCase objects.
-
-        Raises:
-            NotImplementedError: Phase 2 — not yet implemented.
         """
-        raise NotImplementedError(
-            "Zephyr Scale test case fetch is Phase 2. "
-            "Use Excel upload for mapping in the meantime."
-        )
+        query = f'projectKey = "{self.project_key}" AND issueKeys IN ("{story_id}")'
+        return [ZephyrTestCase.from_zephyr(item) for item in self.iter_test_cases(query)]
 
     def get_test_cycle(self, cycle_id: str) -> dict:
         """
-        Fetch a Zephyr Scale test cycle by ID.
+        Fetch a Zephyr Scale test cycle (test run) by key, with its items.
 
         Raises:
-            NotImplementedError: Phase 2 — not yet implemented.
+            ZephyrError: when the cycle does not exist or the request fails.
         """
-        raise NotImplementedError("Zephyr Scale API integration — Phase 2")
+        return self._request("GET", f"/testrun/{cycle_id}").json()
+
+    def search_test_cases(self, query: str, start_at: int = 0,
+                          max_results: int = SEARCH_PAGE_SIZE, fields: Optional[str] = None) -> List[Dict]:
+        """One page of test case JSON objects matching a TQL query."""
+        params = {"query": query, "startAt": start_at, "maxResults": max_results}
+        if fields:
+            params["fields"] = fields
+        return self._request("GET", "/testcase/search", params=params).json()
+
+    def iter_test_cases(self, query: str, fields: Optional[str] = None):
+        """Every test case matching a TQL query, page by page."""
+        start = 0
+        while True:
+            page = self.search_test_cases(query, start, SEARCH_PAGE_SIZE, fields)
+            yield from page
+            if len(page) < SEARCH_PAGE_SIZE:
+                return
+            start += SEARCH_PAGE_SIZE
 
     # ------------------------------------------------------------------
-    # Phase 2 stubs — write
+    # Write
     # ------------------------------------------------------------------
 
     def create_test_case(self, test_case: ZephyrTestCase, story_id: str) -> str:
@@ -163,36 +327,248 @@ class ZephyrScaleClient:
             story_id:  Jira User Story key to link the test case to.
 
         Returns:
-            The Zephyr Scale test case ID (string).
+            The Zephyr Scale test case key, e.g. "PROJ-T12".
 
         Raises:
-            NotImplementedError: Phase 2 — not yet implemented.
+            ZephyrError: when the request fails after retries.
         """
-        raise NotImplementedError("Zephyr Scale API integration — Phase 2")
+        payload = self._payload(test_case, story_id)
+        try:
+            resp = self._request("POST", "/testcase", payload)
+        except ZephyrOutcomeUnknown:
+            # The case may have been created before the answer was lost
+            key = self._find_by_label(self._identity_label(test_case, story_id))
+            if key:
+                return key
+            resp = self._request("POST", "/testcase", payload)
+        return resp.json()["key"]
 
     def update_test_case(self, tc_id: str, test_case: ZephyrTestCase) -> None:
         """
         Update an existing Zephyr Scale test case.
 
         Args:
-            tc_id:     Zephyr Scale test case ID.
+            tc_id:     Zephyr Scale test case key.
             test_case: Updated ZephyrTestCase object.
 
         Raises:
-            NotImplementedError: Phase 2 — not yet implemented.
+            ZephyrError: when the request fails after retries.
         """
-        raise NotImplementedError("Zephyr Scale API integration — Phase 2")
+        self._request("PUT", f"/testcase/{tc_id}", self._payload(test_case, test_case.story_id))
 
     def bulk_create_test_cases(
         self, test_cases: List[ZephyrTestCase], story_id: str
-    ) -> List[str]:
+    ) -> List[ZephyrWriteResult]:
         """
-        Bulk-create multiple test cases in Zephyr Scale under a User Story.
+        Create or update many test cases under a User Story, concurrently.
+
+        Cases already pushed for this story (same summary) are updated when
+        their content changed and left alone otherwise, so the call can be
+        repeated safely — e.g. to retry the items that failed.
 
         Returns:
-            List of created Zephyr Scale test case IDs.
+            One ZephyrWriteResult per input case, in input order. A failure
+            of one case does not stop the others.
+
+        Raises:
+            ZephyrError: when existing cases cannot be looked up.
+        """
+        existing = self._existing_generated()
+        results: List[Optional[ZephyrWriteResult]] = [None] * len(test_cases)
+
+        first_by_key: Dict[str, int] = {}
+        for idx, tc in enumerate(test_cases):
+            first_by_key.setdefault(self._identity_label(tc, story_id), idx)
+
+        def write(idx: int) -> None:
+            tc = test_cases[idx]
+            identity = self._identity_label(tc, story_id)
+            revision = self._revision_label(tc, story_id)
+            current = existing.get(identity)
+            try:
+                if current is None:
+                    action, key = "created", self.create_test_case(tc, story_id)
+                elif current[1] == revision:
+                    action, key = "unchanged", current[0]
+                else:
+                    self.update_test_case(current[0], ZephyrTestCase(**{**asdict(tc), "story_id": story_id}))
+                    action, key = "updated", current[0]
+                results[idx] = ZephyrWriteResult(idx, tc.summary, action, key)
+            except (ZephyrError, requests.RequestException, KeyError, ValueError) as exc:
+                logger.warning("Zephyr write failed for %r: %s", tc.summary, exc)
+                results[idx] = ZephyrWriteResult(idx, tc.summary, "failed", error=str(exc))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(write, sorted(set(first_by_key.values()))))
+
+        for idx, tc in enumerate(test_cases):
+            if results[idx] is None:
+                first = results[first_by_key[self._identity_label(tc, story_id)]]
+                results[idx] = ZephyrWriteResult(idx, tc.summary, "duplicate", first.key, first.error)
+        return results
+
+    def create_test_cycle(self, name: str, story_id: Optional[str] = None,
+                          folder: Optional[str] = None, description: str = "") -> str:
+        """
+        Create an empty Zephyr Scale test cycle (test run).
+
+        Returns:
+            The test cycle key, e.g. "PROJ-C4".
+
+        Raises:
+            ZephyrError: when the request fails after retries.
+        """
+        payload = {"projectKey": self.project_key, "name": name, "objective": description, "items": []}
+        if story_id:
+            payload["issueKey"] = story_id
+        if folder:
+            payload["folder"] = folder
+        return self._request("POST", "/testrun", payload).json()["key"]
+
+    def add_test_results(self, cycle_id: str, results: List[Dict]) -> None:
+        """
+        Add executions to a test cycle in one request; test cases not yet in
+        the cycle are added to it.
+
+        Args:
+            cycle_id: Test cycle key.
+            results:  [{"testCaseKey", "status", "comment"}, ...]
 
         Raises:
-            NotImplementedError: Phase 2 — not yet implemented.
+            ZephyrError: when the request fails after retries.
         """
-        raise NotImplementedError("Zephyr Scale API integration — Phase 2")
+        # Re-sending results only overwrites the same executions
+        self._request("POST", f"/testrun/{cycle_id}/testresults", results, idempotent=True)
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _request(self, method: str, path: str, body=None,
+                 params: Optional[Dict] = None, idempotent: Optional[bool] = None) -> requests.Response:
+        """
+        Paced request with retries for 429 (Retry-After), 5xx and connection
+        errors. A non-idempotent request (POST unless ``idempotent``) is only
+        re-sent when it never reached the server.
+
+        Raises:
+            ZephyrOutcomeUnknown: a non-idempotent request was sent but got
+                no answer (read timeout, connection dropped).
+            ZephyrError: any other failure, after retries.
+        """
+        if idempotent is None:
+            idempotent = method != "POST"
+        url = f"{self.base_url}{ZEPHYR_API_PATH}{path}"
+        for attempt in range(MAX_RETRIES + 1):
+            self._limiter.acquire()
+            try:
+                resp = self._session.request(method, url, json=body, params=params, timeout=REQUEST_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if not idempotent and not _never_sent(exc):
+                    raise ZephyrOutcomeUnknown(f"Zephyr Scale {method} {path} got no answer: {exc}")
+                if attempt == MAX_RETRIES:
+                    raise ZephyrError(f"Zephyr Scale unreachable: {exc}")
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if resp.status_code < 400:
+                return resp
+            if resp.status_code != 429 and resp.status_code < 500:
+                raise ZephyrError(
+                    f"Zephyr Scale {method} {path} failed ({resp.status_code}): {resp.text[:300]}",
+                    resp.status_code,
+                )
+            if attempt == MAX_RETRIES:
+                break
+
+            delay = self._backoff(attempt)
+            if resp.status_code == 429:
+                try:
+                    delay = float(resp.headers.get("Retry-After", delay))
+                except ValueError:
+                    pass
+                if delay > MAX_WAIT_SECONDS:
+                    break
+                self._limiter.pause(delay)      # every worker waits, not just this one
+                delay += random.uniform(0, 0.5)
+            logger.warning("Zephyr Scale returned %s for %s %s; retrying in %.1fs",
+                           resp.status_code, method, path, delay)
+            time.sleep(delay)
+
+        raise ZephyrError(
+            f"Zephyr Scale {method} {path} failed ({resp.status_code}) after {attempt + 1} attempts",
+            resp.status_code,
+        )
+
+    def _find_by_label(self, label: str) -> Optional[str]:
+        """Key of a test case in the project carrying this label, or None."""
+        query = f'projectKey = "{self.project_key}" AND labels IN ("{label}")'
+        return next((item["key"] for item in self.iter_test_cases(query, fields="key")), None)
+
+    def _existing_generated(self) -> Dict[str, Tuple[str, Optional[str]]]:
+        """identity label → (test case key, revision label) for cases this app wrote."""
+        existing: Dict[str, Tuple[str, Optional[str]]] = {}
+        query = f'projectKey = "{self.project_key}" AND labels IN ("{GENERATED_LABEL}")'
+        for item in self.iter_test_cases(query, fields="key,labels"):
+            labels = item.get("labels") or []
+            identity = next((l for l in labels if l.startswith(_KEY_LABEL_PREFIX)), None)
+            if identity:
+                revision = next((l for l in labels if l.startswith(_REV_LABEL_PREFIX)), None)
+                existing[identity] = (item["key"], revision)
+        return existing
+
+    def _payload(self, test_case: ZephyrTestCase, story_id: Optional[str]) -> Dict:
+        steps = [{"description": step} for step in test_case.test_steps] or [{"description": test_case.summary}]
+        steps[-1]["expectedResult"] = test_case.expected_result
+        payload = {
+            "projectKey": self.project_key,
+            "name": test_case.summary,
+            "objective": test_case.description,
+            "precondition": test_case.precondition,
+            "labels": self._upsert_labels(test_case, story_id),
+            "testScript": {"type": "STEP_BY_STEP", "steps": steps},
+        }
+        if story_id:
+            payload["issueLinks"] = [story_id]
+        if test_case.priority:
+            payload["priority"] = test_case.priority
+        if test_case.status:
+            payload["status"] = test_case.status
+        return payload
+
+    def _upsert_labels(self, test_case: ZephyrTestCase, story_id: Optional[str]) -> List[str]:
+        own = [l for l in test_case.labels if not l.startswith("tsg-")]
+        return own + [
+            GENERATED_LABEL,
+            self._identity_label(test_case, story_id),
+            self._revision_label(test_case, story_id),
+        ]
+
+    @staticmethod
+    def _identity_label(test_case: ZephyrTestCase, story_id: Optional[str]) -> str:
+        """Which case this is: story + normalised summary."""
+        ident = f"{story_id or ''}|{' '.join(test_case.summary.lower().split())}"
+        return _KEY_LABEL_PREFIX + hashlib.sha256(ident.encode()).hexdigest()[:12]
+
+    @staticmethod
+    def _revision_label(test_case: ZephyrTestCase, story_id: Optional[str]) -> str:
+        """Which revision: a hash of every written field."""
+        content = asdict(test_case)
+        content.pop("id", None)
+        content["story_id"] = story_id
+        content["labels"] = sorted(l for l in test_case.labels if not l.startswith("tsg-"))
+        digest = hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+        return _REV_LABEL_PREFIX + digest[:12]
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Exponential backoff with jitter: ~0.5s, 1s, 2s ..."""
+        return (2 ** attempt) * (0.25 + random.random() / 2)
+
+
+def _never_sent(exc: requests.RequestException) -> bool:
+    """True when a failed request never reached the server, so resending it cannot apply it twice."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
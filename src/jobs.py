@@ -0,0 +1,176 @@
+"""
+Jobs Module
+Runs operations that can take minutes to hours (Zephyr Scale test cycle
+pushes, bulk PR analyses, full mirror crawls) in the background instead of
+inside one HTTP request, which a proxy or worker timeout would cut off.
+
+The endpoint submits the work and answers 202 with the job id at once.
+The work runs on a small bounded pool with the job's ProgressReporter
+active, so its ``progress.stage()`` and ``current().items()`` calls publish
+to the job's event file in PROGRESS_DIR, and its return value (a
+JSON-serialisable dict) is published in the final "done" event. Any worker
+process can therefore stream the job (GET /api/progress/<id>) or report
+its state (GET /api/jobs/<id>, JobRunner.status()).
+
+Submitting a job id that is still queued or running does not start it
+again, so a client retrying its request joins the running job. A job
+whose event file has not been touched for STALE_SECONDS died with its
+worker and may be started again.
+
+Usage:
+    jobs = JobRunner.from_env(ProgressChannel.from_env())
+    job_id, started = jobs.submit("zephyr-cycle", lambda: pusher.push(...).to_dict())
+    jobs.status(job_id)     # status queued | running | ok | error | lost, stage, items, result, error
+"""
+
+import logging
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from src.progress import JOB_ID_RE, ProgressChannel, activate, deactivate
+from src.tracing import current_span, end_span, start_span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 2
+HEARTBEAT_SECONDS = 30          # running jobs touch their event file this often
+STALE_SECONDS = 5 * 60          # ... so one untouched for this long is no longer running
+
+QUEUED, RUNNING, OK, ERROR, LOST = "queued", "running", "ok", "error", "lost"
+
+
+class JobRunner:
+    """Bounded background pool whose jobs report through a ProgressChannel."""
+
+    def __init__(self, channel: ProgressChannel, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        """
+        Args:
+            channel:         Where job events are published and read back.
+            max_concurrency: Jobs running at once in this process; the rest queue.
+        """
+        self.channel = channel
+        self._pool = ThreadPoolExecutor(max_workers=max(int(max_concurrency), 1), thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._active: Dict[str, str] = {}   # job id → pipeline, queued or running here
+        self._heartbeat: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, channel: ProgressChannel) -> "JobRunner":
+        """Create a runner with JOB_MAX_CONCURRENCY workers."""
+        return cls(channel, max_concurrency=int(os.getenv("JOB_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)))
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, pipeline: str, func: Callable[[], Optional[Dict]],
+               job_id: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Run func() in the background as a job of the given pipeline.
+
+        Args:
+            pipeline: Progress pipeline name (src/progress.py PIPELINES).
+            func:     The work; returns the job's result (JSON-serialisable) or None.
+            job_id:   Id to run the job under (default: a new random one);
+                      pass a deterministic id to make retries idempotent.
+
+        Returns:
+            (job id, started) — started is False when a job with this id
+            was already queued or running, and func was not run.
+
+        Raises:
+            ValueError: job_id is not a valid progress id.
+        """
+        job_id = job_id or secrets.token_hex(16)
+        if not JOB_ID_RE.match(job_id):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        parent = current_span()
+        traceparent = f"00-{parent.trace_id}-{parent.span_id}-01" if parent is not None else None
+        with self._lock:
+            state = self.status(job_id)
+            if job_id in self._active or (state is not None and state["status"] in (QUEUED, RUNNING)):
+                return job_id, False
+            self._active[job_id] = pipeline
+            self.channel.clear(job_id)      # events of an earlier, finished run
+            self.channel.publish(job_id, {"type": "job", "status": QUEUED, "pipeline": pipeline})
+            self._ensure_heartbeat()
+        self._pool.submit(self._run, job_id, pipeline, func, traceparent)
+        return job_id, True
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """
+        A job's state from its events: {"job_id", "pipeline", "status",
+        "stage", "items", "result", "error", "total_elapsed"}. None when
+        no job with this id is known (or its events have expired).
+        """
+        if not JOB_ID_RE.match(job_id or ""):
+            return None
+        events = self.channel.read(job_id)
+        if not events or events[0].get("type") != "job":
+            return None     # unknown, or a plain request's progress
+        state = {"job_id": job_id, "pipeline": events[0].get("pipeline"), "status": QUEUED,
+                 "stage": None, "items": None, "result": None, "error": None, "total_elapsed": None}
+        for event in events:
+            kind = event.get("type")
+            if kind == "job":
+                state["status"] = event["status"]
+            elif kind == "stage":
+                state["stage"] = {k: event.get(k) for k in ("stage", "label", "status")}
+            elif kind == "items":
+                state["items"] = {k: event.get(k) for k in ("done", "total", "eta_seconds")}
+            elif kind == "done":
+                state.update(status=event["status"], result=event.get("result"),
+                             error=event.get("error"), total_elapsed=event.get("total_elapsed"))
+        if state["status"] in (QUEUED, RUNNING) and job_id not in self._active:
+            updated = self.channel.updated_at(job_id)
+            if updated is not None and time.time() - updated > STALE_SECONDS:
+                state["status"] = LOST
+        return state
+
+    def active(self) -> int:
+        """Jobs queued or running in this process."""
+        with self._lock:
+            return len(self._active)
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _run(self, job_id: str, pipeline: str, func: Callable[[], Optional[Dict]],
+             traceparent: Optional[str]) -> None:
+        reporter = self.channel.reporter(pipeline, job_id)
+        token = activate(reporter)
+        # The job's spans join the submitting request's trace
+        root, span_token = start_span(f"job {pipeline}", traceparent=traceparent, job_id=job_id)
+        try:
+            self.channel.publish(job_id, {"type": "job", "status": RUNNING, "pipeline": pipeline})
+            result = func()
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed", job_id, pipeline)
+            end_span(root, span_token, exc)
+            reporter.finish(ok=False, error=str(exc) or type(exc).__name__)
+        else:
+            end_span(root, span_token)
+            reporter.finish(ok=True, result=result)
+        finally:
+            deactivate(token)
+            with self._lock:
+                self._active.pop(job_id, None)
+
+    def _ensure_heartbeat(self) -> None:
+        # Called with the lock held
+        if self._heartbeat is None or not self._heartbeat.is_alive():
+            self._heartbeat = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self) -> None:
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            with self._lock:
+                job_ids = list(self._active)
+            for job_id in job_ids:
+                self.channel.touch(job_id)
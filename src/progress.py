@@ -0,0 +1,415 @@
+"""
+Progress Module
+Stage-by-stage progress of long-running requests, streamed to the browser
+as Server-Sent Events.
+
+The browser picks a progress id, opens ``GET /api/progress/<id>`` (an
+EventSource) and sends the same id in the ``X-Progress-Id`` header of the
+request it starts. Each pipeline stage the request runs — GitHub fetch,
+diff parse, prompt build, model call, response parse, Excel parse,
+mapping, render — publishes a "running" event when it starts and a
+"done" (or "failed") event when it ends, and the request ends with a
+"done" event. Events are appended to one small JSON Lines file per
+request in PROGRESS_DIR, so any worker process can serve the stream.
+
+Every stage's duration is remembered per pipeline as a moving average
+(stage_timings.json in the same directory). Stage events carry that
+expectation and an ETA for the rest of the request. Timings are learned
+from every request, including those nobody watches.
+
+Code below the view reports through the request's reporter without having
+it passed in: the view activates it and modules call ``progress.stage()``,
+which also opens a tracing span for the stage (src/tracing.py).
+
+Usage:
+    channel = ProgressChannel.from_env()
+    token = activate(channel.reporter("analyze-diff", request.headers.get("X-Progress-Id")))
+    with stage("model_call"):
+        ...
+    current().finish(ok=True)
+    deactivate(token)
+
+    for seq, event in channel.events(job_id): ...     # SSE endpoint
+"""
+
+import contextvars
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.tracing import span
+
+try:
+    import fcntl
+except ImportError:     # Windows: timing updates are not serialised
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Ordered stages per pipeline, for step numbers and the remaining-time ETA.
+# Stages a request skips (a precomputed PR analysis has no model call)
+# simply never report.
+PIPELINES: Dict[str, List[str]] = {
+    "analyze-pr": ["github_fetch", "diff_parse", "prompt_build", "model_call", "response_parse"],
+    "analyze-diff": ["diff_parse", "prompt_build", "model_call", "response_parse"],
+    "map-excel": ["excel_parse", "prompt_build", "model_call", "response_parse", "mapping"],
+    "download-mapped-excel": ["excel_parse", "mapping", "render"],
+    "analyze-bulk": ["github_fetch"],
+    "zephyr-cycle": ["zephyr_create", "zephyr_cycle", "zephyr_execute"],
+    "zephyr-sync": ["zephyr_sync"],
+}
+
+STAGE_LABELS = {
+    "github_fetch": "Fetching the pull request from GitHub",
+    "diff_parse": "Parsing the diff",
+    "prompt_build": "Building the prompt",
+    "model_call": "Waiting for AWS Bedrock",
+    "response_parse": "Reading the model's answer",
+    "code_generation": "Generating test code",
+    "excel_parse": "Reading the test suite",
+    "mapping": "Mapping test cases",
+    "render": "Rendering the workbook",
+    "zephyr_create": "Creating new test cases in Zephyr Scale",
+    "zephyr_cycle": "Creating the test cycle",
+    "zephyr_execute": "Adding executions to the cycle",
+    "zephyr_sync": "Syncing the Zephyr Scale mirror",
+}
+
+JOB_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+TIMING_WEIGHT = 0.3                     # weight of the newest duration in the moving average
+DEFAULT_RETENTION_SECONDS = 60 * 60     # event files are removed after an hour
+DEFAULT_STREAM_TIMEOUT = 15 * 60        # an SSE stream gives up after this long
+HEARTBEAT_SECONDS = 15
+POLL_SECONDS = 0.25
+_CLEANUP_INTERVAL = 10 * 60
+_TIMINGS_FILE = "stage_timings.json"
+
+
+class ProgressChannel:
+    """Per-request event files plus the shared stage timing history."""
+
+    def __init__(self, root: str, retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        self.root = root
+        self.retention_seconds = retention_seconds
+        self._timings: Dict[str, Dict] = {}
+        self._timings_mtime: Optional[float] = None
+        self._cleaned_at = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ProgressChannel":
+        root = os.getenv("PROGRESS_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "tsg_progress")
+        return cls(root)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def reporter(self, pipeline: str, job_id: Optional[str] = None) -> "ProgressReporter":
+        """
+        A reporter for one request. Without a valid job_id nothing is
+        published, but stage timings are still learned.
+        """
+        if time.time() - self._cleaned_at > _CLEANUP_INTERVAL:
+            self.cleanup()
+        if job_id and not JOB_ID_RE.match(job_id):
+            job_id = None
+        return ProgressReporter(self, pipeline, job_id)
+
+    def publish(self, job_id: str, event: Dict) -> None:
+        # One write of one line: appends from concurrent writers never interleave
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        with open(self._path(job_id), "a", encoding="utf-8") as fh:
+            fh.write(line)
+
+    def events(self, job_id: str, after: int = 0, timeout: float = DEFAULT_STREAM_TIMEOUT,
+               heartbeat: float = HEARTBEAT_SECONDS) -> Iterator[Optional[Tuple[int, Dict]]]:
+        """
+        Follow a request's events as they are published.
+
+        Yields (sequence number, event) pairs — numbered from 1, skipping
+        the first ``after`` (an SSE Last-Event-ID) — and None after every
+        ``heartbeat`` seconds without events. Ends after the request's
+        "done" event, or after ``timeout`` seconds. The file may not exist
+        yet: the stream is usually opened before the request starts.
+        """
+        path = self._path(job_id)
+        deadline = time.monotonic() + timeout
+        last_sent = time.monotonic()
+        offset, seq, partial = 0, 0, ""
+        while time.monotonic() < deadline:
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    fh.seek(offset)
+                    chunk = fh.read()
+                    offset = fh.tell()
+            except FileNotFoundError:
+                chunk = ""
+            lines = (partial + chunk).split("\n")
+            partial = lines.pop()   # incomplete last line, if any
+            for line in lines:
+                if not line:
+                    continue
+                seq += 1
+                if seq <= after:
+                    continue
+                event = json.loads(line)
+                last_sent = time.monotonic()
+                yield seq, event
+                if event.get("type") == "done":
+                    return
+            if time.monotonic() - last_sent >= heartbeat:
+                last_sent = time.monotonic()
+                yield None
+            time.sleep(POLL_SECONDS)
+
+    def read(self, job_id: str) -> Optional[List[Dict]]:
+        """All events published for a job so far, or None when it has none."""
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as fh:
+                lines = fh.read().split("\n")
+        except FileNotFoundError:
+            return None
+        events = []
+        for line in lines:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue    # empty, or still being written
+        return events
+
+    def touch(self, job_id: str) -> None:
+        """Mark a job's event file as live, so cleanup() keeps it."""
+        try:
+            os.utime(self._path(job_id))
+        except OSError:
+            pass
+
+    def updated_at(self, job_id: str) -> Optional[float]:
+        """When a job's events were last written (or touched), or None."""
+        try:
+            return os.stat(self._path(job_id)).st_mtime
+        except OSError:
+            return None
+
+    def clear(self, job_id: str) -> None:
+        """Forget a job's events, before a job id is reused."""
+        try:
+            os.remove(self._path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def expected_seconds(self, pipeline: str, stage_name: str) -> Optional[float]:
+        """Average duration of a stage in this pipeline so far, or None."""
+        entry = self._load_timings().get(f"{pipeline}/{stage_name}")
+        return entry["avg"] if entry else None
+
+    def record(self, pipeline: str, durations: Dict[str, float]) -> None:
+        """Fold a request's stage durations into the moving averages."""
+        if not durations:
+            return
+        lock_fh = open(os.path.join(self.root, _TIMINGS_FILE + ".lock"), "a")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fh, fcntl.LOCK_EX)
+            self._timings_mtime = None      # re-read under the lock
+            timings = dict(self._load_timings())
+            for stage_name, seconds in durations.items():
+                key = f"{pipeline}/{stage_name}"
+                entry = timings.get(key)
+                avg = seconds if entry is None else entry["avg"] + TIMING_WEIGHT * (seconds - entry["avg"])
+                timings[key] = {"avg": round(avg, 3), "count": (entry or {}).get("count", 0) + 1}
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-timings-")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(timings, fh)
+            os.replace(tmp_path, os.path.join(self.root, _TIMINGS_FILE))
+        finally:
+            lock_fh.close()
+
+    def cleanup(self) -> None:
+        """Remove event files older than retention_seconds."""
+        self._cleaned_at = time.time()
+        cutoff = time.time() - self.retention_seconds
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.endswith(".jsonl"):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.root, f"{job_id}.jsonl")
+
+    def _load_timings(self) -> Dict[str, Dict]:
+        path = os.path.join(self.root, _TIMINGS_FILE)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return self._timings
+        if mtime != self._timings_mtime:
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    self._timings = json.load(fh)
+                self._timings_mtime = mtime
+            except (OSError, ValueError):
+                pass    # mid-replace; keep the previous copy
+        return self._timings
+
+
+class ProgressReporter:
+    """Publishes one request's stage events and collects its stage timings."""
+
+    def __init__(self, channel: Optional[ProgressChannel], pipeline: str, job_id: Optional[str] = None):
+        self.channel = channel
+        self.pipeline = pipeline
+        self.job_id = job_id
+        self.stages = PIPELINES.get(pipeline, [])
+        self.durations: Dict[str, float] = {}
+        self.finished = False
+        self._started = time.monotonic()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Report a stage around the enclosed block; re-raises its errors."""
+        if self.channel is None:
+            yield
+            return
+        started = time.monotonic()
+        self._publish_stage(name, "running", 0.0)
+        try:
+            yield
+        except BaseException:
+            self._publish_stage(name, "failed", time.monotonic() - started)
+            raise
+        seconds = time.monotonic() - started
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self._publish_stage(name, "done", seconds)
+
+    def items(self, done: int, total: int, label: str = "") -> None:
+        """Report progress through a list of work items (e.g. bulk PRs)."""
+        if self.channel is None or not self.job_id:
+            return
+        elapsed = time.monotonic() - self._started
+        eta = elapsed / done * (total - done) if done else None
+        self._publish({
+            "type": "items",
+            "done": done,
+            "total": total,
+            "label": label,
+            "total_elapsed": round(elapsed, 2),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        })
+
+    def finish(self, ok: bool = True, result: Optional[Dict] = None, error: Optional[str] = None) -> None:
+        """
+        Publish the final event and record the stage timings (once). A
+        background job's return value or error goes into the event.
+        """
+        if self.channel is None or self.finished:
+            return
+        self.finished = True
+        event = {
+            "type": "done",
+            "status": "ok" if ok else "error",
+            "total_elapsed": round(time.monotonic() - self._started, 2),
+        }
+        if result is not None:
+            event["result"] = result
+        if error is not None:
+            event["error"] = error
+        self._publish(event)
+        if ok:
+            try:
+                self.channel.record(self.pipeline, self.durations)
+            except OSError:
+                logger.exception("Could not record stage timings")
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _eta(self, name: str, after: bool) -> Optional[float]:
+        """
+        Expected seconds left from the start (or end) of stage ``name``: the
+        averages of it and the pipeline stages after it. None when none of
+        them has run before.
+        """
+        if name in self.stages:
+            remaining = self.stages[self.stages.index(name) + (1 if after else 0):]
+        else:
+            remaining = [] if after else [name]     # an optional stage, outside the pipeline
+        if not remaining:
+            return 0.0
+        known = [e for e in (self.channel.expected_seconds(self.pipeline, s) for s in remaining) if e is not None]
+        return round(sum(known), 1) if known else None
+
+    def _publish_stage(self, name: str, status: str, elapsed: float) -> None:
+        if not self.job_id:
+            return
+        self._publish({
+            "type": "stage",
+            "stage": name,
+            "label": STAGE_LABELS.get(name, name.replace("_", " ").capitalize()),
+            "status": status,
+            "step": self.stages.index(name) + 1 if name in self.stages else None,
+            "steps": len(self.stages),
+            "elapsed": round(elapsed, 2),
+            "expected": self.channel.expected_seconds(self.pipeline, name),
+            "total_elapsed": round(time.monotonic() - self._started, 2),
+            "eta_seconds": None if status == "failed" else self._eta(name, after=status == "done"),
+        })
+
+    def _publish(self, event: Dict) -> None:
+        if not self.job_id:
+            return
+        try:
+            self.channel.publish(self.job_id, event)
+        except OSError:
+            logger.exception("Could not publish progress event")
+
+
+# ---------------------------------------------------------------------------
+# The current request's reporter
+# ---------------------------------------------------------------------------
+
+_NULL_REPORTER = ProgressReporter(None, "")
+_current: contextvars.ContextVar = contextvars.ContextVar("progress_reporter", default=_NULL_REPORTER)
+
+
+def activate(reporter: ProgressReporter) -> contextvars.Token:
+    """Make reporter the current one; pass the token to deactivate()."""
+    return _current.set(reporter)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def current() -> ProgressReporter:
+    """The active reporter, or one that reports nothing."""
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str):
+    """
+    ``with stage("model_call"):`` — report a stage on the current reporter,
+    and trace it as a span (so it also appears in Server-Timing).
+    """
+    with span(name), current().stage(name):
+        yield
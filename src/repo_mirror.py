@@ -0,0 +1,243 @@
+"""
+Repository Mirror Module
+Managed cache of bare mirror repositories on local disk, used to compute
+pull request diffs locally instead of through the GitHub diff API.
+
+Each repository gets one bare repo under the cache root. Analysing a PR
+fetches just the base branch and ``refs/pull/<n>/head`` — git's fetch
+negotiation only transfers objects the mirror does not have yet — and
+then runs ``git diff base...head`` (merge-base semantics, as GitHub shows
+PRs) against local disk. There are no diff-size limits and no API quota
+is used.
+
+Concurrent analyses of the same repository share one mirror: fetches
+take an exclusive file lock (which also serialises gunicorn workers) and
+diffs a shared one. Mirrors unused for the TTL are pruned after a fetch,
+at most once per PRUNE_INTERVAL per process.
+
+Enable with PR_DIFF_SOURCE=mirror (see from_env()).
+"""
+
+import base64
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:     # Windows: locks only serialise threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLONE_URL = "https://github.com/{owner}/{repo}.git"
+DEFAULT_TTL_SECONDS = 14 * 24 * 60 * 60     # mirrors unused for two weeks are removed
+FETCH_TIMEOUT = 600                          # seconds; first fetch of a big repo is slow
+PRUNE_INTERVAL = 60 * 60                     # seconds between prunes of one cache root
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+_pruned_at = {}     # cache root → time.monotonic() of its last prune in this process
+
+
+class MirrorError(ValueError):
+    """Raised when a mirror cannot be created, fetched or diffed."""
+
+
+class RepoMirrorCache:
+    """
+    Bare mirror repositories keyed by owner/repo.
+
+    Usage:
+        mirrors = RepoMirrorCache.from_env(token)
+        if mirrors:
+            base_ref, head_ref = mirrors.fetch_pr("octo", "app", 7, base_branch="main")
+            with mirrors.reading("octo", "app") as path:
+                parsed = CodeAnalyzer().parse_diff_lines(
+                    GitAnalyzer(path).iter_diff_lines(base_ref, head_ref))
+    """
+
+    def __init__(self, root: str, clone_url: str = DEFAULT_CLONE_URL, token: Optional[str] = None,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        """
+        Args:
+            root:        Directory holding the mirrors.
+            clone_url:   Remote URL template with {owner} and {repo} placeholders.
+            token:       GitHub token, sent as an HTTP auth header through the
+                         git command's environment (never written into the
+                         mirror's config or onto its command line).
+            ttl_seconds: Mirrors not used for this long are removed by prune().
+        """
+        self.root = root
+        self.clone_url = clone_url
+        self.token = token
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(root, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Factory
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_env(cls, token: Optional[str] = None) -> Optional["RepoMirrorCache"]:
+        """
+        Create a cache when PR_DIFF_SOURCE=mirror, else return None.
+
+        Reads REPO_MIRROR_DIR, GITHUB_CLONE_URL (e.g. for GitHub Enterprise)
+        and REPO_MIRROR_TTL_DAYS.
+        """
+        if os.getenv("PR_DIFF_SOURCE", "api").strip().lower() != "mirror":
+            return None
+        if shutil.which("git") is None:
+            logger.warning("PR_DIFF_SOURCE=mirror but git is not installed; using the GitHub API.")
+            return None
+        root = os.getenv("REPO_MIRROR_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "tsg_mirrors")
+        clone_url = os.getenv("GITHUB_CLONE_URL", "").strip() or DEFAULT_CLONE_URL
+        ttl_days = float(os.getenv("REPO_MIRROR_TTL_DAYS", DEFAULT_TTL_SECONDS / 86400))
+        return cls(root=root, clone_url=clone_url, token=token, ttl_seconds=int(ttl_days * 86400))
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def mirror_path(self, owner: str, repo: str) -> str:
+        for part in (owner, repo):
+            if not part or part in (".", "..") or "/" in part or "\\" in part:
+                raise MirrorError(f"Invalid repository name: {owner}/{repo}")
+        return os.path.join(self.root, owner, f"{repo}.git")
+
+    def fetch_pr(self, owner: str, repo: str, pr_number: int, base_branch: str) -> Tuple[str, str]:
+        """
+        Bring the mirror up to date for one PR (creating it on first use).
+
+        Returns:
+            (base ref, head ref) inside the mirror, for use with git diff.
+        """
+        path = self.mirror_path(owner, repo)
+        base_ref = f"refs/heads/{base_branch}"
+        head_ref = f"refs/pull/{int(pr_number)}/head"
+
+        with self._lock(path, exclusive=True):
+            if not os.path.isdir(path):
+                self._create(path, owner, repo)
+            started = time.time()
+            self._git(
+                path, "fetch", "--no-tags", "--quiet", "origin",
+                f"+{base_ref}:{base_ref}", f"+{head_ref}:{head_ref}",
+                timeout=FETCH_TIMEOUT,
+            )
+            logger.info("Fetched %s/%s#%s into mirror in %.1fs", owner, repo, pr_number, time.time() - started)
+            os.utime(path)
+        self._prune_if_due()
+        return base_ref, head_ref
+
+    @contextmanager
+    def reading(self, owner: str, repo: str) -> Iterator[str]:
+        """
+        Hold a shared lock on a mirror (fetches wait) and yield its path,
+        e.g. for GitAnalyzer(path).iter_diff_lines(base_ref, head_ref).
+        """
+        path = self.mirror_path(owner, repo)
+        with self._lock(path, exclusive=False):
+            yield path
+
+    def prune(self) -> int:
+        """Remove mirrors not used within the TTL (skipping any in use); returns how many."""
+        now = time.time()
+        removed = 0
+        for owner in os.listdir(self.root):
+            owner_dir = os.path.join(self.root, owner)
+            if not os.path.isdir(owner_dir):
+                continue
+            for name in os.listdir(owner_dir):
+                path = os.path.join(owner_dir, name)
+                if not name.endswith(".git") or now - os.path.getmtime(path) <= self.ttl_seconds:
+                    continue
+                with self._lock(path, exclusive=True, blocking=False) as acquired:
+                    if acquired:
+                        logger.info("Removing unused mirror %s", path)
+                        shutil.rmtree(path, ignore_errors=True)
+                        removed += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _create(self, path: str, owner: str, repo: str) -> None:
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._git(None, "init", "--bare", "--quiet", tmp_path)
+        self._git(tmp_path, "remote", "add", "origin", self.clone_url.format(owner=owner, repo=repo))
+        # Loose objects from repeated small fetches are packed by git's auto gc
+        self._git(tmp_path, "config", "gc.auto", "6700")
+        os.replace(tmp_path, path)
+
+    def _prune_if_due(self) -> None:
+        with _thread_locks_guard:
+            last = _pruned_at.get(self.root)
+            if last is not None and time.monotonic() - last < PRUNE_INTERVAL:
+                return
+            _pruned_at[self.root] = time.monotonic()
+        try:
+            self.prune()
+        except OSError as e:
+            logger.warning("Pruning mirrors in %s failed: %s", self.root, e)
+
+    def _git(self, cwd: Optional[str], *args: str, timeout: int = 60) -> str:
+        cmd = ["git", *args]
+        try:
+            result = subprocess.run(
+                cmd, cwd=cwd, env=self._env(), capture_output=True, timeout=timeout, check=False,
+            )
+        except subprocess.TimeoutExpired:
+            raise MirrorError(f"git {args[0]} timed out after {timeout}s")
+        if result.returncode != 0:
+            raise MirrorError(f"git {args[0]} failed: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout.decode(errors="replace")
+
+    def _env(self) -> dict:
+        # Never prompt for credentials in a server process
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        if self.token:
+            # Config from the environment (git 2.31+), so the token is not
+            # in the process list as a -c argument would be
+            credentials = base64.b64encode(f"x-access-token:{self.token}".encode()).decode()
+            env.update(GIT_CONFIG_COUNT="1", GIT_CONFIG_KEY_0="http.extraHeader",
+                       GIT_CONFIG_VALUE_0=f"Authorization: Basic {credentials}")
+        return env
+
+    @contextmanager
+    def _lock(self, path: str, exclusive: bool, blocking: bool = True):
+        """Per-mirror lock: flock on a sidecar file, plus a thread lock where flock is unavailable."""
+        lock_path = f"{path}.lock"
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        if fcntl is None:
+            with _thread_locks_guard:
+                lock = _thread_locks.setdefault(lock_path, threading.Lock())
+            acquired = lock.acquire(blocking)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    lock.release()
+            return
+
+        with open(lock_path, "a") as fh:
+            flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(fh, flags if blocking else flags | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
@@ -0,0 +1,244 @@
+"""
+Result Store Module
+Keeps every analysis result (analyze-pr, analyze-diff, analyze-bulk) under
+an addressable result ID, so results survive a page refresh, can be shared
+by link, and follow-up requests (exports, mapping, Jira pushes) send the ID
+instead of posting the test cases back.
+
+Results are immutable: the ID is a content hash of the result, so storing
+the same result twice yields the same ID and the ID doubles as its ETag.
+Each result is kept as gzip-compressed JSON in one SQLite file shared by
+every worker process; results not read for RESULT_STORE_TTL_DAYS are
+pruned. Complete PR analyses are also indexed by PR and head SHA, so an
+unchanged PR is served without re-running the pipeline.
+
+Usage:
+    store = ResultStore.from_env()
+    result_id = store.put(analysis, kind="pr")
+    store.get(result_id, fields=["summary", "structured_test_cases"])
+    store.get_test_cases(result_id)
+    store.put_pr_analysis("octo/app#7", head_sha, analysis)
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_DAYS = 30
+COMPRESS_LEVEL = 6
+PRUNE_INTERVAL_SECONDS = 60 * 60
+TOUCH_INTERVAL_SECONDS = 60 * 60    # accessed_at is refreshed at most this often
+
+RESULT_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    raw_size    INTEGER NOT NULL,
+    data        BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at);
+CREATE TABLE IF NOT EXISTS pr_analyses (
+    pr_key      TEXT NOT NULL,
+    head_sha    TEXT NOT NULL,
+    result_id   TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (pr_key, head_sha)
+);
+"""
+
+
+class ResultNotFoundError(KeyError):
+    """Raised when a result ID is malformed, unknown or has been pruned."""
+
+
+class ResultStore:
+    """SQLite-backed store of compressed, content-addressed analysis results."""
+
+    def __init__(self, db_path: str, ttl_seconds: float = DEFAULT_TTL_DAYS * 86400):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._pruned_at = 0.0
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "ResultStore":
+        """Store in RESULT_STORE_PATH (default: the system temp dir), pruned after RESULT_STORE_TTL_DAYS."""
+        db_path = os.getenv("RESULT_STORE_PATH", "").strip() or os.path.join(
+            tempfile.gettempdir(), "tsg_results.sqlite"
+        )
+        return cls(db_path, ttl_seconds=float(os.getenv("RESULT_STORE_TTL_DAYS", DEFAULT_TTL_DAYS)) * 86400)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def put(self, data: Dict, kind: str) -> str:
+        """
+        Store a result and return its ID.
+
+        Args:
+            data: The result document (JSON-serialisable dict); a
+                  ``result_id`` key in it is ignored.
+            kind: What produced it ("pr", "diff", "bulk").
+
+        Returns:
+            32-hex content-hash ID.
+        """
+        data = {k: v for k, v in data.items() if k != "result_id"}
+        raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        result_id = hashlib.sha256(
+            json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()[:32]
+        now = time.time()
+        with self._connect() as conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO results (id, kind, created_at, accessed_at, raw_size, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (result_id, kind, now, now, len(raw), gzip.compress(raw, COMPRESS_LEVEL)),
+            ).rowcount
+            if not inserted:
+                conn.execute("UPDATE results SET accessed_at = ? WHERE id = ?", (now, result_id))
+        self._maybe_prune()
+        return result_id
+
+    def get(self, result_id: str, fields: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Return a stored result, with ``result_id`` and ``kind`` added.
+
+        Args:
+            fields: Top-level keys to return (unknown ones are ignored);
+                    None returns everything.
+
+        Raises:
+            ResultNotFoundError: unknown, malformed or pruned ID.
+        """
+        row = self._row(result_id)
+        data = json.loads(gzip.decompress(row["data"]))
+        if fields is not None:
+            wanted = set(fields)
+            data = {k: v for k, v in data.items() if k in wanted}
+        return dict(data, result_id=result_id, kind=row["kind"])
+
+    def get_test_cases(self, result_id: str) -> List[Dict]:
+        """The generated test cases of a result (analyses and bulk reports alike)."""
+        data = self.get(result_id, fields=("structured_test_cases", "test_cases"))
+        return data.get("structured_test_cases") or data.get("test_cases") or []
+
+    def put_pr_analysis(self, pr_key: str, head_sha: str, data: Dict) -> str:
+        """
+        Store a complete PR analysis under its PR ("owner/repo#n") and head
+        SHA, which also makes it the PR's latest analysis.
+
+        Returns:
+            The analysis' result ID.
+        """
+        result_id = self.put(data, kind="pr")
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pr_analyses (pr_key, head_sha, result_id, created_at) VALUES (?, ?, ?, ?)",
+                (pr_key, head_sha, result_id, time.time()),
+            )
+        return result_id
+
+    def get_pr_analysis(self, pr_key: str, head_sha: Optional[str]) -> Optional[Dict]:
+        """Return the stored analysis of a PR at head_sha, or None."""
+        if not head_sha:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result_id FROM pr_analyses WHERE pr_key = ? AND head_sha = ?", (pr_key, head_sha)
+            ).fetchone()
+        return self._pr_analysis(row["result_id"]) if row is not None else None
+
+    def get_latest_pr_analysis(self, pr_key: str) -> Optional[Tuple[str, Dict]]:
+        """Return (head SHA, analysis) of the PR's most recently stored analysis, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT head_sha, result_id FROM pr_analyses WHERE pr_key = ? ORDER BY created_at DESC LIMIT 1",
+                (pr_key,),
+            ).fetchone()
+        if row is None:
+            return None
+        data = self._pr_analysis(row["result_id"])
+        return (row["head_sha"], data) if data is not None else None
+
+    def exists(self, result_id: str) -> bool:
+        try:
+            self._row(result_id)
+            return True
+        except ResultNotFoundError:
+            return False
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            count, raw, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM results"
+            ).fetchone()
+        return {"results": count, "raw_bytes": raw, "stored_bytes": stored}
+
+    def prune(self) -> int:
+        """Delete results not read for ttl_seconds; returns how many."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            deleted = conn.execute("DELETE FROM results WHERE accessed_at < ?", (cutoff,)).rowcount
+            conn.execute("DELETE FROM pr_analyses WHERE result_id NOT IN (SELECT id FROM results)")
+        self._pruned_at = time.time()
+        if deleted:
+            logger.info("Result store: pruned %d results", deleted)
+        return deleted
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _row(self, result_id: str) -> sqlite3.Row:
+        if not isinstance(result_id, str) or not RESULT_ID_RE.match(result_id):
+            raise ResultNotFoundError(result_id)
+        with self._connect() as conn:
+            row = conn.execute("SELECT kind, accessed_at, data FROM results WHERE id = ?", (result_id,)).fetchone()
+            if row is None:
+                raise ResultNotFoundError(result_id)
+            now = time.time()
+            if now - row["accessed_at"] > TOUCH_INTERVAL_SECONDS:
+                conn.execute("UPDATE results SET accessed_at = ? WHERE id = ?", (now, result_id))
+        return row
+
+    def _pr_analysis(self, result_id: str) -> Optional[Dict]:
+        try:
+            data = self.get(result_id)
+        except ResultNotFoundError:
+            return None  # pruned concurrently
+        return {k: v for k, v in data.items() if k not in ("result_id", "kind")}
+
+    def _maybe_prune(self) -> None:
+        if time.time() - self._pruned_at > PRUNE_INTERVAL_SECONDS:
+            try:
+                self.prune()
+            except sqlite3.Error:
+                logger.exception("Result store prune failed")
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit; WAL lets other workers read while one writes
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
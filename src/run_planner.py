@@ -0,0 +1,269 @@
+"""
+Run Planner Module
+Turns decided mappings into a time-budgeted regression run plan.
+
+No AI calls, no external dependencies. Runs after
+decision_rules.apply_decision(): every RUN/REVIEW mapping is a candidate,
+weighted by match confidence × priority × risk. A 0/1 knapsack picks the
+candidates with the most total weight that fit the budget, and the picks
+are spread over N parallel runners (longest first, onto the least loaded
+runner) so every runner finishes inside the window. Each runner runs its
+tests highest impact first, so a run cut short still covers the most.
+
+Input:  mappings (with execution_decision), per-test durations, a budget
+Output: same mappings with plan_status, plan_runner, plan_order and
+        plan_duration_min added (see PLAN_OUTPUT_SPEC in excel_processor)
+"""
+
+import csv
+import io
+import json
+import math
+import re
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+
+# Decisions that put a test in the candidate set
+PLANNED_DECISIONS = ("RUN", "REVIEW")
+
+PRIORITY_WEIGHTS = {"critical": 4.0, "high": 3.0, "medium": 2.0, "low": 1.0}
+RISK_WEIGHTS = {"critical": 2.0, "high": 1.5, "medium": 1.0, "low": 0.5}
+DEFAULT_PRIORITY_WEIGHT = 2.0
+DEFAULT_RISK_WEIGHT = 1.0
+
+DEFAULT_DURATION_SECONDS = 5 * 60    # when no test has a known duration
+KNAPSACK_RESOLUTION = 1000           # capacity buckets; durations are rounded up to one
+
+_UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0}
+
+
+def parse_duration(value, default_unit: str = "m") -> Optional[float]:
+    """
+    Seconds for a duration cell: "90" (in default_unit), "1:30" (mm:ss),
+    "1:02:30", "90s", "5m", "1.5h", "2h 30m", "10 min". None if unreadable.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) * _UNIT_SECONDS[default_unit]
+    text = str(value).strip().lower()
+    if re.fullmatch(r"\d+(:\d{1,2}){1,2}", text):
+        seconds = 0.0
+        for part in text.split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    if re.fullmatch(r"\d+(\.\d+)?", text):
+        return float(text) * _UNIT_SECONDS[default_unit]
+    parts = re.findall(r"(\d+(?:\.\d+)?)\s*(h|hr|hrs|hours?|m|min|mins|minutes?|s|sec|secs|seconds?)\b", text)
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[unit[0]] for n, unit in parts)
+
+
+def load_duration_history(data: bytes, filename: str = "") -> Dict[str, float]:
+    """
+    Test id → seconds from a history file: JSON ({"TC-1": 42.0, ...} or a
+    list of {"test", "duration"}) or CSV/TSV with a test id column and a
+    duration column (seconds). Repeated ids are averaged.
+    """
+    text = data.decode("utf-8-sig", errors="replace")
+    samples: Dict[str, List[float]] = {}
+
+    def add(test_id, seconds) -> None:
+        seconds = parse_duration(seconds, default_unit="s")
+        if test_id and seconds is not None:
+            samples.setdefault(str(test_id).strip(), []).append(seconds)
+
+    if filename.lower().endswith(".json") or text.lstrip()[:1] in ("{", "["):
+        parsed = json.loads(text)
+        if isinstance(parsed, dict):
+            for test_id, seconds in parsed.items():
+                add(test_id, seconds)
+        else:
+            for item in parsed:
+                add(item.get("test") or item.get("id") or item.get("name"),
+                    item.get("duration") or item.get("seconds") or item.get("time"))
+    else:
+        dialect = "excel-tab" if "\t" in text.split("\n", 1)[0] else "excel"
+        reader = csv.reader(io.StringIO(text), dialect=dialect)
+        header = [h.strip().lower() for h in next(reader, [])]
+        id_col = next((i for i, h in enumerate(header) if h in ("test", "test id", "test case", "id", "name")), 0)
+        time_col = next((i for i, h in enumerate(header) if h in ("duration", "seconds", "time", "elapsed")), 1)
+        for row in reader:
+            if len(row) > max(id_col, time_col):
+                add(row[id_col], row[time_col])
+
+    return {test_id: sum(values) / len(values) for test_id, values in samples.items()}
+
+
+def plan_run(
+    mappings: List[Dict],
+    durations: Dict[int, Optional[float]],
+    budget_seconds: float,
+    runners: int = 1,
+    priorities: Optional[Dict[int, str]] = None,
+    risks: Optional[Dict[int, str]] = None,
+) -> Dict:
+    """
+    Select and order the candidate mappings that fit the budget.
+
+    Args:
+        mappings:       Decided mapping dicts (mutated in place).
+        durations:      Seconds per mapping, by position in ``mappings``;
+                        unknown ones get the median of the known durations.
+        budget_seconds: Wall-clock window each runner has.
+        runners:        Parallel runners the plan is split across.
+        priorities:     Priority label per mapping position (high/medium/low).
+        risks:          Risk label per mapping position (high/medium/low).
+
+    Returns:
+        Summary: {planned, over_budget, planned_minutes, budget_minutes,
+        runners: [{runner, tests, minutes}], coverage}. ``coverage`` is the
+        share of total candidate weight that made it into the plan.
+    """
+    runners = max(int(runners), 1)
+    known = [d for d in durations.values() if d]
+    fallback = median(known) if known else DEFAULT_DURATION_SECONDS
+
+    candidates = []     # (position, seconds, weight)
+    for pos, mapping in enumerate(mappings):
+        for key in ("plan_status", "plan_runner", "plan_order", "plan_duration_min"):
+            mapping[key] = ""
+        if mapping.get("execution_decision") not in PLANNED_DECISIONS:
+            continue
+        seconds = durations.get(pos) or fallback
+        weight = (
+            (int(mapping.get("confidence") or 0) / 100 or 0.01)
+            * PRIORITY_WEIGHTS.get(str((priorities or {}).get(pos, "")).strip().lower(), DEFAULT_PRIORITY_WEIGHT)
+            * RISK_WEIGHTS.get(str((risks or {}).get(pos, "")).strip().lower(), DEFAULT_RISK_WEIGHT)
+        )
+        candidates.append((pos, seconds, weight))
+        mapping["plan_duration_min"] = round(seconds / 60, 1)
+
+    chosen = _knapsack(candidates, budget_seconds * runners)
+    lanes = _assign_runners(
+        [c for c in candidates if c[0] in chosen],
+        [c for c in candidates if c[0] not in chosen],
+        budget_seconds,
+        runners,
+    )
+
+    planned = set()
+    summary_runners = []
+    for runner_idx, lane in enumerate(lanes, start=1):
+        lane.sort(key=lambda c: (-c[2], c[1]))
+        for order, (pos, _, _) in enumerate(lane, start=1):
+            mappings[pos].update(plan_status="PLANNED", plan_runner=runner_idx, plan_order=order)
+            planned.add(pos)
+        summary_runners.append({
+            "runner": runner_idx,
+            "tests": len(lane),
+            "minutes": round(sum(c[1] for c in lane) / 60, 1),
+        })
+    for pos, _, _ in candidates:
+        if pos not in planned:
+            mappings[pos]["plan_status"] = "OVER BUDGET"
+
+    total_weight = sum(c[2] for c in candidates)
+    return {
+        "planned": len(planned),
+        "over_budget": len(candidates) - len(planned),
+        "planned_minutes": round(sum(c[1] for c in candidates if c[0] in planned) / 60, 1),
+        "budget_minutes": round(budget_seconds / 60, 1),
+        "runners": summary_runners,
+        "coverage": round(sum(c[2] for c in candidates if c[0] in planned) / total_weight, 3) if total_weight else 1.0,
+    }
+
+
+def plan_suite_run(
+    mappings: List[Dict],
+    excel_rows,
+    budget_seconds: float,
+    runners: int = 1,
+    history: Optional[Dict[str, float]] = None,
+) -> Dict:
+    """
+    plan_run() with inputs read from the parsed suite rows: duration from
+    ``history`` (by the row's own test id, without the sheet prefix of
+    ``raw_id``) or else the row's duration column (bare numbers in
+    minutes), priority and risk from their columns. Rows are matched to
+    mappings by sheet, workbook and row index.
+    """
+    rows_by_key = {
+        (row.get("_workbook") or None, row.get("_sheet") or None, row["row_index"]): row
+        for row in excel_rows
+    }
+    durations, priorities, risks = {}, {}, {}
+    for pos, mapping in enumerate(mappings):
+        row = rows_by_key.get((mapping.get("workbook"), mapping.get("sheet"), mapping.get("excel_row_index"))) or {}
+        test_id = str(mapping.get("test_id") or mapping.get("raw_id") or "").strip()
+        seconds = (history or {}).get(test_id)
+        durations[pos] = seconds if seconds is not None else parse_duration(row.get("duration"))
+        priorities[pos] = row.get("priority", "")
+        risks[pos] = row.get("risk", "")
+    return plan_run(mappings, durations, budget_seconds, runners, priorities, risks)
+
+
+# ---------------------------------------------------------------------------
+# Private helpers
+# ---------------------------------------------------------------------------
+
+def _knapsack(candidates: List[Tuple[int, float, float]], capacity_seconds: float) -> set:
+    """Positions of the max-weight subset whose total duration fits capacity."""
+    if capacity_seconds <= 0 or not candidates:
+        return set()
+    if sum(c[1] for c in candidates) <= capacity_seconds:
+        return {c[0] for c in candidates}
+
+    # Durations are rounded *up* to whole buckets, so the pick never overruns
+    bucket = max(capacity_seconds / KNAPSACK_RESOLUTION, 1.0)
+    capacity = int(capacity_seconds // bucket)
+    sizes = [max(math.ceil(c[1] / bucket), 1) for c in candidates]
+
+    best = [0.0] * (capacity + 1)
+    keep = []           # per item: bitmap of capacities where taking it improved best
+    for size, (_, _, weight) in zip(sizes, candidates):
+        took = bytearray(capacity + 1)
+        for cap in range(capacity, size - 1, -1):
+            value = best[cap - size] + weight
+            if value > best[cap]:
+                best[cap] = value
+                took[cap] = 1
+        keep.append(took)
+
+    chosen, cap = set(), capacity
+    for idx in range(len(candidates) - 1, -1, -1):
+        if keep[idx][cap]:
+            chosen.add(candidates[idx][0])
+            cap -= sizes[idx]
+    return chosen
+
+
+def _assign_runners(
+    chosen: List[Tuple[int, float, float]],
+    spare: List[Tuple[int, float, float]],
+    budget_seconds: float,
+    runners: int,
+) -> List[List]:
+    """
+    Longest-first onto the least loaded runner. Picks that would overrun a
+    runner's window, then the knapsack's leftovers, fill whatever room is
+    left, best weight per second first.
+    """
+    lanes: List[List] = [[] for _ in range(runners)]
+    loads = [0.0] * runners
+    dropped = []
+    for item in sorted(chosen, key=lambda c: -c[1]):
+        idx = min(range(runners), key=loads.__getitem__)
+        if loads[idx] + item[1] <= budget_seconds:
+            lanes[idx].append(item)
+            loads[idx] += item[1]
+        else:
+            dropped.append(item)
+
+    for item in sorted(dropped + spare, key=lambda c: -c[2] / max(c[1], 1)):
+        idx = min(range(runners), key=loads.__getitem__)
+        if loads[idx] + item[1] <= budget_seconds:
+            lanes[idx].append(item)
+            loads[idx] += item[1]
+    return lanes
@@ -7,8 +7,18 @@ Single Bedrock call per analysis — no intermediate markdown step.
 import boto3
 import json
 import os
+import threading
 from typing import Dict, List
 
+from src.progress import stage
+from src.tracing import KIND_CLIENT, set_attributes, span
+
+# Process-wide cap on in-flight Bedrock calls, shared by every generator and
+# the Excel mapper (bulk analyses run many PRs concurrently; this keeps them
+# under quota)
+BEDROCK_MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", "4"))
+bedrock_slots = threading.BoundedSemaphore(BEDROCK_MAX_CONCURRENCY)
+
 
 class TestScenarioGenerator:
     """Generates structured test scenarios using Claude AI."""
@@ -29,6 +39,7 @@ class TestScenarioGenerator:
         parsed_diff: List[Dict],
         change_types: Dict[str, List[str]],
         pr_context: Dict = None,
+        existing_cases: List[Dict] = None,
     ) -> list:
         """
         Generate structured test cases directly from code change data.
@@ -36,40 +47,40 @@ class TestScenarioGenerator:
         Single Bedrock call — returns a JSON list without an intermediate markdown step.
 
         Args:
-            diff_summary:  Human-readable summary of changes.
-            parsed_diff:   Structured diff (files, additions, deletions).
-            change_types:  Categorised change types from CodeAnalyzer.
-            pr_context:    Optional PR metadata (title, description, etc.).
+            diff_summary:   Human-readable summary of changes.
+            parsed_diff:    Structured diff (files, additions, deletions).
+            change_types:   Categorised change types from CodeAnalyzer.
+            pr_context:     Optional PR metadata (title, description, etc.).
+            existing_cases: Cases generated earlier for these files (incremental
+                            re-analysis); still-valid ones come back with their id.
 
         Returns:
             List of test case dicts, or [] on parse failure.
-            Each dict: {id, title, type, priority, category, steps[], expected_result}
+            Each dict: {id, title, type, priority, category, steps[], expected_result, files[]}
         """
-        prompt = self._build_structured_prompt(diff_summary, parsed_diff, change_types, pr_context)
-
-        response = self.client.invoke_model(
-            modelId=self.model,
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4096,
-                "temperature": 0.3,
-                "messages": [{"role": "user", "content": prompt}],
-            }),
-        )
-
-        text = json.loads(response["body"].read())["content"][0]["text"].strip()
-
-        # Strip markdown code fences if Claude wrapped the JSON
-        if text.startswith("```"):
-            first_newline = text.index("\n")
-            last_fence = text.rfind("```")
-            text = text[first_newline + 1: last_fence].strip() if last_fence > first_newline else text[first_newline + 1:].strip()
-
-        try:
-            result = json.loads(text)
-            return result if isinstance(result, list) else []
-        except (json.JSONDecodeError, ValueError):
-            return []
+        with stage("prompt_build"):
+            prompt = self._build_structured_prompt(diff_summary, parsed_diff, change_types, pr_context, existing_cases)
+            set_attributes(files=len(parsed_diff), prompt_chars=len(prompt))
+
+        with stage("model_call"):
+            payload = self._invoke(prompt, temperature=0.3)
+
+        with stage("response_parse"):
+            text = payload["content"][0]["text"].strip()
+
+            # Strip markdown code fences if Claude wrapped the JSON
+            if text.startswith("```"):
+                first_newline = text.index("\n")
+                last_fence = text.rfind("```")
+                text = text[first_newline + 1: last_fence].strip() if last_fence > first_newline else text[first_newline + 1:].strip()
+
+            try:
+                result = json.loads(text)
+            except (json.JSONDecodeError, ValueError):
+                result = None
+            cases = result if isinstance(result, list) else []
+            set_attributes(parsed=isinstance(result, list), test_cases=len(cases))
+            return cases
 
     def _build_structured_prompt(
         self,
@@ -77,6 +88,7 @@ class TestScenarioGenerator:
         parsed_diff: List[Dict],
         change_types: Dict[str, List[str]],
         pr_context: Dict = None,
+        existing_cases: List[Dict] = None,
     ) -> str:
         """Build the single prompt that produces structured test cases directly."""
 
@@ -107,6 +119,16 @@ class TestScenarioGenerator:
                     if line.strip():
                         prompt += f"  + {line}\n"
 
+        if existing_cases:
+            prompt += "\n## Existing Test Cases For These Files\n"
+            prompt += "These were generated for an earlier version of the same changes:\n"
+            prompt += json.dumps(existing_cases, indent=2) + "\n"
+            prompt += (
+                "Return the complete set of test cases for the changes above. Return an existing case "
+                "with its original id when it still applies, updated if needed; leave out cases that no "
+                "longer apply; give new cases the id \"NEW\".\n"
+            )
+
         prompt += """
 
 ## Output Requirements
@@ -122,7 +144,8 @@ Each element must follow this exact schema:
     "priority": "high",
     "category": "Category (e.g. Payment, Authentication, Product, Checkout)",
     "steps": ["Step 1: ...", "Step 2: ...", "Step 3: ..."],
-    "expected_result": "What the user or system should observe when the test passes"
+    "expected_result": "What the user or system should observe when the test passes",
+    "files": ["path/of/a/changed/file.py"]
   }
 ]
 
@@ -130,6 +153,7 @@ Rules:
 - Include ONLY these three test types: functional, regression, e2e
 - "priority" must be: high, medium, or low
 - "steps" must have at least 2 items
+- "files" lists the changed file paths (exactly as given above) whose changes the case exercises
 - CRITICAL — Steps must be written in plain business language:
     Good: "Navigate to the checkout page and enter valid payment details, then confirm the order."
     Bad:  "Call PaymentService.processPayment() with a valid PaymentDTO object."
@@ -173,14 +197,25 @@ Generate complete, runnable test code with:
 
 Provide the code ready to copy into a test file."""
 
-        response = self.client.invoke_model(
-            modelId=self.model,
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4096,
-                "temperature": 0.5,
-                "messages": [{"role": "user", "content": prompt}],
-            }),
-        )
-
-        return json.loads(response["body"].read())["content"][0]["text"]
+        return self._invoke(prompt, temperature=0.5)["content"][0]["text"]
+
+    def _invoke(self, prompt: str, temperature: float) -> Dict:
+        """One Bedrock call, under the process-wide concurrency cap; returns the response payload."""
+        with bedrock_slots, span("bedrock.invoke_model", KIND_CLIENT, model=self.model) as traced:
+            response = self.client.invoke_model(
+                modelId=self.model,
+                body=json.dumps({
+                    "anthropic_version": "bedrock-2023-05-31",
+                    "max_tokens": 4096,
+                    "temperature": temperature,
+                    "messages": [{"role": "user", "content": prompt}],
+                }),
+            )
+            payload = json.loads(response["body"].read())
+            usage = payload.get("usage") or {}
+            traced.set(
+                input_tokens=usage.get("input_tokens"),
+                output_tokens=usage.get("output_tokens"),
+                stop_reason=payload.get("stop_reason"),
+            )
+        return payload
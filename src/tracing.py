@@ -0,0 +1,381 @@
+"""
+Tracing Module
+Lightweight request tracing: nested, timed spans with attributes, exported
+as OTLP/JSON and summarised in each response's Server-Timing header.
+
+Every request gets a root span. Pipeline stages (progress.stage()), GitHub
+requests, Bedrock invocations, CodeAnalyzer steps and ExcelProcessor
+parse/render open child spans. The spans carry counts such as files,
+rows and tokens as attributes. The root span's direct children become the
+Server-Timing header, so stage durations show up in the browser's devtools.
+
+Finished spans are queued and written by a background thread in batches,
+each batch one OTLP/JSON ``resourceSpans`` document:
+
+    TRACE_EXPORTER=file   JSON Lines in TRACE_FILE (default: system temp dir),
+                          rotated to TRACE_FILE.1 at TRACE_FILE_MAX_MB
+    TRACE_EXPORTER=otlp   POST to OTEL_EXPORTER_OTLP_ENDPOINT/v1/traces
+                          (OTLP/HTTP JSON; OTEL_EXPORTER_OTLP_HEADERS k=v,...)
+    TRACE_EXPORTER=none   spans only feed Server-Timing
+
+Without TRACE_EXPORTER, otlp is used when an endpoint is set, else file.
+A W3C ``traceparent`` request header continues the caller's trace.
+
+Usage:
+    Tracer.from_env().install()             # once, at startup
+
+    with span("bedrock.invoke_model", model=model_id) as s:
+        ...
+        s.set(input_tokens=usage["input_tokens"])
+
+    @traced("code_analyzer.parse_diff", lambda files: {"files": len(files)})
+    def parse_diff(self, diff_text): ...
+
+    future = submit_in_context(pool, fetch, url)     # spans of fetch join this trace
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE_NAME = "test-scenario-generator"
+DEFAULT_FILE_MAX_MB = 50
+BATCH_SIZE = 256
+FLUSH_SECONDS = 2.0
+QUEUE_LIMIT = 10000
+EXPORT_TIMEOUT = 5          # seconds per OTLP POST
+
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Span:
+    """One timed operation; ``children`` holds (name, ms) of its direct children."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "parent_id", "kind",
+                 "start_ns", "end_ns", "attributes", "error", "children")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, kind: int = KIND_INTERNAL,
+                 trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else (trace_id or secrets.token_hex(16))
+        self.parent_id = parent.span_id if parent else parent_id
+        self.span_id = secrets.token_hex(8)
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict = {}
+        self.error: Optional[str] = None
+        self.children: List = []
+        self.set(**attributes)
+
+    def set(self, **attributes) -> "Span":
+        """Add attributes; None values are skipped."""
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+        return self
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        return data
+
+
+class Tracer:
+    """Hands finished spans to an exporter through a background batching thread."""
+
+    def __init__(self, exporter: Optional["SpanExporter"] = None, service_name: str = DEFAULT_SERVICE_NAME):
+        self.exporter = exporter
+        self.service_name = service_name
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=QUEUE_LIMIT)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._thread_lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._dropped = 0
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "").strip()
+        kind = os.getenv("TRACE_EXPORTER", "").strip().lower() or ("otlp" if endpoint else "file")
+        service_name = os.getenv("OTEL_SERVICE_NAME", "").strip() or DEFAULT_SERVICE_NAME
+        if kind == "otlp" and endpoint:
+            exporter = OTLPSpanExporter(endpoint, _parse_headers(os.getenv("OTEL_EXPORTER_OTLP_HEADERS", "")))
+        elif kind == "file":
+            path = os.getenv("TRACE_FILE", "").strip() or os.path.join(tempfile.gettempdir(), "tsg_traces.jsonl")
+            max_mb = float(os.getenv("TRACE_FILE_MAX_MB", DEFAULT_FILE_MAX_MB))
+            exporter = FileSpanExporter(path, int(max_mb * 1024 * 1024))
+        else:
+            exporter = None
+        return cls(exporter, service_name)
+
+    def install(self) -> "Tracer":
+        """Make this the tracer span() reports to; queued spans are flushed at exit."""
+        global _tracer
+        _tracer = self
+        atexit.register(self.flush)
+        return self
+
+    def on_end(self, finished: Span) -> None:
+        if self.exporter is None:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(finished)
+            if self._queue.qsize() >= BATCH_SIZE:
+                self._wake.set()
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 1000 == 0:
+                logger.warning("Trace export queue full; %d spans dropped", self._dropped)
+
+    def flush(self) -> None:
+        """Export everything queued so far, BATCH_SIZE spans per document (blocking)."""
+        with self._export_lock:
+            while True:
+                batch = []
+                while len(batch) < BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._export(batch)
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _ensure_thread(self) -> None:
+        # Started lazily and again after a fork (process pools, pre-fork servers)
+        if self._pid == os.getpid():
+            return
+        with self._thread_lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        # Every FLUSH_SECONDS, or sooner once a full batch is waiting
+        while True:
+            self._wake.wait(FLUSH_SECONDS)
+            self._wake.clear()
+            self.flush()
+
+    def _export(self, batch: List[Span]) -> None:
+        if not batch or self.exporter is None:
+            return
+        document = {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [s.to_otlp() for s in batch]}],
+        }]}
+        try:
+            self.exporter.export(document)
+        except Exception:
+            logger.exception("Trace export failed; %d spans dropped", len(batch))
+
+
+class SpanExporter:
+    """Writes one OTLP/JSON document (a batch of spans) somewhere."""
+
+    def export(self, document: Dict) -> None:
+        raise NotImplementedError
+
+
+class FileSpanExporter(SpanExporter):
+    """One document per line, appended to a file that is rotated when full."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_FILE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, document: Dict) -> None:
+        line = json.dumps(document, separators=(",", ":")) + "\n"
+        try:
+            if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+        except OSError:
+            pass    # not created yet, or rotated by another worker
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line)
+
+
+class OTLPSpanExporter(SpanExporter):
+    """OTLP/HTTP with JSON encoding, as accepted by the OpenTelemetry Collector."""
+
+    def __init__(self, endpoint: str, headers: Optional[Dict[str, str]] = None):
+        endpoint = endpoint.rstrip("/")
+        self.url = endpoint if endpoint.endswith("/v1/traces") else f"{endpoint}/v1/traces"
+        self.headers = dict(headers or {}, **{"Content-Type": "application/json"})
+
+    def export(self, document: Dict) -> None:
+        resp = requests.post(self.url, data=json.dumps(document), headers=self.headers, timeout=EXPORT_TIMEOUT)
+        if resp.status_code >= 300:
+            raise RuntimeError(f"OTLP endpoint returned {resp.status_code}: {resp.text[:200]}")
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+_tracer = Tracer()
+_current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def set_attributes(**attributes) -> None:
+    """Add attributes to the current span, if there is one."""
+    active = _current.get()
+    if active is not None:
+        active.set(**attributes)
+
+
+def start_span(name: str, kind: int = KIND_INTERNAL, traceparent: Optional[str] = None, **attributes):
+    """
+    Open a span under the current one and make it current, for code that
+    cannot use a with block (request hooks). Returns (span, token) for
+    end_span().
+    """
+    trace_id = parent_id = None
+    match = _TRACEPARENT_RE.match(traceparent or "")
+    if match and _current.get() is None:
+        trace_id, parent_id = match.groups()
+    opened = Span(name, _current.get(), kind, trace_id=trace_id, parent_id=parent_id, **attributes)
+    return opened, _current.set(opened)
+
+
+def end_span(opened: Span, token: contextvars.Token, error: Optional[BaseException] = None) -> None:
+    _current.reset(token)
+    if opened.end_ns is not None:
+        return
+    if error is not None:
+        opened.error = f"{type(error).__name__}: {error}"[:300]
+    opened.end_ns = time.time_ns()
+    if opened.parent is not None:
+        opened.parent.children.append((opened.name, opened.duration_ms))
+    _tracer.on_end(opened)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """``with span("github.request", path=path) as s:`` — a child of the current span."""
+    opened, token = start_span(name, kind, **attributes)
+    try:
+        yield opened
+    except BaseException as exc:
+        end_span(opened, token, exc)
+        raise
+    end_span(opened, token)
+
+
+def submit_in_context(pool: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """
+    ``pool.submit(fn, *args, **kwargs)`` with the caller's context variables
+    (current span, progress reporter) carried into the worker thread, so
+    spans fn opens are children of the caller's — part of its trace and its
+    Server-Timing — instead of orphan roots.
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def traced(name: Optional[str] = None, describe: Optional[Callable] = None):
+    """
+    Decorator: run the function in a span (default name: its qualified
+    name). ``describe(result)`` returns attributes taken from the result.
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name) as opened:
+                result = func(*args, **kwargs)
+                if describe is not None:
+                    opened.set(**describe(result))
+                return result
+        return wrapper
+    return decorator
+
+
+def server_timing(root: Span) -> str:
+    """
+    Server-Timing header value: the root span's direct children, durations
+    of same-named ones added up, then the total and the trace id.
+    """
+    totals: Dict[str, float] = {}
+    for child_name, ms in root.children:
+        totals[child_name] = totals.get(child_name, 0.0) + ms
+    metrics = [f"{_metric_name(n)};dur={ms:.1f}" for n, ms in totals.items()]
+    metrics.append(f"total;dur={root.duration_ms:.1f}")
+    metrics.append(f'trace;desc="{root.trace_id}"')
+    return ", ".join(metrics)
+
+
+# ---------------------------------------------------------------------------
+# Private helpers
+# ---------------------------------------------------------------------------
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def _otlp_attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def _parse_headers(raw: str) -> Dict[str, str]:
+    """OTEL_EXPORTER_OTLP_HEADERS format: "key1=value1,key2=value2"."""
+    headers = {}
+    for pair in raw.split(","):
+        if "=" in pair:
+            key, value = pair.split("=", 1)
+            headers[key.strip()] = value.strip()
+    return headers
@@ -0,0 +1,264 @@
+"""
+Upload Store Module
+Keeps uploaded test case workbooks, their parsed rows and mapping results on
+local disk under a content-hash handle, so a workbook is uploaded and parsed
+once per session instead of on every mapping/download request.
+
+Entries live in one directory per handle and are shared by every worker
+process pointing at the same root. Eviction is by TTL (time since last
+access) and then least-recently-used until the store fits its size budget.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024     # 512MB across all entries
+DEFAULT_TTL_SECONDS = 4 * 60 * 60         # 4 hours since last access
+
+_SOURCE_FILE = "source.bin"
+_META_FILE = "meta.json"
+_ROWS_FILE = "rows.json"
+_COPY_CHUNK = 1024 * 1024
+
+
+class UploadNotFoundError(KeyError):
+    """Raised when an upload handle is unknown or has been evicted."""
+
+
+class UploadStore:
+    """
+    Disk-backed store of uploaded workbooks keyed by content hash.
+
+    Usage:
+        store = UploadStore.from_env()
+        handle = store.put(request.files["excel_file"].stream, "suite.xlsx")
+        rows = store.get_rows(handle)            # None until put_rows()
+        store.put_mapping(handle, mapping_id, mapping_data)
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        """
+        Args:
+            root:        Directory holding one sub-directory per upload.
+            max_bytes:   Total size budget; least-recently-used entries are
+                         evicted beyond it.
+            ttl_seconds: Entries not accessed for this long are evicted.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(root, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Factory
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_env(cls) -> "UploadStore":
+        """
+        Create a store from UPLOAD_STORE_DIR, UPLOAD_STORE_MAX_MB and
+        UPLOAD_STORE_TTL_SECONDS (all optional).
+        """
+        root = os.getenv("UPLOAD_STORE_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "tsg_uploads")
+        max_mb = int(os.getenv("UPLOAD_STORE_MAX_MB", DEFAULT_MAX_BYTES // (1024 * 1024)))
+        ttl = int(os.getenv("UPLOAD_STORE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        return cls(root=root, max_bytes=max_mb * 1024 * 1024, ttl_seconds=ttl)
+
+    # ------------------------------------------------------------------
+    # Public API: uploads
+    # ------------------------------------------------------------------
+
+    def put(self, stream: BinaryIO, filename: str) -> str:
+        """
+        Spool an uploaded file to disk and return its content-hash handle.
+
+        Uploading identical bytes again returns the same handle and keeps
+        any rows/mappings already stored for it.
+        """
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = stream.read(_COPY_CHUNK)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+            handle = digest.hexdigest()[:32]
+            entry_dir = self._entry_dir(handle)
+            if os.path.isdir(entry_dir):
+                os.remove(tmp_path)
+                self._touch(handle)
+                return handle
+
+            os.makedirs(entry_dir, exist_ok=True)
+            os.replace(tmp_path, os.path.join(entry_dir, _SOURCE_FILE))
+            self._write_json(handle, _META_FILE, {"filename": filename, "created_at": time.time()})
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict()
+        return handle
+
+    def put_bytes(self, file_bytes: bytes, filename: str) -> str:
+        """Convenience wrapper around put() for in-memory uploads."""
+        return self.put(io.BytesIO(file_bytes), filename)
+
+    def get_bytes(self, handle: str) -> bytes:
+        """Return the raw uploaded bytes for a handle."""
+        path = os.path.join(self._require(handle), _SOURCE_FILE)
+        with open(path, "rb") as fh:
+            data = fh.read()
+        self._touch(handle)
+        return data
+
+    def get_meta(self, handle: str) -> Dict:
+        """Return the stored metadata (filename, created_at) for a handle."""
+        return self._read_json(handle, _META_FILE) or {}
+
+    def put_bundle(self, handles: List[str], options: Dict) -> str:
+        """
+        Group several uploads (e.g. multi-workbook ingestion) under one handle.
+
+        The bundle stores no bytes of its own; its rows and mappings are kept
+        like any other entry. ``options`` records how the members are parsed.
+        """
+        for handle in handles:
+            self._require(handle)
+        digest = hashlib.sha256(json.dumps({"bundle": handles, "options": options}, sort_keys=True).encode())
+        handle = digest.hexdigest()[:32]
+        if not self.exists(handle):
+            os.makedirs(self._entry_dir(handle), exist_ok=True)
+            self._write_json(handle, _META_FILE, {"bundle": handles, "options": options, "created_at": time.time()})
+        self._touch(handle)
+        return handle
+
+    def get_bundle(self, handle: str) -> Optional[Tuple[List[str], Dict]]:
+        """Return (member handles, options) for a bundle handle, or None for a plain upload."""
+        meta = self.get_meta(handle)
+        if "bundle" not in meta:
+            return None
+        return meta["bundle"], meta.get("options", {})
+
+    def exists(self, handle: str) -> bool:
+        return self._valid_handle(handle) and os.path.isdir(self._entry_dir(handle))
+
+    # ------------------------------------------------------------------
+    # Public API: parsed rows and mapping results
+    # ------------------------------------------------------------------
+
+    def get_rows(self, handle: str):
+        """Return parsed rows stored for a handle, or None if not parsed yet."""
+        return self._read_json(handle, _ROWS_FILE)
+
+    def put_rows(self, handle: str, rows) -> None:
+        """Store parsed rows (any JSON value, e.g. TestSuiteTable.to_json())."""
+        self._write_json(handle, _ROWS_FILE, rows)
+
+    def get_mapping(self, handle: str, mapping_id: str) -> Optional[Dict]:
+        """Return a stored mapping result, or None if unknown."""
+        if not self._valid_handle(mapping_id):
+            return None
+        return self._read_json(handle, f"mapping-{mapping_id}.json")
+
+    def put_mapping(self, handle: str, mapping_id: str, mapping_data: Dict) -> None:
+        """Store a mapping result under the upload it was computed from."""
+        if not self._valid_handle(mapping_id):
+            raise ValueError(f"Invalid mapping id: {mapping_id!r}")
+        self._write_json(handle, f"mapping-{mapping_id}.json", mapping_data)
+
+    @staticmethod
+    def mapping_id_for(handle: str, generated_cases: List[Dict]) -> str:
+        """Deterministic id for mapping an upload against a set of generated cases."""
+        digest = hashlib.sha256(handle.encode())
+        digest.update(json.dumps(generated_cases, sort_keys=True).encode())
+        return digest.hexdigest()[:32]
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+
+    def evict(self) -> None:
+        """Drop entries past their TTL, then least-recently-used ones over budget."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, name)
+            if name.startswith(".") or not os.path.isdir(entry_dir):
+                continue
+            try:
+                last_access = os.path.getmtime(entry_dir)
+                size = sum(
+                    os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir)
+                )
+            except OSError:
+                continue  # removed concurrently by another worker
+            if now - last_access > self.ttl_seconds:
+                self._remove(entry_dir)
+            else:
+                entries.append((last_access, size, entry_dir))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(entry_dir)
+            total -= size
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _valid_handle(handle: str) -> bool:
+        return bool(handle) and len(handle) <= 64 and all(c in "0123456789abcdef" for c in handle)
+
+    def _entry_dir(self, handle: str) -> str:
+        return os.path.join(self.root, handle)
+
+    def _require(self, handle: str) -> str:
+        if not self.exists(handle):
+            raise UploadNotFoundError(handle)
+        return self._entry_dir(handle)
+
+    def _touch(self, handle: str) -> None:
+        try:
+            os.utime(self._entry_dir(handle))
+        except OSError:
+            pass
+
+    def _read_json(self, handle: str, name: str):
+        path = os.path.join(self._require(handle), name)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return None
+        self._touch(handle)
+        return data
+
+    def _write_json(self, handle: str, name: str, data) -> None:
+        entry_dir = self._require(handle)
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, separators=(",", ":"))
+        os.replace(tmp_path, os.path.join(entry_dir, name))
+        self._touch(handle)
+
+    @staticmethod
+    def _remove(entry_dir: str) -> None:
+        logger.info("Evicting upload %s", os.path.basename(entry_dir))
+        shutil.rmtree(entry_dir, ignore_errors=True)
@@ -0,0 +1,204 @@
+"""
+Webhooks Module
+Receives GitHub ``pull_request`` webhooks and precomputes test cases in the
+background, so they are ready before anyone opens the PR in the app.
+
+Deliveries are authenticated with the ``X-Hub-Signature-256`` HMAC of the
+shared webhook secret. Pushes to a PR are debounced: each new head SHA
+restarts the PR's timer, so a burst of ``synchronize`` events analyses only
+the last SHA. GitHub spreads a burst over every worker process, so the
+newest SHA of each PR is also recorded in a SQLite row shared by the
+workers; a worker analyses a SHA only after claiming that row, so each SHA
+is analysed once however many workers received its deliveries. Analyses
+run on a small bounded pool; results are stored by head SHA (see
+ResultStore.put_pr_analysis) for /api/analyze-pr to serve.
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE_SECONDS = 20.0
+DEFAULT_MAX_CONCURRENCY = 2
+CLAIM_TIMEOUT_SECONDS = 30 * 60     # a claim this old belongs to a worker that died mid-analysis
+
+# pull_request actions that (may) bring new code to analyse
+ANALYSE_ACTIONS = ("opened", "reopened", "synchronize", "ready_for_review")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pr_heads (
+    pr_key      TEXT PRIMARY KEY,
+    head_sha    TEXT NOT NULL,
+    due_at      REAL NOT NULL,
+    claimed_at  REAL
+);
+"""
+
+
+def verify_signature(secret: str, body: bytes, signature_header: Optional[str]) -> bool:
+    """True when ``signature_header`` ("sha256=<hex>") is body's HMAC under secret."""
+    if not secret or not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header)
+
+
+def pull_request_target(payload: Dict) -> Tuple[str, str, int, str]:
+    """(owner, repo, PR number, head SHA) from a pull_request event payload."""
+    owner, repo = payload["repository"]["full_name"].split("/", 1)
+    pull = payload["pull_request"]
+    return owner, repo, int(pull["number"]), pull["head"]["sha"]
+
+
+class PRPrecomputer:
+    """
+    Debounced, bounded background analysis of pull requests by head SHA.
+
+    Usage:
+        precomputer = PRPrecomputer(analyse, state_path)      # analyse(owner, repo, number, head_sha)
+        precomputer.schedule("octo", "app", 7, "9f2c...")
+    """
+
+    def __init__(
+        self,
+        analyse: Callable[[str, str, int, str], None],
+        state_path: str,
+        debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
+        """
+        Args:
+            analyse:          Runs and stores one analysis; called on the pool.
+            state_path:       SQLite file shared by every worker process.
+            debounce_seconds: Quiet period after the last push before analysing.
+            max_concurrency:  Analyses running at once.
+        """
+        self.analyse = analyse
+        self.state_path = state_path
+        self.debounce_seconds = debounce_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="precompute")
+        self._lock = threading.Lock()
+        self._timers: Dict[str, threading.Timer] = {}
+        self._latest: Dict[str, str] = {}       # PR key → newest head SHA seen by this worker
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls, analyse: Callable[[str, str, int, str], None]) -> "PRPrecomputer":
+        """
+        Create a precomputer sharing WEBHOOK_STATE_PATH (default: the system
+        temp dir), from WEBHOOK_DEBOUNCE_SECONDS and WEBHOOK_MAX_CONCURRENCY.
+        """
+        state_path = os.getenv("WEBHOOK_STATE_PATH", "").strip() or os.path.join(
+            tempfile.gettempdir(), "tsg_webhooks.sqlite"
+        )
+        return cls(
+            analyse,
+            state_path,
+            debounce_seconds=float(os.getenv("WEBHOOK_DEBOUNCE_SECONDS", DEFAULT_DEBOUNCE_SECONDS)),
+            max_concurrency=int(os.getenv("WEBHOOK_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+        )
+
+    def schedule(self, owner: str, repo: str, pr_number: int, head_sha: str) -> None:
+        """(Re)start the PR's debounce timer for head_sha, superseding earlier SHAs."""
+        key = f"{owner}/{repo}#{pr_number}"
+        timer = threading.Timer(self.debounce_seconds, self._submit, args=(owner, repo, pr_number, head_sha))
+        timer.daemon = True
+        with self._connect() as conn:
+            # A new SHA supersedes the PR's claim; a redelivered one only restarts the quiet period
+            conn.execute(
+                "INSERT INTO pr_heads (pr_key, head_sha, due_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(pr_key) DO UPDATE SET head_sha = excluded.head_sha, due_at = excluded.due_at, "
+                "claimed_at = CASE WHEN head_sha = excluded.head_sha THEN claimed_at END",
+                (key, head_sha, time.time() + self.debounce_seconds),
+            )
+        with self._lock:
+            previous = self._timers.pop(key, None)
+            if previous is not None:
+                previous.cancel()
+            self._timers[key] = timer
+            self._latest[key] = head_sha
+        timer.start()
+
+    def cancel(self, owner: str, repo: str, pr_number: int) -> None:
+        """Drop a pending analysis (e.g. the PR was closed)."""
+        key = f"{owner}/{repo}#{pr_number}"
+        with self._lock:
+            timer = self._timers.pop(key, None)
+            self._latest.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pr_heads WHERE pr_key = ?", (key,))
+
+    def pending(self) -> int:
+        """PRs waiting out their debounce period."""
+        with self._lock:
+            return len(self._timers)
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _submit(self, owner: str, repo: str, pr_number: int, head_sha: str) -> None:
+        key = f"{owner}/{repo}#{pr_number}"
+        with self._lock:
+            if self._latest.get(key) != head_sha:
+                return
+            self._timers.pop(key, None)
+        self._pool.submit(self._run, key, owner, repo, pr_number, head_sha)
+
+    def _run(self, key: str, owner: str, repo: str, pr_number: int, head_sha: str) -> None:
+        with self._lock:
+            if self._latest.get(key) != head_sha:
+                return  # a newer push arrived while queued
+        claimed_at = self._claim(key, head_sha)
+        try:
+            if claimed_at is not None:
+                self.analyse(owner, repo, pr_number, head_sha)
+        except Exception:
+            logger.exception("Precomputing %s at %s failed", key, head_sha[:12])
+        finally:
+            with self._lock:
+                if self._latest.get(key) == head_sha:
+                    del self._latest[key]
+            if claimed_at is not None:
+                with self._connect() as conn:
+                    conn.execute(
+                        "DELETE FROM pr_heads WHERE pr_key = ? AND head_sha = ? AND claimed_at = ?",
+                        (key, head_sha, claimed_at),
+                    )
+
+    def _claim(self, key: str, head_sha: str) -> Optional[float]:
+        """
+        Claim the PR's shared row for head_sha; returns the claim time, or
+        None when another worker saw a newer push, a later delivery of the
+        same SHA is still in its quiet period, or the SHA is being analysed.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE pr_heads SET claimed_at = ? WHERE pr_key = ? AND head_sha = ? AND due_at <= ? "
+                "AND (claimed_at IS NULL OR claimed_at < ?)",
+                (now, key, head_sha, now, now - CLAIM_TIMEOUT_SECONDS),
+            ).rowcount
+        return now if claimed else None
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit; each UPDATE is atomic across workers
+        conn = sqlite3.connect(self.state_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,296 @@
+"""
+Zephyr Cycles Module
+Pushes decided mappings to Zephyr Scale as a new test cycle with executions.
+
+Runs after decision_rules.apply_decision(). Every RUN mapping whose test id
+is a Zephyr Scale key (suites mapped from a story via the mirror, or any
+export carrying the keys) is linked as is; MUST_ADD_AND_RUN cases are
+created first through ZephyrScaleClient.bulk_create_test_cases(). The
+executions are then added to the cycle in batches of RESULT_BATCH_SIZE; a
+batch the server rejects is retried item by item, on the client's worker
+pool, so one bad key fails one item rather than a hundred.
+
+Each step is appended to a progress log (one JSON Lines file per job in
+ZEPHYR_PUSH_DIR) before moving on. Posting the same push again replays
+the log: created cases, the cycle and executed batches are not repeated,
+and only what failed or never ran is sent.
+
+Usage:
+    pusher = CyclePusher(ZephyrScaleClient.from_env())
+    report = pusher.push(mappings, new_generated, "Regression PR #42", story_id="PROJ-123")
+    report.to_dict()    # cycle key, counts, failures, items per second
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from src.jira_client import ZephyrError, ZephyrScaleClient, ZephyrTestCase
+from src.progress import current as current_progress, stage
+
+logger = logging.getLogger(__name__)
+
+# Decisions that put a test in the cycle
+CYCLE_DECISIONS = ("RUN", "MUST_ADD_AND_RUN")
+
+RESULT_BATCH_SIZE = 100
+EXECUTION_STATUS = "Not Executed"
+
+ZEPHYR_KEY_RE = re.compile(r"^[A-Z][A-Z0-9_]*-T\d+$")
+
+
+@dataclass
+class CycleItem:
+    """One test going into the cycle."""
+    ref: str                                    # stable id within the push (log key)
+    decision: str
+    title: str
+    test_key: Optional[str] = None              # known Zephyr Scale key
+    test_case: Optional[ZephyrTestCase] = None  # to create when there is no key
+    comment: str = ""
+
+
+@dataclass
+class CyclePushReport:
+    """Outcome of a push: the cycle plus per-item failures and skips."""
+    job_id: str
+    cycle_key: Optional[str]
+    items: int
+    created: int = 0        # test cases created in Zephyr Scale by this push
+    pushed: int = 0         # executions in the cycle so far
+    pushed_now: int = 0     # ... of which sent by this call
+    resumed: bool = False
+    failed: List[Dict] = field(default_factory=list)
+    skipped: List[Dict] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "cycle_key": self.cycle_key,
+            "summary": {
+                "items": self.items,
+                "created": self.created,
+                "pushed": self.pushed,
+                "failed": len(self.failed),
+                "skipped": len(self.skipped),
+                "resumed": self.resumed,
+                "seconds": round(self.seconds, 2),
+                "items_per_second": round(self.pushed_now / self.seconds, 1) if self.seconds else None,
+            },
+            "failed": self.failed,
+            "skipped": self.skipped,
+        }
+
+
+def cycle_items(mappings: List[Dict], new_generated: List[Dict],
+                decisions: Sequence[str] = CYCLE_DECISIONS) -> List[CycleItem]:
+    """The tests a push covers: decided suite rows, then new generated cases."""
+    items = []
+    for m in mappings:
+        decision = m.get("execution_decision")
+        if decision not in decisions:
+            continue
+        raw_id = str(m.get("raw_id") or "").strip()
+        # raw_id of multi-sheet rows is prefixed with "<sheet> / "; the key is the bare test id
+        test_id = str(m.get("test_id") or raw_id).strip()
+        origin = "/".join(str(m.get(k) or "") for k in ("workbook", "sheet"))
+        items.append(CycleItem(
+            ref=f"row:{origin}:{m.get('excel_row_index')}:{raw_id}",
+            decision=decision,
+            title=raw_id or m.get("generated_title") or "",
+            test_key=test_id if ZEPHYR_KEY_RE.match(test_id) else None,
+            comment=m.get("execution_reason") or "",
+        ))
+    if "MUST_ADD_AND_RUN" in decisions:
+        for tc in new_generated:
+            items.append(CycleItem(
+                ref=f"new:{tc.get('id', '')}:{tc.get('title', '')}",
+                decision="MUST_ADD_AND_RUN",
+                title=tc.get("title", ""),
+                test_case=ZephyrTestCase.from_generated(tc),
+                comment="New test case — no existing test covers this change.",
+            ))
+    return items
+
+
+class CycleProgressLog:
+    """Append-only JSON Lines record of a push's finished steps."""
+
+    def __init__(self, root: str, job_id: str):
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, f"{job_id}.jsonl")
+
+    @staticmethod
+    def default_root() -> str:
+        return os.getenv("ZEPHYR_PUSH_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "tsg_zephyr_push")
+
+    @staticmethod
+    def job_id_for(project_key: str, cycle_name: str, items: List[CycleItem]) -> str:
+        """Deterministic job id: the same cycle name and items resume the same push."""
+        refs = sorted(i.ref for i in items)
+        return hashlib.sha256("\n".join([project_key, cycle_name, *refs]).encode()).hexdigest()[:16]
+
+    def load(self) -> Dict:
+        """Replay the log: {"cycle_key", "created": {ref: key}, "pushed": {refs}}."""
+        state = {"cycle_key": None, "created": {}, "pushed": set()}
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue    # last line cut off by an interrupted run
+                    if event["event"] == "cycle":
+                        state["cycle_key"] = event["key"]
+                    elif event["event"] == "created":
+                        state["created"][event["ref"]] = event["key"]
+                    elif event["event"] == "pushed":
+                        state["pushed"].update(event["refs"])
+        except FileNotFoundError:
+            pass
+        return state
+
+    def append(self, event: Dict) -> None:
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(event, separators=(",", ":")) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class CyclePusher:
+    """Creates a Zephyr Scale test cycle from decided mappings, resumably."""
+
+    def __init__(self, client: ZephyrScaleClient, progress_root: Optional[str] = None,
+                 batch_size: int = RESULT_BATCH_SIZE):
+        self.client = client
+        self.progress_root = progress_root or CycleProgressLog.default_root()
+        self.batch_size = max(int(batch_size), 1)
+
+    def job_id(self, mappings: List[Dict], new_generated: List[Dict], cycle_name: str,
+               decisions: Sequence[str] = CYCLE_DECISIONS) -> str:
+        """The id push() logs under: the same arguments always resume the same push."""
+        items = cycle_items(mappings, new_generated, decisions)
+        return CycleProgressLog.job_id_for(self.client.project_key, cycle_name, items)
+
+    def push(
+        self,
+        mappings: List[Dict],
+        new_generated: List[Dict],
+        cycle_name: str,
+        story_id: Optional[str] = None,
+        folder: Optional[str] = None,
+        decisions: Sequence[str] = CYCLE_DECISIONS,
+    ) -> CyclePushReport:
+        """
+        Push the decided tests as a new test cycle named cycle_name.
+
+        Returns:
+            CyclePushReport; items that failed are listed and are retried
+            by calling push() again with the same arguments.
+
+        Raises:
+            ZephyrError: when the cycle itself cannot be created.
+        """
+        started = time.monotonic()
+        items = cycle_items(mappings, new_generated, decisions)
+        job_id = CycleProgressLog.job_id_for(self.client.project_key, cycle_name, items)
+        log = CycleProgressLog(self.progress_root, job_id)
+        state = log.load()
+        report = CyclePushReport(
+            job_id=job_id,
+            cycle_key=state["cycle_key"],
+            items=len(items),
+            resumed=bool(state["cycle_key"] or state["created"]),
+        )
+
+        # 1. Create the test cases that have no Zephyr Scale key yet
+        to_create = [i for i in items if not i.test_key and i.test_case and i.ref not in state["created"]]
+        if to_create:
+            with stage("zephyr_create"):
+                results = self.client.bulk_create_test_cases([i.test_case for i in to_create], story_id)
+            for item, result in zip(to_create, results):
+                if result.key and result.action != "failed":
+                    state["created"][item.ref] = result.key
+                    log.append({"event": "created", "ref": item.ref, "key": result.key})
+                    report.created += result.action == "created"
+                else:
+                    report.failed.append({"ref": item.ref, "title": item.title, "step": "create", "error": result.error})
+
+        failed_refs = {f["ref"] for f in report.failed}
+        keyed = []
+        for item in items:
+            key = item.test_key or state["created"].get(item.ref)
+            if key:
+                keyed.append((item, key))
+            elif item.ref not in failed_refs:
+                report.skipped.append({"ref": item.ref, "title": item.title, "reason": "No Zephyr Scale test key"})
+
+        # 2. The cycle
+        if not state["cycle_key"]:
+            with stage("zephyr_cycle"):
+                state["cycle_key"] = self.client.create_test_cycle(cycle_name, story_id, folder)
+            log.append({"event": "cycle", "key": state["cycle_key"]})
+        report.cycle_key = state["cycle_key"]
+
+        # 3. Executions, in batches; a rejected batch is retried item by item
+        pending = [(i, k) for i, k in keyed if i.ref not in state["pushed"]]
+        progress = current_progress()
+        with stage("zephyr_execute"):
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                try:
+                    self.client.add_test_results(report.cycle_key, [self._result(i, k) for i, k in batch])
+                    done = [i.ref for i, _ in batch]
+                except ZephyrError as exc:
+                    logger.warning("Test result batch rejected (%s); retrying %d items singly", exc, len(batch))
+                    done = self._push_singly(report, batch)
+                if done:
+                    log.append({"event": "pushed", "refs": done})
+                    state["pushed"].update(done)
+                    report.pushed_now += len(done)
+                progress.items(min(start + len(batch), len(pending)), len(pending), batch[-1][1])
+
+        report.pushed = sum(1 for i, _ in keyed if i.ref in state["pushed"])
+        report.seconds = time.monotonic() - started
+        logger.info("Zephyr cycle %s: %s", report.cycle_key, report.to_dict()["summary"])
+        return report
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _push_singly(self, report: CyclePushReport, batch) -> List[str]:
+        def push_one(pair):
+            item, key = pair
+            try:
+                self.client.add_test_results(report.cycle_key, [self._result(item, key)])
+                return item.ref, None
+            except ZephyrError as exc:
+                return item.ref, str(exc)
+
+        done = []
+        with ThreadPoolExecutor(max_workers=self.client.max_workers) as pool:
+            for (item, key), (ref, error) in zip(batch, pool.map(push_one, batch)):
+                if error:
+                    report.failed.append({"ref": ref, "title": item.title, "key": key, "step": "execute", "error": error})
+                else:
+                    done.append(ref)
+        return done
+
+    @staticmethod
+    def _result(item: CycleItem, key: str) -> Dict:
+        return {"testCaseKey": key, "status": EXECUTION_STATUS, "comment": f"{item.decision}: {item.comment}".strip()}
@@ -0,0 +1,309 @@
+"""
+Zephyr Mirror Module
+Keeps a local SQLite copy of a Zephyr Scale project's test cases.
+
+The first sync crawls the whole project, fetching ZEPHYR_MIRROR_WORKERS
+search pages at a time. Later syncs only ask for test cases updated since
+the watermark — the newest ``updatedOn`` seen, taken from the server so
+clock skew does not matter. Searches cannot report deletions, so a full
+crawl runs again every ZEPHYR_MIRROR_FULL_SYNC_HOURS and drops cases it
+no longer sees. A full crawl can take minutes, so ensure_fresh() (called
+while serving requests) never starts one on a populated mirror; run it
+from cron or a background job when full_sync_due().
+
+Test cases are indexed by linked story and by folder, so the mapper can
+read a story's existing tests locally (suite_jsonl() produces an upload
+the suite parser reads like any export) instead of paging the project or
+waiting for an Excel upload.
+
+Usage:
+    mirror = ZephyrMirror.from_env(ZephyrScaleClient.from_env())
+    mirror.ensure_fresh()
+    cases = mirror.test_cases_for_story("PROJ-123")
+    if mirror.full_sync_due():
+        mirror.sync(full=True)      # in the background
+
+    python -m src.zephyr_mirror [--full]      # e.g. from cron
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from src.jira_client import SEARCH_PAGE_SIZE, ZephyrScaleClient, ZephyrTestCase
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_FULL_SYNC_HOURS = 24
+DEFAULT_MAX_AGE_SECONDS = 300       # ensure_fresh(): sync when the last one is older
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_cases (
+    key        TEXT PRIMARY KEY,
+    folder     TEXT,
+    updated_on TEXT,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_test_cases_folder ON test_cases(folder);
+CREATE TABLE IF NOT EXISTS story_links (
+    story_key TEXT NOT NULL,
+    test_key  TEXT NOT NULL,
+    PRIMARY KEY (story_key, test_key)
+);
+CREATE INDEX IF NOT EXISTS idx_story_links_test ON story_links(test_key);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name  TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class ZephyrMirror:
+    """Local, incrementally synced copy of one project's Zephyr Scale test cases."""
+
+    def __init__(self, db_path: str, client: ZephyrScaleClient, max_workers: int = DEFAULT_WORKERS,
+                 full_sync_seconds: float = DEFAULT_FULL_SYNC_HOURS * 3600):
+        self.db_path = db_path
+        self.client = client
+        self.max_workers = max(int(max_workers), 1)
+        self.full_sync_seconds = full_sync_seconds
+        self._sync_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls, client: ZephyrScaleClient) -> "ZephyrMirror":
+        """Mirror in ZEPHYR_MIRROR_PATH (default: the system temp dir, one file per project)."""
+        db_path = os.getenv("ZEPHYR_MIRROR_PATH", "").strip() or os.path.join(
+            tempfile.gettempdir(), f"tsg_zephyr_{client.project_key or 'default'}.sqlite"
+        )
+        return cls(
+            db_path,
+            client,
+            max_workers=int(os.getenv("ZEPHYR_MIRROR_WORKERS", DEFAULT_WORKERS)),
+            full_sync_seconds=float(os.getenv("ZEPHYR_MIRROR_FULL_SYNC_HOURS", DEFAULT_FULL_SYNC_HOURS)) * 3600,
+        )
+
+    # ------------------------------------------------------------------
+    # Public API — sync
+    # ------------------------------------------------------------------
+
+    def sync(self, full: Optional[bool] = None) -> Dict:
+        """
+        Bring the mirror up to date.
+
+        Args:
+            full: True forces a full crawl, False an incremental one; None
+                  (default) crawls fully when the mirror is empty or the
+                  last full crawl is older than full_sync_seconds.
+
+        Returns:
+            {"mode", "fetched", "deleted", "total", "watermark", "seconds"}
+
+        Raises:
+            ZephyrError: when Zephyr Scale cannot be read.
+        """
+        with self._sync_lock:
+            started = time.monotonic()
+            state = self._state()
+            watermark = state.get("watermark")
+            if full is None:
+                full = self._full_sync_due(state)
+
+            query = f'projectKey = "{self.client.project_key}"'
+            if full:
+                items = self._crawl(query)
+            else:
+                items = list(self.client.iter_test_cases(f'{query} AND updatedOn >= "{watermark}"'))
+
+            deleted = self._store(items, replace_all=full)
+            newest = max((i.get("updatedOn") or "" for i in items), default="")
+            state_update = {"watermark": max(newest, watermark or ""), "synced_at": str(time.time())}
+            if full:
+                state_update["full_synced_at"] = state_update["synced_at"]
+            self._set_state(state_update)
+
+            stats = {
+                "mode": "full" if full else "incremental",
+                "fetched": len(items),
+                "deleted": deleted,
+                "total": self.count(),
+                "watermark": state_update["watermark"] or None,
+                "seconds": round(time.monotonic() - started, 2),
+            }
+            logger.info("Zephyr mirror sync: %s", stats)
+            return stats
+
+    def ensure_fresh(self, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS) -> Optional[Dict]:
+        """
+        Sync incrementally when the last sync is older than max_age_seconds;
+        returns its stats, or None. Only a mirror that was never synced is
+        crawled here; a due full crawl is left to the caller.
+        """
+        state = self._state()
+        if time.time() - float(state.get("synced_at") or 0) <= max_age_seconds:
+            return None
+        return self.sync(full=not state.get("watermark"))
+
+    def full_sync_due(self) -> bool:
+        """True when the mirror is empty or its last full crawl is older than full_sync_seconds."""
+        return self._full_sync_due(self._state())
+
+    # ------------------------------------------------------------------
+    # Public API — reads (local only)
+    # ------------------------------------------------------------------
+
+    def test_cases_for_story(self, story_key: str) -> List[ZephyrTestCase]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT tc.data FROM story_links sl JOIN test_cases tc ON tc.key = sl.test_key "
+                "WHERE sl.story_key = ?",
+                (story_key,),
+            ).fetchall()
+        return self._cases(rows)
+
+    def test_cases_in_folder(self, folder: str, recursive: bool = True) -> List[ZephyrTestCase]:
+        folder = "/" + folder.strip("/")
+        with self._connect() as conn:
+            if recursive:
+                prefix = folder.rstrip("/") + "/"
+                rows = conn.execute(
+                    "SELECT data FROM test_cases WHERE folder = ? OR substr(folder, 1, ?) = ?",
+                    (folder, len(prefix), prefix),
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT data FROM test_cases WHERE folder = ?", (folder,)).fetchall()
+        return self._cases(rows)
+
+    def suite_jsonl(self, story_key: str) -> bytes:
+        """
+        A story's test cases as a JSON Lines suite export (Test ID, Test
+        Scenario, Description, Precondition, Test Steps, Expected Result,
+        Priority), for ExcelProcessor and the mapping endpoints.
+        """
+        lines = []
+        for tc in self.test_cases_for_story(story_key):
+            lines.append(json.dumps({
+                "Test ID": tc.id,
+                "Test Scenario": tc.summary,
+                "Description": tc.description,
+                "Precondition": tc.precondition,
+                "Test Steps": "\n".join(f"{n}. {step}" for n, step in enumerate(tc.test_steps, start=1)),
+                "Expected Result": tc.expected_result,
+                "Priority": tc.priority or "",
+            }, ensure_ascii=False))
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM test_cases").fetchone()[0]
+
+    def status(self) -> Dict:
+        state = self._state()
+        return {
+            "project_key": self.client.project_key,
+            "test_cases": self.count(),
+            "watermark": state.get("watermark") or None,
+            "synced_at": float(state["synced_at"]) if state.get("synced_at") else None,
+            "full_synced_at": float(state["full_synced_at"]) if state.get("full_synced_at") else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+
+    def _full_sync_due(self, state: Dict[str, str]) -> bool:
+        last_full = float(state.get("full_synced_at") or 0)
+        return not state.get("watermark") or time.time() - last_full > self.full_sync_seconds
+
+    def _crawl(self, query: str) -> List[Dict]:
+        """Every matching case, fetching max_workers pages at a time until a short page."""
+        items: List[Dict] = []
+        start = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                offsets = [start + n * SEARCH_PAGE_SIZE for n in range(self.max_workers)]
+                pages = list(pool.map(
+                    lambda offset: self.client.search_test_cases(query, offset, SEARCH_PAGE_SIZE), offsets
+                ))
+                for page in pages:
+                    items.extend(page)
+                if any(len(page) < SEARCH_PAGE_SIZE for page in pages):
+                    return items
+                start = offsets[-1] + SEARCH_PAGE_SIZE
+
+    def _store(self, items: Iterable[Dict], replace_all: bool) -> int:
+        """Upsert items (and their story links); with replace_all, delete cases not among them."""
+        items = list(items)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for item in items:
+                key = item["key"]
+                conn.execute(
+                    "INSERT OR REPLACE INTO test_cases (key, folder, updated_on, data) VALUES (?, ?, ?, ?)",
+                    (key, item.get("folder") or "", item.get("updatedOn") or "", json.dumps(item)),
+                )
+                conn.execute("DELETE FROM story_links WHERE test_key = ?", (key,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO story_links (story_key, test_key) VALUES (?, ?)",
+                    [(story, key) for story in item.get("issueLinks") or []],
+                )
+            deleted = 0
+            if replace_all:
+                conn.execute("CREATE TEMP TABLE seen (key TEXT PRIMARY KEY)")
+                conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(i["key"],) for i in items])
+                deleted = conn.execute("DELETE FROM test_cases WHERE key NOT IN (SELECT key FROM seen)").rowcount
+                conn.execute("DELETE FROM story_links WHERE test_key NOT IN (SELECT key FROM seen)")
+                conn.execute("DROP TABLE seen")
+            conn.execute("COMMIT")
+        return deleted
+
+    def _state(self) -> Dict[str, str]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT name, value FROM sync_state"))
+
+    def _set_state(self, values: Dict[str, str]) -> None:
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)", values.items())
+
+    @staticmethod
+    def _cases(rows) -> List[ZephyrTestCase]:
+        cases = [ZephyrTestCase.from_zephyr(json.loads(row[0])) for row in rows]
+        return sorted(cases, key=lambda tc: (len(tc.id), tc.id))    # PROJ-T2 before PROJ-T10
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit mode; _store() manages its own transaction. WAL lets
+        # readers in other workers carry on while a sync writes.
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sync the local Zephyr Scale test case mirror.")
+    parser.add_argument("--full", action="store_true", help="Crawl the whole project instead of an incremental sync")
+    args = parser.parse_args(argv)
+
+    client = ZephyrScaleClient.from_env()
+    if client is None:
+        parser.error("set JIRA_BASE_URL, JIRA_API_TOKEN and JIRA_PROJECT_KEY")
+    stats = ZephyrMirror.from_env(client).sync(full=True if args.full else None)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
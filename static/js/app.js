@@ -12,7 +12,8 @@ const STATUS_CLASSES = {
 };
 
 // Module-level state
-let uploadedExcelFile = null;
+let uploadedExcelFiles = [];
+let uploadedExcelId = null;       // server-side upload handle for uploadedExcelFiles
 let currentMappingResult = null;
 
 // DOM references
@@ -23,22 +24,58 @@ const resultsSection = document.getElementById('resultsSection');
 const errorSection = document.getElementById('errorSection');
 
 // ============================================================
-// On page load: check Jira health
+// Dependency health (cached server-side; polled every minute)
 // ============================================================
-(async function initJiraBadge() {
+const DEPENDENCY_LABELS = { bedrock: 'AWS Bedrock', github: 'GitHub', jira: 'Jira' };
+let dependencyStatus = {};
+
+async function refreshHealth() {
     try {
-        const res = await fetch('/api/jira/health');
-        const data = await res.json();
+        const res = await fetch('/api/health');
+        const result = await res.json();
+        if (!result.success) return;
+        dependencyStatus = result.data;
+
+        const jira = dependencyStatus.jira || {};
         const badge = document.getElementById('jiraBadge');
-        if (data.enabled) {
+        if (jira.status && jira.status !== 'disabled') {
             badge.classList.remove('hidden');
-            document.getElementById('jiraDot').className = data.connected
+            const connected = jira.status === 'up';
+            document.getElementById('jiraDot').className = connected
                 ? 'jira-dot jira-dot-connected'
                 : 'jira-dot jira-dot-disconnected';
-            document.getElementById('jiraBadgeText').textContent = data.connected ? 'Jira Connected' : 'Jira Error';
+            document.getElementById('jiraBadgeText').textContent = connected ? 'Jira Connected' : 'Jira Error';
+            badge.title = connected && jira.latency_ms != null
+                ? `Jira + Zephyr Scale (${Math.round(jira.latency_ms)} ms)`
+                : 'Jira + Zephyr Scale';
         }
+        applyDependencyState();
     } catch (_) {}
-})();
+}
+
+function isDown(name) {
+    return (dependencyStatus[name] || {}).status === 'down';
+}
+
+// Generation and mapping both need Bedrock; PR analysis also needs GitHub
+function applyDependencyState() {
+    const activeTab = document.querySelector('.tab-btn.active').dataset.tab;
+    const needed = activeTab === 'pr-url' ? ['bedrock', 'github'] : ['bedrock'];
+    const down = needed.filter(isDown);
+
+    document.getElementById('submitBtn').disabled = down.length > 0;
+    const notice = document.getElementById('dependencyNotice');
+    if (down.length) {
+        document.getElementById('dependencyNoticeText').textContent =
+            `${down.map(d => DEPENDENCY_LABELS[d]).join(' and ')} ${down.length > 1 ? 'are' : 'is'} currently unavailable — generation and mapping are paused until ${down.length > 1 ? 'they recover' : 'it recovers'}.`;
+        notice.classList.remove('hidden');
+    } else {
+        notice.classList.add('hidden');
+    }
+}
+
+refreshHealth();
+setInterval(refreshHealth, 60000);
 
 // ============================================================
 // Tab switching
@@ -49,6 +86,7 @@ document.querySelectorAll('.tab-btn').forEach(btn => {
         btn.classList.add('active');
         document.querySelectorAll('.tab-content').forEach(c => c.classList.remove('active'));
         document.getElementById(btn.dataset.tab).classList.add('active');
+        applyDependencyState();
     });
 });
 
@@ -68,25 +106,39 @@ uploadZone.addEventListener('dragleave', () => uploadZone.classList.remove('drag
 uploadZone.addEventListener('drop', e => {
     e.preventDefault();
     uploadZone.classList.remove('drag-over');
-    if (e.dataTransfer.files[0]) setExcelFile(e.dataTransfer.files[0]);
+    if (e.dataTransfer.files.length) setExcelFiles(e.dataTransfer.files);
 });
 
 excelFileInput.addEventListener('change', () => {
-    if (excelFileInput.files[0]) setExcelFile(excelFileInput.files[0]);
+    if (excelFileInput.files.length) setExcelFiles(excelFileInput.files);
 });
 
 document.getElementById('removeFile').addEventListener('click', e => { e.stopPropagation(); clearExcelFile(); });
-
-function setExcelFile(file) {
-    if (!file.name.match(/\.(xlsx|xls)$/i)) { showError('Please upload an Excel file (.xlsx or .xls)'); return; }
-    uploadedExcelFile = file;
-    uploadFileName.textContent = file.name;
+// The stored upload handle encodes the sheet mode, so re-upload when it changes
+document.getElementById('allSheets').addEventListener('change', () => { uploadedExcelId = null; });
+
+function setExcelFiles(fileList) {
+    const files = Array.from(fileList);
+    if (files.some(f => !f.name.match(/\.(xlsx|xlsm|xls|csv|tsv|tab|jsonl|ndjson)$/i))) {
+        showError('Please upload an Excel file (.xlsx or .xls) or a CSV, TSV or JSON Lines export');
+        return;
+    }
+    uploadedExcelFiles = files;
+    uploadedExcelId = null;
+    uploadFileName.textContent = files.map(f => f.name).join(', ');
     uploadZone.classList.add('hidden');
     uploadPreview.classList.remove('hidden');
 }
 
+// All uploaded workbooks plus the all-sheets flag, as expected by the mapping endpoints
+function appendExcelFiles(formData) {
+    uploadedExcelFiles.forEach(f => formData.append('excel_file', f, f.name));
+    formData.append('all_sheets', document.getElementById('allSheets').checked ? 'true' : 'false');
+}
+
 function clearExcelFile() {
-    uploadedExcelFile = null;
+    uploadedExcelFiles = [];
+    uploadedExcelId = null;
     excelFileInput.value = '';
     uploadZone.classList.remove('hidden');
     uploadPreview.classList.add('hidden');
@@ -111,30 +163,77 @@ prForm.addEventListener('submit', async e => {
     }
 });
 
+// ============================================================
+// Stage progress (Server-Sent Events from /api/progress/<id>)
+// ============================================================
+const STAGE_STEPS = {
+    github_fetch: 1, diff_parse: 2,
+    prompt_build: 3, model_call: 3, response_parse: 3, code_generation: 3,
+    excel_parse: 4, mapping: 4, render: 4,
+};
+
+// Follow the stages of the request sent with X-Progress-Id: progress.id.
+// render(text, event) runs on every event and once a second in between.
+function watchProgress(render) {
+    const id = (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`).replace(/[^A-Za-z0-9]/g, '');
+    if (!window.EventSource) return { id, close() {} };
+
+    const source = new EventSource(`/api/progress/${id}`);
+    let current = null;
+    let receivedAt = 0;
+    const describe = () => {
+        if (!current) return;
+        const since = (Date.now() - receivedAt) / 1000;
+        let text;
+        if (current.type === 'items') {
+            text = `Analysed ${current.done} of ${current.total} pull requests`;
+        } else {
+            const elapsed = current.status === 'running' ? current.elapsed + since : current.elapsed;
+            text = `${current.label}... ${Math.round(elapsed)}s`;
+        }
+        if (current.eta_seconds != null) {
+            const left = Math.round(current.eta_seconds - since);
+            text += left > 0 ? ` (about ${left}s left)` : ' (almost done)';
+        }
+        render(text, current);
+    };
+    const onEvent = e => { current = JSON.parse(e.data); receivedAt = Date.now(); describe(); };
+    source.addEventListener('stage', onEvent);
+    source.addEventListener('items', onEvent);
+
+    const timer = setInterval(describe, 1000);
+    const close = () => { clearInterval(timer); source.close(); };
+    source.addEventListener('done', close);
+    return { id, close };
+}
+
+// Progress shown in the loading panel's step list
+function watchLoadingProgress() {
+    return watchProgress((text, event) => updateLoadingStep(STAGE_STEPS[event.stage] || 0, text));
+}
+
 // ============================================================
 // Analyze PR
 // ============================================================
 async function analyzePR(prUrl, generateCode) {
     showLoading();
+    updateLoadingStep(1, 'Fetching PR data from GitHub...');
+    const progress = watchLoadingProgress();
     try {
-        updateLoadingStep(1, 'Fetching PR data from GitHub...');
         const response = await fetch('/api/analyze-pr', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'X-Progress-Id': progress.id },
             body: JSON.stringify({ pr_url: prUrl, generate_code: generateCode }),
         });
         const result = await response.json();
         if (!result.success) { showError(result.error || 'An error occurred'); return; }
 
-        updateLoadingStep(2, 'Analysing code changes...');
-        await sleep(200);
-        updateLoadingStep(3, 'Generating structured test cases with AI...');
-        await sleep(200);
-
         await runMappingIfNeeded(result.data);
         showResults(result.data, true);
     } catch (error) {
         showError(`Network error: ${error.message}`);
+    } finally {
+        progress.close();
     }
 }
 
@@ -143,23 +242,23 @@ async function analyzePR(prUrl, generateCode) {
 // ============================================================
 async function analyzeDiff(diffText, generateCode) {
     showLoading();
+    updateLoadingStep(2, 'Analysing code changes...');
+    const progress = watchLoadingProgress();
     try {
-        updateLoadingStep(2, 'Analysing code changes...');
         const response = await fetch('/api/analyze-diff', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'X-Progress-Id': progress.id },
             body: JSON.stringify({ diff_text: diffText, generate_code: generateCode }),
         });
         const result = await response.json();
         if (!result.success) { showError(result.error || 'An error occurred'); return; }
 
-        updateLoadingStep(3, 'Generating structured test cases with AI...');
-        await sleep(200);
-
         await runMappingIfNeeded(result.data);
         showResults(result.data, false);
     } catch (error) {
         showError(`Network error: ${error.message}`);
+    } finally {
+        progress.close();
     }
 }
 
@@ -167,20 +266,36 @@ async function analyzeDiff(diffText, generateCode) {
 // Excel mapping (chained after analysis)
 // ============================================================
 async function runMappingIfNeeded(analysisData) {
-    if (!uploadedExcelFile) return;
+    if (!uploadedExcelFiles.length) return;
 
     const step4 = document.getElementById('step4');
     step4.classList.remove('hidden');
     updateLoadingStep(4, 'Mapping with your existing test cases...');
 
-    try {
+    const postMapping = async useStored => {
         const formData = new FormData();
-        formData.append('excel_file', uploadedExcelFile, uploadedExcelFile.name);
-        formData.append('structured_test_cases', JSON.stringify(analysisData.structured_test_cases || []));
+        if (useStored && uploadedExcelId) formData.append('upload_id', uploadedExcelId);
+        else appendExcelFiles(formData);
+        if (useStored && analysisData.result_id) formData.append('result_id', analysisData.result_id);
+        else formData.append('structured_test_cases', JSON.stringify(analysisData.structured_test_cases || []));
+        const progress = watchLoadingProgress();
+        try {
+            return await fetch('/api/map-excel', {
+                method: 'POST', body: formData, headers: { 'X-Progress-Id': progress.id },
+            });
+        } finally {
+            progress.close();
+        }
+    };
 
-        const res = await fetch('/api/map-excel', { method: 'POST', body: formData });
+    try {
+        // Reference the server-side workbook and result; re-post both if either expired
+        const hasStored = !!(uploadedExcelId || analysisData.result_id);
+        let res = await postMapping(hasStored);
+        if (res.status === 404 && hasStored) res = await postMapping(false);
         const result = await res.json();
         if (result.success) {
+            uploadedExcelId = result.data.upload_id || null;
             analysisData._mappingResult = result.data;
         }
     } catch (err) {
@@ -257,6 +372,8 @@ function showResults(data, isPR = true) {
     const testCasesCard = document.getElementById('testCasesCard');
     if (data.structured_test_cases && data.structured_test_cases.length > 0) {
         window.currentTestCases = data.structured_test_cases;
+        window.currentResultId = data.result_id || null;
+        if (data.result_id) history.replaceState(null, '', `#result=${data.result_id}`);
         populateTestCases(data.structured_test_cases);
         testCasesCard.classList.remove('hidden');
     } else {
@@ -422,7 +539,9 @@ document.getElementById('mappingFilters').addEventListener('click', e => {
 // Downloads
 // ============================================================
 
-// Structured test cases → Excel
+// Structured test cases → Excel / CSV / JSON Lines / Markdown
+const EXPORT_EXTENSIONS = { xlsx: 'xlsx', csv: 'csv', jsonl: 'jsonl', md: 'md' };
+
 document.getElementById('downloadCasesBtn').addEventListener('click', async () => {
     if (!window.currentTestCases || !window.currentTestCases.length) return;
 
@@ -431,15 +550,24 @@ document.getElementById('downloadCasesBtn').addEventListener('click', async () =
     btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Preparing...';
     btn.disabled = true;
 
+    const format = document.getElementById('exportFormat').value;
+    const exportCases = (payload) => fetch('/api/export-test-cases', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ...payload, format }),
+    });
+
     try {
-        const res = await fetch('/api/download-test-cases-excel', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ test_cases: window.currentTestCases }),
-        });
+        // Reference the server-side result first; post the cases if it has expired
+        let res = null;
+        if (window.currentResultId) {
+            res = await exportCases({ result_id: window.currentResultId });
+            if (res.status === 404) res = null;
+        }
+        if (!res) res = await exportCases({ test_cases: window.currentTestCases });
         if (!res.ok) throw new Error('Download failed');
         const blob = await res.blob();
-        triggerDownload(blob, `test_cases_${Date.now()}.xlsx`);
+        triggerDownload(blob, `test_cases_${Date.now()}.${EXPORT_EXTENSIONS[format]}`);
     } catch (err) {
         alert(`Download failed: ${err.message}`);
     } finally {
@@ -450,24 +578,46 @@ document.getElementById('downloadCasesBtn').addEventListener('click', async () =
 
 // Mapped Excel download
 document.getElementById('downloadMappedExcelBtn').addEventListener('click', async () => {
-    if (!uploadedExcelFile || !currentMappingResult) return;
+    if (!uploadedExcelFiles.length || !currentMappingResult) return;
 
     const btn = document.getElementById('downloadMappedExcelBtn');
     const origHtml = btn.innerHTML;
     btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Preparing...';
     btn.disabled = true;
 
-    try {
-        const formData = new FormData();
-        formData.append('excel_file', uploadedExcelFile, uploadedExcelFile.name);
-        formData.append('mapping_result', JSON.stringify(currentMappingResult));
+    // The workbook is rendered while it streams; show the stage on the button
+    let progress = null;
+    const download = body => {
+        if (progress) progress.close();
+        progress = watchProgress(text => {
+            btn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ${escapeHtml(text)}`;
+        });
+        return fetch('/api/download-mapped-excel', {
+            method: 'POST', body, headers: { 'X-Progress-Id': progress.id },
+        });
+    };
 
-        const res = await fetch('/api/download-mapped-excel', { method: 'POST', body: formData });
+    try {
+        // Reference the stored upload + mapping; fall back to a full re-post if evicted
+        let res = null;
+        if (currentMappingResult.upload_id && currentMappingResult.mapping_id) {
+            const refData = new FormData();
+            refData.append('upload_id', currentMappingResult.upload_id);
+            refData.append('mapping_id', currentMappingResult.mapping_id);
+            res = await download(refData);
+        }
+        if (!res || res.status === 404) {
+            const formData = new FormData();
+            appendExcelFiles(formData);
+            formData.append('mapping_result', JSON.stringify(currentMappingResult));
+            res = await download(formData);
+        }
         if (!res.ok) { const err = await res.json(); throw new Error(err.error || 'Download failed'); }
         triggerDownload(await res.blob(), `mapped_test_cases_${Date.now()}.xlsx`);
     } catch (err) {
         alert(`Download failed: ${err.message}`);
     } finally {
+        if (progress) progress.close();
         btn.innerHTML = origHtml;
         btn.disabled = false;
     }
@@ -495,6 +645,7 @@ document.getElementById('analyzeAnotherBtn').addEventListener('click', () => {
     document.getElementById('generateCode').checked = false;
     clearExcelFile();
     currentMappingResult = null;
+    history.replaceState(null, '', location.pathname + location.search);
     window.scrollTo({ top: 0, behavior: 'smooth' });
 });
 
@@ -503,6 +654,25 @@ document.getElementById('tryAgainBtn').addEventListener('click', () => {
     inputSection.classList.remove('hidden');
 });
 
+// ============================================================
+// Reload a stored result (page refresh or shared #result=<id> link)
+// ============================================================
+async function loadSharedResult() {
+    const match = location.hash.match(/^#result=([0-9a-f]{32})$/);
+    if (!match) return;
+    showLoading();
+    try {
+        const res = await fetch(`/api/results/${match[1]}`);
+        const result = await res.json();
+        if (!result.success) { showError(result.error || 'Result not found'); return; }
+        showResults(result.data, !!result.data.pr_info);
+    } catch (error) {
+        showError(`Network error: ${error.message}`);
+    }
+}
+
+loadSharedResult();
+
 // ============================================================
 // Error display
 // ============================================================
@@ -517,8 +687,6 @@ function showError(message) {
 // ============================================================
 // Utilities
 // ============================================================
-function sleep(ms) { return new Promise(r => setTimeout(r, ms)); }
-
 function escapeHtml(text) {
     const div = document.createElement('div');
     div.textContent = String(text);
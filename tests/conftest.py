@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from src.github_client import GitHubClient
+from tests.fake_github import FakeGitHub
+from tests.fake_zephyr import FakeZephyr
+
+
+@pytest.fixture(autouse=True)
+def github_cache(tmp_path, monkeypatch):
+    """A fresh conditional-request cache per test, so no test is answered from another's."""
+    monkeypatch.setenv("GITHUB_CACHE_DIR", str(tmp_path / "github_cache"))
+    monkeypatch.setattr(GitHubClient, "_default_cache", None)
+
+
+@pytest.fixture
+def fake_github():
+    servers = []
+
+    def start(fixture, **options) -> FakeGitHub:
+        server = FakeGitHub(fixture, **options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def fake_zephyr():
+    servers = []
+
+    def start(**options) -> FakeZephyr:
+        server = FakeZephyr(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The Flask app module, with every store in a temporary directory and all dependencies reported up."""
+    root = tmp_path_factory.mktemp("app")
+    overrides = {
+        "UPLOAD_STORE_DIR": root / "uploads",
+        "RESULT_STORE_PATH": root / "results.sqlite",
+        "COVERAGE_INDEX_DIR": root / "coverage",
+        "PROGRESS_DIR": root / "progress",
+        "HEALTH_STATE_PATH": root / "health.json",
+        "HEALTH_PROBES_ENABLED": "false",
+        "WEBHOOK_STATE_PATH": root / "webhooks.sqlite",
+        "TRACE_EXPORTER": "none",
+        "APP_USERNAME": "",
+        "APP_PASSWORD": "",
+    }
+    saved = {name: os.environ.get(name) for name in overrides}
+    os.environ.update({name: str(value) for name, value in overrides.items()})
+    import app
+    app._health.is_down = lambda name: False
+    yield app
+    for name, value in saved.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
@@ -0,0 +1,323 @@
+"""
+Fake GitHub Module
+A local stand-in for the parts of the GitHub REST API this app uses, for
+offline development and testing against huge or awkward pull requests.
+
+Serves, from a JSON fixture:
+    GET /repos/{owner}/{repo}/pulls/{n}            PR JSON, or the unified
+                                                   diff (406 when too large)
+    GET /repos/{owner}/{repo}/pulls/{n}/files      paginated, with Link headers
+    GET /repos/{owner}/{repo}/git/blobs/{sha}      base64 blob content
+    GET /repos/{owner}/{repo}/contents/{path}?ref=  base64 file content at a ref
+
+pull_request_event() builds matching webhook payloads.
+
+Responses carry ETags (and honour If-None-Match with 304) and
+X-RateLimit-* headers, like the real API.
+
+Fixture format:
+    {
+      "repos": {
+        "owner/repo": {
+          "pulls": {
+            "7": {
+              "title": "...", "body": "...", "user": "alice",
+              "base": "main", "head": "feature/x", "state": "open",
+              "base_sha": "<sha>",       # optional, as are "head_sha" and the above
+              "files": [
+                {"filename": "app.py", "status": "modified", "patch": "@@ -1 +1 @@\\n-a\\n+b"},
+                {"filename": "big.sql", "status": "added", "sha": "<blob sha>"}   # no patch
+              ],
+              "diff_too_large": true,    # optional: diff answers 406 (or this status, e.g. 422)
+              "diff_files": 1            # optional: diff lists only the first n files
+            }
+          },
+          "blobs": {"<blob sha>": "file text"},
+          "contents": {"<ref>": {"path/of/file": "file text"}}
+        }
+      }
+    }
+
+Usage:
+    python -m tests.fake_github fixture.json --port 8765
+    python -m tests.fake_github --synthetic-files 5000 --port 8765    # owner/repo#1
+    GITHUB_API_URL=http://127.0.0.1:8765 python app.py
+
+    server = FakeGitHub(fixture).start()       # in-process, on a free port
+    GitHubPRAnalyzer(base_url=server.base_url)
+    server.stop()
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+DIFF_MAX_FILES = 300            # GitHub refuses the diff media type beyond this
+RATE_LIMIT = 5000
+MAX_PER_PAGE = 100
+
+
+class FakeGitHub:
+    """Threaded HTTP server serving a fixture through a GitHub-shaped API."""
+
+    def __init__(self, fixture: Dict, host: str = "127.0.0.1", port: int = 0,
+                 diff_max_files: int = DIFF_MAX_FILES):
+        self.fixture = fixture
+        self.diff_max_files = diff_max_files
+        self.requests: List[Tuple[str, str]] = []     # (path, Accept) log, for tests
+        self.remaining = RATE_LIMIT
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGitHub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    # ------------------------------------------------------------------
+    # Fixtures
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def synthetic_fixture(file_count: int, lines_per_file: int = 20, patchless_every: int = 50) -> Dict:
+        """A single PR (owner/repo#1) with file_count changed files; every
+        patchless_every-th file has no inline patch and is served as a blob."""
+        files, blobs = [], {}
+        for i in range(file_count):
+            name = f"src/module_{i:05d}.py"
+            body = "\n".join(f"def func_{i}_{n}():\n    return {n}" for n in range(lines_per_file // 2))
+            if patchless_every and i % patchless_every == patchless_every - 1:
+                sha = hashlib.sha1(body.encode()).hexdigest()
+                blobs[sha] = body
+                files.append({"filename": name, "status": "added", "sha": sha})
+            else:
+                added = body.split("\n")
+                patch = f"@@ -0,0 +1,{len(added)} @@\n" + "\n".join(f"+{line}" for line in added)
+                files.append({"filename": name, "status": "added", "patch": patch})
+        return {"repos": {"owner/repo": {
+            "pulls": {"1": {"title": f"Synthetic PR with {file_count} files", "files": files}},
+            "blobs": blobs,
+        }}}
+
+    @staticmethod
+    def head_sha(pull: Dict) -> str:
+        """The fixture's "head_sha", or one derived from the PR's files."""
+        return pull.get("head_sha") or hashlib.sha1(json.dumps(pull.get("files", []), sort_keys=True).encode()).hexdigest()
+
+    def pull_request_event(self, full_name: str, number: int, action: str = "synchronize") -> Dict:
+        """A pull_request webhook payload for a fixture PR, as GitHub would deliver it."""
+        pull = self.fixture["repos"][full_name]["pulls"][str(number)]
+        return {
+            "action": action,
+            "number": number,
+            "pull_request": self._pull_json(number, pull),
+            "repository": {"full_name": full_name},
+        }
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                accept = self.headers.get("Accept", "")
+                with fake._lock:
+                    fake.requests.append((url.path, accept))
+                status, body, headers = fake._route(url.path, parse_qs(url.query), accept)
+                self._respond(status, body, headers)
+
+            def _respond(self, status: int, body: bytes, headers: Dict[str, str]):
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+                with fake._lock:
+                    if status != 304:
+                        fake.remaining = max(fake.remaining - 1, 0)
+                    remaining = fake.remaining
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if status in (200, 304):
+                    self.send_header("ETag", etag)
+                self.send_header("X-RateLimit-Limit", str(RATE_LIMIT))
+                self.send_header("X-RateLimit-Remaining", str(remaining))
+                self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def _route(self, path: str, query: Dict, accept: str) -> Tuple[int, bytes, Dict[str, str]]:
+        match = re.fullmatch(r"/repos/([^/]+/[^/]+)/pulls/(\d+)(/files)?", path)
+        if match:
+            repo = self.fixture.get("repos", {}).get(match.group(1))
+            pull = (repo or {}).get("pulls", {}).get(match.group(2))
+            if pull is None:
+                return self._error(404, "Not Found")
+            if match.group(3):
+                return self._files_page(path, pull, query)
+            if "diff" in accept:
+                return self._diff(pull)
+            return self._json(self._pull_json(int(match.group(2)), pull))
+
+        match = re.fullmatch(r"/repos/([^/]+/[^/]+)/git/blobs/([0-9a-f]+)", path)
+        if match:
+            blob = self.fixture.get("repos", {}).get(match.group(1), {}).get("blobs", {}).get(match.group(2))
+            if blob is None:
+                return self._error(404, "Not Found")
+            raw = blob.encode()
+            return self._json({
+                "sha": match.group(2),
+                "size": len(raw),
+                "encoding": "base64",
+                "content": base64.b64encode(raw).decode(),
+            })
+
+        match = re.fullmatch(r"/repos/([^/]+/[^/]+)/contents/(.+)", path)
+        if match:
+            ref = (query.get("ref") or [""])[0]
+            text = self.fixture.get("repos", {}).get(match.group(1), {}).get("contents", {}).get(ref, {}).get(
+                unquote(match.group(2)))
+            if text is None:
+                return self._error(404, "Not Found")
+            raw = text.encode()
+            return self._json({
+                "type": "file",
+                "path": unquote(match.group(2)),
+                "size": len(raw),
+                "encoding": "base64",
+                "content": base64.b64encode(raw).decode(),
+            })
+
+        return self._error(404, "Not Found")
+
+    @staticmethod
+    def _pull_json(number: int, pull: Dict) -> Dict:
+        files = pull.get("files", [])
+        return {
+            "number": number,
+            "title": pull.get("title", f"PR #{number}"),
+            "body": pull.get("body", ""),
+            "state": pull.get("state", "open"),
+            "user": {"login": pull.get("user", "octocat")},
+            "base": {"ref": pull.get("base", "main"), "sha": pull.get("base_sha") or "b" * 40},
+            "head": {"ref": pull.get("head", "feature"), "sha": FakeGitHub.head_sha(pull)},
+            "changed_files": len(files),
+            "additions": sum(f.get("patch", "").count("\n+") for f in files),
+        }
+
+    def _diff(self, pull: Dict) -> Tuple[int, bytes, Dict[str, str]]:
+        files = pull.get("files", [])
+        too_large = pull.get("diff_too_large")
+        if isinstance(too_large, int) and not isinstance(too_large, bool):
+            return self._error(
+                too_large,
+                "Sorry, this diff is taking too long to generate.",
+                errors=[{"resource": "PullRequest", "field": "diff", "code": "not_available"}],
+            )
+        if len(files) > self.diff_max_files or too_large:
+            return self._error(
+                406,
+                f"Sorry, the diff exceeded the maximum number of files ({self.diff_max_files}).",
+                errors=[{"resource": "PullRequest", "field": "diff", "code": "too_large"}],
+            )
+        if pull.get("diff_files") is not None:
+            files = files[:pull["diff_files"]]     # GitHub silently truncates some huge diffs
+        parts = []
+        for f in files:
+            name, old = f["filename"], f.get("previous_filename") or f["filename"]
+            parts.append(f"diff --git a/{old} b/{name}")
+            if "patch" in f:
+                parts.append(f"--- a/{old}\n+++ b/{name}\n{f['patch']}")
+            else:
+                parts.append(f"Binary files a/{old} and b/{name} differ")
+        return 200, ("\n".join(parts) + "\n").encode(), {"Content-Type": "text/plain; charset=utf-8"}
+
+    def _files_page(self, path: str, pull: Dict, query: Dict) -> Tuple[int, bytes, Dict[str, str]]:
+        per_page = min(int(query.get("per_page", ["30"])[0]), MAX_PER_PAGE)
+        page = max(int(query.get("page", ["1"])[0]), 1)
+        files = pull.get("files", [])
+        last_page = max((len(files) + per_page - 1) // per_page, 1)
+        chunk = files[(page - 1) * per_page:page * per_page]
+        entries = [
+            dict({
+                "sha": f.get("sha") or hashlib.sha1(f["filename"].encode()).hexdigest(),
+                "status": "modified",
+                "additions": f.get("patch", "").count("\n+"),
+                "deletions": f.get("patch", "").count("\n-"),
+            }, **f)
+            for f in chunk
+        ]
+        links = []
+        if page < last_page:
+            links.append(f'<{path}?per_page={per_page}&page={page + 1}>; rel="next"')
+            links.append(f'<{path}?per_page={per_page}&page={last_page}>; rel="last"')
+        status, body, headers = self._json(entries)
+        if links:
+            headers["Link"] = ", ".join(links)
+        return status, body, headers
+
+    @staticmethod
+    def _json(data) -> Tuple[int, bytes, Dict[str, str]]:
+        return 200, json.dumps(data).encode(), {"Content-Type": "application/json; charset=utf-8"}
+
+    @staticmethod
+    def _error(status: int, message: str, errors: Optional[List] = None) -> Tuple[int, bytes, Dict[str, str]]:
+        body = {"message": message}
+        if errors:
+            body["errors"] = errors
+        return status, json.dumps(body).encode(), {"Content-Type": "application/json; charset=utf-8"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fixture through a GitHub-shaped REST API.")
+    parser.add_argument("fixture", nargs="?", help="JSON fixture file (see module docstring)")
+    parser.add_argument("--synthetic-files", type=int, default=0,
+                        help="Serve a generated PR owner/repo#1 with this many files instead")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.synthetic_files:
+        fixture = FakeGitHub.synthetic_fixture(args.synthetic_files)
+    elif args.fixture:
+        with open(args.fixture, "r", encoding="utf-8") as fh:
+            fixture = json.load(fh)
+    else:
+        parser.error("give a fixture file or --synthetic-files")
+
+    server = FakeGitHub(fixture, host=args.host, port=args.port)
+    print(f"Fake GitHub API on {server.base_url} (set GITHUB_API_URL to use it)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
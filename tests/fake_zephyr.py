@@ -0,0 +1,268 @@
+"""
+Fake Zephyr Scale Module
+A local stand-in for the parts of the Jira / Zephyr Scale REST API this app
+uses, for offline development and for exercising bulk writes.
+
+Serves, from memory:
+    GET  /rest/api/3/myself                       health check
+    POST /rest/atm/1.0/testcase                   create → {"key": "PROJ-T1"}
+    PUT  /rest/atm/1.0/testcase/{key}             update
+    GET  /rest/atm/1.0/testcase/{key}             fetch
+    GET  /rest/atm/1.0/testcase/search            TQL subset, clauses joined by AND:
+                                                  projectKey = "X", folder = "/f",
+                                                  labels IN (...), issueKeys IN (...),
+                                                  updatedOn >= "<ISO time>";
+                                                  startAt / maxResults paging
+    POST /rest/atm/1.0/testrun                    create a test cycle → {"key": "PROJ-C1"}
+    GET  /rest/atm/1.0/testrun/{key}              test cycle with its items
+    POST /rest/atm/1.0/testrun/{key}/testresults  add executions (JSON array), adding
+                                                  test cases missing from the cycle
+
+Test cases get createdOn / updatedOn timestamps on every write.
+
+Like the real service it rate-limits: beyond ``rate_limit`` requests per
+second it answers 429 with a Retry-After header. ``fail_every`` makes every
+n-th write fail with a 500, to exercise retries and partial failures;
+``stall_every`` applies every n-th write but answers it only after
+``stall_seconds``, to exercise client read timeouts.
+
+Usage:
+    python -m tests.fake_zephyr --port 8766 --rate-limit 20
+    JIRA_BASE_URL=http://127.0.0.1:8766 JIRA_API_TOKEN=x python app.py
+
+    server = FakeZephyr(rate_limit=20).start()     # in-process, on a free port
+    ZephyrScaleClient(server.base_url, "token", "PROJ")
+    server.stop()
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+API_PATH = "/rest/atm/1.0"
+RETRY_AFTER_SECONDS = 1
+
+
+class FakeZephyr:
+    """Threaded HTTP server keeping Zephyr Scale test cases in memory."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 rate_limit: Optional[float] = None, fail_every: int = 0,
+                 stall_every: int = 0, stall_seconds: float = 2.0):
+        self.rate_limit = rate_limit
+        self.fail_every = fail_every
+        self.stall_every = stall_every
+        self.stall_seconds = stall_seconds
+        self.test_cases: Dict[str, Dict] = {}           # key → test case JSON
+        self.test_runs: Dict[str, Dict] = {}            # key → test cycle JSON
+        self.requests: List[Tuple[str, str, int]] = []   # (method, path, status) log, for tests
+        self._writes = 0
+        self._window: List[float] = []                   # request times in the last second
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeZephyr":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def add_test_case(self, body: Dict) -> str:
+        """Seed a test case directly (no rate limit, no fault injection); returns its key."""
+        with self._lock:
+            return self._create_test_case(body)
+
+    def count(self, method: str, status: int) -> int:
+        """Logged requests with this method and status."""
+        return sum(1 for m, _, s in self.requests if m == method and s == status)
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PUT(self):
+                self._handle("PUT")
+
+            def _handle(self, method: str):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else None
+                except json.JSONDecodeError:
+                    body = None
+                status, payload, headers, stall = fake._dispatch(method, url.path, parse_qs(url.query), body)
+                with fake._lock:
+                    fake.requests.append((method, url.path, status))
+                if stall:
+                    time.sleep(fake.stall_seconds)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _dispatch(self, method: str, path: str, query: Dict, body) -> Tuple[int, object, Dict[str, str], bool]:
+        """(status, payload, headers, whether to stall the answer)."""
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.rate_limit:
+                    return 429, {"message": "Rate limit exceeded"}, {"Retry-After": str(RETRY_AFTER_SECONDS)}, False
+                self._window.append(now)
+            stall = False
+            if method in ("POST", "PUT"):
+                self._writes += 1
+                if self.fail_every and self._writes % self.fail_every == 0:
+                    return 500, {"message": "Internal server error"}, {}, False
+                stall = bool(self.stall_every) and self._writes % self.stall_every == 0
+            return self._route(method, path, query, body) + (stall,)
+
+    def _route(self, method: str, path: str, query: Dict, body) -> Tuple[int, object, Dict[str, str]]:
+        if path == "/rest/api/3/myself" and method == "GET":
+            return 200, {"accountId": "fake", "displayName": "Fake User"}, {}
+
+        if path == f"{API_PATH}/testcase/search" and method == "GET":
+            return 200, self._search(query), {}
+
+        if path == f"{API_PATH}/testcase" and method == "POST":
+            if not isinstance(body, dict) or not body.get("projectKey") or not body.get("name"):
+                return 400, {"message": "projectKey and name are required"}, {}
+            key = self._create_test_case(body)
+            return 201, {"id": len(self.test_cases), "key": key}, {}
+
+        if path == f"{API_PATH}/testrun" and method == "POST":
+            if not isinstance(body, dict) or not body.get("projectKey") or not body.get("name"):
+                return 400, {"message": "projectKey and name are required"}, {}
+            key = f"{body['projectKey']}-C{len(self.test_runs) + 1}"
+            self.test_runs[key] = dict(body, key=key, items=list(body.get("items") or []))
+            return 201, {"id": len(self.test_runs), "key": key}, {}
+
+        match = re.fullmatch(rf"{API_PATH}/testrun/([A-Z][A-Z0-9_]*-C\d+)(/testresults)?", path)
+        if match:
+            run = self.test_runs.get(match.group(1))
+            if run is None:
+                return 404, {"message": f"Test run {match.group(1)} not found"}, {}
+            if method == "GET" and not match.group(2):
+                return 200, run, {}
+            if method == "POST" and match.group(2):
+                if not isinstance(body, list):
+                    return 400, {"message": "JSON array of test results required"}, {}
+                unknown = [r.get("testCaseKey") for r in body if r.get("testCaseKey") not in self.test_cases]
+                if unknown:
+                    return 400, {"message": f"Unknown test cases: {', '.join(map(str, unknown))}"}, {}
+                items = {item["testCaseKey"]: item for item in run["items"]}
+                for result in body:
+                    items[result["testCaseKey"]] = dict(result, executionDate=_now())
+                run["items"] = list(items.values())
+                return 201, [{"id": n} for n in range(len(body))], {}
+
+        match = re.fullmatch(rf"{API_PATH}/testcase/([A-Z][A-Z0-9_]*-T\d+)", path)
+        if match:
+            key = match.group(1)
+            if key not in self.test_cases:
+                return 404, {"message": f"Test case {key} not found"}, {}
+            if method == "GET":
+                return 200, self.test_cases[key], {}
+            if method == "PUT":
+                if not isinstance(body, dict):
+                    return 400, {"message": "JSON body required"}, {}
+                self.test_cases[key] = dict(self.test_cases[key], **body, key=key, updatedOn=_now())
+                return 200, {}, {}
+
+        return 404, {"message": "Not Found"}, {}
+
+    def _search(self, query: Dict) -> List[Dict]:
+        tql = (query.get("query") or [""])[0]
+        project = re.search(r'projectKey\s*=\s*"([^"]+)"', tql)
+        folder = re.search(r'folder\s*=\s*"([^"]+)"', tql)
+        since = re.search(r'updatedOn\s*>=\s*"([^"]+)"', tql)
+        labels = re.search(r"labels\s+IN\s*\(([^)]*)\)", tql, re.IGNORECASE)
+        issues = re.search(r"issueKeys\s+IN\s*\(([^)]*)\)", tql, re.IGNORECASE)
+        wanted = set(re.findall(r'"([^"]+)"', labels.group(1))) if labels else None
+        linked = set(re.findall(r'"([^"]+)"', issues.group(1))) if issues else None
+        fields = (query.get("fields") or [""])[0]
+        start = int((query.get("startAt") or [0])[0])
+        limit = int((query.get("maxResults") or [200])[0])
+
+        matched = [
+            tc for tc in self.test_cases.values()
+            if (not project or tc.get("projectKey") == project.group(1))
+            and (not folder or tc.get("folder") == folder.group(1))
+            and (not since or tc.get("updatedOn", "") >= since.group(1))
+            and (wanted is None or wanted & set(tc.get("labels") or []))
+            and (linked is None or linked & set(tc.get("issueLinks") or []))
+        ]
+        page = matched[start:start + limit]
+        if fields:
+            keep = set(fields.split(",")) | {"key"}
+            page = [{k: v for k, v in tc.items() if k in keep} for tc in page]
+        return page
+
+    def _create_test_case(self, body: Dict) -> str:
+        key = f"{body['projectKey']}-T{len(self.test_cases) + 1}"
+        stamp = _now()
+        self.test_cases[key] = dict(body, key=key, createdOn=stamp, updatedOn=stamp)
+        return key
+
+
+def _now() -> str:
+    """Zephyr-style UTC timestamp, millisecond precision."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an in-memory, Zephyr Scale-shaped REST API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="Requests per second before answering 429 (0: unlimited)")
+    parser.add_argument("--fail-every", type=int, default=0,
+                        help="Fail every n-th write with a 500 (0: never)")
+    args = parser.parse_args()
+
+    server = FakeZephyr(host=args.host, port=args.port,
+                        rate_limit=args.rate_limit or None, fail_every=args.fail_every)
+    print(f"Fake Zephyr Scale API on {server.base_url} (set JIRA_BASE_URL to use it)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""The ASGI → WSGI bridge of asgi.py, driven with hand-built ASGI messages."""
+
+import asyncio
+import time
+
+import pytest
+
+
+@pytest.fixture
+def bridge(app_module):
+    import asgi     # imports the app, so only after app_module has set up the environment
+    bridges = []
+
+    def make(wsgi_app, **options):
+        instance = asgi.WSGIBridge(wsgi_app, max_threads=4, **options)
+        bridges.append(instance)
+        return instance
+
+    yield make
+    for instance in bridges:
+        instance.executor.shutdown(wait=True)
+
+
+def _scope(method="GET", path="/", query=b"", headers=()):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "http_version": "1.1",
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 5000),
+    }
+
+
+def _call(application, scope, body_chunks=(b"",), disconnect_after=None):
+    """Run one request; returns the messages sent back."""
+    incoming = [{"type": "http.request", "body": chunk, "more_body": i < len(body_chunks) - 1}
+                for i, chunk in enumerate(body_chunks)]
+    if disconnect_after is not None:
+        incoming = incoming[:disconnect_after] + [{"type": "http.disconnect"}]
+    sent = []
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        await asyncio.Future()      # the client stays connected
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+def _response(sent):
+    start = sent[0]
+    return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"]), \
+        b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def echo_app(environ, start_response):
+    body = environ["wsgi.input"].read()
+    start_response("200 OK", [("Content-Type", "text/plain"), ("X-Path", environ["PATH_INFO"])])
+    return [environ["REQUEST_METHOD"].encode(), b" ", environ["QUERY_STRING"].encode(), b" ", body]
+
+
+def test_request_reaches_the_wsgi_app(bridge):
+    sent = _call(bridge(echo_app), _scope("POST", "/echo", b"a=1"), body_chunks=(b"hello ", b"world"))
+
+    status, headers, body = _response(sent)
+    assert status == 200
+    assert headers["x-path"] == "/echo"
+    assert body == b"POST a=1 hello world"
+    assert sent[-1]["body"] == b"" and not sent[-1].get("more_body")
+
+
+def test_body_over_the_limit_is_refused(bridge):
+    calls = []
+
+    def app(environ, start_response):
+        calls.append(environ)
+        return echo_app(environ, start_response)
+
+    sent = _call(bridge(app, max_body=8), _scope("POST"), body_chunks=(b"12345", b"67890"))
+
+    assert _response(sent)[0] == 413
+    assert calls == []
+
+
+def test_client_disconnecting_mid_body_never_runs_the_view(bridge):
+    calls = []
+
+    def app(environ, start_response):
+        calls.append(environ)
+        return echo_app(environ, start_response)
+
+    sent = _call(bridge(app), _scope("POST"), body_chunks=(b"part 1", b"part 2", b"part 3"), disconnect_after=1)
+
+    assert calls == []
+    assert sent == []
+
+
+def test_streamed_response_is_sent_chunk_by_chunk_and_closed(bridge):
+    closed = []
+
+    class Chunks:
+        def __iter__(self):
+            yield b"one,"
+            yield b""
+            yield b"two"
+
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/csv")])
+        return Chunks()
+
+    sent = _call(bridge(app), _scope())
+
+    assert b"".join(m["body"] for m in sent[1:]) == b"one,two"
+    assert not sent[-1].get("more_body")
+    assert closed == [True]
+
+
+def test_stream_stops_and_closes_when_the_client_disconnects(bridge):
+    produced, closed = [], []
+
+    class Endless:
+        def __iter__(self):
+            while True:
+                produced.append(1)
+                yield b": keep-alive\n\n"
+                time.sleep(0.01)
+
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/event-stream")])
+        return Endless()
+
+    async def run():
+        gone = asyncio.Event()
+        incoming = [{"type": "http.request", "body": b"", "more_body": False}]
+        sent = []
+
+        async def receive():
+            if incoming:
+                return incoming.pop(0)
+            await gone.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == 4:
+                gone.set()
+
+        await asyncio.wait_for(bridge(app)(_scope(), receive, send), 5)
+        return sent
+
+    sent = asyncio.run(run())
+
+    assert closed == [True]
+    assert len(sent) == 4           # nothing is sent after the disconnect
+    assert len(produced) < 10
+
+
+def test_flask_app_behind_the_bridge(bridge, app_module):
+    sent = _call(bridge(app_module.app), _scope("GET", "/health"))
+
+    status, headers, body = _response(sent)
+    assert status == 200
+    assert headers["content-type"].startswith("application/json")
+    assert b'"status"' in body
+
+
+def test_lifespan_is_acknowledged(bridge):
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(bridge(echo_app)({"type": "lifespan"}, receive, send))
+    assert [m["type"] for m in sent] == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
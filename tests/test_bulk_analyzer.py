@@ -0,0 +1,138 @@
+"""BulkAnalyzer: many PRs into one consolidated report, against the fake GitHub server."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from src.bulk_analyzer import BulkAnalyzer, BulkCheckpoint
+from src.git_analyzer import GitHubPRAnalyzer
+from tests.fake_github import FakeGitHub
+
+URLS = [f"https://github.com/owner/repo/pull/{n}" for n in (1, 2, 3)]
+
+
+def _fixture():
+    pulls = {}
+    for n in (1, 2, 3):
+        patch = f"@@ -0,0 +1 @@\n+value = {n}"
+        pulls[str(n)] = {"title": f"Change {n}", "head_sha": f"{n}" * 40,
+                         "files": [{"filename": f"src/m{n}.py", "status": "added", "patch": patch}]}
+    return {"repos": {"owner/repo": {"pulls": pulls}}}
+
+
+class FakeGenerator:
+    """Two cases per PR, one of them shared by all; PR titles in ``failing`` raise."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate_structured_test_cases(self, diff_summary, parsed_diff, change_types, pr_context):
+        title = pr_context["title"]
+        with self._lock:
+            self.calls.append(title)
+        if title in self.failing:
+            raise RuntimeError("Bedrock throttled")
+        priority = "high" if title == "Change 3" else "low"
+        return [
+            {"id": "TC-001", "type": "functional", "title": "Login still works", "priority": priority},
+            {"id": "TC-002", "type": "functional", "title": f"{title} is applied", "priority": "medium"},
+        ]
+
+
+@pytest.fixture
+def analyzer_for(tmp_path):
+    def make(server: FakeGitHub, generator: FakeGenerator) -> BulkAnalyzer:
+        return BulkAnalyzer(checkpoint_root=str(tmp_path / "bulk"), max_workers=2,
+                            gh_analyzer=GitHubPRAnalyzer(base_url=server.base_url), generator=generator)
+    return make
+
+
+def test_consolidate_merges_duplicates_and_renumbers():
+    records = [
+        {"key": "o/r#1", "test_cases": [{"id": "TC-001", "type": "UI", "title": "Login works!", "priority": "low"},
+                                        {"id": "TC-002", "type": "UI", "title": "Logout works", "priority": "low"}]},
+        {"key": "o/r#2", "test_cases": [{"id": "TC-001", "type": "ui", "title": "login  works", "priority": "High"}]},
+    ]
+
+    cases = BulkAnalyzer.consolidate(records)
+
+    assert [(tc["id"], tc["title"], tc["priority"], tc["sources"]) for tc in cases] == [
+        ("TC-001", "Login works!", "High", ["o/r#1", "o/r#2"]),
+        ("TC-002", "Logout works", "low", ["o/r#1"]),
+    ]
+
+
+def test_run_consolidates_and_drops_the_checkpoint_on_success(fake_github, analyzer_for, tmp_path):
+    server = fake_github(_fixture())
+    targets = BulkAnalyzer.targets_from_urls(URLS + URLS[:1])
+    seen = []
+
+    report = analyzer_for(server, FakeGenerator()).run(targets, on_progress=lambda r, done, total: seen.append(done))
+
+    summary = report.to_dict()["summary"]
+    assert (summary["targets"], summary["analysed"], summary["failed"], summary["test_cases"]) == (3, 3, 0, 4)
+    assert report.test_cases[0]["sources"] == ["owner/repo#1", "owner/repo#2", "owner/repo#3"]
+    assert report.test_cases[0]["priority"] == "high"
+    assert sorted(seen) == [1, 2, 3]
+    assert not os.path.exists(tmp_path / "bulk" / report.job_id)
+
+
+def test_rerun_resumes_only_unchanged_prs(fake_github, analyzer_for):
+    fixture = _fixture()
+    server = fake_github(fixture)
+    targets = BulkAnalyzer.targets_from_urls(URLS)
+
+    first = analyzer_for(server, FakeGenerator(failing={"Change 2"})).run(targets)
+    assert [t["status"] for t in first.targets] == ["done", "failed", "done"]
+
+    fixture["repos"]["owner/repo"]["pulls"]["3"]["head_sha"] = "f" * 40     # new commits on PR 3
+    generator = FakeGenerator()
+    second = analyzer_for(server, generator).run(targets)
+
+    assert sorted(generator.calls) == ["Change 2", "Change 3"]
+    assert [t["status"] for t in second.targets] == ["done", "done", "done"]
+    assert second.targets[2]["head_sha"] == "f" * 40
+
+    generator = FakeGenerator()
+    analyzer_for(server, generator).run(targets, resume=False)
+    assert len(generator.calls) == 3
+
+
+def test_abandoned_checkpoints_are_pruned(tmp_path):
+    root = str(tmp_path / "bulk")
+    old = BulkCheckpoint(root, "0123456789abcdef")
+    BulkCheckpoint(root, "fedcba9876543210")
+    stale = time.time() - 3600
+    os.utime(old.dir, (stale, stale))
+
+    assert BulkCheckpoint.prune(root, max_age_seconds=60) == 1
+    assert os.listdir(root) == ["fedcba9876543210"]
+
+
+def test_bulk_endpoint_runs_as_a_background_job(app_module, fake_github, monkeypatch, tmp_path):
+    server = fake_github(_fixture())
+    monkeypatch.setenv("GITHUB_API_URL", server.base_url)
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    monkeypatch.setenv("BULK_CHECKPOINT_DIR", str(tmp_path / "bulk"))
+    monkeypatch.setattr(BulkAnalyzer, "_generator_instance", lambda self: FakeGenerator())
+    client = app_module.app.test_client()
+
+    response = client.post("/api/analyze-bulk", json={"pr_urls": URLS})
+
+    assert response.status_code == 202
+    job_id = response.get_json()["data"]["job_id"]
+    assert job_id == "bulk-" + BulkCheckpoint.job_id_for(BulkAnalyzer.targets_from_urls(URLS))
+    deadline = time.monotonic() + 10
+    while (state := client.get(f"/api/jobs/{job_id}").get_json()["data"])["status"] in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert state["status"] == "ok"
+    assert state["result"]["summary"]["test_cases"] == 4
+    assert "test_cases" not in state["result"]
+    assert state["items"]["done"] == state["items"]["total"] == 3
+    stored = client.get(f"/api/results/{state['result']['result_id']}").get_json()["data"]
+    assert len(stored["test_cases"]) == 4
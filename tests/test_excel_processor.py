@@ -0,0 +1,56 @@
+"""ExcelProcessor parsing of suites with gaps of empty rows."""
+
+import io
+
+from openpyxl import Workbook, load_workbook
+
+from src.excel_processor import ExcelProcessor
+
+
+def _workbook(*rows) -> bytes:
+    wb = Workbook()
+    ws = wb.active
+    for row in rows:
+        ws.append(list(row))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _gapped_suite(gap: int):
+    return [("Test Case", "Expected Result"), ("Login works", "Dashboard shown")] + [(None, None)] * gap + [("Logout works", "Login page shown")]
+
+
+def test_rows_after_a_long_gap_are_kept():
+    data = _workbook(*_gapped_suite(120))
+
+    rows = ExcelProcessor.parse(data)
+
+    assert [row["test_case"] for row in rows] == ["Login works", "Logout works"]
+    assert rows[1]["row_index"] == 2 + 120 + 1
+
+
+def test_rows_after_a_long_gap_are_kept_in_text_suites():
+    text = "\n".join(",".join(cell or "" for cell in row) for row in _gapped_suite(120)).encode()
+
+    rows = ExcelProcessor.parse(text, fmt="csv")
+
+    assert [row["test_case"] for row in rows] == ["Login works", "Logout works"]
+
+
+def test_early_stop_is_opt_in():
+    data = _workbook(*_gapped_suite(120))
+
+    rows = ExcelProcessor.parse(data, max_empty_rows=50)
+
+    assert [row["test_case"] for row in rows] == ["Login works"]
+
+
+def test_trailing_empty_rows_are_not_rendered():
+    data = _workbook(*_gapped_suite(3), *[("", "")] * 200)
+    rows = ExcelProcessor.parse(data)
+    output = io.BytesIO()
+
+    ExcelProcessor.write_output(data, rows, [], [], output)
+
+    assert load_workbook(output).active.max_row == 2 + 3 + 1
@@ -0,0 +1,33 @@
+"""TestCaseExporter xlsx output for awkward cell values."""
+
+import io
+
+from openpyxl import load_workbook
+
+from src.exporters import ExportColumn, TestCaseExporter
+
+COLUMNS = (
+    ExportColumn("ID", 10, lambda tc: tc["id"]),
+    ExportColumn("Score", 10, lambda tc: tc["score"]),
+)
+
+
+def _sheet_values(test_cases):
+    data = b"".join(TestCaseExporter.stream(test_cases, "xlsx", columns=COLUMNS))
+    ws = load_workbook(io.BytesIO(data)).active
+    return [[cell.value for cell in row] for row in ws.iter_rows(min_row=2)]
+
+
+def test_numbers_are_written_as_numeric_cells():
+    assert _sheet_values([{"id": "TC-1", "score": 3}, {"id": "TC-2", "score": 0.5}]) == [["TC-1", 3], ["TC-2", 0.5]]
+
+
+def test_non_finite_floats_are_written_as_text():
+    values = _sheet_values([
+        {"id": "TC-1", "score": float("nan")},
+        {"id": "TC-2", "score": float("inf")},
+        {"id": "TC-3", "score": float("-inf")},
+        {"id": "TC-4", "score": True},
+    ])
+
+    assert values == [["TC-1", "nan"], ["TC-2", "inf"], ["TC-3", "-inf"], ["TC-4", "True"]]
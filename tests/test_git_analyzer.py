@@ -0,0 +1,110 @@
+"""GitHubPRAnalyzer.get_pr_changes() against the fake GitHub API, in particular the files-API fallback."""
+
+import pytest
+
+from src.code_analyzer import CodeAnalyzer
+from src.git_analyzer import GitHubPRAnalyzer
+from src import tracing
+from src.tracing import span
+from tests.fake_github import FakeGitHub
+
+
+def _analyzer(server: FakeGitHub) -> GitHubPRAnalyzer:
+    return GitHubPRAnalyzer(base_url=server.base_url, patchless_policy="blob")
+
+
+def _parsed(server: FakeGitHub):
+    diff_lines, info = _analyzer(server).get_pr_changes("owner", "repo", 1)
+    return CodeAnalyzer().parse_diff_lines(diff_lines), info
+
+
+def _requested(server: FakeGitHub, suffix: str):
+    return [path for path, _ in server.requests if path.endswith(suffix)]
+
+
+def _pull(fixture):
+    return fixture["repos"]["owner/repo"]["pulls"]["1"]
+
+
+def test_small_pr_uses_the_diff(fake_github):
+    server = fake_github(FakeGitHub.synthetic_fixture(5, patchless_every=0))
+    parsed, info = _parsed(server)
+
+    assert [f["file_path"] for f in parsed] == [f"src/module_{i:05d}.py" for i in range(5)]
+    assert info["changed_files"] == 5
+    assert not _requested(server, "/files")
+
+
+@pytest.mark.parametrize("too_large", [True, 422])
+def test_refused_diff_falls_back_to_paginated_files_api(fake_github, too_large):
+    fixture = FakeGitHub.synthetic_fixture(250, patchless_every=50)
+    _pull(fixture)["diff_too_large"] = too_large
+    server = fake_github(fixture)
+
+    parsed, _ = _parsed(server)
+
+    assert len(parsed) == 250
+    assert [f["file_path"] for f in parsed] == [f"src/module_{i:05d}.py" for i in range(250)]
+    assert len(_requested(server, "/files")) == 3          # 100 + 100 + 50
+    # Every 50th file has no inline patch: its content is fetched as a blob
+    assert len([path for path, _ in server.requests if "/git/blobs/" in path]) == 5
+    patchless = next(f for f in parsed if f["file_path"] == "src/module_00049.py")
+    assert patchless["additions"][:2] == ["def func_49_0():", "    return 0"]
+
+
+def test_concurrent_fetches_are_traced_under_the_callers_span(fake_github, monkeypatch):
+    fixture = FakeGitHub.synthetic_fixture(250, patchless_every=50)
+    _pull(fixture)["diff_too_large"] = True
+    server = fake_github(fixture)
+    ended = []
+    monkeypatch.setattr(tracing._tracer, "on_end", ended.append)
+
+    with span("request") as root:
+        _parsed(server)
+
+    github_spans = [s for s in ended if s.name == "github.request"]
+    assert len(github_spans) == len(server.requests) == 1 + 1 + 3 + 5     # diff, info, pages, blobs
+    assert {s.trace_id for s in github_spans} == {root.trace_id}
+    assert [name for name, _ in root.children].count("github.request") == 2     # in Server-Timing
+
+
+def test_diff_listing_fewer_files_than_the_pr_falls_back(fake_github):
+    fixture = FakeGitHub.synthetic_fixture(120, patchless_every=0)
+    _pull(fixture)["diff_files"] = 100
+    server = fake_github(fixture)
+
+    parsed, info = _parsed(server)
+
+    assert info["changed_files"] == 120
+    assert len(parsed) == 120
+    assert len(_requested(server, "/files")) == 2
+
+
+def test_files_api_discovers_pages_from_the_link_header(fake_github):
+    server = fake_github(FakeGitHub.synthetic_fixture(230, patchless_every=0))
+
+    lines = list(_analyzer(server).iter_pr_file_diff_lines("owner", "repo", 1, changed_files=None))
+
+    assert sum(1 for line in lines if line.startswith("diff --git")) == 230
+    assert len(_requested(server, "/files")) == 3
+
+
+def test_patchless_modified_file_is_diffed_against_its_base_version(fake_github):
+    head = "\n".join(f"line {n}" for n in range(1, 11)).replace("line 5", "line five")
+    base = "\n".join(f"line {n}" for n in range(1, 11))
+    fixture = {"repos": {"owner/repo": {
+        "pulls": {"1": {"base_sha": "a" * 40, "diff_too_large": True, "files": [
+            {"filename": "big.py", "status": "modified", "sha": "1" * 40},
+            {"filename": "gone_base.py", "status": "modified", "sha": "2" * 40},
+        ]}},
+        "blobs": {"1" * 40: head, "2" * 40: "x = 2"},
+        "contents": {"a" * 40: {"big.py": base}},
+    }}}
+    server = fake_github(fixture)
+
+    parsed, _ = _parsed(server)
+
+    big, unknown = parsed
+    assert (big["deletions"], big["additions"]) == (["line 5"], ["line five"])
+    assert big["changed_ranges"] == [[5, 5]]
+    assert (unknown["deletions"], unknown["additions"]) == ([], [])     # too large: not "all added"
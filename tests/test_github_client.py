@@ -0,0 +1,40 @@
+"""GitHubClient retry delays for rate-limited responses."""
+
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from src.github_client import GitHubClient
+
+
+def _response(status: int, **headers) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update({k.replace("_", "-"): v for k, v in headers.items()})
+    resp._content = b'{"message": "rate limited"}'
+    return resp
+
+
+@pytest.fixture
+def client():
+    return GitHubClient(base_url="http://github.invalid")
+
+
+def test_retry_after_in_seconds(client):
+    assert client._retry_delay(_response(429, Retry_After="7"), attempt=0) == 7
+
+
+def test_retry_after_as_http_date(client):
+    resp = _response(429, Retry_After=formatdate(time.time() + 30, usegmt=True))
+    assert 25 <= client._retry_delay(resp, attempt=0) <= 30
+
+
+def test_retry_after_in_the_past_retries_at_once(client):
+    assert client._retry_delay(_response(403, Retry_After="Wed, 21 Oct 2015 07:28:00 GMT"), attempt=0) == 0
+
+
+def test_unparseable_retry_after_falls_back_to_backoff(client):
+    delay = client._retry_delay(_response(429, Retry_After="soon"), attempt=1)
+    assert 1 <= delay <= 3
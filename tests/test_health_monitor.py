@@ -0,0 +1,64 @@
+"""HealthMonitor: dependency probes shared between workers through a state file."""
+
+import pytest
+
+from src.health_monitor import DISABLED, DOWN, UNKNOWN, UP, HealthMonitor
+
+
+class Flaky:
+    """A probe that fails while ``down`` is set."""
+
+    def __init__(self):
+        self.down = False
+
+    def __call__(self):
+        if self.down:
+            raise RuntimeError("connection refused")
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "health.json")
+
+
+def test_dependency_is_down_only_after_the_failure_threshold(state_path):
+    github = Flaky()
+    monitor = HealthMonitor({"github": github, "jira": lambda: DISABLED}, state_path, failure_threshold=2)
+    assert monitor.snapshot()["github"]["status"] == UNKNOWN
+
+    monitor.probe_all()
+    github.down = True
+    monitor.probe_all()
+    assert (monitor.snapshot()["github"]["status"], monitor.is_down("github")) == (UP, False)
+
+    monitor.probe_all()
+    assert monitor.is_down("github")
+    assert monitor.snapshot()["github"]["error"] == "connection refused"
+    assert monitor.snapshot()["jira"]["status"] == DISABLED
+
+    github.down = False
+    monitor.probe_all()
+    assert monitor.snapshot()["github"]["status"] == UP
+
+
+def test_other_workers_read_the_probing_workers_results(state_path):
+    prober = HealthMonitor({"bedrock": Flaky()}, state_path, failure_threshold=1)
+    reader = HealthMonitor({"bedrock": Flaky()}, state_path, failure_threshold=1)
+    assert reader.snapshot()["bedrock"]["status"] == UNKNOWN
+
+    prober.probes["bedrock"].down = True
+    prober.probe_all()
+
+    assert reader.snapshot()["bedrock"]["status"] == DOWN
+
+
+def test_disabled_monitor_never_probes(state_path):
+    monitor = HealthMonitor({"github": Flaky()}, state_path, enabled=False)
+
+    assert monitor.start()._thread is None
+    assert not monitor.is_down("github")
+
+
+def test_app_import_and_requests_start_no_probes_when_disabled(app_module):
+    assert app_module.app.test_client().get("/health").status_code in (200, 503)
+    assert app_module._health._thread is None
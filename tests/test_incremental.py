@@ -0,0 +1,84 @@
+"""Incremental re-analysis: file fingerprints, the file-level interdiff and merging regenerated cases."""
+
+from src.incremental import changed_files, file_fingerprints, merge_cases
+
+
+def _file(path, additions=(), deletions=(), context=()):
+    return {"file_path": path, "additions": list(additions), "deletions": list(deletions), "context": list(context)}
+
+
+def _case(case_id, title, files, **fields):
+    return dict({"id": case_id, "title": title, "type": "functional", "files": files}, **fields)
+
+
+def test_fingerprints_ignore_context_and_hunk_positions():
+    before = file_fingerprints([_file("app.py", ["x = 2"], ["x = 1"], context=["def f():"])])
+    rebased = file_fingerprints([_file("app.py", ["x = 2"], ["x = 1"], context=["def g():", "    pass"])])
+    edited = file_fingerprints([_file("app.py", ["x = 3"], ["x = 1"])])
+
+    assert before == rebased
+    assert before["app.py"] != edited["app.py"]
+
+
+def test_changed_files_reports_modified_new_and_removed_files():
+    previous = file_fingerprints([_file("a.py", ["1"]), _file("b.py", ["2"]), _file("c.py", ["3"])])
+    current = file_fingerprints([_file("a.py", ["1"]), _file("b.py", ["2, changed"]), _file("d.py", ["4"])])
+
+    assert changed_files(previous, current) == ({"b.py", "d.py"}, {"c.py"})
+    assert changed_files(previous, previous) == (set(), set())
+
+
+def test_unchanged_fingerprints_keep_every_case():
+    previous = [_case("TC-001", "Login", ["a.py"]), _case("TC-002", "Legacy case", [])]
+
+    merged, delta = merge_cases(previous, [], changed=set(), removed=set())
+
+    assert merged == previous
+    assert delta == {"added": [], "changed": [], "retired": []}
+
+
+def test_regenerated_cases_replace_affected_ones_and_new_ones_are_renumbered():
+    previous = [
+        _case("TC-001", "Login", ["a.py"]),
+        _case("TC-002", "Export", ["b.py"]),
+        _case("TC-007", "Search", ["b.py", "c.py"]),
+        _case("TC-008", "Old case without files", None),
+    ]
+    regenerated = [
+        _case("TC-002", "Export as CSV", ["b.py"]),          # updates TC-002
+        _case("TC-001", "Filter results", ["b.py"]),         # TC-001 was not affected: new
+        _case("TC-002", "Export twice", ["b.py"]),           # id already taken: new
+    ]
+
+    merged, delta = merge_cases(previous, regenerated, changed={"b.py"}, removed=set())
+
+    assert [(tc["id"], tc["title"]) for tc in merged] == [
+        ("TC-001", "Login"),
+        ("TC-002", "Export as CSV"),
+        ("TC-008", "Old case without files"),
+        ("TC-009", "Filter results"),
+        ("TC-010", "Export twice"),
+    ]
+    assert delta == {"added": ["TC-009", "TC-010"], "changed": ["TC-002"], "retired": ["TC-007"]}
+
+
+def test_identical_regenerated_case_is_not_reported_as_changed():
+    previous = [_case("TC-001", "Login", ["a.py"], priority="high")]
+
+    merged, delta = merge_cases(previous, [dict(previous[0])], changed={"a.py"}, removed=set())
+
+    assert merged == previous
+    assert delta == {"added": [], "changed": [], "retired": []}
+
+
+def test_cases_of_removed_files_are_retired():
+    previous = [
+        _case("TC-001", "Login", ["a.py"]),
+        _case("TC-002", "Import", ["gone.py"]),
+        _case("TC-003", "Import then login", ["gone.py", "a.py"]),
+    ]
+
+    merged, delta = merge_cases(previous, [], changed=set(), removed={"gone.py"})
+
+    assert [tc["id"] for tc in merged] == ["TC-001", "TC-003"]      # still touches a file in the PR
+    assert delta["retired"] == ["TC-002"]
@@ -0,0 +1,98 @@
+"""Zephyr Scale bulk upserts against the in-process fake Zephyr server."""
+
+import pytest
+
+from src import jira_client
+from src.jira_client import ZephyrOutcomeUnknown, ZephyrScaleClient, ZephyrTestCase
+from tests.fake_zephyr import FakeZephyr
+
+STORY = "PROJ-1"
+
+
+def _client(server: FakeZephyr, **options) -> ZephyrScaleClient:
+    options.setdefault("rate_per_second", 1000)
+    return ZephyrScaleClient(server.base_url, "token", "PROJ", **options)
+
+
+def _cases(*summaries: str):
+    return [ZephyrTestCase(summary=s, test_steps=["Open the page"], expected_result="It works") for s in summaries]
+
+
+def _actions(results):
+    return [r.action for r in results]
+
+
+def test_bulk_create_then_update_and_skip_unchanged(fake_zephyr):
+    server = fake_zephyr()
+    client = _client(server)
+
+    first = client.bulk_create_test_cases(_cases("Login", "Logout", "Reset password"), STORY)
+    assert _actions(first) == ["created"] * 3
+    assert len(server.test_cases) == 3
+    assert all(server.test_cases[r.key]["issueLinks"] == [STORY] for r in first)
+
+    cases = _cases("Login", "Logout", "Reset password")
+    cases[1].expected_result = "The session is closed"
+    second = client.bulk_create_test_cases(cases, STORY)
+    assert _actions(second) == ["unchanged", "updated", "unchanged"]
+    assert [r.key for r in second] == [r.key for r in first]
+    assert len(server.test_cases) == 3
+    assert server.count("POST", 201) == 3
+
+
+def test_bulk_create_collapses_duplicate_summaries(fake_zephyr):
+    server = fake_zephyr()
+    results = _client(server).bulk_create_test_cases(_cases("Login", "  login ", "Logout"), STORY)
+
+    assert _actions(results) == ["created", "duplicate", "created"]
+    assert results[1].key == results[0].key
+    assert len(server.test_cases) == 2
+
+
+def test_bulk_create_waits_out_retry_after(fake_zephyr):
+    server = fake_zephyr(rate_limit=3)
+    results = _client(server, max_workers=4).bulk_create_test_cases(
+        _cases(*(f"Case {n}" for n in range(8))), STORY
+    )
+
+    assert _actions(results) == ["created"] * 8
+    assert server.count("POST", 429) > 0
+    assert len(server.test_cases) == 8
+
+
+def test_partial_failures_are_reported_and_retried_without_duplicates(fake_zephyr, monkeypatch):
+    monkeypatch.setattr(jira_client, "MAX_RETRIES", 0)
+    server = fake_zephyr(fail_every=3)
+    client = _client(server, max_workers=1)
+    cases = _cases(*(f"Case {n}" for n in range(6)))
+
+    first = client.bulk_create_test_cases(cases, STORY)
+    failed = [r for r in first if r.action == "failed"]
+    assert len(failed) == 2
+    assert all(r.error and r.key is None for r in failed)
+    assert len(server.test_cases) == 4
+
+    server.fail_every = 0
+    second = client.bulk_create_test_cases(cases, STORY)
+    assert sorted(_actions(second)) == ["created"] * 2 + ["unchanged"] * 4
+    assert len(server.test_cases) == 6
+
+
+def test_create_timed_out_after_it_was_applied_is_not_duplicated(fake_zephyr, monkeypatch):
+    monkeypatch.setattr(jira_client, "REQUEST_TIMEOUT", (2, 0.2))
+    server = fake_zephyr(stall_every=1, stall_seconds=0.6)
+
+    results = _client(server).bulk_create_test_cases(_cases("Login"), STORY)
+
+    assert _actions(results) == ["created"]
+    assert list(server.test_cases) == [results[0].key]
+    assert server.count("POST", 201) == 1
+
+
+def test_other_posts_are_not_resent_after_a_read_timeout(fake_zephyr, monkeypatch):
+    monkeypatch.setattr(jira_client, "REQUEST_TIMEOUT", (2, 0.2))
+    server = fake_zephyr(stall_every=1, stall_seconds=0.6)
+
+    with pytest.raises(ZephyrOutcomeUnknown):
+        _client(server).create_test_cycle("Release 2.3")
+    assert len(server.test_runs) == 1
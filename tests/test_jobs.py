@@ -0,0 +1,90 @@
+"""JobRunner: background jobs reported through the progress channel."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from src import jobs
+from src.jobs import JobRunner
+from src.progress import ProgressChannel, current
+
+
+@pytest.fixture
+def runner(tmp_path):
+    return JobRunner(ProgressChannel(str(tmp_path / "progress")))
+
+
+def _wait(runner: JobRunner, job_id: str) -> dict:
+    deadline = time.monotonic() + 5
+    while runner.status(job_id)["status"] in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    return runner.status(job_id)
+
+
+def test_result_and_progress_are_published(runner):
+    def work():
+        for done in (1, 2, 3):
+            current().items(done, 3, f"item {done}")
+        return {"answer": 42}
+
+    job_id, started = runner.submit("analyze-bulk", work)
+
+    state = _wait(runner, job_id)
+    assert started
+    assert (state["status"], state["result"], state["error"]) == ("ok", {"answer": 42}, None)
+    assert state["items"]["done"] == state["items"]["total"] == 3
+    assert state["pipeline"] == "analyze-bulk"
+
+
+def test_failure_is_reported(runner):
+    def work():
+        raise RuntimeError("GitHub is down")
+
+    job_id, _ = runner.submit("analyze-bulk", work)
+
+    state = _wait(runner, job_id)
+    assert (state["status"], state["error"], state["result"]) == ("error", "GitHub is down", None)
+
+
+def test_resubmitting_a_running_job_joins_it(runner):
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        release.wait(5)
+        return {"runs": len(runs)}
+
+    first = runner.submit("zephyr-cycle", work, job_id="cycle-abc12345")
+    second = runner.submit("zephyr-cycle", work, job_id="cycle-abc12345")
+    release.set()
+
+    assert first == ("cycle-abc12345", True)
+    assert second == ("cycle-abc12345", False)
+    assert _wait(runner, "cycle-abc12345")["result"] == {"runs": 1}
+
+    third = runner.submit("zephyr-cycle", work, job_id="cycle-abc12345")      # finished: runs again
+    assert third == ("cycle-abc12345", True)
+    assert _wait(runner, "cycle-abc12345")["result"] == {"runs": 2}
+
+
+def test_job_of_a_dead_worker_is_lost_and_can_be_restarted(runner, tmp_path):
+    channel = runner.channel
+    channel.publish("bulk-deadbeef", {"type": "job", "status": "running", "pipeline": "analyze-bulk"})
+    stale = time.time() - jobs.STALE_SECONDS - 1
+    os.utime(os.path.join(channel.root, "bulk-deadbeef.jsonl"), (stale, stale))
+
+    assert runner.status("bulk-deadbeef")["status"] == "lost"
+    assert runner.submit("analyze-bulk", lambda: None, job_id="bulk-deadbeef")[1]
+    assert _wait(runner, "bulk-deadbeef")["status"] == "ok"
+
+
+def test_unknown_jobs_and_plain_request_progress_have_no_status(runner):
+    runner.channel.publish("request-1234", {"type": "stage", "stage": "diff_parse", "status": "running"})
+
+    assert runner.status("never-submitted") is None
+    assert runner.status("request-1234") is None
+    assert runner.status("../etc/passwd") is None
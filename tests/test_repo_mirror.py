@@ -0,0 +1,127 @@
+"""RepoMirrorCache: PR diffs from local bare mirrors, fetched from a local "remote" repository."""
+
+import os
+import subprocess
+import time
+
+import pytest
+
+from src import repo_mirror
+from src.code_analyzer import CodeAnalyzer
+from src.git_analyzer import GitAnalyzer, GitHubPRAnalyzer
+from src.repo_mirror import MirrorError, RepoMirrorCache
+
+TOKEN = "ghp_secret0123456789"
+API_PATCH = "@@ -1 +1 @@\n-from the api\n+from the api too"
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """owner/repo with main and PR 7 (refs/pull/7/head) changing app.py."""
+    path = tmp_path / "remotes" / "owner" / "repo.git"
+    path.mkdir(parents=True)
+    _git(path, "init", "--quiet", "--initial-branch=main")
+    _git(path, "config", "user.email", "dev@example.com")
+    _git(path, "config", "user.name", "Dev")
+    (path / "app.py").write_text("value = 1\n")
+    _git(path, "add", "app.py")
+    _git(path, "commit", "--quiet", "-m", "base")
+    _git(path, "checkout", "--quiet", "-b", "feature")
+    (path / "app.py").write_text("value = 2\n")
+    _git(path, "commit", "--quiet", "-am", "change")
+    _git(path, "update-ref", "refs/pull/7/head", "feature")
+    _git(path, "checkout", "--quiet", "main")
+    return path
+
+
+@pytest.fixture
+def mirrors(tmp_path, remote):
+    repo_mirror._pruned_at.clear()
+    template = str(tmp_path / "remotes" / "{owner}" / "{repo}.git")
+    return RepoMirrorCache(str(tmp_path / "mirrors"), clone_url=template, token=TOKEN)
+
+
+@pytest.fixture
+def analyzer(fake_github, mirrors):
+    server = fake_github({"repos": {"owner/repo": {"pulls": {
+        "7": {"files": [{"filename": "app.py", "status": "modified", "patch": API_PATCH}]},
+        "8": {"files": [{"filename": "app.py", "status": "modified", "patch": API_PATCH}]},
+    }}}})
+    return GitHubPRAnalyzer(base_url=server.base_url, mirrors=mirrors)
+
+
+def _parsed(lines):
+    return CodeAnalyzer().parse_diff_lines(lines)
+
+
+def test_pr_diff_comes_from_the_mirror(analyzer, mirrors):
+    lines, info = analyzer.get_pr_changes("owner", "repo", 7)
+
+    parsed = _parsed(lines)
+    assert [(f["file_path"], f["deletions"], f["additions"]) for f in parsed] == [
+        ("app.py", ["value = 1"], ["value = 2"]),
+    ]
+    assert os.path.isdir(mirrors.mirror_path("owner", "repo"))
+
+
+def test_token_is_passed_in_the_environment_not_the_command_line(mirrors, monkeypatch):
+    calls = []
+    run = subprocess.run
+
+    def recording_run(cmd, **kwargs):
+        calls.append((cmd, kwargs["env"]))
+        return run(cmd, **kwargs)
+
+    monkeypatch.setattr(repo_mirror.subprocess, "run", recording_run)
+    mirrors.fetch_pr("owner", "repo", 7, base_branch="main")
+
+    assert calls
+    for cmd, env in calls:
+        assert not any(TOKEN in arg or "extraHeader" in arg for arg in cmd)
+        assert env["GIT_CONFIG_KEY_0"] == "http.extraHeader"
+        assert env["GIT_CONFIG_VALUE_0"].startswith("Authorization: Basic ")
+    with open(os.path.join(mirrors.mirror_path("owner", "repo"), "config")) as fh:
+        assert "Authorization" not in fh.read()
+
+
+def test_failed_fetch_falls_back_to_the_api(analyzer):
+    lines, _ = analyzer.get_pr_changes("owner", "repo", 8)     # no refs/pull/8/head in the remote
+
+    assert _parsed(lines)[0]["additions"] == ["from the api too"]
+
+
+def test_failed_mirror_diff_falls_back_to_the_api(analyzer, monkeypatch):
+    def broken(self, *args, **kwargs):
+        raise ValueError("Error getting diff: fatal: no merge base")
+        yield
+
+    monkeypatch.setattr(GitAnalyzer, "iter_diff_lines", broken)
+
+    lines, _ = analyzer.get_pr_changes("owner", "repo", 7)
+
+    assert _parsed(lines)[0]["additions"] == ["from the api too"]
+
+
+def test_unused_mirrors_are_pruned_after_a_fetch(mirrors):
+    mirrors.fetch_pr("owner", "repo", 7, base_branch="main")
+    stale_path = os.path.join(mirrors.root, "other", "old.git")
+    os.makedirs(stale_path)
+    stale = time.time() - mirrors.ttl_seconds - 60
+    os.utime(stale_path, (stale, stale))
+
+    mirrors.fetch_pr("owner", "repo", 7, base_branch="main")
+    assert os.path.isdir(stale_path)        # pruned at most once per PRUNE_INTERVAL
+
+    repo_mirror._pruned_at.clear()
+    mirrors.fetch_pr("owner", "repo", 7, base_branch="main")
+    assert not os.path.exists(stale_path)
+    assert os.path.isdir(mirrors.mirror_path("owner", "repo"))
+
+
+def test_invalid_repository_names_are_rejected(mirrors):
+    with pytest.raises(MirrorError):
+        mirrors.mirror_path("owner", "..")
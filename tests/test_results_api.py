@@ -0,0 +1,48 @@
+"""GET /api/results/<id>: conditional requests and gzip."""
+
+import gzip
+import json
+
+import pytest
+
+
+@pytest.fixture
+def stored(app_module):
+    data = {"summary": "x" * 4000, "structured_test_cases": [{"id": "TC-001", "title": "Login works"}]}
+    return app_module._result_store.put(data, "pr")
+
+
+def test_gzip_and_identity_responses_share_a_weak_etag(app_module, stored):
+    client = app_module.app.test_client()
+
+    plain = client.get(f"/api/results/{stored}")
+    zipped = client.get(f"/api/results/{stored}", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(zipped.get_data())) == plain.get_json()
+    assert plain.headers["ETag"] == zipped.headers["ETag"] == f'W/"{stored}"'
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize("if_none_match", ['W/"{id}"', '"{id}"', '"other", W/"{id}"', "*"])
+def test_matching_if_none_match_is_not_modified(app_module, stored, if_none_match):
+    client = app_module.app.test_client()
+
+    response = client.get(f"/api/results/{stored}", headers={
+        "If-None-Match": if_none_match.format(id=stored), "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'W/"{stored}"'
+
+
+def test_etag_depends_on_the_requested_fields(app_module, stored):
+    client = app_module.app.test_client()
+    full_etag = client.get(f"/api/results/{stored}").headers["ETag"]
+
+    response = client.get(f"/api/results/{stored}?fields=summary", headers={"If-None-Match": full_etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != full_etag
+    assert set(response.get_json()["data"]) >= {"summary"}
+    assert "structured_test_cases" not in response.get_json()["data"]
@@ -0,0 +1,86 @@
+"""Run planner: durations, the budgeted knapsack and the split over runners."""
+
+import io
+
+import pytest
+from openpyxl import Workbook
+
+from src.decision_rules import apply_decision
+from src.excel_mapper import ExcelMapper
+from src.excel_processor import ExcelProcessor, row_key
+from src.run_planner import _assign_runners, _knapsack, parse_duration, plan_suite_run
+
+
+@pytest.mark.parametrize("value, seconds", [
+    (90, 5400.0),
+    ("90", 5400.0),
+    ("1:30", 90.0),
+    ("1:02:30", 3750.0),
+    ("90s", 90.0),
+    ("5m", 300.0),
+    ("1.5h", 5400.0),
+    ("2h 30m", 9000.0),
+    ("10 min", 600.0),
+    ("", None),
+    (None, None),
+    ("soon", None),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_parse_duration_default_unit():
+    assert parse_duration("42", default_unit="s") == 42.0
+
+
+def test_knapsack_takes_everything_within_budget():
+    candidates = [(0, 60.0, 1.0), (1, 120.0, 2.0), (2, 30.0, 0.5)]
+
+    assert _knapsack(candidates, 300) == {0, 1, 2}
+    assert _knapsack(candidates, 0) == set()
+
+
+def test_knapsack_over_budget_maximises_weight():
+    # Greedy by weight would take position 0 alone (weight 5); 1 + 2 weigh 6 and fit
+    candidates = [(0, 100.0, 5.0), (1, 50.0, 3.0), (2, 50.0, 3.0)]
+
+    chosen = _knapsack(candidates, 100)
+
+    assert chosen == {1, 2}
+    assert sum(c[1] for c in candidates if c[0] in chosen) <= 100
+
+
+def test_assign_runners_balances_and_fills_with_spare():
+    chosen = [(0, 60.0, 1.0), (1, 50.0, 1.0), (2, 40.0, 1.0), (3, 30.0, 1.0)]
+    spare = [(4, 20.0, 1.0), (5, 500.0, 9.0)]
+
+    lanes = _assign_runners(chosen, spare, budget_seconds=100, runners=2)
+
+    assert [sorted(c[0] for c in lane) for lane in lanes] == [[0, 3], [1, 2]]
+    assert all(sum(c[1] for c in lane) <= 100 for lane in lanes)
+
+    lanes = _assign_runners(chosen[:2], spare, budget_seconds=100, runners=2)
+    assert sorted(c[0] for lane in lanes for c in lane) == [0, 1, 4]     # spare fills the room left
+
+
+def test_suite_durations_come_from_history_by_unprefixed_test_id():
+    wb = Workbook()
+    wb.remove(wb.active)
+    for title, test_id in (("Smoke", "TC-1"), ("Login", "TC-2")):
+        ws = wb.create_sheet(title)
+        ws.append(["Test ID", "Test Scenario", "Expected Result", "Duration"])
+        ws.append([test_id, f"Scenario of {test_id}", "It works", 10])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    rows = ExcelProcessor.parse_workbooks([("suite.xlsx", buffer.getvalue())])
+    ai_output = {"mappings": [
+        {"excel_row_index": row_key(row), "generated_tc_id": "TC-001", "confidence": 90} for row in rows
+    ]}
+    mappings = [apply_decision(m) for m in ExcelMapper(None)._build_result(
+        ai_output, rows, [{"id": "TC-001", "title": "Login works"}]).mappings]
+
+    plan_suite_run(mappings, rows, budget_seconds=3600, history={"TC-1": 120.0})
+
+    assert mappings[0]["raw_id"] == "Smoke / TC-1"
+    assert [m["plan_duration_min"] for m in mappings] == [2.0, 10.0]     # history, then the sheet's column
+    assert [m["plan_status"] for m in mappings] == ["PLANNED", "PLANNED"]
@@ -0,0 +1,177 @@
+"""GitHub pull_request webhooks: signatures, debounced precomputation, and serving the stored analysis."""
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+import pytest
+
+from src.result_store import ResultStore
+from src.webhooks import PRPrecomputer, verify_signature
+from tests.fake_github import FakeGitHub
+
+SECRET = "webhook-secret"
+PR_URL = "https://github.com/owner/repo/pull/1"
+
+
+def _sign(body: bytes, secret: str = SECRET) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+class RecordingGenerator:
+    """Stands in for TestScenarioGenerator; records which diffs it was asked about."""
+
+    calls = []
+
+    def generate_structured_test_cases(self, diff_summary, parsed_diff, change_types, pr_context=None, **kwargs):
+        RecordingGenerator.calls.append(pr_context.get("head_sha"))
+        return [{"id": "TC-001", "title": f"Covers {f['file_path']}", "type": "functional"} for f in parsed_diff]
+
+
+@pytest.fixture
+def pull_fixture():
+    return {"repos": {"owner/repo": {"pulls": {"1": {
+        "title": "Add login",
+        "head_sha": "a" * 40,
+        "files": [{"filename": "app/login.py", "status": "modified", "patch": "@@ -1 +1 @@\n-old\n+new"}],
+    }}}}}
+
+
+@pytest.fixture
+def webhook_app(app_module, fake_github, pull_fixture, monkeypatch, tmp_path):
+    server = fake_github(pull_fixture)
+    monkeypatch.setenv("GITHUB_API_URL", server.base_url)
+    monkeypatch.setenv("GITHUB_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(app_module, "TestScenarioGenerator", RecordingGenerator)
+    monkeypatch.setattr(app_module, "_precomputer", PRPrecomputer(
+        app_module._precompute_pr, str(tmp_path / "webhooks.sqlite"), debounce_seconds=0.3))
+    monkeypatch.setattr(app_module, "_result_store", ResultStore(str(tmp_path / "results.sqlite")))
+    RecordingGenerator.calls = []
+    return app_module, server
+
+
+def _deliver(client, payload, event="pull_request", signature=None):
+    body = json.dumps(payload).encode()
+    return client.post("/webhooks/github", data=body, content_type="application/json", headers={
+        "X-GitHub-Event": event,
+        "X-Hub-Signature-256": signature or _sign(body),
+    })
+
+
+def _push(server: FakeGitHub, pull_fixture, head_sha: str):
+    pull_fixture["repos"]["owner/repo"]["pulls"]["1"]["head_sha"] = head_sha
+    return server.pull_request_event("owner/repo", 1)
+
+
+def test_verify_signature():
+    body = b'{"action": "opened"}'
+    assert verify_signature(SECRET, body, _sign(body))
+    assert not verify_signature(SECRET, body, _sign(body, "other-secret"))
+    assert not verify_signature(SECRET, body + b" ", _sign(body))
+    assert not verify_signature(SECRET, body, _sign(body)[len("sha256="):])
+    assert not verify_signature(SECRET, body, None)
+    assert not verify_signature("", body, _sign(body, ""))
+
+
+def test_deliveries_without_a_valid_signature_are_rejected(webhook_app):
+    app_module, server = webhook_app
+    client = app_module.app.test_client()
+    payload = server.pull_request_event("owner/repo", 1)
+
+    assert _deliver(client, payload, signature=_sign(b"{}")).status_code == 401
+    assert _deliver(client, payload, event="ping").status_code == 200
+    assert _deliver(client, payload).status_code == 202
+    app_module._precomputer.cancel("owner", "repo", 1)
+
+
+def test_debounce_collapses_a_burst_of_pushes_into_one_analysis(tmp_path):
+    analysed = []
+    done = threading.Event()
+
+    def analyse(owner, repo, number, head_sha):
+        analysed.append(head_sha)
+        done.set()
+
+    precomputer = PRPrecomputer(analyse, str(tmp_path / "webhooks.sqlite"), debounce_seconds=0.2)
+    for sha in ("1" * 40, "2" * 40, "3" * 40):
+        precomputer.schedule("owner", "repo", 1, sha)
+        time.sleep(0.05)
+
+    assert done.wait(5)
+    time.sleep(0.3)
+    assert analysed == ["3" * 40]
+    assert precomputer.pending() == 0
+
+
+def test_workers_sharing_the_state_file_analyse_each_sha_once(tmp_path):
+    analysed = []
+    state_path = str(tmp_path / "webhooks.sqlite")
+
+    def analyse(owner, repo, number, head_sha):
+        time.sleep(0.2)
+        analysed.append(head_sha)
+
+    first, second = (PRPrecomputer(analyse, state_path, debounce_seconds=0.1) for _ in range(2))
+    first.schedule("owner", "repo", 1, "1" * 40)
+    second.schedule("owner", "repo", 1, "2" * 40)       # the burst's next push reached the other worker
+    first.schedule("owner", "repo", 2, "3" * 40)
+    second.schedule("owner", "repo", 2, "3" * 40)       # the same SHA delivered to both workers
+
+    assert _wait_for(lambda: len(analysed) == 2)
+    time.sleep(0.4)
+    assert sorted(analysed) == ["2" * 40, "3" * 40]
+
+
+def test_result_store_keeps_the_latest_pr_analysis(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    assert store.get_latest_pr_analysis("owner/repo#1") is None
+
+    store.put_pr_analysis("owner/repo#1", "a" * 40, {"structured_test_cases": [{"id": "TC-001"}]})
+    store.put_pr_analysis("owner/repo#1", "b" * 40, {"structured_test_cases": []})
+
+    assert store.get_pr_analysis("owner/repo#1", "a" * 40) == {"structured_test_cases": [{"id": "TC-001"}]}
+    assert store.get_pr_analysis("owner/repo#2", "a" * 40) is None
+    assert store.get_latest_pr_analysis("owner/repo#1") == ("b" * 40, {"structured_test_cases": []})
+
+
+def test_pushes_are_precomputed_and_the_stored_analysis_is_served(webhook_app, pull_fixture):
+    app_module, server = webhook_app
+    client = app_module.app.test_client()
+
+    for sha in ("b" * 40, "c" * 40, "d" * 40):
+        assert _deliver(client, _push(server, pull_fixture, sha)).status_code == 202
+
+    pr_key = "owner/repo#1"
+    assert _wait_for(lambda: app_module._result_store.get_pr_analysis(pr_key, "d" * 40) is not None)
+    assert RecordingGenerator.calls == ["d" * 40]
+    assert app_module._result_store.get_pr_analysis(pr_key, "b" * 40) is None
+
+    response = client.post("/api/analyze-pr", json={"pr_url": PR_URL})
+    data = response.get_json()["data"]
+    assert response.status_code == 200
+    assert data["precomputed"] is True
+    assert data["pr_info"]["head_sha"] == "d" * 40
+    assert data["structured_test_cases"][0]["title"] == "Covers app/login.py"
+    assert RecordingGenerator.calls == ["d" * 40]     # served, not generated again
+
+
+def test_a_sha_that_is_no_longer_the_head_is_skipped(webhook_app, pull_fixture):
+    app_module, server = webhook_app
+    _push(server, pull_fixture, "f" * 40)
+
+    app_module._precompute_pr("owner", "repo", 1, "e" * 40)
+
+    assert RecordingGenerator.calls == []
+    assert app_module._result_store.get_pr_analysis("owner/repo#1", "e" * 40) is None
+    assert app_module._result_store.get_pr_analysis("owner/repo#1", "f" * 40) is None
@@ -0,0 +1,164 @@
+"""CyclePusher: Zephyr Scale test cycles from decided mappings, against the fake Zephyr server."""
+
+import io
+import time
+
+import pytest
+from openpyxl import Workbook
+
+from src.decision_rules import apply_decision
+from src.excel_mapper import ExcelMapper
+from src.excel_processor import ExcelProcessor, row_key
+from src.jira_client import ZephyrError, ZephyrScaleClient
+from src.zephyr_cycles import CyclePusher, cycle_items
+from tests.fake_zephyr import FakeZephyr
+
+GENERATED = [{"id": "TC-001", "title": "Login works"}]
+
+
+def _client(server: FakeZephyr) -> ZephyrScaleClient:
+    return ZephyrScaleClient(server.base_url, "token", "PROJ", rate_per_second=1000)
+
+
+def _seed(server: FakeZephyr, count: int):
+    return [server.add_test_case({"projectKey": "PROJ", "name": f"Case {n}"}) for n in range(count)]
+
+
+def _suite(*sheets) -> bytes:
+    """Workbook with one sheet per (title, test ids)."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for title, test_ids in sheets:
+        ws = wb.create_sheet(title)
+        ws.append(["Test ID", "Test Scenario", "Expected Result"])
+        for test_id in test_ids:
+            ws.append([test_id, f"Scenario of {test_id}", "It works"])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _mappings(rows, confidence: int = 90):
+    """Mappings as the mapper builds them, every row a strong match: decided RUN."""
+    ai_output = {"mappings": [
+        {"excel_row_index": row_key(row), "generated_tc_id": "TC-001", "confidence": confidence} for row in rows
+    ]}
+    return [apply_decision(m) for m in ExcelMapper(None)._build_result(ai_output, rows, GENERATED).mappings]
+
+
+def _run_rows(*test_ids):
+    return [apply_decision({"excel_row_index": n, "raw_id": test_id, "test_id": test_id,
+                            "status": "MAPPED", "confidence": 90})
+            for n, test_id in enumerate(test_ids, start=2)]
+
+
+@pytest.fixture
+def pusher_for(tmp_path):
+    def make(server: FakeZephyr, **options) -> CyclePusher:
+        return CyclePusher(_client(server), progress_root=str(tmp_path / "push"), **options)
+    return make
+
+
+def test_keys_of_multi_sheet_suites_are_found():
+    rows = ExcelProcessor.parse_workbooks([("suite.xlsx", _suite(("Smoke", ["PROJ-T1"]), ("Login", ["PROJ-T2"])))])
+
+    items = cycle_items(_mappings(rows), [])
+
+    assert [m["raw_id"] for m in _mappings(rows)] == ["Smoke / PROJ-T1", "Login / PROJ-T2"]
+    assert [i.test_key for i in items] == ["PROJ-T1", "PROJ-T2"]
+
+
+def test_push_creates_new_cases_and_adds_executions(fake_zephyr, pusher_for):
+    server = fake_zephyr()
+    keys = _seed(server, 3)
+    new_case = {"id": "TC-009", "title": "Password reset", "steps": ["Request a reset"],
+                "expected_result": "A mail is sent"}
+
+    report = pusher_for(server).push(_run_rows(*keys), [new_case], "Regression", story_id="PROJ-1")
+
+    summary = report.to_dict()["summary"]
+    assert (summary["items"], summary["created"], summary["pushed"], summary["failed"]) == (4, 1, 4, 0)
+    cycle = server.test_runs[report.cycle_key]
+    assert {item["testCaseKey"] for item in cycle["items"]} == set(keys) | {"PROJ-T4"}
+    assert server.test_cases["PROJ-T4"]["name"] == "Password reset"
+
+
+def test_rows_without_a_key_are_skipped(fake_zephyr, pusher_for):
+    server = fake_zephyr()
+    keys = _seed(server, 1)
+
+    report = pusher_for(server).push(_run_rows(keys[0], "Login works"), [], "Regression")
+
+    assert report.pushed == 1
+    assert [(s["title"], s["reason"]) for s in report.skipped] == [("Login works", "No Zephyr Scale test key")]
+    assert report.failed == []
+
+
+def test_rejected_batch_is_retried_item_by_item(fake_zephyr, pusher_for):
+    server = fake_zephyr()
+    keys = _seed(server, 5)
+
+    report = pusher_for(server, batch_size=10).push(_run_rows(*keys[:3], "PROJ-T99", *keys[3:]), [], "Regression")
+
+    assert report.pushed == 5
+    assert [(f["key"], f["step"]) for f in report.failed] == [("PROJ-T99", "execute")]
+    assert "Unknown test cases: PROJ-T99" in report.failed[0]["error"]
+    results = [p for m, p, _ in server.requests if m == "POST" and p.endswith("/testresults")]
+    assert len(results) == 1 + 6      # the rejected batch, then each item on its own
+    assert len(server.test_runs[report.cycle_key]["items"]) == 5
+
+
+def test_second_push_resumes_from_the_progress_log(fake_zephyr, pusher_for, monkeypatch):
+    server = fake_zephyr()
+    keys = _seed(server, 6)
+    mappings = _run_rows(*keys)
+    pusher = pusher_for(server, batch_size=2)
+    add_test_results = pusher.client.add_test_results
+    sent = []
+
+    def flaky(cycle_key, results):     # two batches go through, then the service is down
+        if len(sent) >= 2:
+            raise ZephyrError("Service unavailable", status=503)
+        sent.append(results)
+        return add_test_results(cycle_key, results)
+
+    monkeypatch.setattr(pusher.client, "add_test_results", flaky)
+    first = pusher.push(mappings, [], "Regression")
+    assert (first.pushed, len(first.failed)) == (4, 2)
+
+    monkeypatch.setattr(pusher.client, "add_test_results", add_test_results)
+    second = pusher.push(mappings, [], "Regression")
+
+    assert second.resumed and second.job_id == first.job_id
+    assert second.cycle_key == first.cycle_key
+    assert (second.pushed, second.pushed_now, second.failed) == (6, 2, [])
+    assert len(server.test_runs) == 1
+
+    third = pusher.push(mappings, [], "Regression")
+    assert (third.pushed, third.pushed_now) == (6, 0)
+
+
+def test_test_cycle_endpoint_runs_the_push_as_a_background_job(app_module, fake_zephyr, monkeypatch, tmp_path):
+    server = fake_zephyr()
+    keys = _seed(server, 2)
+    monkeypatch.setenv("JIRA_BASE_URL", server.base_url)
+    monkeypatch.setenv("JIRA_API_TOKEN", "token")
+    monkeypatch.setenv("JIRA_PROJECT_KEY", "PROJ")
+    monkeypatch.setenv("ZEPHYR_RATE_LIMIT", "1000")
+    monkeypatch.setenv("ZEPHYR_PUSH_DIR", str(tmp_path / "push"))
+    client = app_module.app.test_client()
+    mapping_result = {"mappings": _run_rows(*keys), "new_generated": []}
+
+    response = client.post("/api/jira/test-cycles", json={"cycle_name": "Nightly", "mapping_result": mapping_result})
+
+    assert response.status_code == 202
+    job_id = response.get_json()["data"]["job_id"]
+    deadline = time.monotonic() + 10
+    while (state := client.get(f"/api/jobs/{job_id}").get_json()["data"])["status"] in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert state["status"] == "ok"
+    assert state["result"]["summary"]["pushed"] == 2
+    assert state["items"]["done"] == state["items"]["total"] == 2
+    assert len(server.test_runs[state["result"]["cycle_key"]]["items"]) == 2
+    assert client.get("/api/jobs/unknown-job-id").status_code == 404
@@ -0,0 +1,118 @@
+"""ZephyrMirror: full and incremental syncs of the local test case copy, against the fake Zephyr server."""
+
+import time
+
+import pytest
+import requests
+
+from src.jira_client import ZephyrScaleClient
+from src.zephyr_mirror import ZephyrMirror
+
+
+def _seed(server, count: int, **fields):
+    return [server.add_test_case(dict({"projectKey": "PROJ", "name": f"Case {n}"}, **fields)) for n in range(count)]
+
+
+@pytest.fixture
+def mirror_for(tmp_path):
+    def make(server, **options) -> ZephyrMirror:
+        client = ZephyrScaleClient(server.base_url, "token", "PROJ", rate_per_second=1000)
+        return ZephyrMirror(str(tmp_path / "mirror.sqlite"), client, **options)
+    return make
+
+
+def _searches(server):
+    return [path for method, path, _ in server.requests if method == "GET" and path.endswith("/testcase/search")]
+
+
+def test_first_sync_crawls_every_page(fake_zephyr, mirror_for):
+    server = fake_zephyr()
+    _seed(server, 250)
+    mirror = mirror_for(server, max_workers=2)
+
+    stats = mirror.sync()
+
+    assert (stats["mode"], stats["fetched"], stats["deleted"], stats["total"]) == ("full", 250, 0, 250)
+    assert stats["watermark"] == max(tc["updatedOn"] for tc in server.test_cases.values())
+    assert len(_searches(server)) == 4      # two rounds of two pages; the third page is short
+    assert not mirror.full_sync_due()
+
+
+def test_later_syncs_fetch_only_cases_updated_since_the_watermark(fake_zephyr, mirror_for):
+    server = fake_zephyr()
+    keys = _seed(server, 5, folder="/Suite")
+    for day, key in enumerate(keys, start=1):
+        server.test_cases[key]["updatedOn"] = f"2024-01-0{day}T00:00:00.000Z"
+    mirror = mirror_for(server)
+    first = mirror.sync()
+    assert first["watermark"] == "2024-01-05T00:00:00.000Z"
+    requests.put(f"{server.base_url}/rest/atm/1.0/testcase/{keys[2]}", json={"name": "Renamed"}, timeout=5)
+
+    stats = mirror.sync()
+
+    # The renamed case, and the one at the old watermark (updatedOn >= is inclusive)
+    assert (stats["mode"], stats["fetched"], stats["total"]) == ("incremental", 2, 5)
+    assert stats["watermark"] == server.test_cases[keys[2]]["updatedOn"] > first["watermark"]
+    assert "Renamed" in [tc.summary for tc in mirror.test_cases_in_folder("Suite")]
+    assert mirror.sync()["fetched"] == 1        # only the case at the watermark
+
+
+def test_only_a_full_crawl_drops_deleted_cases(fake_zephyr, mirror_for):
+    server = fake_zephyr()
+    keys = _seed(server, 3)
+    mirror = mirror_for(server)
+    mirror.sync()
+    del server.test_cases[keys[0]]
+
+    assert mirror.sync(full=False)["deleted"] == 0
+    assert mirror.count() == 3
+
+    stats = mirror.sync(full=True)
+    assert (stats["deleted"], stats["total"]) == (1, 2)
+
+
+def test_full_crawl_due_is_left_out_of_ensure_fresh(fake_zephyr, mirror_for):
+    server = fake_zephyr()
+    _seed(server, 2)
+    mirror = mirror_for(server, full_sync_seconds=0)
+
+    assert mirror.ensure_fresh(0)["mode"] == "full"         # never synced: crawled
+    time.sleep(0.01)
+    assert mirror.full_sync_due()
+    assert mirror.ensure_fresh(0)["mode"] == "incremental"
+    assert mirror.ensure_fresh(3600) is None
+
+
+def test_cases_are_read_by_story_and_folder(fake_zephyr, mirror_for):
+    server = fake_zephyr()
+    _seed(server, 2, folder="/Checkout", issueLinks=["PROJ-1"])
+    _seed(server, 1, folder="/Checkout/Payments", issueLinks=["PROJ-1", "PROJ-2"])
+    _seed(server, 1, folder="/Search")
+    mirror = mirror_for(server)
+    mirror.sync()
+
+    assert [tc.id for tc in mirror.test_cases_for_story("PROJ-1")] == ["PROJ-T1", "PROJ-T2", "PROJ-T3"]
+    assert [tc.id for tc in mirror.test_cases_for_story("PROJ-2")] == ["PROJ-T3"]
+    assert len(mirror.test_cases_in_folder("Checkout")) == 3
+    assert len(mirror.test_cases_in_folder("/Checkout", recursive=False)) == 2
+    assert mirror.suite_jsonl("PROJ-2").decode().count("\n") == 1
+    assert mirror.suite_jsonl("PROJ-9") == b""
+
+
+def test_sync_endpoint_runs_as_a_background_job(app_module, fake_zephyr, mirror_for, monkeypatch):
+    server = fake_zephyr()
+    _seed(server, 3)
+    monkeypatch.setattr(app_module, "_zephyr_mirror", mirror_for(server))
+    client = app_module.app.test_client()
+
+    response = client.post("/api/jira/sync", json={"full": True})
+
+    assert response.status_code == 202
+    job_id = response.get_json()["data"]["job_id"]
+    assert job_id == "zephyr-sync-PROJ"
+    deadline = time.monotonic() + 10
+    while (state := client.get(f"/api/jobs/{job_id}").get_json()["data"])["status"] in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert state["status"] == "ok"
+    assert (state["result"]["mode"], state["result"]["total"]) == ("full", 3)